@@ -4,20 +4,42 @@ from __future__ import annotations
 
 import datetime as dt
 import json
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Iterator, Optional
 
 import httpx
-from fastapi import APIRouter, HTTPException, Query, UploadFile, File
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from koda2.logging_config import get_logger
+from koda2.pagination import InvalidCursor, encode_cursor, trim_page
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+# List endpoints return the cursor for the next page in this header (and,
+# where the body is an object, as "next_cursor"). Absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Calendar accounts (URL-encoded, comma-separated) missing from a partial result
+INCOMPLETE_ACCOUNTS_HEADER = "X-Calendar-Incomplete"
+
+
+@contextmanager
+def _cursor_errors() -> Iterator[None]:
+    """Turn a malformed ?cursor= into a 400 instead of a 500."""
+    try:
+        yield
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
 
 # ── Request / Response Models ────────────────────────────────────────
 
@@ -221,18 +243,27 @@ async def supervisor_improve(request: dict[str, Any]) -> dict[str, Any]:
 
 @router.get("/supervisor/queue")
 async def supervisor_queue(
+    response: Response,
     status: Optional[str] = Query(None),
-    limit: int = Query(50),
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Page back from a previous next_cursor"),
 ) -> dict[str, Any]:
-    """Get the improvement queue status and items."""
-    from koda2.supervisor.improvement_queue import get_improvement_queue
+    """Get the improvement queue status and the newest items (oldest first)."""
+    from koda2.supervisor.improvement_queue import get_improvement_queue, queue_item_cursor
 
     queue = get_improvement_queue()
-    items = queue.list_items(status=status, limit=limit)
+    with _cursor_errors():
+        items = queue.list_items(status=status, limit=limit + 1, cursor=cursor)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[1:]
+        next_cursor = encode_cursor(*queue_item_cursor(items[0]))
+    _set_next_cursor(response, next_cursor)
     return {
         "stats": queue.stats(),
         "worker_running": queue.is_running,
         "items": items,
+        "next_cursor": next_cursor,
     }
 
 
@@ -332,15 +363,31 @@ async def chat(request: ChatRequest) -> ChatResponse:
 
 @router.get("/calendar/events")
 async def list_events(
+    response: Response,
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
     days: int = Query(7),
+    max_age: Optional[int] = Query(None, ge=0, description="Oldest acceptable cache age in seconds (0 = live)"),
+    allow_stale: bool = Query(True, description="Serve stale cache while revalidating in the background"),
 ) -> list[dict[str, Any]]:
-    """List calendar events."""
+    """List calendar events (cache-first).
+
+    Accounts that failed or missed their deadline are listed in the
+    ``X-Calendar-Incomplete`` header; the events of the others are returned.
+    """
+    from urllib.parse import quote
+
     orch = get_orchestrator()
     start_dt = dt.datetime.fromisoformat(start) if start else dt.datetime.now(dt.UTC)
     end_dt = dt.datetime.fromisoformat(end) if end else start_dt + dt.timedelta(days=days)
-    events = await orch.calendar.list_events(start_dt, end_dt)
+    events, statuses = await orch.calendar.list_events_with_status(
+        start_dt, end_dt,
+        max_age=dt.timedelta(seconds=max_age) if max_age is not None else None,
+        allow_stale=allow_stale,
+    )
+    incomplete = [name for name, status in statuses.items() if status.status in ("timeout", "error")]
+    if incomplete:
+        response.headers[INCOMPLETE_ACCOUNTS_HEADER] = ",".join(quote(name) for name in incomplete)
     return [
         {
             "id": e.id, "title": e.title, "start": e.start.isoformat(),
@@ -357,6 +404,13 @@ async def list_events(
     ]
 
 
+@router.get("/calendar/cache")
+async def calendar_cache_stats() -> dict[str, Any]:
+    """Cache-first read metrics and per-account sync times."""
+    orch = get_orchestrator()
+    return await orch.calendar.cache_stats()
+
+
 @router.post("/calendar/sync")
 async def sync_calendar() -> dict[str, Any]:
     """Trigger a manual calendar sync from remote providers to local cache."""
@@ -366,6 +420,39 @@ async def sync_calendar() -> dict[str, Any]:
     return {"status": "ok", "total_events": total, "accounts": results}
 
 
+@router.post("/calendar/notifications/graph")
+async def graph_calendar_notification(
+    request: Request,
+    validation_token: Optional[str] = Query(None, alias="validationToken"),
+) -> Response:
+    """Microsoft Graph change notifications for calendar subscriptions.
+
+    Graph validates a new subscription by POSTing a ``validationToken``,
+    which must be echoed as plain text within 10 seconds.
+    """
+    if validation_token is not None:
+        return Response(content=validation_token, media_type="text/plain")
+    orch = get_orchestrator()
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid notification body")
+    orch.calendar_notifications.handle_graph(payload)
+    return Response(status_code=202)
+
+
+@router.post("/calendar/notifications/google")
+async def google_calendar_notification(
+    channel_id: str = Header("", alias="X-Goog-Channel-ID"),
+    channel_token: str = Header("", alias="X-Goog-Channel-Token"),
+    resource_state: str = Header("", alias="X-Goog-Resource-State"),
+) -> Response:
+    """Google Calendar ``events.watch`` push notifications (the body is empty)."""
+    orch = get_orchestrator()
+    orch.calendar_notifications.handle_google(channel_id, channel_token, resource_state)
+    return Response(status_code=200)
+
+
 @router.post("/calendar/events")
 async def create_event(request: EventRequest) -> dict[str, Any]:
     """Create a calendar event with optional prep time."""
@@ -421,6 +508,37 @@ async def get_inbox(
     ]
 
 
+@router.get("/email/search")
+async def search_email(
+    q: str = Query("", description="Search words; all must match, \"quotes\" for a phrase"),
+    sender: Optional[str] = Query(None),
+    since: Optional[dt.datetime] = Query(None),
+    before: Optional[dt.datetime] = Query(None),
+    folder: Optional[str] = Query(None),
+    unread: Optional[bool] = Query(None),
+    has_attachments: Optional[bool] = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+) -> list[dict[str, Any]]:
+    """Search synced mail locally, best match first, with highlighted snippets."""
+    orch = get_orchestrator()
+    hits = await orch.email.search_emails(
+        query=q, sender=sender, since=since, before=before, folder=folder,
+        is_read=None if unread is None else not unread, has_attachments=has_attachments, limit=limit,
+    )
+    return [
+        {
+            "id": hit.message.id, "subject": hit.message.subject, "sender": hit.message.sender,
+            "date": hit.message.date.isoformat() if hit.message.date else "",
+            "is_read": hit.message.is_read,
+            "has_attachments": hit.message.has_attachments,
+            "account": hit.message.account_name or "",
+            "folder": hit.message.folder,
+            "snippet": hit.snippet,
+        }
+        for hit in hits
+    ]
+
+
 @router.post("/email/send")
 async def send_email(request: EmailRequest) -> dict[str, bool]:
     """Send an email."""
@@ -503,27 +621,56 @@ async def search_memory(
 
 @router.get("/memory/list")
 async def list_memories(
+    response: Response,
     user_id: str = "default",
     category: Optional[str] = None,
-    limit: int = Query(100),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
 ) -> list[dict[str, Any]]:
-    """List all stored memories for a user."""
+    """List stored memories for a user, newest first (paged via X-Next-Cursor)."""
     orch = get_orchestrator()
-    entries = await orch.memory.list_memories(user_id, category=category, limit=limit)
+    with _cursor_errors():
+        entries = await orch.memory.list_memories(user_id, category=category, limit=limit + 1, cursor=cursor)
+    entries, next_cursor = trim_page(entries, limit, orch.memory.memory_cursor)
+    _set_next_cursor(response, next_cursor)
     return [_memory_to_dict(e) for e in entries]
 
 
 @router.get("/memory/all")
 async def list_all_memories(
+    response: Response,
     category: Optional[str] = None,
-    limit: int = Query(100),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
 ) -> list[dict[str, Any]]:
-    """List all memories across all users (for dashboard)."""
+    """List all memories across all users (for dashboard), paged via X-Next-Cursor."""
     orch = get_orchestrator()
-    entries = await orch.memory.list_all_memories(category=category, limit=limit)
+    with _cursor_errors():
+        entries = await orch.memory.list_all_memories(category=category, limit=limit + 1, cursor=cursor)
+    entries, next_cursor = trim_page(entries, limit, lambda e: orch.memory.memory_cursor(e, "updated_at"))
+    _set_next_cursor(response, next_cursor)
     return [_memory_to_dict(e) for e in entries]
 
 
+@router.get("/memory/export")
+async def export_memories(
+    user_id: Optional[str] = None,
+    category: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream every active memory (one user's, or all) as NDJSON."""
+    orch = get_orchestrator()
+
+    async def _lines() -> AsyncIterator[str]:
+        async for entry in orch.memory.iter_memories(user_id=user_id, category=category):
+            yield json.dumps(_memory_to_dict(entry), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        _lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="memories.ndjson"'},
+    )
+
+
 @router.get("/memory/stats")
 async def memory_stats(user_id: str = "default") -> dict[str, Any]:
     """Get memory statistics."""
@@ -531,6 +678,13 @@ async def memory_stats(user_id: str = "default") -> dict[str, Any]:
     return await orch.memory.get_memory_stats(user_id)
 
 
+@router.post("/memory/consolidate")
+async def consolidate_memory(force_compact: bool = Query(False)) -> dict[str, Any]:
+    """Run memory decay, de-duplication, archiving and index compaction now."""
+    orch = get_orchestrator()
+    return await orch.memory.consolidate(force_compact=force_compact)
+
+
 class MemoryUpdateRequest(BaseModel):
     """Memory update request."""
     content: Optional[str] = None
@@ -901,23 +1055,31 @@ async def create_agent_task(
 
 @router.get("/agent/tasks")
 async def list_agent_tasks(
+    response: Response,
     user_id: str = "default",
     status: Optional[str] = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
 ) -> dict[str, Any]:
-    """List agent tasks for a user."""
+    """List agent tasks for a user, newest first."""
     orch = get_orchestrator()
+    from koda2.modules.agent import agent_task_cursor
     from koda2.modules.agent.models import AgentStatus
     
     task_status = AgentStatus(status) if status else None
-    tasks = await orch.agent.list_tasks(
-        user_id=user_id,
-        status=task_status,
-        limit=limit,
-    )
+    with _cursor_errors():
+        tasks = await orch.agent.list_tasks(
+            user_id=user_id,
+            status=task_status,
+            limit=limit + 1,
+            cursor=cursor,
+        )
+    tasks, next_cursor = trim_page(tasks, limit, agent_task_cursor)
+    _set_next_cursor(response, next_cursor)
     return {
         "tasks": [t.to_dict() for t in tasks],
         "total": len(tasks),
+        "next_cursor": next_cursor,
     }
 
 
@@ -1077,14 +1239,19 @@ async def list_command_categories() -> dict[str, Any]:
 
 @router.get("/tasks")
 async def list_queued_tasks(
+    response: Response,
     status: Optional[str] = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
 ) -> list[dict[str, Any]]:
-    """List tasks from the async task queue."""
+    """List tasks from the async task queue, newest first (paged via X-Next-Cursor)."""
     orch = get_orchestrator()
-    from koda2.modules.task_queue import TaskStatus
+    from koda2.modules.task_queue import TaskStatus, task_cursor
     task_status = TaskStatus(status) if status else None
-    tasks = await orch.task_queue.list_tasks(status=task_status, limit=limit)
+    with _cursor_errors():
+        tasks = await orch.task_queue.list_tasks(status=task_status, limit=limit + 1, cursor=cursor)
+    tasks, next_cursor = trim_page(tasks, limit, task_cursor)
+    _set_next_cursor(response, next_cursor)
     return [t.to_dict() for t in tasks]
 
 
@@ -25,6 +25,14 @@ app.add_typer(service_app, name="service")
 cmd_app = typer.Typer(help="Browse available commands", no_args_is_help=True)
 app.add_typer(cmd_app, name="commands")
 
+# Memory subcommand
+memory_app = typer.Typer(help="Maintain the memory store", no_args_is_help=True)
+app.add_typer(memory_app, name="memory")
+
+# Database subcommand
+db_app = typer.Typer(help="Database schema and migrations", no_args_is_help=True)
+app.add_typer(db_app, name="db")
+
 
 def _async_run(coro):
     """Run an async coroutine."""
@@ -104,12 +112,21 @@ def doctor() -> None:
     # ── Database ──
     console.print("\n[bold]Database[/bold]")
     if settings:
-        db_path = settings.database_url.replace("sqlite+aiosqlite:///", "")
-        if Path(db_path).exists():
-            size_mb = Path(db_path).stat().st_size / 1024 / 1024
-            ok(f"SQLite DB exists ({size_mb:.1f} MB): {db_path}")
+        from koda2.database import database_backend
+
+        if database_backend(settings.database_url) == "postgresql":
+            try:
+                __import__("asyncpg")
+                ok("PostgreSQL backend (asyncpg available)")
+            except ImportError:
+                fail("PostgreSQL URL configured but asyncpg is not installed — pip install 'koda2[postgres]'")
         else:
-            warn(f"SQLite DB not found: {db_path} (will be created on first run)")
+            db_path = settings.database_url.replace("sqlite+aiosqlite:///", "")
+            if Path(db_path).exists():
+                size_mb = Path(db_path).stat().st_size / 1024 / 1024
+                ok(f"SQLite DB exists ({size_mb:.1f} MB): {db_path}")
+            else:
+                warn(f"SQLite DB not found: {db_path} (will be created on first run)")
 
         chroma_dir = Path(settings.chroma_persist_dir)
         if chroma_dir.exists():
@@ -710,6 +727,91 @@ def commands_categories() -> None:
     console.print()
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Memory Commands
+# ─────────────────────────────────────────────────────────────────────────────
+
+@memory_app.command("reindex")
+def memory_reindex(
+    batch_size: int = typer.Option(256, "--batch-size", "-b", help="Rows per embedding batch"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="Embedding worker processes (default: half the CPUs)"),
+    fresh: bool = typer.Option(False, "--fresh", help="Ignore any checkpoint and start over"),
+) -> None:
+    """Rebuild the vector index from the database (stop the server first)."""
+    from rich.progress import BarColumn, Progress, TextColumn, TimeElapsedColumn
+
+    from koda2.modules.memory.reindex import MemoryReindexer
+
+    with Progress(
+        TextColumn("[cyan]{task.description}"),
+        BarColumn(),
+        TextColumn("{task.completed}/{task.total}"),
+        TextColumn("[green]{task.fields[rate]:.0f} docs/s"),
+        TimeElapsedColumn(),
+        console=console,
+    ) as bar:
+        task = bar.add_task("Reindexing", total=None, rate=0.0)
+
+        def _on_progress(p) -> None:
+            bar.update(task, description=f"Reindexing {p.source}", completed=p.processed,
+                       total=p.total, rate=p.docs_per_second)
+
+        reindexer = MemoryReindexer(batch_size=batch_size, workers=workers, on_progress=_on_progress)
+        try:
+            summary = _async_run(reindexer.run(resume=not fresh))
+        except KeyboardInterrupt:
+            console.print("\n[yellow]Interrupted — run the command again to resume.[/yellow]")
+            raise typer.Exit(1)
+
+    console.print(
+        f"[green]✓ Reindexed {summary['documents']} documents in {summary['seconds']}s "
+        f"({summary['docs_per_second']} docs/s)[/green]"
+    )
+    for source, count in summary["sources"].items():
+        console.print(f"  • {source}: {count}")
+
+
+@db_app.command("status")
+def db_status() -> None:
+    """Show applied and pending schema migrations."""
+    from koda2.database import close_db, get_engine
+    from koda2.migrations import MIGRATIONS, applied_versions, pending_migrations
+
+    async def _status() -> set[int]:
+        try:
+            return await applied_versions(get_engine())
+        finally:
+            await close_db()
+
+    applied = _async_run(_status())
+    pending = {m.version for m in pending_migrations(applied)}
+    table = Table(title="Schema Migrations")
+    table.add_column("Version", justify="right")
+    table.add_column("Name")
+    table.add_column("Status")
+    for m in MIGRATIONS:
+        status = "[yellow]pending[/yellow]" if m.version in pending else "[green]applied[/green]"
+        table.add_row(str(m.version), m.name, status)
+    console.print(table)
+
+
+@db_app.command("migrate")
+def db_migrate() -> None:
+    """Create missing tables and apply pending migrations."""
+    from koda2.database import close_db, init_db
+    from koda2.migrations import MIGRATIONS
+
+    async def _migrate() -> None:
+        try:
+            await init_db()
+        finally:
+            await close_db()
+
+    _async_run(_migrate())
+    latest = MIGRATIONS[-1].version if MIGRATIONS else 0
+    console.print(f"[green]✓ Database schema is at version {latest}[/green]")
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Other Commands
 # ─────────────────────────────────────────────────────────────────────────────
@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+import datetime as dt
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import DateTime, MetaData, TypeDecorator, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from koda2.config import get_settings
 from koda2.logging_config import get_logger
@@ -29,6 +32,125 @@ class Base(DeclarativeBase):
     metadata = MetaData(naming_convention=convention)
 
 
+class UTCDateTime(TypeDecorator):
+    """A timestamp stored as naive UTC, on every backend.
+
+    Some code writes ``dt.datetime.now(dt.UTC)`` and some naive
+    ``dt.datetime.utcnow()``; aware values are converted to UTC and
+    stripped, so both store the same instant. The column is a plain
+    ``TIMESTAMP`` (asyncpg refuses aware values for it, and would read
+    naive ones into a TIMESTAMPTZ as server-local time), and values read
+    back are naive UTC, as they always were on SQLite.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, dt.datetime) and value.tzinfo is not None:
+            return value.astimezone(dt.UTC).replace(tzinfo=None)
+        return value
+
+
+# ── Engine profiles ──────────────────────────────────────────────────
+
+# Applied to every new SQLite connection. WAL lets readers run while one
+# writer commits; with WAL, synchronous=NORMAL only fsyncs at checkpoints
+# and is still crash-safe. busy_timeout makes a second writer wait for the
+# lock instead of failing with "database is locked".
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "cache_size": -65536,  # negative = KiB → 64 MiB page cache
+    "mmap_size": 268435456,  # 256 MiB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+
+def normalize_database_url(url: str) -> str:
+    """Map plain PostgreSQL URLs onto the asyncpg driver."""
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def database_backend(url: str) -> str:
+    """Return the backend name ("sqlite", "postgresql", ...) for a URL."""
+    return make_url(normalize_database_url(url)).get_backend_name()
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+
+def _apply_sqlite_pragmas(dbapi_connection, _record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_engine_for(
+    url: str,
+    *,
+    echo: bool = False,
+    tuned: bool = True,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+) -> AsyncEngine:
+    """Create an async engine with the profile for the URL's backend.
+
+    SQLite gets ``SQLITE_PRAGMAS`` on every connection (unless ``tuned`` is
+    False, which the benchmark uses as a baseline). File databases and
+    PostgreSQL get a sized queue pool; in-memory SQLite keeps its single
+    static connection.
+    """
+    url = normalize_database_url(url)
+    backend = database_backend(url)
+    options: dict = {"echo": echo, "pool_pre_ping": True}
+
+    if backend == "sqlite":
+        if not _is_memory_sqlite(url):
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+            )
+    elif backend == "postgresql":
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=1800,
+            connect_args={"server_settings": {"application_name": "koda2", "timezone": "UTC"}},
+        )
+
+    engine = create_async_engine(url, **options)
+    if backend == "sqlite" and tuned:
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def dialect_insert(bind, table):
+    """Return an INSERT for ``table`` with ``on_conflict_do_*`` for this backend.
+
+    ``bind`` is anything with a ``dialect`` (an engine, connection or
+    ``session.bind``).
+    """
+    name = bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"No upsert support for {name}")
+    return insert(table)
+
+
 _engine = None
 _session_factory = None
 
@@ -38,11 +160,15 @@ def get_engine():
     global _engine
     if _engine is None:
         settings = get_settings()
-        _engine = create_async_engine(
-            settings.database_url,
-            echo=settings.koda2_env == "development",
-            pool_pre_ping=True,
-        )
+        url = settings.database_url
+        pool = {}
+        if not (database_backend(url) == "sqlite" and _is_memory_sqlite(url)):
+            pool = {
+                "pool_size": settings.database_pool_size,
+                "max_overflow": settings.database_max_overflow,
+            }
+        _engine = create_engine_for(url, echo=settings.koda2_env == "development", **pool)
+        logger.info("database_engine_created", backend=database_backend(url), **pool)
     return _engine
 
 
@@ -72,16 +198,22 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def init_db() -> None:
-    """Create all tables."""
+    """Create missing tables, then apply pending schema migrations."""
     # Import all models so Base.metadata knows about them
     import koda2.modules.account.models  # noqa: F401
     import koda2.modules.calendar.cache  # noqa: F401
+    import koda2.modules.email.attachments  # noqa: F401
+    import koda2.modules.email.store  # noqa: F401
+    import koda2.modules.memory.models  # noqa: F401
     import koda2.modules.scheduler.models  # noqa: F401
+    import koda2.security.audit  # noqa: F401
+    from koda2.migrations import run_migrations
 
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    logger.info("database_initialized")
+    applied = await run_migrations(engine)
+    logger.info("database_initialized", migrations_applied=applied)
 
 
 async def close_db() -> None:
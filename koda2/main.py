@@ -18,6 +18,7 @@ import os
 import signal
 import subprocess
 import sys
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
@@ -60,6 +61,7 @@ from koda2.database import close_db, init_db
 from koda2.logging_config import get_logger, setup_logging
 from koda2.modules.metrics.service import MetricsService
 from koda2.orchestrator import Orchestrator
+from koda2.security.audit import get_audit_writer
 
 setup_logging()
 logger = get_logger(__name__)
@@ -173,6 +175,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     _background_tasks.append(asyncio.create_task(_start_whatsapp(_orchestrator)))
     _background_tasks.append(asyncio.create_task(_periodic_token_refresh(_orchestrator)))
     _background_tasks.append(asyncio.create_task(_periodic_calendar_sync(_orchestrator)))
+    _background_tasks.append(asyncio.create_task(_periodic_imap_keepalive()))
 
     await _print_status(settings, _orchestrator)
     
@@ -215,7 +218,7 @@ async def _graceful_shutdown() -> None:
         await asyncio.gather(*_background_tasks, return_exceptions=True)
     _background_tasks.clear()
 
-    # 2. Stop services (order: orchestrator → metrics → ws → db)
+    # 2. Stop services (order: orchestrator → metrics → ws → audit → db)
     if _orchestrator:
         try:
             await _orchestrator.shutdown()
@@ -234,6 +237,12 @@ async def _graceful_shutdown() -> None:
         except Exception as exc:
             logger.warning("websocket_stop_error", error=str(exc))
 
+    # Flush buffered audit rows while the DB is still open
+    try:
+        await get_audit_writer().close()
+    except Exception as exc:
+        logger.warning("audit_flush_error", error=str(exc))
+
     try:
         await close_db()
     except Exception as exc:
@@ -438,16 +447,31 @@ async def _start_whatsapp(orch: Orchestrator) -> None:
 async def _periodic_calendar_sync(orch: Orchestrator) -> None:
     """Periodically sync calendar events from remote providers to local DB.
     
-    First sync after 10 seconds, then every 5 minutes.
+    First sync after 10 seconds, after which accounts are subscribed to
+    push notifications (CalendarNotifier), which sync an account as soon
+    as it changes. Accounts without push are polled every 5 minutes; the
+    pushed ones only hourly, as a safety net for lost notifications.
     """
+
     SYNC_INTERVAL = 5 * 60  # 5 minutes
+    SAFETY_NET_INTERVAL = 60 * 60  # 1 hour
     await asyncio.sleep(10)  # Let startup finish
 
+    last_full_sync = None
+    push_started = False
     while True:
         try:
-            results = await orch.calendar.sync_all()
+            if last_full_sync is None or time.monotonic() - last_full_sync >= SAFETY_NET_INTERVAL:
+                results = await orch.calendar.sync_all()
+                last_full_sync = time.monotonic()
+            else:
+                results = await orch.calendar.sync_all(exclude=orch.calendar.push_accounts)
             total = sum(v for v in results.values() if v >= 0)
             logger.info("calendar_sync_done", total_events=total, accounts=results)
+
+            if not push_started and get_settings().calendar_push_enabled:
+                push_started = True
+                await orch.calendar_notifications.start()
         except asyncio.CancelledError:
             break
         except Exception as exc:
@@ -459,6 +483,27 @@ async def _periodic_calendar_sync(orch: Orchestrator) -> None:
             break
 
 
+async def _periodic_imap_keepalive() -> None:
+    """NOOP pooled IMAP sessions so servers don't drop them between inbox checks.
+
+    Runs every 4 minutes; sessions unused for longer than the pool's
+    MAX_IDLE are logged out instead.
+    """
+    from koda2.modules.email.imap_pool import imap_pool
+
+    KEEPALIVE_INTERVAL = 4 * 60  # 4 minutes
+    while True:
+        try:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            kept = await asyncio.to_thread(imap_pool.keepalive)
+            if kept:
+                logger.debug("imap_keepalive_done", sessions=kept)
+        except asyncio.CancelledError:
+            break
+        except Exception as exc:
+            logger.error("imap_keepalive_error", error=str(exc))
+
+
 async def _periodic_token_refresh(orch: Orchestrator) -> None:
     """Periodically refresh Google OAuth tokens to keep connections alive.
     
@@ -0,0 +1,106 @@
+"""Versioned schema migrations.
+
+``init_db`` still creates missing tables with ``create_all``; migrations
+evolve what ``create_all`` cannot touch on an existing database — indexes,
+new columns, data fixes. Each migration runs once, in its own transaction,
+and is recorded in the ``schema_migrations`` table.
+
+Add a migration by appending a function to ``koda2/migrations/versions.py``
+decorated with ``@migration(<next version>, "<description>")``. Write them
+as plain SQL that works on both SQLite and PostgreSQL, and idempotently
+(``IF NOT EXISTS`` / ``IF EXISTS``), since a fresh database may already
+have the objects from the models.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import Column, Integer, String, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from koda2.database import Base, UTCDateTime
+from koda2.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class SchemaMigration(Base):
+    """One applied migration."""
+
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(256), nullable=False)
+    applied_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema step, applied with a synchronous connection."""
+
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str) -> Callable[[Callable[[Connection], None]], Callable[[Connection], None]]:
+    """Register ``fn`` as migration ``version``."""
+
+    def decorator(fn: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+
+    return decorator
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    """Return True if ``table`` exists (for migrations touching optional tables)."""
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    """Return True if ``table`` exists and has ``column``."""
+    return has_table(conn, table) and any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _applied_versions(conn: Connection) -> set[int]:
+    SchemaMigration.__table__.create(conn, checkfirst=True)
+    return set(conn.execute(select(SchemaMigration.version)).scalars())
+
+
+async def applied_versions(engine: AsyncEngine) -> set[int]:
+    """Return the versions already recorded in ``schema_migrations``."""
+    async with engine.begin() as conn:
+        return await conn.run_sync(_applied_versions)
+
+
+def pending_migrations(applied: set[int]) -> list[Migration]:
+    """Return registered migrations not yet in ``applied``, in order."""
+    from koda2.migrations import versions  # noqa: F401 — registers MIGRATIONS
+
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+async def run_migrations(engine: AsyncEngine) -> list[int]:
+    """Apply all pending migrations. Returns the versions applied."""
+    applied = await applied_versions(engine)
+    done: list[int] = []
+    for m in pending_migrations(applied):
+        async with engine.begin() as conn:
+            await conn.run_sync(m.upgrade)
+            await conn.execute(SchemaMigration.__table__.insert().values(
+                version=m.version, name=m.name, applied_at=dt.datetime.now(dt.UTC),
+            ))
+        logger.info("migration_applied", version=m.version, name=m.name)
+        done.append(m.version)
+    return done
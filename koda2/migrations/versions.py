@@ -0,0 +1,108 @@
+"""Schema migrations, in order. Never edit a migration once released."""
+
+from __future__ import annotations
+
+from sqlalchemy import String, Text, text
+from sqlalchemy.engine import Connection
+
+from koda2.database import UTCDateTime
+from koda2.migrations import has_column, has_table, migration
+
+
+def _create_index(conn: Connection, table: str, name: str, columns: str) -> None:
+    if has_table(conn, table):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+@migration(1, "hot-path composite indexes")
+def add_hot_path_indexes(conn: Connection) -> None:
+    # Recent history for a profile, newest first (get_recent_conversations)
+    _create_index(conn, "conversations", "ix_conversations_profile_created", "profile_id, created_at DESC")
+    # Per-user memory listing, optionally by category (list_memories)
+    _create_index(conn, "memory_entries", "ix_memory_entries_user_active_category_created",
+                  "user_id, active, category, created_at")
+    # Dashboard listing across users, most recently updated first (list_all_memories)
+    _create_index(conn, "memory_entries", "ix_memory_entries_active_updated", "active, updated_at")
+    # Window reads and the sync delete for one account (CalendarCache)
+    _create_index(conn, "cached_calendar_events", "ix_cached_events_account_start", "account_name, start")
+
+
+@migration(2, "drop indexes superseded by composites")
+def drop_superseded_indexes(conn: Connection) -> None:
+    # Both are leading-column prefixes of the version 1 composites
+    conn.execute(text("DROP INDEX IF EXISTS ix_conversations_profile_id"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_memory_entries_user_id"))
+
+
+@migration(3, "calendar sync tokens")
+def add_calendar_sync_token(conn: Connection) -> None:
+    # Provider change token for incremental calendar sync (CalendarCache.apply_changes)
+    if has_table(conn, "calendar_sync_state") and not has_column(conn, "calendar_sync_state", "sync_token"):
+        conn.execute(text("ALTER TABLE calendar_sync_state ADD COLUMN sync_token TEXT"))
+
+
+@migration(4, "calendar recurring series")
+def add_calendar_series_columns(conn: Connection) -> None:
+    # Series masters stored once and expanded on read (CalendarCache.get_events)
+    if not has_table(conn, "cached_calendar_events"):
+        return
+    # Types rendered by the dialect: PostgreSQL has no DATETIME
+    for column, type_ in (
+        ("recurrence", Text()),
+        ("recurrence_end", UTCDateTime()),
+        ("series_id", String(512)),
+        ("original_start", UTCDateTime()),
+    ):
+        if not has_column(conn, "cached_calendar_events", column):
+            ddl = type_.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE cached_calendar_events ADD COLUMN {column} {ddl}"))
+    _create_index(conn, "cached_calendar_events", "ix_cached_events_account_series", "account_name, series_id")
+    # Google tokens were issued for expanded instances; force one full resync
+    if has_table(conn, "calendar_sync_state"):
+        conn.execute(text("UPDATE calendar_sync_state SET sync_token = NULL"))
+
+
+@migration(5, "email full-text search index")
+def add_email_search_index(conn: Connection) -> None:
+    # FTS5 index over the mail store (MailStore.search), kept in step by triggers;
+    # SQLite only, elsewhere search falls back to LIKE
+    if not has_table(conn, "email_messages"):
+        return
+    # email_messages has a string primary key, so its rowid is implicit and VACUUM may
+    # renumber it; email_fts is keyed on a column of its own instead (content_rowid)
+    if not has_column(conn, "email_messages", "search_rowid"):
+        conn.execute(text("ALTER TABLE email_messages ADD COLUMN search_rowid INTEGER"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_email_messages_search_rowid ON email_messages (search_rowid)"
+    ))
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(text("UPDATE email_messages SET search_rowid = rowid WHERE search_rowid IS NULL"))
+    columns = "subject, sender_name, sender, recipients_json, body_text"
+    new = ", ".join(f"new.{c.strip()}" for c in columns.split(","))
+    old = ", ".join(f"old.{c.strip()}" for c in columns.split(","))
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS email_fts USING fts5({columns}, content='email_messages', "
+        "content_rowid='search_rowid', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    # ORDER BY rank: subject and sender matches weigh more than body matches
+    conn.execute(text("INSERT INTO email_fts(email_fts, rank) VALUES ('rank', 'bm25(5.0, 3.0, 3.0, 1.0, 1.0)')"))
+    # New rows are numbered here: the next search_rowid, then indexed under it
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS email_fts_insert AFTER INSERT ON email_messages BEGIN "
+        "UPDATE email_messages SET search_rowid = (SELECT COALESCE(MAX(search_rowid), 0) + 1 FROM email_messages) "
+        "WHERE rowid = new.rowid AND search_rowid IS NULL; "
+        f"INSERT INTO email_fts(rowid, {columns}) "
+        f"SELECT search_rowid, {columns} FROM email_messages WHERE rowid = new.rowid; END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS email_fts_delete AFTER DELETE ON email_messages BEGIN "
+        f"INSERT INTO email_fts(email_fts, rowid, {columns}) VALUES ('delete', old.search_rowid, {old}); END"
+    ))
+    # Flag updates (and the numbering above) leave the index alone
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS email_fts_update AFTER UPDATE OF {columns} ON email_messages BEGIN "
+        f"INSERT INTO email_fts(email_fts, rowid, {columns}) VALUES ('delete', old.search_rowid, {old}); "
+        f"INSERT INTO email_fts(rowid, {columns}) VALUES (new.search_rowid, {new}); END"
+    ))
+    conn.execute(text("INSERT INTO email_fts(email_fts) VALUES ('rebuild')"))
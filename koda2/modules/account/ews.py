@@ -0,0 +1,394 @@
+"""Shared Exchange Web Services transport.
+
+One ``EWSSession`` per mailbox serves both the calendar provider and the
+email service. It keeps a pooled ``httpx.Client`` with NTLM auth open:
+Exchange authenticates NTLM per connection, so requests on a kept-alive
+connection skip the three-leg handshake. The EWS host found by probing
+the configured server and autodiscover candidates is cached on disk, so
+a restart doesn't repeat the DNS lookups and probes.
+
+Responses are parsed as they stream in with ``iterparse``; callers get
+one item element at a time, which is detached once consumed, so a large
+folder never sits in memory as a whole document. ``find_items`` pages
+FindItem with ``IndexedPageItemView``.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import io
+import json
+import threading
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import httpx
+
+from koda2.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+TYPES_NS = "http://schemas.microsoft.com/exchange/services/2006/types"
+MESSAGES_NS = "http://schemas.microsoft.com/exchange/services/2006/messages"
+NS = {"t": TYPES_NS, "m": MESSAGES_NS}
+
+HEADERS = {"Content-Type": "text/xml; charset=utf-8"}
+
+_ROOT_FOLDER = f"{{{MESSAGES_NS}}}RootFolder"
+
+
+def envelope(body_xml: str) -> str:
+    """Wrap a request body in the SOAP envelope EWS expects."""
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
+               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"
+               xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
+  <soap:Header>
+    <t:RequestServerVersion Version="Exchange2016"/>
+  </soap:Header>
+  <soap:Body>
+    {body_xml}
+  </soap:Body>
+</soap:Envelope>"""
+
+
+def normalize_server(server: str) -> str:
+    """Strip protocol, path, and port from a server string."""
+    s = server.strip()
+    for prefix in ("https://", "http://"):
+        if s.lower().startswith(prefix):
+            s = s[len(prefix):]
+            break
+    return s.split("/")[0].split(":")[0]
+
+
+def ntlm_user(username: str, email: str) -> str:
+    """NTLM user name, with a DOMAIN\\ prefix derived from the mailbox if missing."""
+    if "\\" not in username and "@" not in username and "@" in email:
+        domain = email.split("@")[-1].split(".")[0].upper()
+        if domain:
+            return f"{domain}\\{username}"
+    return username
+
+
+class _ChunkReader(io.RawIOBase):
+    """File-like view over an iterator of byte chunks, for ``iterparse``."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class AutodiscoverCache:
+    """EWS hosts found by autodiscover, kept in a JSON file.
+
+    Keyed by mailbox and configured server; entries older than ``TTL``
+    are rediscovered.
+    """
+
+    TTL = dt.timedelta(days=7)
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            from koda2.config import get_settings
+            self._path = get_settings().data_dir / "ews_autodiscover.json"
+        return self._path
+
+    @staticmethod
+    def _key(email: str, server: str) -> str:
+        return f"{email.lower()}|{server.lower()}"
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: dict) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(entries, indent=2, sort_keys=True))
+            tmp.replace(self.path)
+        except OSError as exc:
+            logger.warning("ews_autodiscover_cache_write_failed", error=str(exc))
+
+    def get(self, email: str, server: str) -> Optional[str]:
+        """The cached host for this mailbox, or None if unknown or stale."""
+        with self._lock:
+            entry = self._load().get(self._key(email, server))
+        if not entry:
+            return None
+        try:
+            found = dt.datetime.fromisoformat(entry["found_at"])
+        except (KeyError, ValueError):
+            return None
+        if dt.datetime.now(dt.UTC) - found > self.TTL:
+            return None
+        return entry.get("host") or None
+
+    def put(self, email: str, server: str, host: str) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[self._key(email, server)] = {
+                "host": host, "found_at": dt.datetime.now(dt.UTC).isoformat(),
+            }
+            self._save(entries)
+
+    def forget(self, email: str, server: str) -> None:
+        with self._lock:
+            entries = self._load()
+            if entries.pop(self._key(email, server), None) is not None:
+                self._save(entries)
+
+
+class EWSSession:
+    """Authenticated, kept-alive EWS connection for one mailbox.
+
+    Get one with ``for_account``; sessions are shared per server, user
+    and mailbox. ``discover`` returns candidate hosts for a server and
+    mailbox (the configured server first) and is only consulted when the
+    disk cache has no host.
+    """
+
+    # Live sessions, keyed by (configured server, username, mailbox)
+    _sessions: dict[tuple[str, str, str], "EWSSession"] = {}
+    _registry_lock = threading.Lock()
+    autodiscover_cache = AutodiscoverCache()
+
+    # Items per FindItem page, and connections kept open per session
+    PAGE_SIZE = 100
+    MAX_CONNECTIONS = 4
+    TIMEOUT = 30
+
+    def __init__(
+        self,
+        server: str,
+        username: str,
+        password: str,
+        email: str,
+        discover: Optional[Callable[[str, str], list[str]]] = None,
+    ) -> None:
+        self._configured = normalize_server(server)
+        self.server = self._configured
+        self._username = username
+        self._password = password
+        self._email = email
+        self._discover = discover
+        self._client: Optional[httpx.Client] = None
+        self._resolved = False
+        self._from_cache = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_account(
+        cls,
+        server: str,
+        username: str,
+        password: str,
+        email: str,
+        discover: Optional[Callable[[str, str], list[str]]] = None,
+    ) -> EWSSession:
+        """The shared session for a mailbox (replaced if the password changed)."""
+        key = (normalize_server(server), username, email.lower())
+        with cls._registry_lock:
+            session = cls._sessions.get(key)
+            if session is None or session._password != password:
+                if session is not None:
+                    session.close()
+                session = cls._sessions[key] = cls(server, username, password, email, discover)
+        return session
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close every shared session."""
+        with cls._registry_lock:
+            sessions = list(cls._sessions.values())
+            cls._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    @property
+    def url(self) -> str:
+        return f"https://{self.server}/EWS/Exchange.asmx"
+
+    def _get_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                try:
+                    from httpx_ntlm import HttpNtlmAuth
+                except ImportError:
+                    raise RuntimeError("httpx-ntlm is required for EWS. Run: pip install httpx-ntlm")
+                self._client = httpx.Client(
+                    verify=True,
+                    timeout=self.TIMEOUT,
+                    headers=HEADERS,
+                    auth=HttpNtlmAuth(ntlm_user(self._username, self._email), self._password),
+                    limits=httpx.Limits(
+                        max_connections=self.MAX_CONNECTIONS,
+                        max_keepalive_connections=self.MAX_CONNECTIONS,
+                    ),
+                )
+            return self._client
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def _probe(self, host: str) -> bool:
+        """Whether ``host`` answers an authenticated ResolveNames."""
+        body_xml = f"""<m:ResolveNames ReturnFullContactData="false">
+      <m:UnresolvedEntry>{self._email}</m:UnresolvedEntry>
+    </m:ResolveNames>"""
+        try:
+            resp = self._get_client().post(
+                f"https://{host}/EWS/Exchange.asmx", content=envelope(body_xml), timeout=15,
+            )
+        except httpx.HTTPError:
+            return False
+        return resp.status_code == 200
+
+    def resolve(self) -> str:
+        """The host to talk to: cached, verified, or autodiscovered."""
+        if self._resolved:
+            return self.server
+        cached = self.autodiscover_cache.get(self._email, self._configured)
+        if cached:
+            self.server, self._resolved, self._from_cache = cached, True, True
+            return self.server
+        if self._discover is None:
+            self._resolved = True
+            return self.server
+
+        host = self._configured
+        if not self._probe(host):
+            logger.info("ews_autodiscovering", original_server=self._configured, email=self._email)
+            candidates = self._discover(self._configured, self._email)
+            host = next((h for h in candidates if h != self._configured and self._probe(h)), None)
+            if host is None:
+                # Nothing answered: keep the configured server and let requests report the error
+                logger.warning("ews_autodiscover_failed", server=self._configured)
+                self._resolved = True
+                return self.server
+            logger.info("ews_autodiscovered", old_server=self._configured, new_server=host)
+        self.server = host
+        self.autodiscover_cache.put(self._email, self._configured, host)
+        self._resolved, self._from_cache = True, False
+        return host
+
+    def _forget_host(self) -> bool:
+        """Drop a cached host that stopped answering; True if there was one."""
+        if not self._from_cache:
+            return False
+        logger.info("ews_cached_server_unreachable", server=self.server)
+        self.autodiscover_cache.forget(self._email, self._configured)
+        self.server, self._resolved, self._from_cache = self._configured, False, False
+        return True
+
+    def _send(self, body_xml: str, timeout: Optional[httpx.Timeout]) -> httpx.Response:
+        client = self._get_client()
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        request = client.build_request("POST", self.url, content=envelope(body_xml), **kwargs)
+        return client.send(request, stream=True)
+
+    @contextmanager
+    def stream(self, body_xml: str, timeout: Optional[httpx.Timeout] = None) -> Iterator[httpx.Response]:
+        """POST a request and hand back the response unread.
+
+        Raises RuntimeError for a non-200 status. A cached host that can't
+        be reached is forgotten and the mailbox rediscovered once.
+        """
+        self.resolve()
+        try:
+            resp = self._send(body_xml, timeout)
+        except httpx.TransportError:
+            if not self._forget_host():
+                raise
+            self.resolve()
+            resp = self._send(body_xml, timeout)
+        try:
+            if resp.status_code != 200:
+                raise RuntimeError(f"EWS request failed: HTTP {resp.status_code}")
+            yield resp
+        finally:
+            resp.close()
+
+    def request(self, body_xml: str) -> str:
+        """Execute a request and return the whole response XML."""
+        with self.stream(body_xml) as resp:
+            resp.read()
+            return resp.text
+
+    def iter_items(self, body_xml: str, tag: str, paging: Optional[dict] = None) -> Iterator[ET.Element]:
+        """Yield each ``tag`` element of the response as soon as it's parsed.
+
+        ``tag`` is a qualified name such as ``{TYPES_NS}Message``. A
+        yielded element is detached from the tree once the caller moves
+        on, so only one item is held at a time. The ``RootFolder`` paging
+        attributes are copied into ``paging`` if given. An error response
+        message raises RuntimeError.
+        """
+        with self.stream(body_xml) as resp:
+            stack: list[ET.Element] = []
+            for event, elem in ET.iterparse(_ChunkReader(resp.iter_bytes()), events=("start", "end")):
+                if event == "start":
+                    if paging is not None and elem.tag == _ROOT_FOLDER:
+                        paging.update(elem.attrib)
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag == tag:
+                    yield elem
+                    if stack:
+                        stack[-1].remove(elem)
+                elif elem.tag.endswith("ResponseMessage") and elem.get("ResponseClass") == "Error":
+                    code = elem.findtext("m:ResponseCode", "", NS)
+                    operation = elem.tag.rpartition("}")[2].removesuffix("ResponseMessage")
+                    raise RuntimeError(f"EWS {operation} failed: {code}")
+
+    def find_items(
+        self, body: Callable[[str], str], tag: str, limit: Optional[int] = None,
+    ) -> Iterator[ET.Element]:
+        """Page a FindItem request, yielding items as they stream in.
+
+        ``body`` builds the FindItem request around the
+        ``IndexedPageItemView`` element it's given; pages of
+        ``PAGE_SIZE`` are requested until the folder (or ``limit``) is
+        exhausted.
+        """
+        offset = 0
+        while limit is None or offset < limit:
+            size = self.PAGE_SIZE if limit is None else min(self.PAGE_SIZE, limit - offset)
+            view = f'<m:IndexedPageItemView MaxEntriesReturned="{size}" Offset="{offset}" BasePoint="Beginning"/>'
+            paging: dict[str, str] = {}
+            count = 0
+            for elem in self.iter_items(body(view), tag, paging):
+                count += 1
+                yield elem
+            if count == 0 or paging.get("IncludesLastItemInRange", "true").lower() == "true":
+                return
+            offset = int(paging.get("IndexedPagingOffset") or offset + count)
@@ -8,10 +8,10 @@ from typing import Optional
 from uuid import uuid4
 
 from pydantic import BaseModel, Field
-from sqlalchemy import Boolean, Column, DateTime, Index, String, Text
+from sqlalchemy import Boolean, Column, Index, String, Text
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 
-from koda2.database import Base
+from koda2.database import Base, UTCDateTime
 
 
 class AccountType(StrEnum):
@@ -46,9 +46,9 @@ class Account(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     is_default = Column(Boolean, default=False, nullable=False)
     credentials = Column(Text, nullable=False)  # Encrypted JSON string
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False)
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False)
     updated_at = Column(
-        DateTime,
+        UTCDateTime,
         default=lambda: dt.datetime.now(dt.UTC),
         onupdate=lambda: dt.datetime.now(dt.UTC),
         nullable=False,
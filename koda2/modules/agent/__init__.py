@@ -1,5 +1,5 @@
 """Agent module - autonomous task execution with planning and feedback loops."""
 
-from koda2.modules.agent.service import AgentService, AgentTask, AgentStatus
+from koda2.modules.agent.service import AgentService, AgentTask, AgentStatus, agent_task_cursor
 
-__all__ = ["AgentService", "AgentTask", "AgentStatus"]
+__all__ = ["AgentService", "AgentTask", "AgentStatus", "agent_task_cursor"]
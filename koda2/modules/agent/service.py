@@ -18,6 +18,7 @@ from typing import Any, Callable, Coroutine, Optional
 from koda2.logging_config import get_logger
 from koda2.modules.agent.models import AgentStatus, AgentStep, AgentTask, StepStatus
 from koda2.modules.llm.models import ChatMessage, LLMRequest
+from koda2.pagination import after_cursor
 
 logger = get_logger(__name__)
 
@@ -40,6 +41,11 @@ RULES:
 7. If you truly cannot proceed, explain why clearly."""
 
 
+def agent_task_cursor(task: AgentTask) -> tuple[str, str]:
+    """Keyset sort key for ``AgentService.list_tasks``."""
+    return task.created_at.isoformat(), task.id
+
+
 class AgentService:
     """Service for autonomous agent task execution using native tool-calling."""
     
@@ -331,8 +337,12 @@ class AgentService:
         user_id: Optional[str] = None,
         status: Optional[AgentStatus] = None,
         limit: int = 50,
+        cursor: Optional[str] = None,
     ) -> list[AgentTask]:
-        """List tasks with optional filtering."""
+        """List tasks newest first with optional filtering.
+
+        ``cursor`` (from ``agent_task_cursor``) continues after a previous page.
+        """
         tasks = list(self._tasks.values())
         
         if user_id:
@@ -340,8 +350,7 @@ class AgentService:
         if status:
             tasks = [t for t in tasks if t.status == status]
         
-        tasks.sort(key=lambda t: t.created_at, reverse=True)
-        return tasks[:limit]
+        return after_cursor(tasks, agent_task_cursor, cursor)[:limit]
     
     async def shutdown(self) -> None:
         """Gracefully shutdown the agent service."""
@@ -3,6 +3,11 @@
 Stores events fetched from remote providers so the API and assistant
 can always access them without hitting the remote server on every request.
 A background sync task keeps the cache fresh.
+
+Recurring series the provider reports as a master (Google) are stored
+once, with their rule block, and expanded for the requested window on
+read; overrides of single occurrences are separate rows pointing at the
+master through ``series_id``/``original_start``.
 """
 
 from __future__ import annotations
@@ -11,12 +16,14 @@ import datetime as dt
 import json
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, Boolean, Index, select, delete
+from sqlalchemy import Column, Integer, String, Text, Boolean, Index, and_, func, or_, select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from koda2.database import Base, get_session
+from koda2.config import ensure_local_tz, get_local_tz
+from koda2.database import Base, UTCDateTime, dialect_insert, get_session
 from koda2.logging_config import get_logger
 from koda2.modules.calendar.models import CalendarEvent, CalendarProvider, Attendee
+from koda2.modules.calendar.recurrence import expand_series, series_end
 
 logger = get_logger(__name__)
 
@@ -34,22 +41,105 @@ class CachedCalendarEvent(Base):
     title = Column(String(1024), nullable=False, default="")
     description = Column(Text, nullable=True, default="")
     location = Column(String(1024), nullable=True, default="")
-    start = Column(DateTime, nullable=False)
-    end = Column(DateTime, nullable=False)
+    start = Column(UTCDateTime, nullable=False)
+    end = Column(UTCDateTime, nullable=False)
     all_day = Column(Boolean, default=False)
     organizer = Column(String(512), nullable=True, default="")
     attendees_json = Column(Text, nullable=True, default="[]")
     is_online = Column(Boolean, default=False)
     meeting_url = Column(String(2048), nullable=True, default="")
     status = Column(String(50), nullable=True, default="confirmed")
-    synced_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    # Series master: rule block, and the end of its last occurrence (NULL: unbounded)
+    recurrence = Column(Text, nullable=True)
+    recurrence_end = Column(UTCDateTime, nullable=True)
+    # Override of one occurrence: the master's provider ID and the start it replaces
+    series_id = Column(String(512), nullable=True)
+    original_start = Column(UTCDateTime, nullable=True)
+    synced_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
 
     __table_args__ = (
         Index("ix_cached_events_start", "start"),
+        Index("ix_cached_events_account_start", "account_name", "start"),
         Index("ix_cached_events_provider_id", "provider_id", "account_name", unique=True),
+        Index("ix_cached_events_account_series", "account_name", "series_id"),
+    )
+
+
+class CalendarSyncState(Base):
+    """Per-account record of the last successful sync window.
+
+    Kept separately from the event rows so a sync that finds nothing
+    changed still records that the cache is fresh without rewriting rows.
+    ``sync_token`` is the provider's change token for the window, if any.
+    """
+
+    __tablename__ = "calendar_sync_state"
+
+    account_name = Column(String(255), primary_key=True)
+    window_start = Column(UTCDateTime, nullable=False)
+    window_end = Column(UTCDateTime, nullable=False)
+    synced_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
+    sync_token = Column(Text, nullable=True)
+
+
+# Columns compared when diffing a sync against the cache (synced_at is bookkeeping)
+CONTENT_FIELDS = (
+    "provider", "calendar_name", "title", "description", "location", "start", "end",
+    "all_day", "organizer", "attendees_json", "is_online", "meeting_url", "status",
+    "recurrence", "recurrence_end", "series_id", "original_start",
+)
+
+# Values per ... IN (...) list in one statement
+_DELETE_CHUNK = 500
+
+
+def _naive_utc(value: dt.datetime) -> dt.datetime:
+    """Convert to the naive UTC stored in the cache (naive input is local time)."""
+    return ensure_local_tz(value).astimezone(dt.UTC).replace(tzinfo=None)
+
+
+def _local(value: dt.datetime) -> dt.datetime:
+    """Convert a stored naive-UTC value back to aware local time."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.UTC)
+    return value.astimezone(get_local_tz())
+
+
+def _in_window(ws: dt.datetime, we: dt.datetime):
+    """Rows with something in ``ws``–``we``: events by their own times, series masters by their span."""
+    return and_(
+        CachedCalendarEvent.start <= we,
+        or_(
+            and_(CachedCalendarEvent.recurrence.is_(None), CachedCalendarEvent.end >= ws),
+            and_(
+                CachedCalendarEvent.recurrence.is_not(None),
+                or_(CachedCalendarEvent.recurrence_end.is_(None), CachedCalendarEvent.recurrence_end >= ws),
+            ),
+        ),
     )
 
 
+def _row_in_window(db_data: dict, ws: dt.datetime, we: dt.datetime) -> bool:
+    """``_in_window`` for a ``_to_db`` dict."""
+    if db_data["start"] > we:
+        return False
+    if db_data["recurrence"] is None:
+        return db_data["end"] >= ws
+    return db_data["recurrence_end"] is None or db_data["recurrence_end"] >= ws
+
+
+def _content(values) -> tuple:
+    """Comparable tuple of CONTENT_FIELDS from a row or a ``_to_db`` dict."""
+    get = values.get if isinstance(values, dict) else lambda k: getattr(values, k)
+    out = []
+    for key in CONTENT_FIELDS:
+        v = get(key)
+        if isinstance(v, dt.datetime) and v.tzinfo is not None:
+            v = v.replace(tzinfo=None)
+        out.append(v)
+    return tuple(out)
+
+
 class CalendarCache:
     """Manages the local calendar event cache."""
 
@@ -57,8 +147,17 @@ class CalendarCache:
     def _to_db(event: CalendarEvent, account_name: str = "") -> dict:
         """Convert a CalendarEvent to a dict for DB insertion."""
         attendees = [{"name": a.name, "email": a.email, "status": a.status} for a in event.attendees]
-        start = event.start.replace(tzinfo=None) if event.start.tzinfo else event.start
-        end = event.end.replace(tzinfo=None) if event.end.tzinfo else event.end
+        start = _naive_utc(event.start)
+        end = _naive_utc(event.end)
+        recurrence_end = None
+        if event.recurrence:
+            try:
+                last = series_end(event.recurrence)
+            except ValueError as exc:
+                logger.warning("calendar_series_rule_invalid", series=event.provider_id, error=str(exc))
+                last = None
+            if last is not None:
+                recurrence_end = _naive_utc(last) + (end - start)
         return {
             "provider_id": event.provider_id,
             "provider": event.provider.value if event.provider else None,
@@ -75,6 +174,10 @@ class CalendarCache:
             "is_online": event.is_online,
             "meeting_url": event.meeting_url,
             "status": event.status,
+            "recurrence": event.recurrence or None,
+            "recurrence_end": recurrence_end,
+            "series_id": event.series_id or None,
+            "original_start": _naive_utc(event.original_start) if event.original_start else None,
             "synced_at": dt.datetime.utcnow(),
         }
 
@@ -94,8 +197,8 @@ class CalendarCache:
             title=row.title or "",
             description=row.description or "",
             location=row.location or "",
-            start=row.start,
-            end=row.end,
+            start=_local(row.start),
+            end=_local(row.end),
             all_day=row.all_day or False,
             attendees=attendees,
             organizer=row.organizer or "",
@@ -103,6 +206,9 @@ class CalendarCache:
             is_online=row.is_online or False,
             meeting_url=row.meeting_url or "",
             status=row.status or "confirmed",
+            recurrence=row.recurrence,
+            series_id=row.series_id or "",
+            original_start=_local(row.original_start) if row.original_start else None,
         )
 
     async def sync_events(
@@ -111,73 +217,254 @@ class CalendarCache:
         account_name: str,
         window_start: dt.datetime,
         window_end: dt.datetime,
+        mark_synced: bool = True,
+        sync_token: Optional[str] = None,
     ) -> int:
         """Sync a batch of events into the cache.
 
-        Deletes old events for this account in the time window, then inserts fresh ones.
-        Returns the number of events cached.
+        The batch is the complete set of events for this account in the
+        window. It is diffed against the cached rows: new or changed events
+        are written with one bulk ``INSERT ... ON CONFLICT DO UPDATE``,
+        events that disappeared from the window are deleted, and unchanged
+        rows are left alone. Returns the number of events cached.
+
+        With ``mark_synced`` the window is recorded as the account's sync
+        state, which is what cache-first reads check for coverage, together
+        with the provider's ``sync_token`` for later ``apply_changes`` calls.
+        Ad-hoc writes of a narrower range pass False so they don't shrink it;
+        they carry expanded occurrences, so they never remove series masters
+        or overrides. Removing a master removes its overrides.
         """
-        # Normalize to naive UTC
-        ws = window_start.replace(tzinfo=None) if window_start.tzinfo else window_start
-        we = window_end.replace(tzinfo=None) if window_end.tzinfo else window_end
+        ws = _naive_utc(window_start)
+        we = _naive_utc(window_end)
+
+        incoming: dict[str, dict] = {}
+        for event in events:
+            db_data = self._to_db(event, account_name)
+            incoming[db_data["provider_id"]] = db_data
 
         async with get_session() as session:
-            # Delete existing events for this account in the window
-            await session.execute(
-                delete(CachedCalendarEvent).where(
-                    CachedCalendarEvent.account_name == account_name,
-                    CachedCalendarEvent.start >= ws,
-                    CachedCalendarEvent.start <= we,
+            existing: dict[str, tuple] = {}
+            series_rows: set[str] = set()
+            for row in await session.execute(
+                select(CachedCalendarEvent.provider_id, *(getattr(CachedCalendarEvent, f) for f in CONTENT_FIELDS))
+                .where(CachedCalendarEvent.account_name == account_name, _in_window(ws, we))
+            ):
+                existing[row.provider_id] = _content(row)
+                if row.recurrence is not None or row.series_id is not None:
+                    series_rows.add(row.provider_id)
+            changed = [d for pid, d in incoming.items() if existing.get(pid) != _content(d)]
+            removed = [
+                pid for pid in existing
+                if pid not in incoming and (mark_synced or pid not in series_rows)
+            ]
+            await self._delete(session, account_name, removed)
+
+            if changed:
+                stmt = dialect_insert(session.bind, CachedCalendarEvent)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["provider_id", "account_name"],
+                    set_={key: stmt.excluded[key] for key in (*CONTENT_FIELDS, "synced_at")},
                 )
-            )
+                await session.execute(stmt, changed)
+
+            if mark_synced:
+                state = dialect_insert(session.bind, CalendarSyncState).values(
+                    account_name=account_name, window_start=ws, window_end=we,
+                    synced_at=dt.datetime.utcnow(), sync_token=sync_token,
+                )
+                await session.execute(state.on_conflict_do_update(
+                    index_elements=["account_name"],
+                    set_={key: state.excluded[key] for key in ("window_start", "window_end", "synced_at", "sync_token")},
+                ))
+
+        logger.info(
+            "calendar_cache_synced", account=account_name, events=len(incoming),
+            written=len(changed), deleted=len(removed), unchanged=len(incoming) - len(changed),
+        )
+        return len(events)
+
+    async def apply_changes(
+        self,
+        events: list[CalendarEvent],
+        deleted_ids: list[str],
+        account_name: str,
+        sync_token: Optional[str] = None,
+        local_write: bool = False,
+    ) -> int:
+        """Apply an incremental change set to an account's synced window.
+
+        ``events`` are created/updated events and ``deleted_ids`` removed
+        provider IDs, as reported by the provider since the stored token.
+        Changed events that now fall outside the window are removed too.
+        The window is kept; ``synced_at`` and the token are updated,
+        except for a ``local_write`` (an event this app just created,
+        changed or deleted), which leaves the sync state alone.
+        Returns the number of rows written or deleted.
+
+        Raises ValueError if the account has no recorded window (a full
+        ``sync_events`` must come first).
+        """
+        async with get_session() as session:
+            state = await session.get(CalendarSyncState, account_name)
+            if state is None:
+                raise ValueError(f"No sync window recorded for calendar account {account_name!r}")
+            ws, we = state.window_start, state.window_end
 
-            # Insert fresh events
+            incoming: dict[str, dict] = {}
+            gone = set(deleted_ids)
             for event in events:
                 db_data = self._to_db(event, account_name)
-                # Upsert: check if exists by provider_id + account
-                existing = (await session.execute(
-                    select(CachedCalendarEvent).where(
-                        CachedCalendarEvent.provider_id == db_data["provider_id"],
-                        CachedCalendarEvent.account_name == db_data["account_name"],
-                    ).limit(1)
-                )).scalar_one_or_none()
-
-                if existing:
-                    for key, val in db_data.items():
-                        setattr(existing, key, val)
+                if _row_in_window(db_data, ws, we):
+                    incoming[db_data["provider_id"]] = db_data
+                    gone.discard(db_data["provider_id"])
                 else:
-                    session.add(CachedCalendarEvent(**db_data))
+                    gone.add(db_data["provider_id"])
 
-        logger.info("calendar_cache_synced", account=account_name, events=len(events))
-        return len(events)
+            existing: dict[str, tuple] = {}
+            ids = list(incoming)
+            for i in range(0, len(ids), _DELETE_CHUNK):
+                for row in await session.execute(
+                    select(CachedCalendarEvent.provider_id, *(getattr(CachedCalendarEvent, f) for f in CONTENT_FIELDS))
+                    .where(
+                        CachedCalendarEvent.account_name == account_name,
+                        CachedCalendarEvent.provider_id.in_(ids[i:i + _DELETE_CHUNK]),
+                    )
+                ):
+                    existing[row.provider_id] = _content(row)
+            changed = [d for pid, d in incoming.items() if existing.get(pid) != _content(d)]
+
+            deleted = await self._delete(session, account_name, sorted(gone))
+
+            if changed:
+                stmt = dialect_insert(session.bind, CachedCalendarEvent)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["provider_id", "account_name"],
+                    set_={key: stmt.excluded[key] for key in (*CONTENT_FIELDS, "synced_at")},
+                )
+                await session.execute(stmt, changed)
+
+            if not local_write:
+                state.synced_at = dt.datetime.utcnow()
+                state.sync_token = sync_token
+
+        logger.info(
+            "calendar_cache_changes_applied", account=account_name,
+            written=len(changed), deleted=deleted, unchanged=len(incoming) - len(changed),
+        )
+        return len(changed) + deleted
+
+    @staticmethod
+    async def _delete(session: AsyncSession, account_name: str, provider_ids: list[str]) -> int:
+        """Delete an account's rows by provider ID, with the overrides of any series among them."""
+        deleted = 0
+        for i in range(0, len(provider_ids), _DELETE_CHUNK):
+            chunk = provider_ids[i:i + _DELETE_CHUNK]
+            result = await session.execute(
+                delete(CachedCalendarEvent).where(
+                    CachedCalendarEvent.account_name == account_name,
+                    or_(CachedCalendarEvent.provider_id.in_(chunk), CachedCalendarEvent.series_id.in_(chunk)),
+                )
+            )
+            deleted += result.rowcount or 0
+        return deleted
 
     async def get_events(
         self,
         start: dt.datetime,
         end: dt.datetime,
         account_name: Optional[str] = None,
+        account_names: Optional[list[str]] = None,
     ) -> list[CalendarEvent]:
-        """Get cached events from the local DB."""
-        ws = start.replace(tzinfo=None) if start.tzinfo else start
-        we = end.replace(tzinfo=None) if end.tzinfo else end
+        """Get cached events from the local DB (one account, several, or all).
+
+        Series masters are expanded into their occurrences in the range,
+        minus those replaced by an override row (moved or cancelled) or
+        already cached as a single event with the occurrence's ID.
+        Cancelled overrides themselves are not returned.
+        """
+        ws = _naive_utc(start)
+        we = _naive_utc(end)
 
         async with get_session() as session:
-            stmt = select(CachedCalendarEvent).where(
-                CachedCalendarEvent.start >= ws,
-                CachedCalendarEvent.start <= we,
-            )
+            # Overlap, like the providers' timeMin/timeMax: includes events
+            # already in progress at ``start``
+            stmt = select(CachedCalendarEvent).where(_in_window(ws, we))
             if account_name:
                 stmt = stmt.where(CachedCalendarEvent.account_name == account_name)
+            if account_names is not None:
+                stmt = stmt.where(CachedCalendarEvent.account_name.in_(account_names))
             stmt = stmt.order_by(CachedCalendarEvent.start)
 
             result = await session.execute(stmt)
             rows = result.scalars().all()
 
-        return [self._from_db(row) for row in rows]
+            masters = [row for row in rows if row.recurrence is not None]
+            replaced: set[tuple[str, str, dt.datetime]] = set()
+            if masters:
+                # An override can move its occurrence anywhere, so look them
+                # up by the start they replace, not by the window
+                reach = max(row.end - row.start for row in masters)
+                series_ids = sorted({row.provider_id for row in masters})
+                for i in range(0, len(series_ids), _DELETE_CHUNK):
+                    for row in await session.execute(
+                        select(
+                            CachedCalendarEvent.account_name,
+                            CachedCalendarEvent.series_id,
+                            CachedCalendarEvent.original_start,
+                        ).where(
+                            CachedCalendarEvent.series_id.in_(series_ids[i:i + _DELETE_CHUNK]),
+                            CachedCalendarEvent.original_start >= ws - reach,
+                            CachedCalendarEvent.original_start <= we,
+                        )
+                    ):
+                        replaced.add((row.account_name, row.series_id, row.original_start))
+
+        events = [
+            self._from_db(row) for row in rows
+            if row.recurrence is None and not (row.series_id and row.status == "cancelled")
+        ]
+        if not masters:
+            return events
+
+        cached = {(row.account_name, row.provider_id) for row in rows}
+        for row in masters:
+            try:
+                occurrences = expand_series(self._from_db(row), start, end)
+            except ValueError as exc:
+                logger.warning("calendar_series_expand_failed", series=row.provider_id, error=str(exc))
+                continue
+            for occurrence in occurrences:
+                if (row.account_name, occurrence.provider_id) in cached:
+                    continue
+                if (row.account_name, row.provider_id, _naive_utc(occurrence.original_start)) in replaced:
+                    continue
+                events.append(occurrence)
+        events.sort(key=lambda e: e.start)
+        return events
+
+    async def get_sync_states(self) -> dict[str, CalendarSyncState]:
+        """Return the recorded sync window of every account, keyed by account name."""
+        async with get_session() as session:
+            rows = (await session.execute(select(CalendarSyncState))).scalars().all()
+        return {row.account_name: row for row in rows}
+
+    async def get_sync_state(self, account_name: str) -> Optional[CalendarSyncState]:
+        """Return one account's recorded sync window and token, if any."""
+        async with get_session() as session:
+            return await session.get(CalendarSyncState, account_name)
 
     async def get_last_sync(self, account_name: Optional[str] = None) -> Optional[dt.datetime]:
-        """Get the timestamp of the last sync for an account."""
+        """Get the timestamp of the last sync for an account (or any account)."""
         async with get_session() as session:
+            stmt = select(func.max(CalendarSyncState.synced_at))
+            if account_name:
+                stmt = stmt.where(CalendarSyncState.account_name == account_name)
+            synced_at = (await session.execute(stmt)).scalar_one_or_none()
+            if synced_at is not None:
+                return synced_at
+
+            # Caches synced before sync state was tracked
             stmt = select(CachedCalendarEvent.synced_at)
             if account_name:
                 stmt = stmt.where(CachedCalendarEvent.account_name == account_name)
@@ -190,7 +477,10 @@ class CalendarCache:
         """Clear the cache (all or for a specific account)."""
         async with get_session() as session:
             stmt = delete(CachedCalendarEvent)
+            state = delete(CalendarSyncState)
             if account_name:
                 stmt = stmt.where(CachedCalendarEvent.account_name == account_name)
+                state = state.where(CalendarSyncState.account_name == account_name)
             await session.execute(stmt)
+            await session.execute(state)
         logger.info("calendar_cache_cleared", account=account_name or "all")
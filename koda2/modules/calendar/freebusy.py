@@ -0,0 +1,381 @@
+"""Free/busy index over the locally cached calendar events.
+
+Each account's cached events are held in an interval tree, so overlap,
+gap and next-free-slot questions are answered in memory without a
+provider round trip or a table scan. An account is loaded from
+``CalendarCache`` on first use; after that ``CalendarService`` feeds it
+the same writes it makes to the cache (syncs, and the events it creates,
+updates or deletes itself). Each write inserts and removes only the
+events it touched, in O(log n) apiece, so a slot booked a moment ago is
+busy right away. A write that carries a recurring series master drops
+the account instead, so it is reloaded with the series expanded.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import random
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from koda2.config import ensure_local_tz
+from koda2.logging_config import get_logger
+from koda2.modules.calendar.cache import CalendarCache
+from koda2.modules.calendar.models import CalendarEvent
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class BusyInterval:
+    """A busy ``[start, end)`` period, with the account and event behind it."""
+
+    start: dt.datetime
+    end: dt.datetime
+    account: str
+    event: CalendarEvent
+
+
+class _Node:
+    __slots__ = ("item", "key", "priority", "left", "right", "max_end")
+
+    def __init__(self, item: BusyInterval) -> None:
+        self.item = item
+        self.key = _key(item)
+        self.priority = random.random()
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.max_end = item.end
+
+
+def _key(item: BusyInterval) -> tuple[dt.datetime, dt.datetime, str]:
+    return item.start, item.end, item.event.provider_id
+
+
+def _update(node: _Node) -> _Node:
+    latest = node.item.end
+    if node.left is not None and node.left.max_end > latest:
+        latest = node.left.max_end
+    if node.right is not None and node.right.max_end > latest:
+        latest = node.right.max_end
+    node.max_end = latest
+    return node
+
+
+def _split(node: Optional[_Node], key: tuple) -> tuple[Optional[_Node], Optional[_Node]]:
+    """Split into the nodes keyed below ``key`` and the rest."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, rest = _split(node.right, key)
+        return _update(node), rest
+    below, node.left = _split(node.left, key)
+    return below, _update(node)
+
+
+def _merge(low: Optional[_Node], high: Optional[_Node]) -> Optional[_Node]:
+    """Join two treaps where every key in ``low`` is below every key in ``high``."""
+    if low is None:
+        return high
+    if high is None:
+        return low
+    if low.priority > high.priority:
+        low.right = _merge(low.right, high)
+        return _update(low)
+    high.left = _merge(low, high.left)
+    return _update(high)
+
+
+class IntervalTree:
+    """Interval tree over half-open ``[start, end)`` intervals.
+
+    A treap: a binary search tree ordered by (start, end, provider ID)
+    and kept balanced in expectation by random heap priorities, each
+    node annotated with the latest end in its subtree. ``add`` and
+    ``remove`` cost O(log n), so an index follows every write without a
+    rebuild. An overlap query only descends into subtrees that can still
+    contain a hit, so it costs O(log n) plus the intervals reported.
+    """
+
+    def __init__(self, intervals: Iterable[BusyInterval] = ()) -> None:
+        self._root: Optional[_Node] = None
+        self._size = 0
+        for interval in intervals:
+            self.add(interval)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, interval: BusyInterval) -> None:
+        node = _Node(interval)
+
+        def _insert(root: Optional[_Node]) -> _Node:
+            if root is None:
+                return node
+            if node.priority > root.priority:
+                node.left, node.right = _split(root, node.key)
+                return _update(node)
+            if node.key < root.key:
+                root.left = _insert(root.left)
+            else:
+                root.right = _insert(root.right)
+            return _update(root)
+
+        self._root = _insert(self._root)
+        self._size += 1
+
+    def remove(self, interval: BusyInterval) -> None:
+        """Remove an interval added earlier (a no-op if it isn't there)."""
+        key = _key(interval)
+        removed = False
+
+        def _delete(root: Optional[_Node]) -> Optional[_Node]:
+            nonlocal removed
+            if root is None:
+                return None
+            if key < root.key:
+                root.left = _delete(root.left)
+            elif root.key < key:
+                root.right = _delete(root.right)
+            else:
+                removed = True
+                return _merge(root.left, root.right)
+            return _update(root)
+
+        self._root = _delete(self._root)
+        self._size -= removed
+
+    def overlapping(self, start: dt.datetime, end: dt.datetime, closed: bool = False) -> list[BusyInterval]:
+        """Intervals overlapping ``[start, end)``, ordered by start.
+
+        With ``closed`` intervals that only touch the range (ending at
+        ``start`` or starting at ``end``) count too.
+        """
+        found: list[BusyInterval] = []
+
+        def _search(node: Optional[_Node]) -> None:
+            if node is None or node.max_end < start or (node.max_end == start and not closed):
+                return  # everything in this subtree ends before the range
+            _search(node.left)
+            item = node.item
+            if item.start > end or (item.start == end and not closed):
+                return  # this node and its right subtree start after the range
+            if item.end > start or (item.end == start and closed):
+                found.append(item)
+            _search(node.right)
+
+        _search(self._root)
+        return found
+
+
+class _AccountIndex:
+    """One account's cached window and busy intervals keyed by provider ID.
+
+    The tree is updated in place on every write; ``series`` maps a
+    series ID to the provider IDs of its indexed occurrences, so dropping
+    a series doesn't scan the account.
+    """
+
+    def __init__(self, window_start: dt.datetime, window_end: dt.datetime) -> None:
+        self.window_start = window_start
+        self.window_end = window_end
+        self.intervals: dict[str, BusyInterval] = {}
+        self.series: dict[str, set[str]] = {}
+        self.tree = IntervalTree()
+
+    def put(self, account: str, event: CalendarEvent) -> None:
+        self._remove(event.provider_id)
+        start, end = ensure_local_tz(event.start), ensure_local_tz(event.end)
+        if event.status != "cancelled" and end > start:
+            interval = BusyInterval(start, end, account, event)
+            self.intervals[event.provider_id] = interval
+            self.tree.add(interval)
+            if event.series_id:
+                self.series.setdefault(event.series_id, set()).add(event.provider_id)
+
+    def drop(self, provider_ids: Iterable[str]) -> None:
+        """Remove events by provider ID, with the occurrences of any series among them."""
+        for pid in provider_ids:
+            self._remove(pid)
+            for occurrence in self.series.pop(pid, ()):
+                self._remove(occurrence)
+
+    def _remove(self, provider_id: str) -> None:
+        interval = self.intervals.pop(provider_id, None)
+        if interval is None:
+            return
+        self.tree.remove(interval)
+        series_id = interval.event.series_id
+        if series_id and series_id in self.series:
+            self.series[series_id].discard(provider_id)
+            if not self.series[series_id]:
+                del self.series[series_id]
+
+
+class FreeBusyIndex:
+    """Per-account free/busy lookups answered from the calendar cache.
+
+    Queries take the account names to consider (None for every account
+    with a recorded sync window) and only know what the cache knows: use
+    ``covers`` first when a range outside the synced windows must not be
+    reported as free.
+    """
+
+    def __init__(self, cache: CalendarCache) -> None:
+        self._cache = cache
+        self._accounts: dict[str, _AccountIndex] = {}
+
+    async def _load(self, account: str) -> Optional[_AccountIndex]:
+        """The account's index, read from the cache on first use (None if never synced)."""
+        index = self._accounts.get(account)
+        if index is not None:
+            return index
+        state = await self._cache.get_sync_state(account)
+        if state is None:
+            return None
+        index = _AccountIndex(state.window_start.replace(tzinfo=dt.UTC), state.window_end.replace(tzinfo=dt.UTC))
+        for event in await self._cache.get_events(index.window_start, index.window_end, account_name=account):
+            index.put(account, event)
+        self._accounts[account] = index
+        logger.debug("freebusy_index_loaded", account=account, intervals=len(index.intervals))
+        return index
+
+    async def _indexes(self, accounts: Optional[list[str]]) -> list[_AccountIndex]:
+        if accounts is None:
+            accounts = list(await self._cache.get_sync_states())
+        indexes = [await self._load(name) for name in accounts]
+        return [index for index in indexes if index is not None]
+
+    async def covers(self, start: dt.datetime, end: dt.datetime, accounts: list[str]) -> bool:
+        """Whether every one of ``accounts`` has a synced window spanning ``start``–``end``."""
+        start, end = ensure_local_tz(start), ensure_local_tz(end)
+        for name in accounts:
+            index = await self._load(name)
+            if index is None or index.window_start > start or index.window_end < end:
+                return False
+        return bool(accounts)
+
+    async def busy(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        accounts: Optional[list[str]] = None,
+    ) -> list[BusyInterval]:
+        """Busy intervals overlapping ``start``–``end`` across accounts, ordered by start."""
+        start, end = ensure_local_tz(start), ensure_local_tz(end)
+        found: list[BusyInterval] = []
+        for index in await self._indexes(accounts):
+            found.extend(index.tree.overlapping(start, end))
+        found.sort(key=lambda i: (i.start, i.end))
+        return found
+
+    async def is_free(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        accounts: Optional[list[str]] = None,
+    ) -> bool:
+        """Whether nothing is booked anywhere in ``start``–``end``."""
+        return not await self.busy(start, end, accounts)
+
+    async def free_slots(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        accounts: Optional[list[str]] = None,
+        min_duration: dt.timedelta = dt.timedelta(0),
+    ) -> list[tuple[dt.datetime, dt.datetime]]:
+        """The gaps between busy intervals in ``start``–``end``, at least ``min_duration`` long."""
+        start, end = ensure_local_tz(start), ensure_local_tz(end)
+        slots: list[tuple[dt.datetime, dt.datetime]] = []
+        cursor = start
+        for interval in await self.busy(start, end, accounts):
+            if interval.start > cursor and interval.start - cursor >= min_duration:
+                slots.append((cursor, interval.start))
+            cursor = max(cursor, interval.end)
+        if end > cursor and end - cursor >= min_duration:
+            slots.append((cursor, end))
+        return slots
+
+    async def next_free_slot(
+        self,
+        after: dt.datetime,
+        duration: dt.timedelta,
+        accounts: Optional[list[str]] = None,
+        until: Optional[dt.datetime] = None,
+    ) -> Optional[tuple[dt.datetime, dt.datetime]]:
+        """The first free ``duration`` starting at or after ``after``.
+
+        Searches up to ``until`` (default: the end of the latest synced
+        window); returns None if no such slot exists before then.
+        """
+        if until is None:
+            indexes = await self._indexes(accounts)
+            if not indexes:
+                return None
+            until = max(index.window_end for index in indexes)
+        slots = await self.free_slots(after, until, accounts, min_duration=duration)
+        if not slots:
+            return None
+        slot_start = slots[0][0]
+        return slot_start, slot_start + duration
+
+    async def last_before(
+        self,
+        when: dt.datetime,
+        since: dt.datetime,
+        accounts: Optional[list[str]] = None,
+    ) -> Optional[BusyInterval]:
+        """The busy interval ending last between ``since`` and ``when``."""
+        when = ensure_local_tz(when)
+        ended = [i for i in await self.busy(since, when, accounts) if i.end <= when]
+        return max(ended, key=lambda i: i.end, default=None)
+
+    def replace(
+        self,
+        account: str,
+        events: list[CalendarEvent],
+        start: dt.datetime,
+        end: dt.datetime,
+        synced: bool = False,
+    ) -> None:
+        """Mirror ``CalendarCache.sync_events``: ``events`` are all of the account's events in the range.
+
+        With ``synced`` the range also becomes the account's window. An
+        account that isn't loaded yet is left alone; it is read from the
+        (already updated) cache when first queried.
+        """
+        index = self._accounts.get(account)
+        if index is None:
+            return
+        if any(event.recurrence for event in events):
+            self.invalidate(account)
+            return
+        start, end = ensure_local_tz(start), ensure_local_tz(end)
+        index.drop([i.event.provider_id for i in index.tree.overlapping(start, end, closed=True)])
+        for event in events:
+            index.put(account, event)
+        if synced:
+            index.window_start, index.window_end = start, end
+
+    def apply_changes(self, account: str, events: list[CalendarEvent], deleted_ids: list[str]) -> None:
+        """Mirror ``CalendarCache.apply_changes`` for a loaded account."""
+        index = self._accounts.get(account)
+        if index is None:
+            return
+        if any(event.recurrence for event in events):
+            self.invalidate(account)
+            return
+        index.drop(deleted_ids)
+        for event in events:
+            if ensure_local_tz(event.start) <= index.window_end and ensure_local_tz(event.end) >= index.window_start:
+                index.put(account, event)
+            else:
+                index.drop([event.provider_id])
+
+    def invalidate(self, account: Optional[str] = None) -> None:
+        """Forget one account (or all); it is reloaded from the cache on next use."""
+        if account is None:
+            self._accounts.clear()
+        else:
+            self._accounts.pop(account, None)
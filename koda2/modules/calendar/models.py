@@ -41,7 +41,9 @@ class CalendarEvent(BaseModel):
     all_day: bool = False
     attendees: list[Attendee] = Field(default_factory=list)
     organizer: str = ""
-    recurrence: Optional[str] = None
+    recurrence: Optional[str] = None  # rule block of a series master (see calendar.recurrence)
+    series_id: str = ""  # master's provider ID, for an occurrence or override of a series
+    original_start: Optional[dt.datetime] = None  # the occurrence an override replaces
     reminders: list[int] = Field(default_factory=lambda: [15])
     calendar_name: str = ""
     is_online: bool = False
@@ -55,6 +57,48 @@ class CalendarEvent(BaseModel):
         """Event duration in minutes."""
         return int((self.end - self.start).total_seconds() / 60)
 
+
+class CalendarChanges(BaseModel):
+    """What changed on a provider since a sync token.
+
+    With ``full`` set, ``events`` is the complete window (no usable token,
+    or the provider can't express the change incrementally); otherwise it
+    holds only created/updated events and ``deleted_ids`` the provider IDs
+    that were removed. ``sync_token`` is the opaque token for the next call.
+    """
+
+    events: list[CalendarEvent] = Field(default_factory=list)
+    deleted_ids: list[str] = Field(default_factory=list)
+    sync_token: Optional[str] = None
+    full: bool = False
+
+
+class CalendarSubscription(BaseModel):
+    """A provider's push channel for one account's calendar changes.
+
+    ``kind`` is ``webhook`` (the provider calls our notification route)
+    or ``stream`` (we hold a long-lived request open, EWS). ``client_state``
+    is the secret the provider echoes in every notification;
+    ``resource_id`` is what Google needs to stop a channel.
+    """
+
+    subscription_id: str
+    account: str = ""
+    kind: str = "webhook"
+    resource_id: str = ""
+    client_state: str = ""
+    expires_at: Optional[dt.datetime] = None
+
+
+class AccountFetchStatus(BaseModel):
+    """Outcome for one account in a multi-account calendar call."""
+
+    account: str
+    status: str = "ok"  # ok, cached, timeout, error
+    elapsed_ms: int = 0
+    error: str = ""
+
+
 class PrepTimeResult(BaseModel):
     """Preparation time calculation between events."""
 
@@ -63,3 +107,24 @@ class PrepTimeResult(BaseModel):
     available_minutes: int = 0
     suggested_prep_minutes: int = 15
     travel_time_needed: bool = False
+
+
+class MeetingSlot(BaseModel):
+    """A candidate meeting time; higher scores rank first."""
+
+    start: dt.datetime
+    end: dt.datetime
+    score: float = 0.0
+
+
+class MeetingSlotSearch(BaseModel):
+    """Result of a multi-attendee slot search.
+
+    ``unresolved_attendees`` had no visible free/busy on any account and
+    ``incomplete_accounts`` could not be read, so the slots don't account
+    for them.
+    """
+
+    slots: list[MeetingSlot] = Field(default_factory=list)
+    unresolved_attendees: list[str] = Field(default_factory=list)
+    incomplete_accounts: list[str] = Field(default_factory=list)
@@ -0,0 +1,284 @@
+"""Push-based calendar change notifications.
+
+Instead of polling every account on a timer, ``CalendarNotifier`` asks
+each provider to report changes: Graph subscriptions and Google
+``events.watch`` channels POST to the notification routes under
+``/api/calendar/notifications/``, and Exchange holds a streaming
+subscription open. A notification only says *that* an account changed;
+it triggers an incremental ``CalendarService.sync_account`` of that one
+account, with bursts coalesced into a single sync.
+
+Accounts with a live subscription are listed in
+``CalendarService.push_accounts``: reads trust their cache, and the
+periodic sync only polls them as a slow safety net.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import hmac
+import secrets
+from typing import Any, Optional
+
+from koda2.logging_config import get_logger
+from koda2.modules.calendar.models import CalendarProvider, CalendarSubscription
+from koda2.modules.calendar.providers import BaseCalendarProvider, SubscriptionExpired
+from koda2.modules.calendar.service import CalendarService
+
+logger = get_logger(__name__)
+
+
+class CalendarNotifier:
+    """Keeps a push subscription per calendar account and syncs accounts as they change."""
+
+    # Notification routes, relative to the public base URL
+    WEBHOOK_PATHS = {
+        CalendarProvider.MSGRAPH: "/api/calendar/notifications/graph",
+        CalendarProvider.GOOGLE: "/api/calendar/notifications/google",
+    }
+    # Wait after a notification before syncing, so a burst costs one sync
+    DEBOUNCE_SECONDS = 2.0
+    # Subscriptions expiring within this margin are renewed; checked this often (seconds)
+    RENEW_MARGIN = dt.timedelta(hours=6)
+    RENEW_CHECK_INTERVAL = 30 * 60
+    # GetStreamingEvents connection length (minutes, EWS allows 1-30) and
+    # the pause (seconds) before reconnecting a failed stream
+    STREAM_MINUTES = 10
+    STREAM_RETRY_SECONDS = 60
+
+    def __init__(self, calendar: CalendarService, webhook_url: str = "") -> None:
+        self._calendar = calendar
+        self._webhook_url = webhook_url.rstrip("/")
+        self._subscriptions: dict[str, CalendarSubscription] = {}  # subscription / channel ID -> subscription
+        self._providers: dict[str, BaseCalendarProvider] = {}  # account name -> provider
+        self._streams: dict[str, asyncio.Task] = {}  # account name -> stream task
+        self._pending: dict[str, asyncio.Task] = {}  # account name -> debounced sync
+        self._renew_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriptions(self) -> list[CalendarSubscription]:
+        """The live subscriptions, across accounts."""
+        return list(self._subscriptions.values())
+
+    def _callback_url(self, provider: BaseCalendarProvider) -> Optional[str]:
+        """Where a provider should deliver notifications (None: it can't be reached)."""
+        if provider.push_kind != "webhook":
+            return ""
+        if not self._webhook_url or provider.provider not in self.WEBHOOK_PATHS:
+            return None
+        return self._webhook_url + self.WEBHOOK_PATHS[provider.provider]
+
+    async def start(self) -> None:
+        """Subscribe every active calendar account and start renewing subscriptions."""
+        for account in await self._calendar.get_accounts():
+            await self.subscribe_account(account)
+        if self._renew_task is None:
+            self._renew_task = asyncio.create_task(self._renew_loop())
+
+    async def subscribe_account(self, account) -> bool:
+        """Set up push for one account; False if it stays on polling."""
+        try:
+            _, provider = await self._calendar._get_provider(account.id)
+        except Exception as exc:
+            logger.warning("calendar_push_provider_failed", account=account.name, error=str(exc))
+            return False
+        if provider.push_kind is None:
+            return False
+        url = self._callback_url(provider)
+        if url is None:
+            logger.info("calendar_push_needs_webhook_url", account=account.name, provider=str(provider.provider))
+            return False
+        try:
+            subscriptions = await provider.subscribe(url, secrets.token_urlsafe(32))
+        except Exception as exc:
+            logger.warning("calendar_subscribe_failed", account=account.name, error=str(exc))
+            return False
+        if not subscriptions:
+            return False
+
+        self._providers[account.name] = provider
+        self._add(account.name, subscriptions)
+        if provider.push_kind == "stream":
+            self._streams[account.name] = asyncio.create_task(
+                self._stream(account.name, provider, subscriptions[0]),
+            )
+        # Catch whatever changed before the subscription existed
+        self.request_sync(account.name)
+        logger.info("calendar_push_subscribed", account=account.name, kind=provider.push_kind,
+                    subscriptions=len(subscriptions))
+        return True
+
+    def _add(self, account_name: str, subscriptions: list[CalendarSubscription]) -> None:
+        for subscription in subscriptions:
+            subscription.account = account_name
+            self._subscriptions[subscription.subscription_id] = subscription
+        self._calendar.push_accounts.add(account_name)
+
+    async def _resubscribe(self, account_name: str) -> list[CalendarSubscription]:
+        """Replace an account's subscriptions with new ones (new first, so no gap)."""
+        provider = self._providers[account_name]
+        old = [s for s in self._subscriptions.values() if s.account == account_name]
+        new = await provider.subscribe(self._callback_url(provider) or "", secrets.token_urlsafe(32))
+        if not new:
+            raise RuntimeError("provider returned no subscription")
+        for subscription in old:
+            self._subscriptions.pop(subscription.subscription_id, None)
+            try:
+                await provider.unsubscribe(subscription)
+            except Exception as exc:
+                logger.debug("calendar_unsubscribe_failed", account=account_name, error=str(exc))
+        self._add(account_name, new)
+        return new
+
+    def _drop(self, account_name: str) -> None:
+        """Forget an account's subscriptions; it falls back to polling."""
+        for sub_id in [i for i, s in self._subscriptions.items() if s.account == account_name]:
+            del self._subscriptions[sub_id]
+        self._calendar.push_accounts.discard(account_name)
+
+    def request_sync(self, account_name: str) -> None:
+        """Sync an account shortly, unless a sync is already waiting to start."""
+        if account_name in self._pending:
+            return
+        self._pending[account_name] = asyncio.create_task(self._sync_soon(account_name))
+
+    async def _sync_soon(self, account_name: str) -> None:
+        await asyncio.sleep(self.DEBOUNCE_SECONDS)
+        # Cleared before syncing: a change arriving mid-sync schedules another
+        self._pending.pop(account_name, None)
+        count = await self._calendar.sync_account(account_name)
+        logger.info("calendar_push_synced", account=account_name, changes=count)
+
+    def handle_graph(self, payload: dict[str, Any]) -> int:
+        """Process a Graph change notification batch; returns how many were accepted.
+
+        Notifications for unknown subscriptions or with the wrong
+        ``clientState`` are ignored.
+        """
+        accepted = 0
+        for note in payload.get("value", []):
+            subscription = self._subscriptions.get(note.get("subscriptionId", ""))
+            if subscription is None or not hmac.compare_digest(
+                note.get("clientState", ""), subscription.client_state,
+            ):
+                logger.warning("calendar_notification_rejected", provider="msgraph",
+                               subscription=note.get("subscriptionId", ""))
+                continue
+            accepted += 1
+            self.request_sync(subscription.account)
+        return accepted
+
+    def handle_google(self, channel_id: str, token: str, resource_state: str) -> bool:
+        """Process a Google push (its ``X-Goog-*`` headers); False if rejected.
+
+        The ``sync`` message sent when a channel opens carries no change.
+        """
+        subscription = self._subscriptions.get(channel_id)
+        if subscription is None or not hmac.compare_digest(token, subscription.client_state):
+            logger.warning("calendar_notification_rejected", provider="google", subscription=channel_id)
+            return False
+        if resource_state != "sync":
+            self.request_sync(subscription.account)
+        return True
+
+    async def _stream(
+        self,
+        account_name: str,
+        provider: BaseCalendarProvider,
+        subscription: CalendarSubscription,
+    ) -> None:
+        """Keep a stream subscription's connection open, syncing on each change.
+
+        While the stream is down the account is polled like any other. A
+        subscription that expires again before reporting anything counts
+        as a failure, so a provider without a change stream backs off
+        instead of resubscribing in a tight loop.
+        """
+        resubscribed = False
+        while True:
+            try:
+                if await provider.wait_for_changes(subscription, self.STREAM_MINUTES):
+                    self.request_sync(account_name)
+                self._calendar.push_accounts.add(account_name)
+                resubscribed = False
+                continue
+            except asyncio.CancelledError:
+                raise
+            except SubscriptionExpired as expired:
+                if resubscribed:
+                    error = str(expired)
+                else:
+                    logger.info("calendar_stream_resubscribing", account=account_name)
+                    try:
+                        subscription = (await self._resubscribe(account_name))[0]
+                        self.request_sync(account_name)
+                        resubscribed = True
+                        continue
+                    except Exception as exc:
+                        error = str(exc)
+            except Exception as exc:
+                error = str(exc)
+            logger.warning("calendar_stream_failed", account=account_name, error=error)
+            self._calendar.push_accounts.discard(account_name)
+            resubscribed = False
+            await asyncio.sleep(self.STREAM_RETRY_SECONDS)
+
+    async def renew_expiring(self, now: Optional[dt.datetime] = None) -> int:
+        """Renew subscriptions close to expiry; returns how many were renewed or replaced.
+
+        Providers that can't extend a subscription in place get the
+        account resubscribed; an account that can't be resubscribed falls
+        back to polling.
+        """
+        cutoff = (now or dt.datetime.now(dt.UTC)) + self.RENEW_MARGIN
+        renewed = 0
+        resubscribe: set[str] = set()
+        for subscription in list(self._subscriptions.values()):
+            if subscription.expires_at is None or subscription.expires_at > cutoff:
+                continue
+            try:
+                extended = await self._providers[subscription.account].renew(subscription)
+            except Exception as exc:
+                logger.warning("calendar_subscription_renew_failed", account=subscription.account, error=str(exc))
+                extended = None
+            if extended is None:
+                resubscribe.add(subscription.account)
+            else:
+                self._subscriptions[subscription.subscription_id] = extended
+                renewed += 1
+        for account_name in sorted(resubscribe):
+            try:
+                renewed += len(await self._resubscribe(account_name))
+            except Exception as exc:
+                logger.warning("calendar_resubscribe_failed", account=account_name, error=str(exc))
+                self._drop(account_name)
+        return renewed
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.RENEW_CHECK_INTERVAL)
+            try:
+                await self.renew_expiring()
+            except Exception as exc:
+                logger.error("calendar_subscription_renewal_error", error=str(exc))
+
+    async def stop(self) -> None:
+        """Cancel every subscription and background task."""
+        tasks = [*self._streams.values(), *self._pending.values()]
+        if self._renew_task is not None:
+            tasks.append(self._renew_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._streams.clear()
+        self._pending.clear()
+        self._renew_task = None
+
+        for subscription in list(self._subscriptions.values()):
+            try:
+                await self._providers[subscription.account].unsubscribe(subscription)
+            except Exception as exc:
+                logger.debug("calendar_unsubscribe_failed", account=subscription.account, error=str(exc))
+        self._subscriptions.clear()
+        self._calendar.push_accounts.clear()
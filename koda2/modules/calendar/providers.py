@@ -3,21 +3,40 @@
 from __future__ import annotations
 
 import datetime as dt
+import json
+import time
 from abc import ABC, abstractmethod
 from typing import Optional
 
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from koda2.logging_config import get_logger
-from koda2.modules.calendar.models import Attendee, CalendarEvent, CalendarProvider
+from koda2.modules.calendar.models import (
+    Attendee,
+    CalendarChanges,
+    CalendarEvent,
+    CalendarProvider,
+    CalendarSubscription,
+)
+from koda2.modules.calendar.recurrence import series_recurrence
 
 logger = get_logger(__name__)
 
 
+class SyncTokenExpired(Exception):
+    """The provider rejected a stored sync token; a full resync is needed."""
+
+
+class SubscriptionExpired(Exception):
+    """A push subscription is gone on the provider side; subscribe again."""
+
+
 class BaseCalendarProvider(ABC):
     """Abstract calendar provider interface."""
 
     provider: CalendarProvider
+    # How changes are pushed: "webhook", "stream", or None (poll only)
+    push_kind: Optional[str] = None
 
     @abstractmethod
     async def list_events(
@@ -41,12 +60,63 @@ class BaseCalendarProvider(ABC):
     async def list_calendars(self) -> list[str]:
         """List available calendar names."""
 
+    async def close(self) -> None:
+        """Release pooled connections (nothing to release by default)."""
+
+    async def list_changes(
+        self, start: dt.datetime, end: dt.datetime, sync_token: Optional[str] = None,
+    ) -> CalendarChanges:
+        """Return what changed since ``sync_token`` (or everything in the window).
+
+        Providers with change tracking override this; the default has no
+        token and always returns the full window. Raises ``SyncTokenExpired``
+        when the token is no longer accepted.
+        """
+        return CalendarChanges(events=await self.list_events(start, end), full=True)
+
+    async def get_free_busy(
+        self, emails: list[str], start: dt.datetime, end: dt.datetime,
+    ) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Busy periods of other people's calendars, keyed by lowercased email.
+
+        Attendees the provider can't see (unknown, no permission, or no
+        free/busy support, the default) are left out of the result.
+        """
+        return {}
+
+    async def subscribe(self, callback_url: str, client_state: str) -> list[CalendarSubscription]:
+        """Ask the provider to push calendar changes (see ``push_kind``).
+
+        Webhook providers deliver to ``callback_url`` and echo
+        ``client_state``; stream providers ignore the URL. Returns the
+        subscriptions created (none by default: the account is polled).
+        """
+        return []
+
+    async def renew(self, subscription: CalendarSubscription) -> Optional[CalendarSubscription]:
+        """Extend a subscription; None if it can't be renewed in place (subscribe again)."""
+        return None
+
+    async def unsubscribe(self, subscription: CalendarSubscription) -> None:
+        """Cancel a subscription (nothing to cancel by default)."""
+
+    async def wait_for_changes(self, subscription: CalendarSubscription, timeout_minutes: int) -> bool:
+        """Block until a stream subscription reports a change (True) or the connection times out (False).
+
+        Raises ``SubscriptionExpired`` when the provider no longer knows
+        the subscription. Providers without a change stream never hold a
+        stream subscription, so by default every subscription is expired.
+        """
+        raise SubscriptionExpired(f"{type(self).__name__} has no change stream")
+
 
 class EWSCalendarProvider(BaseCalendarProvider):
     """Exchange Web Services calendar integration via direct SOAP + httpx-ntlm.
 
     Uses raw SOAP requests instead of exchangelib because exchangelib's NTLM
-    handshake hangs on many Exchange servers with Python 3.13+.
+    handshake hangs on many Exchange servers with Python 3.13+. Requests go
+    through the mailbox's shared ``EWSSession`` (kept-alive NTLM connection,
+    autodiscover cached on disk, streamed parsing).
     """
 
     provider = CalendarProvider.EWS
@@ -62,10 +132,7 @@ class EWSCalendarProvider(BaseCalendarProvider):
         self._username = username
         self._password = password
         self._email = email
-        self._ews_url = f"https://{self._server}/EWS/Exchange.asmx"
-        self._headers = {"Content-Type": "text/xml; charset=utf-8"}
-        self._auth = None  # Lazy init
-        self._verified = False  # Whether we've verified the server works
+        self._session = None  # Lazy init
 
     @staticmethod
     def _normalize_server(server: str) -> str:
@@ -134,198 +201,112 @@ class EWSCalendarProvider(BaseCalendarProvider):
 
         return candidates
 
-    def _get_auth(self):
-        """Get httpx-ntlm auth, building DOMAIN\\user variants."""
-        if self._auth is not None:
-            return self._auth
-        try:
-            from httpx_ntlm import HttpNtlmAuth
-        except ImportError:
-            raise RuntimeError("httpx-ntlm is required for EWS. Run: pip install httpx-ntlm")
-
-        user = self._username
-        # Auto-add domain prefix if not present
-        if "\\" not in user and "@" not in user:
-            domain = self._email.split("@")[-1].split(".")[0].upper() if "@" in self._email else ""
-            if domain:
-                user = f"{domain}\\{self._username}"
-        self._auth = HttpNtlmAuth(user, self._password)
-        return self._auth
-
-    def _ensure_server(self) -> None:
-        """Verify the configured server works; autodiscover if it doesn't."""
-        if self._verified:
-            return
-
-        import httpx
-        auth = self._get_auth()
-
-        # Quick test on configured server
-        try:
-            with httpx.Client(verify=True, timeout=10) as client:
-                resp = client.get(self._ews_url)
-            if resp.status_code in (200, 401):
-                # Server is reachable — try NTLM
-                test_soap = f"""<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"
-               xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
-  <soap:Header><t:RequestServerVersion Version="Exchange2016"/></soap:Header>
-  <soap:Body>
-    <m:ResolveNames ReturnFullContactData="false">
-      <m:UnresolvedEntry>{self._email}</m:UnresolvedEntry>
-    </m:ResolveNames>
-  </soap:Body>
-</soap:Envelope>"""
-                with httpx.Client(verify=True, timeout=15) as client:
-                    resp = client.post(self._ews_url, content=test_soap, headers=self._headers, auth=auth)
-                if resp.status_code == 200:
-                    self._verified = True
-                    logger.info("ews_server_verified", server=self._server)
-                    return
-        except Exception:
-            pass
-
-        # Server didn't work — try autodiscover
-        logger.info("ews_autodiscovering", original_server=self._server, email=self._email)
-        candidates = self._discover_servers(self._server, self._email)
-
-        for srv in candidates:
-            if srv == self._server:
-                continue  # Already tried
-            ews_url = f"https://{srv}/EWS/Exchange.asmx"
-            try:
-                test_soap = f"""<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"
-               xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
-  <soap:Header><t:RequestServerVersion Version="Exchange2016"/></soap:Header>
-  <soap:Body>
-    <m:ResolveNames ReturnFullContactData="false">
-      <m:UnresolvedEntry>{self._email}</m:UnresolvedEntry>
-    </m:ResolveNames>
-  </soap:Body>
-</soap:Envelope>"""
-                with httpx.Client(verify=True, timeout=15) as client:
-                    resp = client.post(ews_url, content=test_soap, headers=self._headers, auth=auth)
-                if resp.status_code == 200:
-                    logger.info("ews_autodiscovered", old_server=self._server, new_server=srv)
-                    self._server = srv
-                    self._ews_url = ews_url
-                    self._verified = True
-                    return
-            except Exception:
-                continue
+    def _get_session(self):
+        """The mailbox's shared EWS session."""
+        if self._session is None:
+            from koda2.modules.account.ews import EWSSession
+            self._session = EWSSession.for_account(
+                self._server, self._username, self._password, self._email, discover=self._discover_servers,
+            )
+        return self._session
 
-        # If nothing worked, keep original and hope for the best
-        self._verified = True
-        logger.warning("ews_autodiscover_failed", server=self._server)
+    async def close(self) -> None:
+        """Close the session's kept-alive connections."""
+        if self._session is not None:
+            self._session.close()
 
     def _soap_request(self, body_xml: str) -> str:
         """Execute a SOAP request against EWS and return the response XML."""
-        import httpx
-        self._ensure_server()
-        soap = f"""<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"
-               xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
-  <soap:Header>
-    <t:RequestServerVersion Version="Exchange2016"/>
-  </soap:Header>
-  <soap:Body>
-    {body_xml}
-  </soap:Body>
-</soap:Envelope>"""
-        with httpx.Client(verify=True, timeout=30) as client:
-            resp = client.post(self._ews_url, content=soap, headers=self._headers, auth=self._get_auth())
-        if resp.status_code != 200:
-            raise RuntimeError(f"EWS request failed: HTTP {resp.status_code}")
-        return resp.text
+        return self._get_session().request(body_xml)
 
-    @staticmethod
-    def _parse_events_xml(xml_text: str) -> list[dict]:
+    @classmethod
+    def _parse_events_xml(cls, xml_text: str) -> list[dict]:
         """Parse CalendarItem elements from EWS FindItem response XML."""
         import xml.etree.ElementTree as ET
-        ns = {
-            "s": "http://schemas.xmlsoap.org/soap/envelope/",
-            "t": "http://schemas.microsoft.com/exchange/services/2006/types",
-            "m": "http://schemas.microsoft.com/exchange/services/2006/messages",
+        from koda2.modules.account.ews import TYPES_NS
+        return [cls._parse_item(item) for item in ET.fromstring(xml_text).iter(f"{{{TYPES_NS}}}CalendarItem")]
+
+    @staticmethod
+    def _parse_item(item) -> dict:
+        """Read one CalendarItem element into a plain dict."""
+        ns = {"t": "http://schemas.microsoft.com/exchange/services/2006/types"}
+
+        def _text(tag: str) -> str:
+            el = item.find(f"t:{tag}", ns)
+            return el.text if el is not None and el.text else ""
+
+        # Parse organizer
+        organizer = ""
+        org_el = item.find(".//t:Organizer/t:Mailbox/t:Name", ns)
+        if org_el is not None and org_el.text:
+            organizer = org_el.text
+
+        # Parse attendees
+        attendees_data = []
+        for att in item.findall(".//t:RequiredAttendees/t:Attendee", ns):
+            mb = att.find("t:Mailbox", ns)
+            if mb is not None:
+                att_email = ""
+                att_name = ""
+                e_el = mb.find("t:EmailAddress", ns)
+                n_el = mb.find("t:Name", ns)
+                if e_el is not None and e_el.text:
+                    att_email = e_el.text
+                if n_el is not None and n_el.text:
+                    att_name = n_el.text
+                resp_el = att.find("t:ResponseType", ns)
+                status = resp_el.text if resp_el is not None else "Unknown"
+                if att_email:
+                    attendees_data.append({"email": att_email, "name": att_name, "status": status})
+
+        # Parse ItemId
+        item_id_el = item.find("t:ItemId", ns)
+        item_id = item_id_el.get("Id", "") if item_id_el is not None else ""
+
+        # Parse online meeting URL
+        meeting_url = ""
+        # Check for OnlineMeetingUrl or JoinUrl
+        for tag in ["OnlineMeetingUrl", "JoinOnlineMeetingUrl"]:
+            url_el = item.find(f"t:{tag}", ns)
+            if url_el is not None and url_el.text:
+                meeting_url = url_el.text
+                break
+
+        return {
+            "id": item_id,
+            "subject": _text("Subject"),
+            "start": _text("Start"),
+            "end": _text("End"),
+            "location": _text("Location"),
+            "organizer": organizer,
+            "attendees": attendees_data,
+            "is_all_day": _text("IsAllDayEvent").lower() == "true",
+            "meeting_url": meeting_url,
+            "body": _text("Body"),
+            "item_type": _text("CalendarItemType"),
         }
-        root = ET.fromstring(xml_text)
-        items = root.findall(".//t:CalendarItem", ns)
-        events = []
-        for item in items:
-            def _text(tag: str) -> str:
-                el = item.find(f"t:{tag}", ns)
-                return el.text if el is not None and el.text else ""
-
-            # Parse organizer
-            organizer = ""
-            org_el = item.find(".//t:Organizer/t:Mailbox/t:Name", ns)
-            if org_el is not None and org_el.text:
-                organizer = org_el.text
-
-            # Parse attendees
-            attendees_data = []
-            for att in item.findall(".//t:RequiredAttendees/t:Attendee", ns):
-                mb = att.find("t:Mailbox", ns)
-                if mb is not None:
-                    att_email = ""
-                    att_name = ""
-                    e_el = mb.find("t:EmailAddress", ns)
-                    n_el = mb.find("t:Name", ns)
-                    if e_el is not None and e_el.text:
-                        att_email = e_el.text
-                    if n_el is not None and n_el.text:
-                        att_name = n_el.text
-                    resp_el = att.find("t:ResponseType", ns)
-                    status = resp_el.text if resp_el is not None else "Unknown"
-                    if att_email:
-                        attendees_data.append({"email": att_email, "name": att_name, "status": status})
-
-            # Parse location
-            location = _text("Location")
-
-            # Parse ItemId
-            item_id_el = item.find("t:ItemId", ns)
-            item_id = item_id_el.get("Id", "") if item_id_el is not None else ""
-
-            # Parse boolean
-            is_all_day = _text("IsAllDayEvent").lower() == "true"
-
-            # Parse online meeting URL
-            meeting_url = ""
-            # Check for OnlineMeetingUrl or JoinUrl
-            for tag in ["OnlineMeetingUrl", "JoinOnlineMeetingUrl"]:
-                url_el = item.find(f"t:{tag}", ns)
-                if url_el is not None and url_el.text:
-                    meeting_url = url_el.text
-                    break
-
-            events.append({
-                "id": item_id,
-                "subject": _text("Subject"),
-                "start": _text("Start"),
-                "end": _text("End"),
-                "location": location,
-                "organizer": organizer,
-                "attendees": attendees_data,
-                "is_all_day": is_all_day,
-                "meeting_url": meeting_url,
-                "body": _text("Body"),
-            })
-        return events
+
+    # Items per CalendarView request; a busier window is read in pages
+    VIEW_PAGE_SIZE = 200
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def list_events(
         self, start: dt.datetime, end: dt.datetime, calendar_name: Optional[str] = None,
     ) -> list[CalendarEvent]:
+        """Read the window with CalendarView, streaming each page.
+
+        CalendarView can't be combined with IndexedPageItemView; a page
+        that doesn't reach the end of the window is continued from the
+        start of its last item, skipping items already read.
+        """
         import asyncio
+        from koda2.modules.account.ews import TYPES_NS
 
         start_str = start.strftime("%Y-%m-%dT%H:%M:%SZ") if start.tzinfo else start.strftime("%Y-%m-%dT%H:%M:%SZ")
         end_str = end.strftime("%Y-%m-%dT%H:%M:%SZ") if end.tzinfo else end.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-        body_xml = f"""<m:FindItem Traversal="Shallow">
+        def _body(view_start: str) -> str:
+            return f"""<m:FindItem Traversal="Shallow">
       <m:ItemShape>
         <t:BaseShape>Default</t:BaseShape>
         <t:AdditionalProperties>
@@ -339,43 +320,309 @@ class EWSCalendarProvider(BaseCalendarProvider):
           <t:FieldURI FieldURI="item:Body"/>
         </t:AdditionalProperties>
       </m:ItemShape>
-      <m:CalendarView StartDate="{start_str}" EndDate="{end_str}"/>
+      <m:CalendarView MaxEntriesReturned="{self.VIEW_PAGE_SIZE}" StartDate="{view_start}" EndDate="{end_str}"/>
       <m:ParentFolderIds>
         <t:DistinguishedFolderId Id="calendar"/>
       </m:ParentFolderIds>
     </m:FindItem>"""
 
         def _fetch():
-            xml_text = self._soap_request(body_xml)
-            raw_events = self._parse_events_xml(xml_text)
-            events = []
-            for raw in raw_events:
-                try:
-                    start_dt = dt.datetime.fromisoformat(raw["start"].replace("Z", "+00:00"))
-                    end_dt = dt.datetime.fromisoformat(raw["end"].replace("Z", "+00:00"))
-                except ValueError:
-                    continue
+            session = self._get_session()
+            events: list[CalendarEvent] = []
+            seen: set[str] = set()
+            view_start = start_str
+            while True:
+                paging: dict[str, str] = {}
+                last_start = ""
+                for item in session.iter_items(_body(view_start), f"{{{TYPES_NS}}}CalendarItem", paging):
+                    raw = self._parse_item(item)
+                    last_start = raw["start"] or last_start
+                    if raw["id"] in seen:
+                        continue
+                    seen.add(raw["id"])
+                    event = self._to_event(raw, calendar_name)
+                    if event:
+                        events.append(event)
+                if paging.get("IncludesLastItemInRange", "true").lower() == "true" or not last_start:
+                    return events
+                if last_start == view_start:
+                    # A whole page starting at one instant; nothing to continue from
+                    logger.warning("ews_calendar_view_truncated", start=view_start, count=len(events))
+                    return events
+                view_start = last_start
+
+        return await asyncio.to_thread(_fetch)
 
-                attendees = [
-                    Attendee(email=a["email"], name=a.get("name", ""), status=a.get("status", ""))
-                    for a in raw.get("attendees", [])
+    def _to_event(self, raw: dict, calendar_name: Optional[str] = None) -> Optional[CalendarEvent]:
+        """Build a CalendarEvent from a ``_parse_events_xml`` dict (None if undated)."""
+        try:
+            start_dt = dt.datetime.fromisoformat(raw["start"].replace("Z", "+00:00"))
+            end_dt = dt.datetime.fromisoformat(raw["end"].replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+        attendees = [
+            Attendee(email=a["email"], name=a.get("name", ""), status=a.get("status", ""))
+            for a in raw.get("attendees", [])
+        ]
+        return CalendarEvent(
+            provider=self.provider,
+            provider_id=raw["id"],
+            title=raw["subject"],
+            description=raw.get("body", ""),
+            location=raw.get("location", ""),
+            start=start_dt,
+            end=end_dt,
+            all_day=raw.get("is_all_day", False),
+            attendees=attendees,
+            organizer=raw.get("organizer", ""),
+            is_online=bool(raw.get("meeting_url")),
+            meeting_url=raw.get("meeting_url", ""),
+            calendar_name=calendar_name or "Exchange",
+        )
+
+    # Changes per SyncFolderItems call (EWS maximum is 512)
+    SYNC_BATCH_SIZE = 512
+
+    def _sync_folder_items(self, sync_state: Optional[str], with_items: bool) -> tuple[list[dict], list[str], str]:
+        """Drain SyncFolderItems from ``sync_state``.
+
+        Returns (changed items as ``_parse_events_xml`` dicts, deleted item
+        IDs, new sync state). ``with_items=False`` asks for IDs only, which
+        is enough to obtain a starting state after a full fetch.
+        """
+        import xml.etree.ElementTree as ET
+        ns = {
+            "t": "http://schemas.microsoft.com/exchange/services/2006/types",
+            "m": "http://schemas.microsoft.com/exchange/services/2006/messages",
+        }
+        properties = """<t:AdditionalProperties>
+          <t:FieldURI FieldURI="item:Subject"/>
+          <t:FieldURI FieldURI="calendar:Start"/>
+          <t:FieldURI FieldURI="calendar:End"/>
+          <t:FieldURI FieldURI="calendar:Location"/>
+          <t:FieldURI FieldURI="calendar:Organizer"/>
+          <t:FieldURI FieldURI="calendar:IsAllDayEvent"/>
+          <t:FieldURI FieldURI="calendar:RequiredAttendees"/>
+          <t:FieldURI FieldURI="calendar:CalendarItemType"/>
+        </t:AdditionalProperties>""" if with_items else ""
+
+        changed: list[dict] = []
+        deleted: list[str] = []
+        while True:
+            state_xml = f"<m:SyncState>{sync_state}</m:SyncState>" if sync_state else ""
+            body_xml = f"""<m:SyncFolderItems>
+      <m:ItemShape>
+        <t:BaseShape>IdOnly</t:BaseShape>
+        {properties}
+      </m:ItemShape>
+      <m:SyncFolderId>
+        <t:DistinguishedFolderId Id="calendar"/>
+      </m:SyncFolderId>
+      {state_xml}
+      <m:MaxChangesReturned>{self.SYNC_BATCH_SIZE}</m:MaxChangesReturned>
+    </m:SyncFolderItems>"""
+            root = ET.fromstring(self._soap_request(body_xml))
+            message = root.find(".//m:SyncFolderItemsResponseMessage", ns)
+            code = message.findtext("m:ResponseCode", "", ns) if message is not None else ""
+            if code == "ErrorInvalidSyncStateData":
+                raise SyncTokenExpired("EWS sync state no longer valid")
+            if message is None or message.get("ResponseClass") == "Error":
+                raise RuntimeError(f"EWS SyncFolderItems failed: {code or 'no response'}")
+
+            if with_items:
+                changed.extend(self._parse_item(item) for item in message.iter(f"{{{ns['t']}}}CalendarItem"))
+            for item_id in message.findall("m:Changes/t:Delete/t:ItemId", ns):
+                deleted.append(item_id.get("Id", ""))
+            sync_state = message.findtext("m:SyncState", "", ns)
+            if message.findtext("m:IncludesLastItemInRange", "true", ns).lower() == "true":
+                return changed, deleted, sync_state
+
+    async def list_changes(
+        self, start: dt.datetime, end: dt.datetime, sync_token: Optional[str] = None,
+    ) -> CalendarChanges:
+        """Incremental sync via SyncFolderItems.
+
+        SyncFolderItems reports recurring series by their master item, not
+        per occurrence, so a change to anything but a single appointment
+        falls back to a CalendarView fetch of the window (still with the
+        new sync state).
+        """
+        import asyncio
+
+        if not sync_token:
+            events = await self.list_events(start, end)
+            _, _, state = await asyncio.to_thread(self._sync_folder_items, None, False)
+            return CalendarChanges(events=events, sync_token=state or None, full=True)
+
+        changed, deleted, state = await asyncio.to_thread(self._sync_folder_items, sync_token, True)
+        if any(raw.get("item_type") not in ("", "Single") for raw in changed):
+            events = await self.list_events(start, end)
+            return CalendarChanges(events=events, sync_token=state or None, full=True)
+        events = [e for e in (self._to_event(raw) for raw in changed) if e]
+        return CalendarChanges(events=events, deleted_ids=deleted, sync_token=state or None)
+
+    push_kind = "stream"
+    # Calendar folder events a streaming subscription reports
+    STREAM_EVENT_TYPES = ("CreatedEvent", "ModifiedEvent", "DeletedEvent", "MovedEvent", "CopiedEvent")
+    # Response codes meaning the subscription must be created again
+    STREAM_GONE_CODES = ("ErrorSubscriptionNotFound", "ErrorInvalidSubscription", "ErrorSubscriptionAccessDenied")
+
+    async def subscribe(self, callback_url: str, client_state: str) -> list[CalendarSubscription]:
+        """Create a streaming subscription on the calendar folder (``callback_url`` is unused)."""
+        import asyncio
+        import xml.etree.ElementTree as ET
+
+        event_types = "".join(f"<t:EventType>{name}</t:EventType>" for name in self.STREAM_EVENT_TYPES)
+        body_xml = f"""<m:Subscribe>
+      <m:StreamingSubscriptionRequest>
+        <t:FolderIds><t:DistinguishedFolderId Id="calendar"/></t:FolderIds>
+        <t:EventTypes>{event_types}</t:EventTypes>
+      </m:StreamingSubscriptionRequest>
+    </m:Subscribe>"""
+        ns = {"m": "http://schemas.microsoft.com/exchange/services/2006/messages"}
+        root = ET.fromstring(await asyncio.to_thread(self._soap_request, body_xml))
+        message = root.find(".//m:SubscribeResponseMessage", ns)
+        if message is None or message.get("ResponseClass") == "Error":
+            code = message.findtext("m:ResponseCode", "", ns) if message is not None else "no response"
+            raise RuntimeError(f"EWS Subscribe failed: {code}")
+        return [CalendarSubscription(
+            subscription_id=message.findtext("m:SubscriptionId", "", ns), kind="stream",
+            client_state=client_state,
+        )]
+
+    @classmethod
+    def _stream_status(cls, envelope: str) -> Optional[bool]:
+        """Read one envelope of a GetStreamingEvents response.
+
+        True if it carries a calendar change, False if the server closed
+        the connection, None for a keep-alive. Raises SubscriptionExpired
+        or RuntimeError for an error response.
+        """
+        import xml.etree.ElementTree as ET
+        ns = {
+            "t": "http://schemas.microsoft.com/exchange/services/2006/types",
+            "m": "http://schemas.microsoft.com/exchange/services/2006/messages",
+        }
+        message = ET.fromstring(envelope).find(".//m:GetStreamingEventsResponseMessage", ns)
+        if message is None:
+            return None
+        if message.get("ResponseClass") == "Error":
+            code = message.findtext("m:ResponseCode", "", ns)
+            if code in cls.STREAM_GONE_CODES:
+                raise SubscriptionExpired(f"EWS streaming subscription gone: {code}")
+            raise RuntimeError(f"EWS GetStreamingEvents failed: {code}")
+        for name in cls.STREAM_EVENT_TYPES:
+            if message.find(f".//m:Notifications/m:Notification/t:{name}", ns) is not None:
+                return True
+        if message.findtext("m:ConnectionStatus", "", ns) == "Closed":
+            return False
+        return None
+
+    async def wait_for_changes(self, subscription: CalendarSubscription, timeout_minutes: int) -> bool:
+        """Hold a GetStreamingEvents connection open until a change arrives or it times out.
+
+        EWS sends one SOAP envelope per batch of notifications (and keep-
+        alives) over the same response; it is read as it arrives and the
+        connection dropped at the first change. Changes made while no
+        connection is open are delivered on the next one.
+        """
+        import asyncio
+        import re
+
+        import httpx
+
+        body_xml = f"""<m:GetStreamingEvents>
+      <m:SubscriptionIds><t:SubscriptionId>{subscription.subscription_id}</t:SubscriptionId></m:SubscriptionIds>
+      <m:ConnectionTimeout>{timeout_minutes}</m:ConnectionTimeout>
+    </m:GetStreamingEvents>"""
+        envelope_end = re.compile(r"</(?:\w+:)?Envelope>")
+
+        def _stream() -> bool:
+            timeout = httpx.Timeout(30, read=timeout_minutes * 60 + 60)
+            with self._get_session().stream(body_xml, timeout=timeout) as resp:
+                buffer = ""
+                for chunk in resp.iter_text():
+                    buffer += chunk
+                    while (match := envelope_end.search(buffer)) is not None:
+                        envelope, buffer = buffer[:match.end()], buffer[match.end():]
+                        status = self._stream_status(envelope[envelope.find("<"):])
+                        if status is not None:
+                            return status
+            return False
+
+        return await asyncio.to_thread(_stream)
+
+    # GetUserAvailability busy types that block a meeting
+    FREE_BUSY_BLOCKING = ("Tentative", "Busy", "OOF")
+
+    async def get_free_busy(
+        self, emails: list[str], start: dt.datetime, end: dt.datetime,
+    ) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Attendee availability via GetUserAvailability, in UTC."""
+        import asyncio
+        from xml.sax.saxutils import escape
+
+        def _utc(value: dt.datetime) -> str:
+            return value.astimezone(dt.UTC).strftime("%Y-%m-%dT%H:%M:%S")
+
+        transition = (
+            "<t:Bias>0</t:Bias><t:Time>00:00:00</t:Time><t:DayOrder>1</t:DayOrder>"
+            "<t:Month>1</t:Month><t:DayOfWeek>Sunday</t:DayOfWeek>"
+        )
+        mailboxes = "".join(
+            f"""<t:MailboxData>
+          <t:Email><t:Address>{escape(email)}</t:Address></t:Email>
+          <t:AttendeeType>Required</t:AttendeeType>
+          <t:ExcludeConflicts>false</t:ExcludeConflicts>
+        </t:MailboxData>"""
+            for email in emails
+        )
+        body_xml = f"""<m:GetUserAvailabilityRequest>
+      <t:TimeZone>
+        <t:Bias>0</t:Bias>
+        <t:StandardTime>{transition}</t:StandardTime>
+        <t:DaylightTime>{transition}</t:DaylightTime>
+      </t:TimeZone>
+      <m:MailboxDataArray>
+        {mailboxes}
+      </m:MailboxDataArray>
+      <t:FreeBusyViewOptions>
+        <t:TimeWindow>
+          <t:StartTime>{_utc(start)}</t:StartTime>
+          <t:EndTime>{_utc(end)}</t:EndTime>
+        </t:TimeWindow>
+        <t:MergedFreeBusyIntervalInMinutes>15</t:MergedFreeBusyIntervalInMinutes>
+        <t:RequestedView>FreeBusy</t:RequestedView>
+      </t:FreeBusyViewOptions>
+    </m:GetUserAvailabilityRequest>"""
+
+        def _fetch() -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+            import xml.etree.ElementTree as ET
+            ns = {
+                "t": "http://schemas.microsoft.com/exchange/services/2006/types",
+                "m": "http://schemas.microsoft.com/exchange/services/2006/messages",
+            }
+
+            def _parse(value: str) -> dt.datetime:
+                parsed = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+                return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt.UTC)
+
+            root = ET.fromstring(self._soap_request(body_xml))
+            result: dict[str, list[tuple[dt.datetime, dt.datetime]]] = {}
+            # One FreeBusyResponse per mailbox, in request order
+            for email, response in zip(emails, root.findall(".//m:FreeBusyResponse", ns)):
+                message = response.find("m:ResponseMessage", ns)
+                if message is not None and message.get("ResponseClass") == "Error":
+                    logger.info("ews_free_busy_unavailable", email=email,
+                                code=message.findtext("m:ResponseCode", "", ns))
+                    continue
+                result[email.lower()] = [
+                    (_parse(event.findtext("t:StartTime", "", ns)), _parse(event.findtext("t:EndTime", "", ns)))
+                    for event in response.findall(".//t:CalendarEvent", ns)
+                    if event.findtext("t:BusyType", "", ns) in self.FREE_BUSY_BLOCKING
                 ]
-                events.append(CalendarEvent(
-                    provider=self.provider,
-                    provider_id=raw["id"],
-                    title=raw["subject"],
-                    description=raw.get("body", ""),
-                    location=raw.get("location", ""),
-                    start=start_dt,
-                    end=end_dt,
-                    all_day=raw.get("is_all_day", False),
-                    attendees=attendees,
-                    organizer=raw.get("organizer", ""),
-                    is_online=bool(raw.get("meeting_url")),
-                    meeting_url=raw.get("meeting_url", ""),
-                    calendar_name=calendar_name or "Exchange",
-                ))
-            return events
+            return result
 
         return await asyncio.to_thread(_fetch)
 
@@ -488,14 +735,32 @@ class GoogleCalendarProvider(BaseCalendarProvider):
 
     provider = CalendarProvider.GOOGLE
 
+    # Partial-response masks: only what _to_event and the sync reads use
+    EVENT_FIELDS = (
+        "items(id,status,summary,description,location,start,end,hangoutLink,"
+        "organizer(email),attendees(email,displayName,responseStatus),"
+        "recurrence,recurringEventId,originalStartTime),"
+        "nextPageToken,nextSyncToken"
+    )
+    CALENDAR_LIST_FIELDS = "items(id,summary),nextPageToken"
+    # events().list page size (API maximum) and sub-requests per batch call (API limit 50)
+    PAGE_SIZE = 2500
+    BATCH_SIZE = 50
+    # How long calendarList() results are reused (seconds)
+    CALENDAR_LIST_TTL = 300
+
     def __init__(
         self,
         credentials_file: str,
         token_file: str,
+        api_endpoint: Optional[str] = None,
     ) -> None:
         self._credentials_file = credentials_file
         self._token_file = token_file
+        # Service base URL ("http://127.0.0.1:8080/calendar/v3/"), e.g. a local stand-in server for tests
+        self._api_endpoint = api_endpoint
         self._service = None
+        self._calendars: Optional[tuple[float, dict[str, str]]] = None  # (fetched at, id -> summary)
 
     def _get_service(self, force_refresh: bool = False):
         """Lazy-init Google Calendar service with automatic token refresh.
@@ -542,9 +807,82 @@ class GoogleCalendarProvider(BaseCalendarProvider):
                     "Google token expired and no refresh token. Re-authenticate via dashboard."
                 )
 
-        self._service = build("calendar", "v3", credentials=creds)
+        client_options = {"api_endpoint": self._api_endpoint} if self._api_endpoint else None
+        self._service = build("calendar", "v3", credentials=creds, client_options=client_options)
         return self._service
 
+    def _calendar_summaries(self, service) -> dict[str, str]:
+        """Calendar ID -> display name for every calendar in the user's list.
+
+        One paginated ``calendarList().list()`` (the summaries come with
+        it, no per-calendar ``get``), reused for ``CALENDAR_LIST_TTL``.
+        """
+        if self._calendars and time.monotonic() - self._calendars[0] < self.CALENDAR_LIST_TTL:
+            return self._calendars[1]
+        calendars: dict[str, str] = {}
+        page_token = None
+        while True:
+            result = service.calendarList().list(
+                fields=self.CALENDAR_LIST_FIELDS, pageToken=page_token,
+            ).execute()
+            for cal in result.get("items", []):
+                calendars[cal["id"]] = cal.get("summary", cal["id"])
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+        self._calendars = (time.monotonic(), calendars)
+        return calendars
+
+    def _list_event_pages(self, service, params: dict[str, dict]) -> dict[str, dict]:
+        """Run ``events().list`` for several calendars, following pagination.
+
+        ``params`` maps calendar ID to its ``events().list`` arguments. Each
+        round sends the next page of every calendar that still has one as
+        a single batch HTTP request (up to ``BATCH_SIZE`` per call), so N
+        calendars cost one round trip instead of N. Returns calendar ID ->
+        ``{"items": [...], "nextSyncToken": str | None, "error": Exception | None}``.
+        """
+        results = {cal_id: {"items": [], "nextSyncToken": None, "error": None} for cal_id in params}
+        pending: dict[str, Optional[str]] = {cal_id: None for cal_id in params}  # cal ID -> page token
+        while pending:
+            current = list(pending.items())
+            pending = {}
+            for i in range(0, len(current), self.BATCH_SIZE):
+                chunk = current[i:i + self.BATCH_SIZE]
+
+                def _collect(request_id, response, exception, chunk=chunk):
+                    cal_id = chunk[int(request_id)][0]
+                    if exception is not None:
+                        results[cal_id]["error"] = exception
+                        return
+                    results[cal_id]["items"].extend(response.get("items", []))
+                    if response.get("nextPageToken"):
+                        pending[cal_id] = response["nextPageToken"]
+                    else:
+                        results[cal_id]["nextSyncToken"] = response.get("nextSyncToken")
+
+                batch = self._new_batch(service, _collect)
+                for n, (cal_id, page_token) in enumerate(chunk):
+                    kwargs = {**params[cal_id], "fields": self.EVENT_FIELDS, "maxResults": self.PAGE_SIZE}
+                    if page_token:
+                        kwargs["pageToken"] = page_token
+                    batch.add(service.events().list(**kwargs), request_id=str(n))
+                batch.execute()
+        return results
+
+    def _new_batch(self, service, callback):
+        """A batch request, sent to the ``api_endpoint`` host when one is set.
+
+        The client builds its batch URL from the discovery document's
+        ``rootUrl`` and ignores ``client_options``, so without this the
+        sub-requests would still go to www.googleapis.com.
+        """
+        if not self._api_endpoint:
+            return service.new_batch_http_request(callback=callback)
+        from urllib.parse import urljoin
+        from googleapiclient.http import BatchHttpRequest
+        return BatchHttpRequest(callback=callback, batch_uri=urljoin(self._api_endpoint, "/batch/calendar/v3"))
+
     async def refresh_token(self) -> bool:
         """Proactively refresh the Google OAuth token to keep it alive."""
         try:
@@ -564,74 +902,225 @@ class GoogleCalendarProvider(BaseCalendarProvider):
         service = self._get_service()
 
         def _fetch():
-            from koda2.config import get_local_tz, get_settings
+            from koda2.config import get_local_tz
             local_tz = get_local_tz()
-            tz_name = get_settings().koda2_timezone
 
             # Ensure start/end are tz-aware for the Google API
             _start = start if start.tzinfo else start.replace(tzinfo=local_tz)
             _end = end if end.tzinfo else end.replace(tzinfo=local_tz)
-            time_min = _start.isoformat()
-            time_max = _end.isoformat()
 
             # If a specific calendar is requested, use it; otherwise fetch from ALL calendars
+            summaries = self._calendar_summaries(service)
             if calendar_name:
-                cal_ids = [calendar_name]
+                calendars = {calendar_name: summaries.get(calendar_name, calendar_name)}
             else:
-                cal_list = service.calendarList().list().execute()
-                cal_ids = [c["id"] for c in cal_list.get("items", [])]
-                if not cal_ids:
-                    cal_ids = ["primary"]
-
+                calendars = summaries or {"primary": "primary"}
+
+            params = {
+                cal_id: {
+                    "calendarId": cal_id,
+                    "timeMin": _start.isoformat(),
+                    "timeMax": _end.isoformat(),
+                    "singleEvents": True,
+                    "orderBy": "startTime",
+                }
+                for cal_id in calendars
+            }
             all_events = []
-            for cal_id in cal_ids:
-                try:
-                    # Get calendar display name
-                    cal_summary = cal_id
-                    try:
-                        cal_info = service.calendarList().get(calendarId=cal_id).execute()
-                        cal_summary = cal_info.get("summary", cal_id)
-                    except Exception:
-                        pass
+            for cal_id, result in self._list_event_pages(service, params).items():
+                if result["error"] is not None:
+                    logger.warning("google_calendar_fetch_failed", calendar=cal_id, error=str(result["error"]))
+                for item in result["items"]:
+                    all_events.append(self._to_event(item, calendars[cal_id]))
+            return all_events
 
-                    result = service.events().list(
-                        calendarId=cal_id,
-                        timeMin=time_min,
-                        timeMax=time_max,
-                        singleEvents=True,
-                        orderBy="startTime",
-                    ).execute()
-                    for item in result.get("items", []):
-                        s = item.get("start", {})
-                        e = item.get("end", {})
-                        start_dt = dt.datetime.fromisoformat(
-                            s.get("dateTime", s.get("date", "")).replace("Z", "+00:00")
-                        )
-                        end_dt = dt.datetime.fromisoformat(
-                            e.get("dateTime", e.get("date", "")).replace("Z", "+00:00")
-                        )
-                        attendees = [
-                            Attendee(email=a["email"], name=a.get("displayName", ""),
-                                     status=a.get("responseStatus", "needsAction"))
-                            for a in item.get("attendees", [])
-                        ]
-                        all_events.append(CalendarEvent(
-                            provider=CalendarProvider.GOOGLE,
-                            provider_id=item["id"],
-                            title=item.get("summary", ""),
-                            description=item.get("description", ""),
-                            location=item.get("location", ""),
-                            start=start_dt,
-                            end=end_dt,
-                            attendees=attendees,
-                            organizer=item.get("organizer", {}).get("email", ""),
-                            is_online="hangoutLink" in item,
-                            meeting_url=item.get("hangoutLink", ""),
-                            calendar_name=cal_summary,
+        return await asyncio.to_thread(_fetch)
+
+    @staticmethod
+    def _parse_time(value: dict) -> dt.datetime:
+        """A Google ``{"dateTime": ...}`` or all-day ``{"date": ...}`` value."""
+        return dt.datetime.fromisoformat(
+            value.get("dateTime", value.get("date", "")).replace("Z", "+00:00")
+        )
+
+    @classmethod
+    def _to_event(cls, item: dict, cal_summary: str) -> CalendarEvent:
+        """Build a CalendarEvent from an events().list item.
+
+        A series master (``singleEvents=False``) keeps its rule block in
+        ``recurrence``; an exception to a series gets ``series_id`` and
+        the ``original_start`` it replaces.
+        """
+        s = item.get("start", {})
+        e = item.get("end", {})
+        start_dt = cls._parse_time(s)
+        end_dt = cls._parse_time(e)
+        all_day = "date" in s and "dateTime" not in s
+        recurrence = None
+        if item.get("recurrence"):
+            recurrence = series_recurrence(item["recurrence"], start_dt, all_day, s.get("timeZone"))
+        attendees = [
+            Attendee(email=a["email"], name=a.get("displayName", ""),
+                     status=a.get("responseStatus", "needsAction"))
+            for a in item.get("attendees", [])
+        ]
+        return CalendarEvent(
+            provider=CalendarProvider.GOOGLE,
+            provider_id=item["id"],
+            title=item.get("summary", ""),
+            description=item.get("description", ""),
+            location=item.get("location", ""),
+            start=start_dt,
+            end=end_dt,
+            attendees=attendees,
+            organizer=item.get("organizer", {}).get("email", ""),
+            is_online="hangoutLink" in item,
+            meeting_url=item.get("hangoutLink", ""),
+            calendar_name=cal_summary,
+            all_day=all_day,
+            recurrence=recurrence,
+            series_id=item.get("recurringEventId", ""),
+            original_start=cls._parse_time(item["originalStartTime"]) if "originalStartTime" in item else None,
+        )
+
+    async def list_changes(
+        self, start: dt.datetime, end: dt.datetime, sync_token: Optional[str] = None,
+    ) -> CalendarChanges:
+        """Incremental sync via events().list ``syncToken``, one per calendar.
+
+        The token is a JSON map of calendar ID to Google sync token. A new
+        or removed calendar invalidates it, as does HTTP 410 from Google.
+
+        Recurring series come back unexpanded (``singleEvents=False``): one
+        master with its rules plus the exceptions, which the cache expands
+        on read. A cancelled exception is kept as a cancelled override so
+        it hides its occurrence; any other cancellation is a deletion.
+        """
+        import asyncio
+
+        service = self._get_service()
+
+        def _fetch() -> CalendarChanges:
+            from koda2.config import get_local_tz
+            local_tz = get_local_tz()
+
+            calendars = self._calendar_summaries(service) or {"primary": "primary"}
+            tokens = json.loads(sync_token) if sync_token else {}
+            if sync_token and set(tokens) != set(calendars):
+                raise SyncTokenExpired("Google calendar list changed")
+
+            # Sync tokens can't be combined with timeMin/timeMax or orderBy
+            params: dict[str, dict] = {}
+            for cal_id in calendars:
+                params[cal_id] = {"calendarId": cal_id, "singleEvents": False}
+                if sync_token:
+                    params[cal_id]["syncToken"] = tokens[cal_id]
+                else:
+                    _start = start if start.tzinfo else start.replace(tzinfo=local_tz)
+                    _end = end if end.tzinfo else end.replace(tzinfo=local_tz)
+                    params[cal_id].update(timeMin=_start.isoformat(), timeMax=_end.isoformat())
+
+            changes = CalendarChanges(full=not sync_token)
+            new_tokens: dict[str, str] = {}
+            for cal_id, result in self._list_event_pages(service, params).items():
+                error = result["error"]
+                if error is not None:
+                    if getattr(getattr(error, "resp", None), "status", None) == 410:
+                        raise SyncTokenExpired(f"Google sync token expired for {cal_id}") from error
+                    raise error
+                for item in result["items"]:
+                    if item.get("status") == "cancelled" and "recurringEventId" in item:
+                        original = self._parse_time(item["originalStartTime"])
+                        changes.events.append(CalendarEvent(
+                            provider=CalendarProvider.GOOGLE, provider_id=item["id"], title="",
+                            start=original, end=original, status="cancelled",
+                            series_id=item["recurringEventId"], original_start=original,
+                            calendar_name=calendars[cal_id],
                         ))
-                except Exception as exc:
-                    print(f"[Google Calendar] Error fetching from {cal_id}: {exc}")
-            return all_events
+                    elif item.get("status") == "cancelled":
+                        changes.deleted_ids.append(item["id"])
+                    else:
+                        changes.events.append(self._to_event(item, calendars[cal_id]))
+                new_tokens[cal_id] = result["nextSyncToken"] or ""
+
+            if all(new_tokens.values()):
+                changes.sync_token = json.dumps(new_tokens, sort_keys=True)
+            return changes
+
+        return await asyncio.to_thread(_fetch)
+
+    push_kind = "webhook"
+    # Requested lifetime of an events().watch channel (Google caps it, typically at 7 days)
+    CHANNEL_TTL = dt.timedelta(days=7)
+
+    async def subscribe(self, callback_url: str, client_state: str) -> list[CalendarSubscription]:
+        """One ``events().watch`` channel per calendar, delivering to ``callback_url``."""
+        import asyncio
+        from uuid import uuid4
+
+        service = self._get_service()
+
+        def _watch() -> list[CalendarSubscription]:
+            subscriptions = []
+            for cal_id in self._calendar_summaries(service) or {"primary": "primary"}:
+                channel = service.events().watch(calendarId=cal_id, body={
+                    "id": uuid4().hex,
+                    "type": "web_hook",
+                    "address": callback_url,
+                    "token": client_state,
+                    "params": {"ttl": str(int(self.CHANNEL_TTL.total_seconds()))},
+                }).execute()
+                expiration = channel.get("expiration")
+                subscriptions.append(CalendarSubscription(
+                    subscription_id=channel["id"],
+                    resource_id=channel.get("resourceId", ""),
+                    client_state=client_state,
+                    expires_at=dt.datetime.fromtimestamp(int(expiration) / 1000, dt.UTC) if expiration else None,
+                ))
+            return subscriptions
+
+        return await asyncio.to_thread(_watch)
+
+    async def unsubscribe(self, subscription: CalendarSubscription) -> None:
+        """Stop a watch channel (``channels().stop``)."""
+        import asyncio
+
+        service = self._get_service()
+        await asyncio.to_thread(
+            lambda: service.channels().stop(body={
+                "id": subscription.subscription_id, "resourceId": subscription.resource_id,
+            }).execute()
+        )
+
+    # Calendars per freebusy().query (API limit)
+    FREE_BUSY_MAX_CALENDARS = 50
+
+    async def get_free_busy(
+        self, emails: list[str], start: dt.datetime, end: dt.datetime,
+    ) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Attendee availability via ``freebusy().query``."""
+        import asyncio
+
+        service = self._get_service()
+
+        def _parse(value: str) -> dt.datetime:
+            return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+        def _fetch() -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+            result: dict[str, list[tuple[dt.datetime, dt.datetime]]] = {}
+            for i in range(0, len(emails), self.FREE_BUSY_MAX_CALENDARS):
+                response = service.freebusy().query(body={
+                    "timeMin": start.astimezone(dt.UTC).isoformat(),
+                    "timeMax": end.astimezone(dt.UTC).isoformat(),
+                    "items": [{"id": email} for email in emails[i:i + self.FREE_BUSY_MAX_CALENDARS]],
+                }).execute()
+                for cal_id, cal in response.get("calendars", {}).items():
+                    if cal.get("errors"):
+                        logger.info("google_free_busy_unavailable", calendar=cal_id,
+                                    reasons=[e.get("reason") for e in cal["errors"]])
+                        continue
+                    result[cal_id.lower()] = [(_parse(b["start"]), _parse(b["end"])) for b in cal.get("busy", [])]
+            return result
 
         return await asyncio.to_thread(_fetch)
 
@@ -716,16 +1205,32 @@ class GoogleCalendarProvider(BaseCalendarProvider):
         service = self._get_service()
 
         def _list():
-            result = service.calendarList().list().execute()
-            return [c["id"] for c in result.get("items", [])]
+            return list(self._calendar_summaries(service))
         return await asyncio.to_thread(_list)
 
 
 class MSGraphCalendarProvider(BaseCalendarProvider):
-    """Microsoft Graph API calendar integration for Office 365."""
+    """Microsoft Graph API calendar integration for Office 365.
+
+    Access tokens are cached per app registration until shortly before they
+    expire, and requests go through one pooled ``httpx.AsyncClient`` per
+    tenant, so a call is normally a single request on a warm connection.
+    """
 
     provider = CalendarProvider.MSGRAPH
 
+    GRAPH_URL = "https://graph.microsoft.com/v1.0"
+    # Properties _to_event reads (calendarView/delta doesn't support $select)
+    EVENT_SELECT = "id,subject,bodyPreview,location,start,end,attendees,isOnlineMeeting,onlineMeeting"
+    # Events per page (Prefer: odata.maxpagesize; Graph default is 10)
+    PAGE_SIZE = 250
+    # Refresh a cached token this many seconds before it expires
+    TOKEN_REFRESH_MARGIN = 300
+
+    # Shared across instances: (tenant, client_id) -> (token, expires at), tenant -> (loop, client)
+    _tokens: dict[tuple[str, str], tuple[str, float]] = {}
+    _clients: dict[str, tuple[object, object]] = {}
+
     def __init__(
         self,
         client_id: str,
@@ -736,68 +1241,227 @@ class MSGraphCalendarProvider(BaseCalendarProvider):
         self._client_secret = client_secret
         self._tenant_id = tenant_id
 
-    async def _get_token(self) -> str:
-        """Acquire an OAuth2 token via client credentials."""
+    def _client(self):
+        """The pooled client for this tenant (one per event loop)."""
+        import asyncio
+
         import httpx
 
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(self._tenant_id)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            client = httpx.AsyncClient(
+                timeout=30,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+            entry = self._clients[self._tenant_id] = (loop, client)
+        return entry[1]
+
+    async def close(self) -> None:
+        """Close this tenant's pooled client."""
+        entry = self._clients.pop(self._tenant_id, None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    async def _get_token(self, force_refresh: bool = False) -> str:
+        """Return a cached client-credentials token, fetching one when needed."""
+        key = (self._tenant_id, self._client_id)
+        cached = self._tokens.get(key)
+        if cached and not force_refresh and time.monotonic() < cached[1] - self.TOKEN_REFRESH_MARGIN:
+            return cached[0]
+
         url = f"https://login.microsoftonline.com/{self._tenant_id}/oauth2/v2.0/token"
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, data={
-                "client_id": self._client_id,
-                "client_secret": self._client_secret,
-                "scope": "https://graph.microsoft.com/.default",
-                "grant_type": "client_credentials",
-            })
+        resp = await self._client().post(url, data={
+            "client_id": self._client_id,
+            "client_secret": self._client_secret,
+            "scope": "https://graph.microsoft.com/.default",
+            "grant_type": "client_credentials",
+        })
+        resp.raise_for_status()
+        data = resp.json()
+        token = data["access_token"]
+        self._tokens[key] = (token, time.monotonic() + float(data.get("expires_in", 3599)))
+        return token
+
+    async def _request(self, method: str, url: str, **kwargs):
+        """Send an authorized Graph request; a 401 refreshes the token once."""
+        headers = kwargs.pop("headers", {})
+        if not url.startswith("https://"):
+            url = f"{self.GRAPH_URL}{url}"
+        client = self._client()
+        token = await self._get_token()
+        resp = await client.request(method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        if resp.status_code == 401:
+            token = await self._get_token(force_refresh=True)
+            resp = await client.request(method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        return resp
+
+    async def _get_pages(self, url: str, params: Optional[dict] = None) -> tuple[list[dict], dict]:
+        """GET a collection, following ``@odata.nextLink`` to the end.
+
+        Returns (all items, last page) — the last page carries any
+        ``@odata.deltaLink``. Graph's 410 Gone is raised as SyncTokenExpired.
+        """
+        headers = {"Prefer": f'odata.maxpagesize={self.PAGE_SIZE}, outlook.timezone="UTC"'}
+        items: list[dict] = []
+        while True:
+            resp = await self._request("GET", url, params=params, headers=headers)
+            if resp.status_code == 410:
+                raise SyncTokenExpired("Graph delta link expired")
             resp.raise_for_status()
-            return resp.json()["access_token"]
+            data = resp.json()
+            items.extend(data.get("value", []))
+            if "@odata.nextLink" not in data:
+                return items, data
+            url, params = data["@odata.nextLink"], None
+
+    @staticmethod
+    def _utc(value: dt.datetime) -> str:
+        return value.astimezone(dt.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def list_events(
         self, start: dt.datetime, end: dt.datetime, calendar_name: Optional[str] = None,
     ) -> list[CalendarEvent]:
-        import httpx
-
-        token = await self._get_token()
-        url = "https://graph.microsoft.com/v1.0/me/calendarview"
-        params = {
-            "startDateTime": start.isoformat() + "Z",
-            "endDateTime": end.isoformat() + "Z",
+        items, _ = await self._get_pages("/me/calendarview", {
+            "startDateTime": self._utc(start),
+            "endDateTime": self._utc(end),
             "$orderby": "start/dateTime",
-        }
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                url, params=params,
-                headers={"Authorization": f"Bearer {token}"},
-            )
+            "$select": self.EVENT_SELECT,
+        })
+        return [self._to_event(item, calendar_name) for item in items]
+
+    def _to_event(self, item: dict, calendar_name: Optional[str] = None) -> CalendarEvent:
+        """Build a CalendarEvent from a Graph event resource."""
+        return CalendarEvent(
+            provider=self.provider,
+            provider_id=item["id"],
+            title=item.get("subject", ""),
+            description=item.get("bodyPreview", ""),
+            location=item.get("location", {}).get("displayName", ""),
+            start=self._parse_datetime(item["start"]),
+            end=self._parse_datetime(item["end"]),
+            attendees=[
+                Attendee(
+                    email=a.get("emailAddress", {}).get("address", ""),
+                    name=a.get("emailAddress", {}).get("name", ""),
+                )
+                for a in item.get("attendees", [])
+            ],
+            is_online=item.get("isOnlineMeeting", False),
+            meeting_url=item.get("onlineMeeting", {}).get("joinUrl", "") if item.get("onlineMeeting") else "",
+            calendar_name=calendar_name or "default",
+        )
+
+    @staticmethod
+    def _parse_datetime(value: dict) -> dt.datetime:
+        """Parse a Graph dateTimeTimeZone; UTC values come without an offset."""
+        parsed = dt.datetime.fromisoformat(value["dateTime"])
+        if parsed.tzinfo is None and value.get("timeZone") == "UTC":
+            parsed = parsed.replace(tzinfo=dt.UTC)
+        return parsed
+
+    async def list_changes(
+        self, start: dt.datetime, end: dt.datetime, sync_token: Optional[str] = None,
+    ) -> CalendarChanges:
+        """Incremental sync via ``calendarView/delta``.
+
+        The token is the ``@odata.deltaLink`` of the previous round, which
+        keeps the original window. Graph answers 410 Gone once it expires.
+        """
+        if sync_token:
+            items, last = await self._get_pages(sync_token)
+        else:
+            items, last = await self._get_pages("/me/calendarView/delta", {
+                "startDateTime": self._utc(start),
+                "endDateTime": self._utc(end),
+            })
+
+        changes = CalendarChanges(full=not sync_token, sync_token=last.get("@odata.deltaLink"))
+        for item in items:
+            if "@removed" in item:
+                changes.deleted_ids.append(item["id"])
+            else:
+                changes.events.append(self._to_event(item))
+        return changes
+
+    push_kind = "webhook"
+    # Subscription lifetime requested (Graph allows at most 4230 minutes for events)
+    SUBSCRIPTION_LIFETIME = dt.timedelta(minutes=4200)
+
+    async def subscribe(self, callback_url: str, client_state: str) -> list[CalendarSubscription]:
+        """Create a ``/subscriptions`` change notification for the mailbox's events.
+
+        Graph first validates ``callback_url`` by POSTing a
+        ``validationToken`` to it, which the route must echo.
+        """
+        resp = await self._request("POST", "/subscriptions", json={
+            "changeType": "created,updated,deleted",
+            "notificationUrl": callback_url,
+            "resource": "me/events",
+            "expirationDateTime": self._utc(dt.datetime.now(dt.UTC) + self.SUBSCRIPTION_LIFETIME),
+            "clientState": client_state,
+        })
+        resp.raise_for_status()
+        data = resp.json()
+        return [CalendarSubscription(
+            subscription_id=data["id"],
+            client_state=client_state,
+            expires_at=dt.datetime.fromisoformat(data["expirationDateTime"].replace("Z", "+00:00")),
+        )]
+
+    async def renew(self, subscription: CalendarSubscription) -> Optional[CalendarSubscription]:
+        """Push the expiry out by ``SUBSCRIPTION_LIFETIME``; None if Graph no longer has it."""
+        resp = await self._request("PATCH", f"/subscriptions/{subscription.subscription_id}", json={
+            "expirationDateTime": self._utc(dt.datetime.now(dt.UTC) + self.SUBSCRIPTION_LIFETIME),
+        })
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        expires = resp.json()["expirationDateTime"]
+        return subscription.model_copy(update={
+            "expires_at": dt.datetime.fromisoformat(expires.replace("Z", "+00:00")),
+        })
+
+    async def unsubscribe(self, subscription: CalendarSubscription) -> None:
+        """Delete the subscription (already gone is fine)."""
+        resp = await self._request("DELETE", f"/subscriptions/{subscription.subscription_id}")
+        if resp.status_code != 404:
             resp.raise_for_status()
-            data = resp.json()
 
-        events = []
-        for item in data.get("value", []):
-            events.append(CalendarEvent(
-                provider=self.provider,
-                provider_id=item["id"],
-                title=item.get("subject", ""),
-                description=item.get("bodyPreview", ""),
-                location=item.get("location", {}).get("displayName", ""),
-                start=dt.datetime.fromisoformat(item["start"]["dateTime"]),
-                end=dt.datetime.fromisoformat(item["end"]["dateTime"]),
-                attendees=[
-                    Attendee(
-                        email=a.get("emailAddress", {}).get("address", ""),
-                        name=a.get("emailAddress", {}).get("name", ""),
-                    )
-                    for a in item.get("attendees", [])
-                ],
-                is_online=item.get("isOnlineMeeting", False),
-                meeting_url=item.get("onlineMeeting", {}).get("joinUrl", "") if item.get("onlineMeeting") else "",
-                calendar_name=calendar_name or "default",
-            ))
-        return events
+    # Mailboxes per getSchedule request (API limit) and the view granularity (minutes)
+    SCHEDULE_BATCH_SIZE = 20
+    SCHEDULE_INTERVAL = 15
+    # scheduleItem statuses that block a meeting (free and workingElsewhere don't)
+    SCHEDULE_BLOCKING = ("tentative", "busy", "oof")
+
+    async def get_free_busy(
+        self, emails: list[str], start: dt.datetime, end: dt.datetime,
+    ) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Attendee availability via ``calendar/getSchedule``, in UTC."""
+        result: dict[str, list[tuple[dt.datetime, dt.datetime]]] = {}
+        for i in range(0, len(emails), self.SCHEDULE_BATCH_SIZE):
+            resp = await self._request("POST", "/me/calendar/getSchedule", json={
+                "schedules": emails[i:i + self.SCHEDULE_BATCH_SIZE],
+                "startTime": {"dateTime": self._utc(start).rstrip("Z"), "timeZone": "UTC"},
+                "endTime": {"dateTime": self._utc(end).rstrip("Z"), "timeZone": "UTC"},
+                "availabilityViewInterval": self.SCHEDULE_INTERVAL,
+            }, headers={"Prefer": 'outlook.timezone="UTC"'})
+            resp.raise_for_status()
+            for schedule in resp.json().get("value", []):
+                if "error" in schedule:
+                    logger.info("graph_free_busy_unavailable", schedule=schedule.get("scheduleId"),
+                                error=schedule["error"].get("message", ""))
+                    continue
+                result[schedule["scheduleId"].lower()] = [
+                    (self._parse_datetime(item["start"]), self._parse_datetime(item["end"]))
+                    for item in schedule.get("scheduleItems", [])
+                    if item.get("status") in self.SCHEDULE_BLOCKING
+                ]
+        return result
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def create_event(self, event: CalendarEvent) -> CalendarEvent:
-        import httpx
         from koda2.config import get_local_tz, get_settings
 
         local_tz = get_local_tz()
@@ -805,7 +1469,6 @@ class MSGraphCalendarProvider(BaseCalendarProvider):
         ev_start = event.start if event.start.tzinfo else event.start.replace(tzinfo=local_tz)
         ev_end = event.end if event.end.tzinfo else event.end.replace(tzinfo=local_tz)
 
-        token = await self._get_token()
         body = {
             "subject": event.title,
             "body": {"contentType": "text", "content": event.description},
@@ -817,29 +1480,21 @@ class MSGraphCalendarProvider(BaseCalendarProvider):
                 for a in event.attendees
             ],
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://graph.microsoft.com/v1.0/me/events",
-                json=body,
-                headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self._request("POST", "/me/events", json=body)
+        resp.raise_for_status()
+        data = resp.json()
 
         event.provider_id = data["id"]
         event.provider = self.provider
         return event
 
     async def update_event(self, event: CalendarEvent) -> CalendarEvent:
-        import httpx
-
         from koda2.config import get_local_tz, get_settings
         local_tz = get_local_tz()
         tz_name = get_settings().koda2_timezone
         ev_start = event.start if event.start.tzinfo else event.start.replace(tzinfo=local_tz)
         ev_end = event.end if event.end.tzinfo else event.end.replace(tzinfo=local_tz)
 
-        token = await self._get_token()
         body = {
             "subject": event.title,
             "body": {"contentType": "text", "content": event.description},
@@ -847,39 +1502,18 @@ class MSGraphCalendarProvider(BaseCalendarProvider):
             "end": {"dateTime": ev_end.isoformat(), "timeZone": tz_name},
             "location": {"displayName": event.location},
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.patch(
-                f"https://graph.microsoft.com/v1.0/me/events/{event.provider_id}",
-                json=body,
-                headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-            )
-            resp.raise_for_status()
+        resp = await self._request("PATCH", f"/me/events/{event.provider_id}", json=body)
+        resp.raise_for_status()
         return event
 
     async def delete_event(self, event_id: str) -> bool:
-        import httpx
-
-        token = await self._get_token()
-        async with httpx.AsyncClient() as client:
-            resp = await client.delete(
-                f"https://graph.microsoft.com/v1.0/me/events/{event_id}",
-                headers={"Authorization": f"Bearer {token}"},
-            )
-            resp.raise_for_status()
+        resp = await self._request("DELETE", f"/me/events/{event_id}")
+        resp.raise_for_status()
         return True
 
     async def list_calendars(self) -> list[str]:
-        import httpx
-
-        token = await self._get_token()
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                "https://graph.microsoft.com/v1.0/me/calendars",
-                headers={"Authorization": f"Bearer {token}"},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-        return [c["name"] for c in data.get("value", [])]
+        calendars, _ = await self._get_pages("/me/calendars", {"$select": "name"})
+        return [c["name"] for c in calendars]
 
 
 class CalDAVCalendarProvider(BaseCalendarProvider):
@@ -921,23 +1555,165 @@ class CalDAVCalendarProvider(BaseCalendarProvider):
                     continue
                 results = cal.date_search(start=start, end=end, expand=True)
                 for item in results:
-                    vevent = item.vobject_instance.vevent
-                    events.append(CalendarEvent(
-                        provider=self.provider,
-                        provider_id=str(item.url),
-                        title=str(getattr(vevent, "summary", "")),
-                        description=str(getattr(vevent, "description", "")),
-                        location=str(getattr(vevent, "location", "")),
-                        start=vevent.dtstart.value if hasattr(vevent.dtstart.value, "hour")
-                            else dt.datetime.combine(vevent.dtstart.value, dt.time.min),
-                        end=vevent.dtend.value if hasattr(vevent.dtend.value, "hour")
-                            else dt.datetime.combine(vevent.dtend.value, dt.time.min),
-                        calendar_name=cal.name,
-                    ))
+                    events.append(self._to_event(item, item.vobject_instance.vevent, cal.name))
             return events
 
         return await asyncio.to_thread(_fetch)
 
+    def _to_event(self, item, vevent, calendar_name: str) -> CalendarEvent:
+        """Build a CalendarEvent from a calendar object and one of its VEVENTs."""
+        return CalendarEvent(
+            provider=self.provider,
+            provider_id=str(item.url),
+            title=str(getattr(vevent, "summary", "")),
+            description=str(getattr(vevent, "description", "")),
+            location=str(getattr(vevent, "location", "")),
+            start=vevent.dtstart.value if hasattr(vevent.dtstart.value, "hour")
+                else dt.datetime.combine(vevent.dtstart.value, dt.time.min),
+            end=vevent.dtend.value if hasattr(vevent.dtend.value, "hour")
+                else dt.datetime.combine(vevent.dtend.value, dt.time.min),
+            calendar_name=calendar_name,
+        )
+
+    async def list_changes(
+        self, start: dt.datetime, end: dt.datetime, sync_token: Optional[str] = None,
+    ) -> CalendarChanges:
+        """Incremental sync via WebDAV ``sync-collection`` (RFC 6578).
+
+        The server reports only hrefs whose ETag changed since the token;
+        those are fetched and expanded over the window, and hrefs it reports
+        gone become deletions. The token is a JSON map of calendar URL to
+        the server's sync token. Servers without sync-collection support
+        get a full window fetch (no token) every time.
+        """
+        import asyncio
+
+        if not sync_token:
+            events = await self.list_events(start, end)
+
+        def _fetch() -> CalendarChanges:
+            client = self._get_client()
+            calendars = client.principal().calendars()
+            tokens = json.loads(sync_token) if sync_token else {}
+            if sync_token and set(tokens) != {str(c.url) for c in calendars}:
+                raise SyncTokenExpired("CalDAV calendar list changed")
+
+            changes = CalendarChanges(full=not sync_token)
+            new_tokens: dict[str, str] = {}
+            for cal in calendars:
+                try:
+                    collection = cal.objects_by_sync_token(
+                        sync_token=tokens.get(str(cal.url)), load_objects=bool(sync_token),
+                    )
+                except Exception as exc:
+                    if sync_token:
+                        raise SyncTokenExpired(f"CalDAV sync token rejected for {cal.name}") from exc
+                    logger.info("caldav_sync_collection_unsupported", calendar=cal.name, error=str(exc))
+                    return changes
+                new_tokens[str(cal.url)] = collection.sync_token
+                if not sync_token:
+                    continue
+                for item in collection:
+                    if not item.data:
+                        changes.deleted_ids.append(str(item.url))
+                        continue
+                    try:
+                        item.expand_rrule(start, end)
+                    except Exception:
+                        pass
+                    for vevent in item.vobject_instance.vevent_list:
+                        changes.events.append(self._to_event(item, vevent, cal.name))
+
+            if new_tokens and all(new_tokens.values()):
+                changes.sync_token = json.dumps(new_tokens, sort_keys=True)
+            return changes
+
+        changes = await asyncio.to_thread(_fetch)
+        if not sync_token:
+            changes.events = events
+        return changes
+
+    async def get_free_busy(
+        self, emails: list[str], start: dt.datetime, end: dt.datetime,
+    ) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Attendee availability via a VFREEBUSY request to the scheduling outbox (RFC 6638).
+
+        Servers without CalDAV scheduling support resolve no one.
+        """
+        import asyncio
+        from uuid import uuid4
+
+        def _stamp(value: dt.datetime) -> str:
+            return value.astimezone(dt.UTC).strftime("%Y%m%dT%H%M%SZ")
+
+        def _fetch() -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+            client = self._get_client()
+            principal = client.principal()
+            try:
+                outbox = principal.schedule_outbox()
+                organizer = str(principal.get_vcal_address())
+            except Exception as exc:
+                logger.info("caldav_scheduling_unsupported", error=str(exc))
+                return {}
+            lines = [
+                "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Koda2//EN", "METHOD:REQUEST",
+                "BEGIN:VFREEBUSY", f"UID:{uuid4()}", f"DTSTAMP:{_stamp(dt.datetime.now(dt.UTC))}",
+                f"DTSTART:{_stamp(start)}", f"DTEND:{_stamp(end)}", f"ORGANIZER:{organizer}",
+                *(f"ATTENDEE:mailto:{email}" for email in emails),
+                "END:VFREEBUSY", "END:VCALENDAR",
+            ]
+            response = client.post(
+                str(outbox.url), "\r\n".join(lines) + "\r\n",
+                {"Content-Type": "text/calendar; charset=utf-8"},
+            )
+            return self._parse_schedule_response(response.raw)
+
+        return await asyncio.to_thread(_fetch)
+
+    @classmethod
+    def _parse_schedule_response(cls, xml_text: str) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+        """Busy periods per recipient from a CalDAV ``schedule-response``."""
+        import xml.etree.ElementTree as ET
+        ns = {"C": "urn:ietf:params:xml:ns:caldav", "D": "DAV:"}
+        result: dict[str, list[tuple[dt.datetime, dt.datetime]]] = {}
+        for response in ET.fromstring(xml_text).findall("C:response", ns):
+            recipient = response.findtext("C:recipient/D:href", "", ns).strip()
+            status = response.findtext("C:request-status", "", ns).strip()
+            data = response.findtext("C:calendar-data", "", ns)
+            if not status.startswith("2.") or not data:
+                logger.info("caldav_free_busy_unavailable", recipient=recipient, status=status)
+                continue
+            email = recipient.split(":", 1)[1] if recipient.lower().startswith("mailto:") else recipient
+            result[email.lower()] = cls._parse_freebusy(data)
+        return result
+
+    @staticmethod
+    def _parse_freebusy(ical: str) -> list[tuple[dt.datetime, dt.datetime]]:
+        """Non-free FREEBUSY periods (UTC, ``start/end`` or ``start/duration``) of a VFREEBUSY."""
+        import re
+
+        def _utc(value: str) -> dt.datetime:
+            return dt.datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=dt.UTC)
+
+        duration_re = re.compile(r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+        periods: list[tuple[dt.datetime, dt.datetime]] = []
+        for line in re.sub(r"\r?\n[ \t]", "", ical).splitlines():
+            name, _, value = line.partition(":")
+            params = name.upper().split(";")
+            if params[0] != "FREEBUSY" or "FBTYPE=FREE" in params[1:]:
+                continue
+            for period in value.split(","):
+                first, _, second = period.strip().partition("/")
+                start = _utc(first)
+                match = duration_re.match(second.lstrip("+"))
+                if match:
+                    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+                    end = start + dt.timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+                else:
+                    end = _utc(second)
+                periods.append((start, end))
+        return periods
+
     async def create_event(self, event: CalendarEvent) -> CalendarEvent:
         import asyncio
 
@@ -2,22 +2,30 @@
 
 Events are cached locally in SQLite so the API and assistant always have
 access, even when the remote provider is temporarily unreachable.
-A background sync task keeps the cache fresh.
+A background sync task keeps the cache fresh, and ``list_events`` reads
+from it first (stale-while-revalidate), going live only for ranges the
+cache doesn't cover.
 """
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
-from typing import Optional
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+from zoneinfo import ZoneInfo
 
-from koda2.config import ensure_local_tz
+from koda2.config import ensure_local_tz, get_local_tz
 from koda2.logging_config import get_logger
 from koda2.modules.account.models import AccountType, ProviderType
 from koda2.modules.account.service import AccountService
 from koda2.modules.calendar.cache import CalendarCache
+from koda2.modules.calendar.freebusy import FreeBusyIndex
 from koda2.modules.calendar.models import (
+    AccountFetchStatus,
     CalendarEvent,
     CalendarProvider,
+    MeetingSlotSearch,
     PrepTimeResult,
 )
 from koda2.modules.calendar.providers import (
@@ -26,22 +34,49 @@ from koda2.modules.calendar.providers import (
     EWSCalendarProvider,
     GoogleCalendarProvider,
     MSGraphCalendarProvider,
+    SyncTokenExpired,
 )
+from koda2.modules.calendar.scheduling import WORKDAY_END, WORKDAY_START, find_meeting_slots
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 
 class CalendarService:
     """Unified calendar management with multi-account support."""
 
     # How far ahead to sync events (days)
     SYNC_WINDOW_DAYS = 30
+    # How far back to sync events (days)
+    SYNC_PAST_DAYS = 7
+    # Cached events younger than this are served without revalidation
+    # (two periodic sync cycles)
+    CACHE_MAX_AGE = dt.timedelta(minutes=10)
+    # Extra days a full sync covers beyond SYNC_WINDOW_DAYS, so that
+    # incremental syncs against its token stay valid while the window
+    # slides forward; once outgrown, the next sync is full again
+    SYNC_TOKEN_SLACK_DAYS = 7
+    # Accounts queried at once by multi-account calls
+    FANOUT_CONCURRENCY = 4
+    # Per-account deadline (seconds) for live reads and calendar listing;
+    # a slower account is reported as timed out instead of delaying the rest
+    ACCOUNT_TIMEOUT = 15.0
+    # Per-account deadline (seconds) for a background sync, which may be full
+    SYNC_ACCOUNT_TIMEOUT = 120.0
 
     def __init__(self, account_service: Optional[AccountService] = None) -> None:
         self._account_service = account_service or AccountService()
         self._providers: dict[str, BaseCalendarProvider] = {}  # account_id -> provider
         self._cache = CalendarCache()
+        self.freebusy = FreeBusyIndex(self._cache)  # shared with FacilityService
         self._last_sync: Optional[dt.datetime] = None
+        self._revalidating: dict[str, asyncio.Task] = {}  # account name -> sync task
+        self._cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "bypassed": 0, "revalidations": 0}
+        self._account_status: dict[str, AccountFetchStatus] = {}  # last fan-out outcome per account
+        # Accounts whose changes arrive by push (CalendarNotifier): their
+        # cache is current whatever its age, so reads never revalidate it
+        self.push_accounts: set[str] = set()
 
     async def _get_provider(self, account_id: Optional[str] = None) -> tuple[str, BaseCalendarProvider]:
         """Get a calendar provider for the specified account or default.
@@ -144,20 +179,23 @@ class CalendarService:
         result: dict[str, list[str]] = {}
         seen_cal_ids: set[str] = set()
         accounts = await self.get_accounts()
-        
-        for account in accounts:
-            try:
-                _, provider = await self._get_provider(account.id)
-                cals = await provider.list_calendars()
-                # Deduplicate: skip calendar IDs we've already seen
-                unique_cals = [c for c in cals if c not in seen_cal_ids]
-                seen_cal_ids.update(unique_cals)
-                if unique_cals:
-                    result[account.name] = unique_cals
-            except Exception as exc:
-                logger.error("list_calendars_failed", account=account.name, error=str(exc))
+
+        async def _list(account) -> list[str]:
+            _, provider = await self._get_provider(account.id)
+            return await provider.list_calendars()
+
+        # Accounts are queried concurrently; deduplicate in account order
+        for account, (status, cals) in zip(accounts, await self._fan_out(accounts, _list)):
+            if status.status != "ok":
+                logger.error("list_calendars_failed", account=account.name, error=status.error)
                 result[account.name] = []
-        
+                continue
+            # Deduplicate: skip calendar IDs we've already seen
+            unique_cals = [c for c in cals if c not in seen_cal_ids]
+            seen_cal_ids.update(unique_cals)
+            if unique_cals:
+                result[account.name] = unique_cals
+
         return result
 
     async def list_events(
@@ -166,49 +204,221 @@ class CalendarService:
         end: dt.datetime,
         account_id: Optional[str] = None,
         calendar_name: Optional[str] = None,
+        max_age: Optional[dt.timedelta] = None,
+        allow_stale: bool = True,
     ) -> list[CalendarEvent]:
-        """List events — always fetches live from all providers."""
-        events = await self._fetch_events_live(start, end, account_id, calendar_name)
-
-        # Update cache in the background (best-effort)
-        if events:
-            try:
-                accounts = await self.get_accounts()
-                account_name = accounts[0].name if accounts else "default"
-                await self._cache.sync_events(events, account_name, start, end)
-            except Exception as exc:
-                logger.warning("cache_write_failed", error=str(exc))
+        """List events, served from the local cache where possible.
 
+        See ``list_events_with_status``; accounts that fail or time out
+        simply contribute no events.
+        """
+        events, _ = await self.list_events_with_status(
+            start, end, account_id, calendar_name, max_age=max_age, allow_stale=allow_stale,
+        )
         return events
 
-    async def _fetch_events_live(
+    async def list_events_with_status(
         self,
         start: dt.datetime,
         end: dt.datetime,
         account_id: Optional[str] = None,
         calendar_name: Optional[str] = None,
-    ) -> list[CalendarEvent]:
-        """Fetch events directly from remote providers (no cache)."""
-        events: list[CalendarEvent] = []
+        max_age: Optional[dt.timedelta] = None,
+        allow_stale: bool = True,
+    ) -> tuple[list[CalendarEvent], dict[str, AccountFetchStatus]]:
+        """List events plus how each account was served.
+
+        Per account, if its last sync window covers ``start``–``end``:
+
+        - synced within ``max_age`` (default ``CACHE_MAX_AGE``), or kept
+          current by push notifications: read from cache
+        - older: read from cache and re-synced in the background
+          (stale-while-revalidate), or fetched live if ``allow_stale`` is False
+
+        Accounts whose window doesn't cover the range are fetched live,
+        concurrently, each within ``ACCOUNT_TIMEOUT``; the events of the
+        accounts that answered are returned even if others time out.
+        ``max_age=timedelta(0)`` forces a live fetch; filtering by
+        ``calendar_name`` always goes live since the cache is per account.
+        """
+        start = ensure_local_tz(start)
+        end = ensure_local_tz(end)
+        max_age = self.CACHE_MAX_AGE if max_age is None else max_age
 
-        if account_id:
+        if calendar_name or max_age <= dt.timedelta(0):
+            self._cache_stats["bypassed"] += 1
+            return await self._fetch_events_live(start, end, account_id, calendar_name)
+
+        try:
+            accounts = await self.get_accounts()
+            if account_id:
+                accounts = [a for a in accounts if a.id == account_id]
+            states = await self._cache.get_sync_states()
+        except Exception as exc:
+            logger.warning("calendar_cache_read_failed", error=str(exc))
+            self._cache_stats["bypassed"] += 1
+            return await self._fetch_events_live(start, end, account_id, calendar_name)
+        if not accounts:
+            return await self._fetch_events_live(start, end, account_id, calendar_name)
+
+        now = dt.datetime.now(dt.UTC).replace(tzinfo=None)
+        range_start = start.astimezone(dt.UTC).replace(tzinfo=None)
+        range_end = end.astimezone(dt.UTC).replace(tzinfo=None)
+        cached: list[str] = []
+        live: list = []
+        for account in accounts:
+            state = states.get(account.name)
+            if state is None or state.window_start > range_start or state.window_end < range_end:
+                self._cache_stats["misses"] += 1
+                live.append(account)
+            elif now - state.synced_at <= max_age or account.name in self.push_accounts:
+                self._cache_stats["hits"] += 1
+                cached.append(account.name)
+            elif allow_stale:
+                self._cache_stats["stale_hits"] += 1
+                cached.append(account.name)
+                self._schedule_revalidation(account)
+            else:
+                self._cache_stats["misses"] += 1
+                live.append(account)
+
+        events: list[CalendarEvent] = []
+        statuses = {name: AccountFetchStatus(account=name, status="cached") for name in cached}
+        if cached:
+            events.extend(await self._cache.get_events(start, end, account_names=cached))
+        results = await self._fan_out(live, lambda a: self._fetch_account_events(a, start, end))
+        for account, (status, acc_events) in zip(live, results):
+            statuses[account.name] = status
+            if not acc_events:
+                continue
+            events.extend(acc_events)
+            # Refresh the rows for this range without claiming the whole sync window
             try:
-                _, provider = await self._get_provider(account_id)
-                events = await provider.list_events(start, end, calendar_name)
+                await self._cache.sync_events(acc_events, account.name, start, end, mark_synced=False)
+                self.freebusy.replace(account.name, acc_events, start, end)
             except Exception as exc:
-                logger.error("list_events_failed", account_id=account_id, error=str(exc))
-        else:
-            accounts = await self.get_accounts()
-            for account in accounts:
+                logger.warning("cache_write_failed", error=str(exc))
+        return self._merge_events(events), statuses
+
+    async def cache_stats(self) -> dict[str, Any]:
+        """Cache-first read counters, account sync windows and last live-call outcomes."""
+        stats: dict[str, Any] = dict(self._cache_stats)
+        served = stats["hits"] + stats["stale_hits"]
+        total = served + stats["misses"] + stats["bypassed"]
+        stats["hit_rate"] = round(served / total, 3) if total else 0.0
+        stats["revalidating"] = sorted(self._revalidating)
+        stats["account_status"] = {name: status.model_dump() for name, status in self._account_status.items()}
+        states = await self._cache.get_sync_states()
+        stats["accounts"] = {
+            name: {
+                "synced_at": state.synced_at.isoformat(),
+                "window_start": state.window_start.isoformat(),
+                "window_end": state.window_end.isoformat(),
+            }
+            for name, state in states.items()
+        }
+        return stats
+
+    def _schedule_revalidation(self, account) -> None:
+        """Re-sync ``account`` in the background unless already in progress."""
+        if account.name in self._revalidating:
+            return
+        self._cache_stats["revalidations"] += 1
+        task = asyncio.create_task(self._revalidate(account))
+        self._revalidating[account.name] = task
+        task.add_done_callback(lambda _t, name=account.name: self._revalidating.pop(name, None))
+
+    async def _revalidate(self, account) -> None:
+        try:
+            await self._sync_account(account, *self._sync_window())
+        except Exception as exc:
+            logger.warning("calendar_revalidate_failed", account=account.name, error=str(exc))
+
+    async def _fan_out(
+        self,
+        accounts: list,
+        call: Callable[[Any], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> list[tuple[AccountFetchStatus, Optional[T]]]:
+        """Run ``call(account)`` for every account concurrently.
+
+        At most ``FANOUT_CONCURRENCY`` calls run at once and each gets its
+        own deadline (default ``ACCOUNT_TIMEOUT``), so one slow server
+        costs its own deadline and nothing more. Failures and timeouts are
+        captured per account rather than raised. Returns
+        ``(status, result)`` pairs in ``accounts`` order; result is None
+        unless the status is ``ok``.
+        """
+        timeout = self.ACCOUNT_TIMEOUT if timeout is None else timeout
+        semaphore = asyncio.Semaphore(self.FANOUT_CONCURRENCY)
+
+        async def _one(account) -> tuple[AccountFetchStatus, Optional[T]]:
+            async with semaphore:
+                started = time.monotonic()
+                status = AccountFetchStatus(account=account.name)
+                result = None
                 try:
-                    _, provider = await self._get_provider(account.id)
-                    acc_events = await provider.list_events(start, end, calendar_name)
-                    for event in acc_events:
-                        event.calendar_name = account.name
-                    events.extend(acc_events)
+                    result = await asyncio.wait_for(call(account), timeout)
+                except asyncio.TimeoutError:
+                    status.status = "timeout"
+                    status.error = f"No response within {timeout:g}s"
                 except Exception as exc:
-                    logger.error("list_events_failed", account=account.name, error=str(exc))
+                    status.status = "error"
+                    status.error = f"{type(exc).__name__}: {exc}"
+                status.elapsed_ms = int((time.monotonic() - started) * 1000)
+            if status.status != "ok":
+                logger.warning("calendar_account_failed", account=account.name,
+                               status=status.status, error=status.error, elapsed_ms=status.elapsed_ms)
+            self._account_status[account.name] = status
+            return status, result
+
+        return list(await asyncio.gather(*(_one(account) for account in accounts)))
+
+    async def _fetch_account_events(
+        self,
+        account,
+        start: dt.datetime,
+        end: dt.datetime,
+        calendar_name: Optional[str] = None,
+    ) -> list[CalendarEvent]:
+        """Fetch one account's events live, labelled with the account name."""
+        _, provider = await self._get_provider(account.id)
+        acc_events = await provider.list_events(start, end, calendar_name)
+        for event in acc_events:
+            event.calendar_name = account.name
+        return acc_events
 
+    async def _fetch_events_live(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        account_id: Optional[str] = None,
+        calendar_name: Optional[str] = None,
+    ) -> tuple[list[CalendarEvent], dict[str, AccountFetchStatus]]:
+        """Fetch events directly from remote providers (no cache), concurrently."""
+        accounts = await self.get_accounts()
+        if account_id:
+            accounts = [a for a in accounts if a.id == account_id]
+            if not accounts:
+                account = await self._account_service.get_account(account_id)
+                if not account:
+                    logger.error("list_events_failed", account_id=account_id, error="account not found")
+                    return [], {}
+                accounts = [account]
+
+        events: list[CalendarEvent] = []
+        statuses: dict[str, AccountFetchStatus] = {}
+        results = await self._fan_out(
+            accounts, lambda a: self._fetch_account_events(a, start, end, calendar_name),
+        )
+        for account, (status, acc_events) in zip(accounts, results):
+            statuses[account.name] = status
+            events.extend(acc_events or [])
+        return self._merge_events(events), statuses
+
+    @staticmethod
+    def _merge_events(events: list[CalendarEvent]) -> list[CalendarEvent]:
+        """Deduplicate by provider_id, normalize timezones and sort by start."""
         # Deduplicate events by provider_id (multiple accounts may share the same token)
         seen_ids: set[str] = set()
         unique_events: list[CalendarEvent] = []
@@ -228,34 +438,108 @@ class CalendarService:
         unique_events.sort(key=lambda e: e.start)
         return unique_events
 
-    async def sync_all(self) -> dict[str, int]:
+    def _sync_window(self) -> tuple[dt.datetime, dt.datetime]:
+        """The range the periodic sync keeps cached."""
+        now = dt.datetime.now(dt.UTC)
+        return now - dt.timedelta(days=self.SYNC_PAST_DAYS), now + dt.timedelta(days=self.SYNC_WINDOW_DAYS)
+
+    async def _sync_account(self, account, start: dt.datetime, end: dt.datetime) -> int:
+        """Bring one account's cached window up to date.
+
+        If the stored window still covers ``start``–``end`` and has a sync
+        token, only the provider's changes since that token are applied.
+        Otherwise (first sync, no token support, window outgrown, or the
+        provider rejects the token) the whole window is fetched, extended
+        by ``SYNC_TOKEN_SLACK_DAYS``. Returns the number of events synced
+        (full) or changes applied (incremental).
+        """
+        _, provider = await self._get_provider(account.id)
+        state = await self._cache.get_sync_state(account.name)
+        changes = None
+        if (
+            state is not None and state.sync_token
+            and state.window_start <= start.astimezone(dt.UTC).replace(tzinfo=None)
+            and state.window_end >= end.astimezone(dt.UTC).replace(tzinfo=None)
+        ):
+            window = (state.window_start.replace(tzinfo=dt.UTC), state.window_end.replace(tzinfo=dt.UTC))
+            try:
+                changes = await provider.list_changes(*window, sync_token=state.sync_token)
+            except SyncTokenExpired as exc:
+                logger.info("calendar_sync_token_expired", account=account.name, error=str(exc))
+
+        if changes is None:
+            window = (start, end + dt.timedelta(days=self.SYNC_TOKEN_SLACK_DAYS))
+            changes = await provider.list_changes(*window)
+
+        for event in changes.events:
+            event.calendar_name = account.name
+        if changes.full:
+            count = await self._cache.sync_events(
+                changes.events, account.name, *window, sync_token=changes.sync_token,
+            )
+            self.freebusy.replace(account.name, changes.events, *window, synced=True)
+            return count
+        count = await self._cache.apply_changes(
+            changes.events, changes.deleted_ids, account.name, sync_token=changes.sync_token,
+        )
+        self.freebusy.apply_changes(account.name, changes.events, changes.deleted_ids)
+        return count
+
+    async def sync_all(self, exclude: Iterable[str] = ()) -> dict[str, int]:
         """Sync events from all accounts into the local cache.
 
-        Called periodically by the background sync task.
-        Returns dict of account_name -> number of events synced.
+        Called periodically by the background sync task. Accounts are
+        synced concurrently, each within ``SYNC_ACCOUNT_TIMEOUT``; those
+        with a valid sync token only fetch what changed (see
+        ``_sync_account``). Accounts named in ``exclude`` are skipped.
+        Returns dict of account_name -> number of events synced (changes
+        applied, for an incremental sync), or -1 on failure.
         """
         results: dict[str, int] = {}
-        now = dt.datetime.now(dt.UTC)
-        start = now - dt.timedelta(days=7)  # Include recent past
-        end = now + dt.timedelta(days=self.SYNC_WINDOW_DAYS)
+        start, end = self._sync_window()
 
-        accounts = await self.get_accounts()
-        for account in accounts:
-            try:
-                _, provider = await self._get_provider(account.id)
-                events = await provider.list_events(start, end)
-                for event in events:
-                    event.calendar_name = event.calendar_name or account.name
-                count = await self._cache.sync_events(events, account.name, start, end)
-                results[account.name] = count
-            except Exception as exc:
-                logger.error("calendar_sync_failed", account=account.name, error=str(exc))
-                results[account.name] = -1
+        skipped = set(exclude)
+        accounts = [a for a in await self.get_accounts() if a.name not in skipped]
+        synced = await self._fan_out(
+            accounts, lambda a: self._sync_account(a, start, end), timeout=self.SYNC_ACCOUNT_TIMEOUT,
+        )
+        for account, (status, count) in zip(accounts, synced):
+            if status.status != "ok":
+                logger.error("calendar_sync_failed", account=account.name, error=status.error)
+            results[account.name] = count if status.status == "ok" else -1
 
         self._last_sync = dt.datetime.now(dt.UTC)
         logger.info("calendar_sync_complete", results=results)
         return results
 
+    async def sync_account(self, account_name: str) -> int:
+        """Sync one account by name, e.g. when a change notification arrives.
+
+        Same as one account of ``sync_all``: incremental where a token
+        allows, within ``SYNC_ACCOUNT_TIMEOUT``. Returns the count, or -1
+        if the sync failed or the account doesn't exist.
+        """
+        accounts = [a for a in await self.get_accounts() if a.name == account_name]
+        if not accounts:
+            logger.warning("calendar_sync_unknown_account", account=account_name)
+            return -1
+        start, end = self._sync_window()
+        [(status, count)] = await self._fan_out(
+            accounts, lambda a: self._sync_account(a, start, end), timeout=self.SYNC_ACCOUNT_TIMEOUT,
+        )
+        if status.status != "ok":
+            logger.error("calendar_sync_failed", account=account_name, error=status.error)
+            return -1
+        return count
+
+    async def close(self) -> None:
+        """Close the providers' pooled connections."""
+        for account_id, provider in list(self._providers.items()):
+            try:
+                await provider.close()
+            except Exception as exc:
+                logger.warning("calendar_provider_close_failed", account_id=account_id, error=str(exc))
+
     @property
     def last_sync(self) -> Optional[dt.datetime]:
         """When the last sync completed."""
@@ -283,6 +567,7 @@ class CalendarService:
         accounts = await self.get_accounts()
         account_name = next((a.name for a in accounts if a.id == acc_id), acc_id)
         logger.info("event_created", title=event.title, account=account_name)
+        await self._record_write(account_name, [created], [])
         
         return created
 
@@ -292,8 +577,10 @@ class CalendarService:
         account_id: Optional[str] = None,
     ) -> CalendarEvent:
         """Update an event."""
-        _, provider = await self._get_provider(account_id)
-        return await provider.update_event(event)
+        acc_id, provider = await self._get_provider(account_id)
+        updated = await provider.update_event(event)
+        await self._record_write(await self._account_name(acc_id), [updated], [])
+        return updated
 
     async def delete_event(
         self,
@@ -301,8 +588,40 @@ class CalendarService:
         account_id: str,
     ) -> bool:
         """Delete an event by account and ID."""
-        _, provider = await self._get_provider(account_id)
-        return await provider.delete_event(event_id)
+        acc_id, provider = await self._get_provider(account_id)
+        deleted = await provider.delete_event(event_id)
+        if deleted:
+            await self._record_write(await self._account_name(acc_id), [], [event_id])
+        return deleted
+
+    async def _account_name(self, account_id: str) -> Optional[str]:
+        return next((a.name for a in await self.get_accounts() if a.id == account_id), None)
+
+    async def _record_write(
+        self, account_name: Optional[str], events: list[CalendarEvent], deleted_ids: list[str],
+    ) -> None:
+        """Put a write made through this service into the cache and free/busy index.
+
+        Reads and slot searches then see it at once instead of offering
+        a time that was just booked. Accounts that were never synced have
+        nothing cached and are read live anyway. A failed cache write is
+        only logged (the provider call succeeded and the next sync brings
+        the cache in line); the account's index is dropped so it reloads.
+        """
+        if not account_name:
+            return
+        events = [e for e in events if isinstance(e, CalendarEvent) and e.provider_id]
+        for event in events:
+            event.calendar_name = account_name
+        try:
+            await self._cache.apply_changes(events, deleted_ids, account_name, local_write=True)
+        except ValueError:
+            return
+        except Exception as exc:
+            logger.warning("calendar_cache_write_failed", account=account_name, error=str(exc))
+            self.freebusy.invalidate(account_name)
+            return
+        self.freebusy.apply_changes(account_name, events, deleted_ids)
 
     async def calculate_prep_time(
         self,
@@ -310,15 +629,18 @@ class CalendarService:
         default_prep_minutes: int = 15,
         account_id: Optional[str] = None,
     ) -> PrepTimeResult:
-        """Calculate available preparation time before an event."""
+        """Calculate available preparation time before an event.
+
+        The previous event is looked up in the free/busy index when the
+        accounts' synced windows cover the 4 hours before ``event``, and
+        fetched through ``list_events`` otherwise.
+        """
         event.start = ensure_local_tz(event.start)
         event.end = ensure_local_tz(event.end)
         search_start = event.start - dt.timedelta(hours=4)
-        earlier_events = await self.list_events(search_start, event.start, account_id)
-        earlier_events = [e for e in earlier_events if e.end <= event.start]
+        prev = await self._previous_event(search_start, event.start, account_id)
 
-        if earlier_events:
-            prev = max(earlier_events, key=lambda e: e.end)
+        if prev is not None:
             available = int((event.start - prev.end).total_seconds() / 60)
             travel = bool(prev.location and event.location and prev.location != event.location)
             return PrepTimeResult(
@@ -335,6 +657,95 @@ class CalendarService:
             suggested_prep_minutes=default_prep_minutes,
         )
 
+    async def _previous_event(
+        self,
+        since: dt.datetime,
+        before: dt.datetime,
+        account_id: Optional[str] = None,
+    ) -> Optional[CalendarEvent]:
+        """The event ending last between ``since`` and ``before``."""
+        try:
+            accounts = await self.get_accounts()
+            names = [a.name for a in accounts if not account_id or a.id == account_id]
+            if await self.freebusy.covers(since, before, names):
+                interval = await self.freebusy.last_before(before, since, names)
+                return interval.event if interval else None
+        except Exception as exc:
+            logger.warning("freebusy_lookup_failed", error=str(exc))
+
+        earlier_events = await self.list_events(since, before, account_id)
+        earlier_events = [e for e in earlier_events if e.end <= before]
+        return max(earlier_events, key=lambda e: e.end, default=None)
+
+    async def find_meeting_slots(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        duration_minutes: int,
+        attendees: Optional[list[str]] = None,
+        timezone: Optional[str] = None,
+        day_start: dt.time = WORKDAY_START,
+        day_end: dt.time = WORKDAY_END,
+        buffer_minutes: int = 15,
+        max_results: int = 5,
+    ) -> MeetingSlotSearch:
+        """Find ranked times when all accounts and ``attendees`` are free.
+
+        Own busy time comes from the free/busy index when the synced
+        windows cover the range, else from ``list_events``. Attendees are
+        looked up on every account's provider concurrently (Exchange
+        availability, Graph ``getSchedule``, Google ``freebusy``, CalDAV
+        scheduling); the first account that can see an attendee counts.
+        Working hours apply in ``timezone`` (default: the configured one),
+        and ``buffer_minutes`` is kept free around existing meetings.
+        """
+        start = ensure_local_tz(start)
+        end = ensure_local_tz(end)
+        tz = ZoneInfo(timezone) if timezone else get_local_tz()
+        accounts = await self.get_accounts()
+        names = [a.name for a in accounts]
+        result = MeetingSlotSearch()
+
+        busy: list[tuple[dt.datetime, dt.datetime]] = []
+        try:
+            covered = await self.freebusy.covers(start, end, names)
+        except Exception as exc:
+            logger.warning("freebusy_lookup_failed", error=str(exc))
+            covered = False
+        if covered:
+            busy.extend((i.start, i.end) for i in await self.freebusy.busy(start, end, names))
+        else:
+            events, statuses = await self.list_events_with_status(start, end)
+            busy.extend((e.start, e.end) for e in events if e.status != "cancelled")
+            result.incomplete_accounts = sorted(
+                name for name, status in statuses.items() if status.status in ("timeout", "error")
+            )
+
+        wanted = sorted({a.strip().lower() for a in attendees or [] if a.strip()})
+        resolved: set[str] = set()
+        if wanted and accounts:
+            async def _lookup(account) -> dict[str, list[tuple[dt.datetime, dt.datetime]]]:
+                _, provider = await self._get_provider(account.id)
+                return await provider.get_free_busy(wanted, start, end)
+
+            for _, found in await self._fan_out(accounts, _lookup):
+                for email, periods in (found or {}).items():
+                    if email in wanted and email not in resolved:
+                        resolved.add(email)
+                        busy.extend(periods)
+        result.unresolved_attendees = [a for a in wanted if a not in resolved]
+
+        result.slots = find_meeting_slots(
+            busy, start, end, dt.timedelta(minutes=duration_minutes), tz,
+            day_start=day_start, day_end=day_end,
+            buffer=dt.timedelta(minutes=buffer_minutes), max_results=max_results,
+        )
+        logger.info(
+            "meeting_slots_found", slots=len(result.slots), busy=len(busy),
+            attendees=len(wanted), unresolved=len(result.unresolved_attendees),
+        )
+        return result
+
     async def schedule_with_prep(
         self,
         event: CalendarEvent,
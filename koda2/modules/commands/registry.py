@@ -212,12 +212,35 @@ COMMANDS: dict[str, Command] = {
         parameters=[
             CommandParameter("start", "string", True, description="ISO datetime (e.g., 2024-01-15T09:00:00)"),
             CommandParameter("end", "string", True, description="ISO datetime"),
+            CommandParameter("live", "boolean", False, False, "Bypass the local cache and ask the providers directly"),
         ],
         examples=[
             '{"action": "check_calendar", "params": {"start": "2024-01-15T00:00:00", "end": "2024-01-15T23:59:59"}}',
         ],
     ),
     
+    "find_meeting_slots": Command(
+        name="find_meeting_slots",
+        category="calendar",
+        description="Find ranked free meeting times across all calendars and the attendees' availability in one call",
+        parameters=[
+            CommandParameter("start", "string", True, description="ISO datetime where the search begins"),
+            CommandParameter("end", "string", True, description="ISO datetime where the search ends"),
+            CommandParameter("duration_minutes", "integer", True, description="Meeting length in minutes"),
+            CommandParameter("attendees", "array", False, None, "Attendee email addresses to check free/busy for"),
+            CommandParameter("timezone", "string", False, None, "IANA time zone for working hours (default: configured)"),
+            CommandParameter("day_start", "string", False, "09:00", "Working day start (HH:MM)"),
+            CommandParameter("day_end", "string", False, "17:00", "Working day end (HH:MM)"),
+            CommandParameter("buffer_minutes", "integer", False, 15, "Free time kept around existing meetings"),
+            CommandParameter("max_results", "integer", False, 5, "Number of slots to return"),
+        ],
+        examples=[
+            '{"action": "find_meeting_slots", "params": {"start": "2024-01-15T00:00:00", "end": "2024-01-19T23:59:59", "duration_minutes": 45, "attendees": ["anna@example.com", "piet@example.com"]}}',
+        ],
+        notes="Use this instead of several check_calendar calls when looking for a time. "
+              "Attendees listed in unresolved_attendees could not be checked.",
+    ),
+    
     "schedule_meeting": Command(
         name="schedule_meeting",
         category="calendar",
@@ -430,13 +453,20 @@ COMMANDS: dict[str, Command] = {
     "search_email": Command(
         name="search_email",
         category="email",
-        description="Search emails across all accounts by keyword (searches subject, sender, and body).",
-        parameters=[
-            CommandParameter("query", "string", True, description="Search keyword"),
+        description="Search emails across all accounts (subject, sender, recipients and body), best match first, with a highlighted snippet per result.",
+        parameters=[
+            CommandParameter("query", "string", False, "", 'Search words (all must match, as prefixes); "quotes" for a phrase'),
+            CommandParameter("sender", "string", False, description="Sender address or name contains this"),
+            CommandParameter("since", "string", False, description="Received on/after (ISO datetime)"),
+            CommandParameter("before", "string", False, description="Received before (ISO datetime)"),
+            CommandParameter("folder", "string", False, description="Folder, e.g. INBOX"),
+            CommandParameter("unread", "boolean", False, description="true: only unread, false: only read"),
+            CommandParameter("has_attachments", "boolean", False, description="Only mail with (or without) attachments"),
             CommandParameter("limit", "integer", False, 20, "Max results"),
         ],
         examples=[
             '{"action": "search_email", "params": {"query": "invoice", "limit": 10}}',
+            '{"action": "search_email", "params": {"query": "offerte", "sender": "jansen", "has_attachments": true, "since": "2026-01-01"}}',
         ],
     ),
     
@@ -26,6 +26,7 @@ from koda2.config import get_settings
 from koda2.database import get_session
 from koda2.logging_config import get_logger
 from koda2.modules.account.models import Account, AccountType, ProviderType
+from koda2.modules.email.imap_pool import IMAPPool, imap_pool
 
 logger = get_logger(__name__)
 
@@ -150,9 +151,10 @@ class AssistantInboxMessage:
 class AssistantMailService:
     """Manages the assistant's own email: reading (IMAP) + sending (SMTP)."""
 
-    def __init__(self, account_service: Optional[Any] = None) -> None:
+    def __init__(self, account_service: Optional[Any] = None, imap_pool: IMAPPool = imap_pool) -> None:
         self._account_service = account_service
         self._settings = get_settings()
+        self._imap_pool = imap_pool
 
     # ── Configuration ─────────────────────────────────────────────────
 
@@ -279,7 +281,10 @@ class AssistantMailService:
     # ── IMAP helpers ──────────────────────────────────────────────────
 
     def _connect_imap(self, cfg: AssistantEmailConfig) -> imaplib.IMAP4:
-        """Create an IMAP connection respecting the encryption setting."""
+        """Create a fresh IMAP connection respecting the encryption setting.
+
+        Only for connection tests; reads go through the shared session pool.
+        """
         logger.info("imap_connecting", server=cfg.imap_server, port=cfg.imap_port,
                     encryption=cfg.imap_encryption, username=cfg.imap_username)
         if cfg.imap_encryption == "ssl":
@@ -400,81 +405,80 @@ class AssistantMailService:
             return []
 
         try:
-            def _fetch():
-                conn = self._connect_imap(cfg)
-                try:
-                    conn.select(folder)
-                    criteria = "UNSEEN" if unread_only else "ALL"
-                    _, msg_nums = conn.search(None, criteria)
-                    msg_ids = msg_nums[0].split()
-                    if limit:
-                        msg_ids = msg_ids[-limit:]
-
-                    messages: list[AssistantInboxMessage] = []
-                    for msg_id in reversed(msg_ids):
-                        _, data = conn.fetch(msg_id, "(RFC822 FLAGS)")
-                        if not data or not data[0]:
-                            continue
-                        raw = data[0][1]
-                        msg = email_lib.message_from_bytes(raw)
-
-                        subject = ""
-                        raw_subject = msg.get("Subject", "")
-                        if raw_subject:
-                            decoded = decode_header(raw_subject)
-                            subject = (
-                                str(decoded[0][0], decoded[0][1] or "utf-8")
-                                if isinstance(decoded[0][0], bytes)
-                                else str(decoded[0][0])
-                            )
-
-                        body_text = ""
-                        body_html = ""
-                        if msg.is_multipart():
-                            for part in msg.walk():
-                                ct = part.get_content_type()
-                                cd = str(part.get("Content-Disposition", ""))
-                                if ct == "text/plain" and "attachment" not in cd:
-                                    payload = part.get_payload(decode=True)
-                                    if payload:
-                                        body_text = payload.decode("utf-8", errors="replace")
-                                elif ct == "text/html" and "attachment" not in cd:
-                                    payload = part.get_payload(decode=True)
-                                    if payload:
-                                        body_html = payload.decode("utf-8", errors="replace")
-                        else:
-                            payload = msg.get_payload(decode=True)
-                            if payload:
-                                body_text = payload.decode("utf-8", errors="replace")
-
-                        flags_raw = data[0][0].decode() if isinstance(data[0][0], bytes) else ""
-                        is_read = "\\Seen" in flags_raw
-
-                        date = None
-                        try:
-                            date = email_lib.utils.parsedate_to_datetime(msg.get("Date", ""))
-                        except Exception:
-                            pass
-
-                        messages.append(AssistantInboxMessage(
-                            uid=msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id),
-                            subject=subject,
-                            sender=msg.get("From", ""),
-                            recipients=[r.strip() for r in msg.get("To", "").split(",") if r.strip()],
-                            cc=[r.strip() for r in (msg.get("Cc") or "").split(",") if r.strip()],
-                            body_text=body_text,
-                            body_html=body_html,
-                            date=date,
-                            is_read=is_read,
-                            in_reply_to=msg.get("In-Reply-To", ""),
-                            references=msg.get("References", ""),
-                            folder=folder,
-                        ))
-                    return messages
-                finally:
-                    conn.logout()
-
-            return await asyncio.to_thread(_fetch)
+            def _fetch(conn: imaplib.IMAP4) -> list[AssistantInboxMessage]:
+                conn.select(folder)
+                criteria = "UNSEEN" if unread_only else "ALL"
+                _, msg_nums = conn.search(None, criteria)
+                msg_ids = msg_nums[0].split()
+                if limit:
+                    msg_ids = msg_ids[-limit:]
+
+                messages: list[AssistantInboxMessage] = []
+                for msg_id in reversed(msg_ids):
+                    _, data = conn.fetch(msg_id, "(RFC822 FLAGS)")
+                    if not data or not data[0]:
+                        continue
+                    raw = data[0][1]
+                    msg = email_lib.message_from_bytes(raw)
+
+                    subject = ""
+                    raw_subject = msg.get("Subject", "")
+                    if raw_subject:
+                        decoded = decode_header(raw_subject)
+                        subject = (
+                            str(decoded[0][0], decoded[0][1] or "utf-8")
+                            if isinstance(decoded[0][0], bytes)
+                            else str(decoded[0][0])
+                        )
+
+                    body_text = ""
+                    body_html = ""
+                    if msg.is_multipart():
+                        for part in msg.walk():
+                            ct = part.get_content_type()
+                            cd = str(part.get("Content-Disposition", ""))
+                            if ct == "text/plain" and "attachment" not in cd:
+                                payload = part.get_payload(decode=True)
+                                if payload:
+                                    body_text = payload.decode("utf-8", errors="replace")
+                            elif ct == "text/html" and "attachment" not in cd:
+                                payload = part.get_payload(decode=True)
+                                if payload:
+                                    body_html = payload.decode("utf-8", errors="replace")
+                    else:
+                        payload = msg.get_payload(decode=True)
+                        if payload:
+                            body_text = payload.decode("utf-8", errors="replace")
+
+                    flags_raw = data[0][0].decode() if isinstance(data[0][0], bytes) else ""
+                    is_read = "\\Seen" in flags_raw
+
+                    date = None
+                    try:
+                        date = email_lib.utils.parsedate_to_datetime(msg.get("Date", ""))
+                    except Exception:
+                        pass
+
+                    messages.append(AssistantInboxMessage(
+                        uid=msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id),
+                        subject=subject,
+                        sender=msg.get("From", ""),
+                        recipients=[r.strip() for r in msg.get("To", "").split(",") if r.strip()],
+                        cc=[r.strip() for r in (msg.get("Cc") or "").split(",") if r.strip()],
+                        body_text=body_text,
+                        body_html=body_html,
+                        date=date,
+                        is_read=is_read,
+                        in_reply_to=msg.get("In-Reply-To", ""),
+                        references=msg.get("References", ""),
+                        folder=folder,
+                    ))
+                return messages
+
+            return await asyncio.to_thread(
+                self._imap_pool.run, cfg.imap_server, cfg.imap_port, cfg.imap_username, cfg.imap_password,
+                _fetch, cfg.imap_encryption,
+            )
         except Exception as exc:
             logger.error("assistant_email_fetch_failed", error=str(exc))
             return []
@@ -0,0 +1,305 @@
+"""Content-addressed attachment storage.
+
+Downloaded attachments are streamed to disk in chunks, hashed on the way,
+and kept once per content under ``<root>/<sha256[:2]>/<sha256>``: the same
+file mailed ten times is stored once. ``MessageAttachment`` links a
+message's attachment (account, folder, provider id, filename) to its blob,
+so asking for it again needs no network at all, and ``AttachmentBlob``
+has room for per-blob analysis results, so work done on a file's content
+is done once. Callers get a copy (``export``), never the shared blob.
+
+Writers are plain blocking objects, used from ``asyncio.to_thread`` for
+IMAP and directly for streamed HTTP bodies.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime as dt
+import hashlib
+import itertools
+import json
+import os
+import re
+import stat
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, Column, Index, Integer, String, Text, select, update
+
+from koda2.config import get_settings
+from koda2.database import Base, UTCDateTime, dialect_insert, get_session
+from koda2.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_NOT_BASE64 = re.compile(rb"[^A-Za-z0-9+/]")
+
+
+class AttachmentBlob(Base):
+    """One stored file, keyed by the SHA-256 of its content."""
+
+    __tablename__ = "attachment_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False, default=0)
+    content_type = Column(String(255), nullable=False, default="application/octet-stream")
+    analysis_json = Column(Text, nullable=True)  # cached results of analysing the content
+    created_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
+
+
+class MessageAttachment(Base):
+    """Which blob holds a message's attachment."""
+
+    __tablename__ = "message_attachments"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_name = Column(String(255), nullable=False)
+    folder = Column(String(255), nullable=False, default="INBOX")
+    provider_id = Column(String(512), nullable=False)
+    filename = Column(String(1024), nullable=False)
+    part = Column(String(512), nullable=False, default="")  # IMAP section or provider attachment id
+    sha256 = Column(String(64), nullable=False)
+    stored_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_message_attachments_key", "account_name", "folder", "provider_id", "filename", unique=True),
+        Index("ix_message_attachments_sha256", "sha256"),
+    )
+
+
+@dataclass
+class StoredAttachment:
+    """An attachment on disk: its blob and where that blob lives."""
+
+    sha256: str
+    size: int
+    content_type: str
+    path: Path
+
+
+class TransferDecoder:
+    """Undo a part's transfer encoding a chunk at a time.
+
+    Chunks may be cut anywhere: base64 keeps an incomplete quantum and
+    quoted-printable an incomplete line until the next chunk completes them.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self._encoding = (encoding or "").lower()
+        self._pending = b""
+        self._padded = False  # base64 padding seen: the data has ended
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._encoding == "base64":
+            if self._padded:
+                return b""
+            self._padded = b"=" in chunk
+            data = self._pending + _NOT_BASE64.sub(b"", chunk.split(b"=", 1)[0])
+            whole = len(data) - len(data) % 4
+            self._pending = data[whole:]
+            return base64.b64decode(data[:whole])
+        if self._encoding == "quoted-printable":
+            data = self._pending + chunk
+            cut = data.rfind(b"\n") + 1
+            self._pending = data[cut:]
+            return binascii.a2b_qp(data[:cut])
+        return chunk
+
+    def flush(self) -> bytes:
+        data, self._pending = self._pending, b""
+        if self._encoding == "base64":
+            data = data[:len(data) - len(data) % 4] if len(data) % 4 == 1 else data + b"=" * (-len(data) % 4)
+            return base64.b64decode(data)
+        if self._encoding == "quoted-printable":
+            return binascii.a2b_qp(data)
+        return data
+
+
+class BlobWriter:
+    """Write one file into the store, hashing as it goes.
+
+    Data goes to a temporary file next to the blobs; ``commit`` moves it
+    to its content address, or drops it if that content is already stored.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        tmp_dir = root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+        self._tmp = Path(name)
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.sha256 = ""
+
+    def write(self, data: bytes) -> None:
+        if data:
+            self._hash.update(data)
+            self._file.write(data)
+            self.size += len(data)
+
+    def commit(self) -> Path:
+        """Close the file and move it to ``<root>/<sha[:2]>/<sha>``."""
+        self._file.close()
+        self.sha256 = self._hash.hexdigest()
+        path = blob_path(self._root, self.sha256)
+        if path.exists():
+            self._tmp.unlink(missing_ok=True)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(self._tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)  # blobs are shared; never edit in place
+            os.replace(self._tmp, path)
+        return path
+
+    def discard(self) -> None:
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> BlobWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None or not self.sha256:
+            self.discard()
+
+
+def blob_path(root: Path, sha256: str) -> Path:
+    return root / sha256[:2] / sha256
+
+
+class AttachmentStore:
+    """Attachment blobs on disk plus the index linking messages to them."""
+
+    # Bytes per read from the server and per write to disk
+    CHUNK = 1024 * 1024
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self._root = Path(root) if root else None
+
+    @property
+    def root(self) -> Path:
+        if self._root is None:
+            self._root = get_settings().data_dir / "attachment_blobs"
+        return self._root
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self.root)
+
+    async def find(self, account_name: str, folder: str, provider_id: str, filename: str) -> Optional[StoredAttachment]:
+        """The stored copy of a message's attachment, if it was downloaded before and is still on disk."""
+        async with get_session() as session:
+            row = (await session.execute(
+                select(AttachmentBlob)
+                .join(MessageAttachment, MessageAttachment.sha256 == AttachmentBlob.sha256)
+                .where(
+                    MessageAttachment.account_name == account_name,
+                    MessageAttachment.folder == folder,
+                    MessageAttachment.provider_id == provider_id,
+                    MessageAttachment.filename == filename,
+                )
+            )).scalar_one_or_none()
+        if row is None:
+            return None
+        path = blob_path(self.root, row.sha256)
+        if not path.is_file() or path.stat().st_size != row.size:
+            return None
+        return StoredAttachment(sha256=row.sha256, size=row.size, content_type=row.content_type, path=path)
+
+    async def add(
+        self,
+        writer: BlobWriter,
+        account_name: str,
+        folder: str,
+        provider_id: str,
+        filename: str,
+        content_type: str = "application/octet-stream",
+        part: str = "",
+    ) -> StoredAttachment:
+        """Commit a finished writer and link the message's attachment to the blob."""
+        path = writer.commit()
+        now = dt.datetime.utcnow()
+        async with get_session() as session:
+            blob = dialect_insert(session.bind, AttachmentBlob).values(
+                sha256=writer.sha256, size=writer.size, content_type=content_type, created_at=now,
+            )
+            await session.execute(blob.on_conflict_do_nothing(index_elements=["sha256"]))
+            link = dialect_insert(session.bind, MessageAttachment).values(
+                account_name=account_name, folder=folder, provider_id=provider_id, filename=filename,
+                part=part, sha256=writer.sha256, stored_at=now,
+            )
+            await session.execute(link.on_conflict_do_update(
+                index_elements=["account_name", "folder", "provider_id", "filename"],
+                set_={"part": part, "sha256": writer.sha256, "stored_at": now},
+            ))
+        logger.info("attachment_stored", sha256=writer.sha256, size=writer.size, filename=filename)
+        return StoredAttachment(sha256=writer.sha256, size=writer.size, content_type=content_type, path=path)
+
+    async def get_analysis(self, sha256: str) -> Optional[dict[str, Any]]:
+        """Analysis results saved for a blob, so the same content isn't analysed twice."""
+        async with get_session() as session:
+            value = (await session.execute(
+                select(AttachmentBlob.analysis_json).where(AttachmentBlob.sha256 == sha256)
+            )).scalar_one_or_none()
+        return json.loads(value) if value else None
+
+    async def save_analysis(self, sha256: str, analysis: dict[str, Any]) -> None:
+        async with get_session() as session:
+            await session.execute(update(AttachmentBlob).where(AttachmentBlob.sha256 == sha256).values(
+                analysis_json=json.dumps(analysis, default=str),
+            ))
+
+    @staticmethod
+    def export(stored: StoredAttachment, output_dir: str | Path, filename: str) -> Path:
+        """Copy a blob into ``output_dir`` under the attachment's filename.
+
+        The caller gets a file of its own: the shared blob is never handed
+        out, so editing a download can't change what other messages point
+        at. An identical file already at that name is reused; a different
+        one is left alone and the copy numbered (``report (1).pdf``).
+
+        The copy is hashed on the way; a blob that no longer matches its
+        address is deleted (so the next download fetches it again) and
+        ``ValueError`` raised.
+        """
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = Path(filename).name or stored.sha256
+        stem, suffix = Path(name).stem, Path(name).suffix
+        for n in itertools.count():
+            target = directory / (name if n == 0 else f"{stem} ({n}){suffix}")
+            try:
+                out = open(target, "xb")
+            except FileExistsError:
+                if target.is_file() and target.stat().st_size == stored.size and _sha256_of(target) == stored.sha256:
+                    return target
+                continue
+            break
+
+        digest = hashlib.sha256()
+        try:
+            with out, open(stored.path, "rb") as src:
+                while chunk := src.read(AttachmentStore.CHUNK):
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            target.unlink(missing_ok=True)
+            raise
+        if digest.hexdigest() != stored.sha256:
+            target.unlink(missing_ok=True)
+            stored.path.unlink(missing_ok=True)
+            logger.error("attachment_blob_corrupt", sha256=stored.sha256)
+            raise ValueError(f"Attachment blob {stored.sha256} is corrupt")
+        return target
+
+
+def _sha256_of(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(AttachmentStore.CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
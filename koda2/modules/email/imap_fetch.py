@@ -0,0 +1,256 @@
+"""Header-first IMAP fetching.
+
+Listing an inbox only needs a few headers, the flags and the MIME
+structure, so one ``UID FETCH`` over the whole UID set asks for just
+those (``LIST_ITEMS``). Bodies are fetched later, and only the text part,
+using the section numbers the BODYSTRUCTURE gave.
+
+The helpers here parse what ``imaplib`` hands back: a list of response
+lines, where an item carrying a literal arrives as a ``(line, literal)``
+tuple.
+"""
+
+from __future__ import annotations
+
+import base64
+import email as email_lib
+import itertools
+import quopri
+import re
+from dataclasses import dataclass, field
+from email.header import decode_header, make_header
+from email.message import Message
+from typing import Any, Iterable, Optional
+
+LIST_HEADERS = ("FROM", "TO", "CC", "SUBJECT", "DATE", "MESSAGE-ID", "IN-REPLY-TO", "REFERENCES")
+LIST_ITEMS = f"(UID FLAGS RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({' '.join(LIST_HEADERS)})])"
+
+_TOKEN = re.compile(
+    rb'\s*(?:(?P<open>\()|(?P<close>\))|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+    rb"|(?P<atom>[^\s()\"\[\]{}]+(?:\[[^\]]*\](?:<\d+>)?)?))"
+)
+_LITERAL = re.compile(rb"\{(\d+)\}$")
+
+
+@dataclass
+class BodyPart:
+    """One leaf of a BODYSTRUCTURE."""
+
+    section: str
+    content_type: str
+    params: dict[str, str] = field(default_factory=dict)
+    encoding: str = "7bit"
+    size: int = 0
+    disposition: str = ""
+    filename: str = ""
+
+    @property
+    def is_attachment(self) -> bool:
+        return self.disposition == "attachment"
+
+    @property
+    def decoded_size(self) -> int:
+        """Approximate size once the transfer encoding is undone."""
+        # MIME base64: 76-character lines plus CRLF carry 57 bytes each
+        return self.size * 57 // 78 if self.encoding == "base64" else self.size
+
+
+@dataclass
+class FetchedMessage:
+    """What a listing fetch returned for one message."""
+
+    uid: str
+    flags: list[str]
+    size: int
+    headers: Message
+    parts: list[BodyPart]
+
+    def text_part(self) -> Optional[BodyPart]:
+        """The part to show as the body: plain text, else HTML."""
+        for content_type in ("text/plain", "text/html"):
+            for part in self.parts:
+                if part.content_type == content_type and not part.is_attachment:
+                    return part
+        return None
+
+    def attachments(self) -> list[BodyPart]:
+        return [part for part in self.parts if part.is_attachment]
+
+
+def uid_set(uids: Iterable[int | str | bytes]) -> str:
+    """Compress UIDs into an IMAP sequence set: ``[1, 2, 3, 7]`` -> ``"1:3,7"``."""
+    numbers = sorted({int(uid) for uid in uids})
+    ranges: list[str] = []
+    start = prev = None
+    for number in numbers + [None]:
+        if start is not None and number == prev + 1:
+            prev = number
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == prev else f"{start}:{prev}")
+        start = prev = number
+    return ",".join(ranges)
+
+
+def _tokens(data: list[Any]) -> list[Any]:
+    """Turn imaplib's response lines into nested lists.
+
+    Atoms and quoted strings become ``str``, ``NIL`` becomes ``None`` and
+    literals stay ``bytes``.
+    """
+    root: list[Any] = []
+    stack = [root]
+    for item in data:
+        line, literal = item if isinstance(item, tuple) else (item, None)
+        if not isinstance(line, bytes):
+            continue
+        if literal is not None:
+            line = _LITERAL.sub(b"", line.rstrip())
+        pos = 0
+        while pos < len(line):
+            match = _TOKEN.match(line, pos)
+            if not match:
+                break
+            pos = match.end()
+            if match.group("open"):
+                stack.append([])
+            elif match.group("close"):
+                if len(stack) > 1:
+                    done = stack.pop()
+                    stack[-1].append(done)
+            elif match.group("quoted") is not None:
+                stack[-1].append(re.sub(rb"\\(.)", rb"\1", match.group("quoted")).decode("utf-8", "replace"))
+            elif match.group("atom"):
+                atom = match.group("atom").decode("utf-8", "replace")
+                stack[-1].append(None if atom.upper() == "NIL" else atom)
+        if literal is not None:
+            stack[-1].append(literal)
+    return root
+
+
+def parse_fetch(data: list[Any]) -> list[dict[str, Any]]:
+    """Split a FETCH response into one ``{ITEM: value}`` dict per message.
+
+    Item names are upper-cased; responses for the same message are merged.
+    """
+    by_seq: dict[str, dict[str, Any]] = {}
+    tokens = _tokens(data)
+    for seq, items in zip(tokens[::2], tokens[1::2]):
+        if not isinstance(items, list):
+            continue
+        values = by_seq.setdefault(str(seq), {})
+        for name, value in zip(items[::2], items[1::2]):
+            values[str(name).upper()] = value
+    return list(by_seq.values())
+
+
+def body_item(values: dict[str, Any], prefix: str = "BODY[") -> Optional[bytes]:
+    """The first ``BODY[...]`` item of a parsed message, as bytes."""
+    for name, value in values.items():
+        if name.startswith(prefix):
+            return value if isinstance(value, bytes) else (value or "").encode()
+    return None
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value or ""
+
+
+def _pairs(value: Any) -> dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {_text(k).lower(): _text(v) for k, v in zip(value[::2], value[1::2])}
+
+
+def parse_bodystructure(node: Any, prefix: str = "") -> list[BodyPart]:
+    """Flatten a BODYSTRUCTURE into its leaf parts, numbered as IMAP sections."""
+    if not isinstance(node, list) or not node:
+        return []
+    if isinstance(node[0], list):
+        # Multipart: the children come first, then the subtype and extension data
+        parts: list[BodyPart] = []
+        children = list(itertools.takewhile(lambda child: isinstance(child, list), node))
+        for index, child in enumerate(children, 1):
+            parts.extend(parse_bodystructure(child, f"{prefix}.{index}" if prefix else str(index)))
+        return parts
+
+    maintype, subtype = _text(node[0]).lower(), _text(node[1]).lower() if len(node) > 1 else ""
+    params = _pairs(node[2]) if len(node) > 2 else {}
+    encoding = _text(node[5]).lower() if len(node) > 5 else "7bit"
+    try:
+        size = int(node[6]) if len(node) > 6 else 0
+    except (TypeError, ValueError):
+        size = 0
+    # Extension data follows the basic fields (plus line count for text/*,
+    # envelope, body and line count for message/rfc822): md5, disposition, ...
+    extension = 7 + (1 if maintype == "text" else 3 if (maintype, subtype) == ("message", "rfc822") else 0)
+    disposition, disposition_params = "", {}
+    if len(node) > extension + 1 and isinstance(node[extension + 1], list):
+        disposition = _text(node[extension + 1][0]).lower()
+        disposition_params = _pairs(node[extension + 1][1]) if len(node[extension + 1]) > 1 else {}
+    filename = disposition_params.get("filename") or params.get("name", "")
+    return [BodyPart(
+        section=prefix or "1",
+        content_type=f"{maintype}/{subtype}",
+        params=params,
+        encoding=encoding,
+        size=size,
+        disposition=disposition,
+        filename=decode_mime_header(filename),
+    )]
+
+
+def decode_mime_header(value: str) -> str:
+    """Decode RFC 2047 encoded words (``=?utf-8?q?...?=``)."""
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, ValueError):
+        return value
+
+
+def decode_part(payload: bytes, encoding: str, charset: str = "utf-8", partial: bool = False) -> str:
+    """Undo a part's transfer encoding and charset.
+
+    ``partial`` payloads (a ``<0.n>`` prefix) may end mid base64 quantum,
+    which is trimmed rather than failing.
+    """
+    encoding = encoding.lower()
+    if encoding == "base64":
+        data = re.sub(rb"[^A-Za-z0-9+/=]", b"", payload)
+        if partial:
+            data = data[:len(data) - len(data) % 4]
+        try:
+            payload = base64.b64decode(data)
+        except ValueError:
+            payload = b""
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def parse_listing(data: list[Any]) -> list[FetchedMessage]:
+    """Parse the response to a ``UID FETCH <set> LIST_ITEMS``."""
+    messages = []
+    for values in parse_fetch(data):
+        if "UID" not in values:
+            continue
+        flags = values.get("FLAGS") or []
+        try:
+            size = int(values.get("RFC822.SIZE") or 0)
+        except ValueError:
+            size = 0
+        messages.append(FetchedMessage(
+            uid=str(values["UID"]),
+            flags=[_text(flag) for flag in flags] if isinstance(flags, list) else [],
+            size=size,
+            headers=email_lib.message_from_bytes(body_item(values, "BODY[HEADER") or b""),
+            parts=parse_bodystructure(values.get("BODYSTRUCTURE")),
+        ))
+    return messages
@@ -0,0 +1,250 @@
+"""Pooled, persistent IMAP sessions.
+
+Opening an IMAP connection costs a TLS handshake plus a LOGIN; checking an
+inbox every few minutes shouldn't pay that each time. ``IMAPPool`` keeps
+logged-in connections per account (server, port, user, encryption) and
+hands them out to ``EmailService`` and ``AssistantMailService`` alike, so
+both inbox code paths share the same sessions.
+
+A connection that sat idle is checked with ``NOOP`` before reuse, and
+``keepalive`` NOOPs idle connections periodically so servers don't drop
+them (idle ones past ``MAX_IDLE`` are closed instead). A connection that
+fails mid-command is discarded, and ``run`` retries the work once on a
+fresh one. Each server gets at most ``MAX_PER_SERVER`` connections across
+all its accounts.
+"""
+
+from __future__ import annotations
+
+import imaplib
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from koda2.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Errors after which a connection can't be trusted any more
+DROPPED_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError, ssl.SSLError, socket.timeout)
+
+# (server, port, username, encryption)
+PoolKey = tuple[str, int, str, str]
+
+
+class IMAPPool:
+    """Logged-in IMAP connections shared across services, bounded per server."""
+
+    # Connections per server (all accounts together)
+    MAX_PER_SERVER = 4
+    # Idle seconds after which a connection is NOOP-checked before reuse,
+    # and after which it's closed instead of kept alive
+    NOOP_AFTER = 60
+    MAX_IDLE = 25 * 60
+    # Seconds to connect/read, and to wait for a free slot on a busy server
+    TIMEOUT = 20
+    CHECKOUT_TIMEOUT = 30
+
+    def __init__(self) -> None:
+        self._idle: dict[PoolKey, list[tuple[imaplib.IMAP4, float]]] = {}
+        self._open: dict[str, int] = {}  # server -> open connections (idle + in use)
+        self._passwords: dict[PoolKey, str] = {}
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def key(server: str, port: int, username: str, encryption: str = "ssl") -> PoolKey:
+        return (server.lower(), int(port), username, encryption)
+
+    def _connect(self, key: PoolKey, password: str) -> imaplib.IMAP4:
+        server, port, username, encryption = key
+        if encryption == "ssl":
+            conn = imaplib.IMAP4_SSL(server, port, timeout=self.TIMEOUT)
+        else:
+            conn = imaplib.IMAP4(server, port, timeout=self.TIMEOUT)
+            if encryption == "starttls":
+                conn.starttls()
+        try:
+            conn.login(username, password)
+            # Capabilities after login may differ from the greeting's
+            typ, data = conn.capability()
+            if typ == "OK" and data and data[0]:
+                conn.capabilities = tuple(data[0].decode().upper().split())
+            if "CONDSTORE" in conn.capabilities and "ENABLE" in conn.capabilities:
+                conn.enable("CONDSTORE")  # per-message MODSEQ, for incremental flag sync
+        except Exception:
+            self._close(conn)
+            raise
+        logger.info("imap_session_opened", server=server, username=username)
+        return conn
+
+    @staticmethod
+    def _close(conn: imaplib.IMAP4) -> None:
+        try:
+            conn.logout()
+        except Exception:
+            try:
+                conn.shutdown()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _alive(conn: imaplib.IMAP4) -> bool:
+        try:
+            return conn.noop()[0] == "OK"
+        except Exception:
+            return False
+
+    def _discard(self, server: str, conn: imaplib.IMAP4) -> None:
+        """Close a connection and free its slot."""
+        self._close(conn)
+        with self._cond:
+            self._open[server] = max(0, self._open.get(server, 0) - 1)
+            self._cond.notify()
+
+    def _evict_other(self, key: PoolKey) -> Optional[imaplib.IMAP4]:
+        """Take the longest-idle connection another account holds on the same server."""
+        candidates = [
+            (since, other) for other, idle in self._idle.items()
+            if other != key and other[0] == key[0] and idle
+            for _, since in idle[:1]
+        ]
+        if not candidates:
+            return None
+        _, other = min(candidates)
+        conn, _ = self._idle[other].pop(0)
+        self._open[key[0]] -= 1
+        return conn
+
+    def _checkout(self, key: PoolKey, password: str) -> imaplib.IMAP4:
+        server = key[0]
+        deadline = time.monotonic() + self.CHECKOUT_TIMEOUT
+        while True:
+            evicted = None
+            with self._cond:
+                if self._passwords.get(key, password) != password:
+                    # Credentials changed: the pooled sessions belong to the old login
+                    stale, self._idle[key] = self._idle.get(key, []), []
+                    self._open[server] = max(0, self._open.get(server, 0) - len(stale))
+                    for old, _ in stale:
+                        self._close(old)
+                self._passwords[key] = password
+                idle = self._idle.get(key)
+                if idle:
+                    conn, since = idle.pop()
+                elif self._open.get(server, 0) < self.MAX_PER_SERVER or (
+                    evicted := self._evict_other(key)
+                ) is not None:
+                    self._open[server] = self._open.get(server, 0) + 1
+                    conn, since = None, 0.0
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No free IMAP connection to {server}")
+                    self._cond.wait(remaining)
+                    continue
+            if evicted is not None:
+                self._close(evicted)
+            if conn is None:
+                try:
+                    return self._connect(key, password)
+                except Exception:
+                    with self._cond:
+                        self._open[server] -= 1
+                        self._cond.notify()
+                    raise
+            idle_for = time.monotonic() - since
+            if idle_for > self.MAX_IDLE or (idle_for > self.NOOP_AFTER and not self._alive(conn)):
+                logger.debug("imap_session_stale", server=server, idle=round(idle_for))
+                self._discard(server, conn)
+                continue
+            return conn
+
+    def _checkin(self, key: PoolKey, conn: imaplib.IMAP4) -> None:
+        with self._cond:
+            self._idle.setdefault(key, []).append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(
+        self, server: str, port: int, username: str, password: str, encryption: str = "ssl",
+    ) -> Iterator[imaplib.IMAP4]:
+        """Borrow a logged-in connection; it goes back to the pool afterwards.
+
+        A connection that raised one of ``DROPPED_ERRORS`` is closed
+        rather than returned. Callers select their own folder.
+        """
+        key = self.key(server, port, username, encryption)
+        conn = self._checkout(key, password)
+        try:
+            yield conn
+        except Exception as exc:
+            if isinstance(exc, DROPPED_ERRORS):
+                self._discard(key[0], conn)
+            else:
+                self._checkin(key, conn)
+            raise
+        except BaseException:
+            # Interrupted mid-command: the session state is unknown
+            self._discard(key[0], conn)
+            raise
+        self._checkin(key, conn)
+
+    def run(
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        work: Callable[[imaplib.IMAP4], T],
+        encryption: str = "ssl",
+    ) -> T:
+        """Run ``work`` on a pooled connection, once more on a fresh one if the first dropped."""
+        try:
+            with self.connection(server, port, username, password, encryption) as conn:
+                return work(conn)
+        except DROPPED_ERRORS as exc:
+            logger.info("imap_session_reconnecting", server=server, error=str(exc))
+        with self.connection(server, port, username, password, encryption) as conn:
+            return work(conn)
+
+    def keepalive(self) -> int:
+        """NOOP idle connections; close dead ones and those idle past ``MAX_IDLE``.
+
+        Returns how many connections were kept.
+        """
+        now = time.monotonic()
+        with self._cond:
+            batch = [(key, conn, since) for key, idle in self._idle.items() for conn, since in idle]
+            self._idle = {}
+        kept = 0
+        for key, conn, since in batch:
+            if now - since > self.MAX_IDLE or not self._alive(conn):
+                self._discard(key[0], conn)
+                continue
+            with self._cond:
+                self._idle.setdefault(key, []).append((conn, since))
+                self._cond.notify()
+            kept += 1
+        return kept
+
+    def close_all(self) -> None:
+        """Log out every idle connection."""
+        with self._cond:
+            batch = [(key, conn) for key, idle in self._idle.items() for conn, _ in idle]
+            self._idle = {}
+        for key, conn in batch:
+            self._discard(key[0], conn)
+
+    def stats(self) -> dict[str, int]:
+        """Open connections per server."""
+        with self._cond:
+            return {server: count for server, count in self._open.items() if count}
+
+
+# Shared by every service that reads mail over IMAP
+imap_pool = IMAPPool()
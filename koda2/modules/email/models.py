@@ -37,6 +37,17 @@ class EmailAttachment(BaseModel):
     size: int = 0
     data: Optional[bytes] = None
     path: Optional[str] = None
+    section: str = ""  # IMAP body part number, e.g. "2" or "1.3"
+
+
+class EmailBodyPart(BaseModel):
+    """Where a message's text body lives, so it can be fetched on its own."""
+
+    section: str  # IMAP body part number
+    content_type: str = "text/plain"
+    charset: str = "utf-8"
+    encoding: str = "7bit"
+    size: int = 0
 
 
 class EmailMessage(BaseModel):
@@ -63,6 +74,10 @@ class EmailMessage(BaseModel):
     in_reply_to: str = ""
     references: str = ""
     date: dt.datetime = Field(default_factory=lambda: dt.datetime.now(dt.UTC))
+    size: int = 0
+    # Header-only listings leave the body out until load_bodies() fetches it
+    body_loaded: bool = True
+    body_part: Optional[EmailBodyPart] = None
 
     @property
     def has_attachments(self) -> bool:
@@ -10,12 +10,13 @@ import email.mime.multipart
 import email.mime.text
 import email.mime.base
 import email.encoders
+import heapq
 import imaplib
+import itertools
 import os
 import smtplib
-from email.header import decode_header
 from pathlib import Path
-from typing import Optional, Any
+from typing import Any, Awaitable, Callable, Optional
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -23,25 +24,67 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from koda2.config import get_settings
 from koda2.logging_config import get_logger
 from koda2.modules.account.models import AccountType, ProviderType
+from koda2.modules.email.attachments import AttachmentStore, BlobWriter, TransferDecoder
+from koda2.modules.email.imap_fetch import (
+    LIST_ITEMS,
+    BodyPart,
+    FetchedMessage,
+    body_item,
+    decode_mime_header,
+    decode_part,
+    parse_fetch,
+    parse_listing,
+    uid_set,
+)
+from koda2.modules.email.imap_pool import IMAPPool, imap_pool
 from koda2.modules.email.models import (
     EmailAttachment,
+    EmailBodyPart,
     EmailFilter,
     EmailMessage,
     EmailPriority,
     EmailProvider,
     EmailTemplate,
 )
+from koda2.modules.email.store import EmailSyncState, MailDelta, MailSearchHit, MailStore
 
 logger = get_logger(__name__)
 
+# Providers whose inbox is synced into the local MailStore (EWS is read live)
+SYNCED_PROVIDERS = (ProviderType.IMAP.value, ProviderType.GOOGLE.value, ProviderType.MSGRAPH.value)
+# Folder the store keeps per account
+SYNC_FOLDER = "INBOX"
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SELECT = "id,subject,from,toRecipients,receivedDateTime,body,isRead,hasAttachments"
+
 
 class EmailService:
     """Unified email management service with multi-account support."""
 
-    def __init__(self, account_service: Optional[Any] = None) -> None:
+    # Stored inboxes synced within this are read without syncing again
+    MAIL_SYNC_MAX_AGE = dt.timedelta(minutes=2)
+    # Newest messages taken on a full sync (first sync, new UIDVALIDITY, expired token)
+    INITIAL_MESSAGES = 200
+    # How far back a full Graph delta sync reaches
+    INITIAL_DAYS = 30
+    # Messages per listing fetch (IMAP) or delta page (Graph) during a sync
+    FETCH_BATCH = 100
+    # IMAP text parts up to this size are fetched while syncing, so search covers them
+    SYNC_BODY_MAX_BYTES = 64 * 1024
+    # Shared deadline (seconds) for fetch_all_emails across all providers;
+    # those that haven't answered by then are left out of the result
+    FETCH_DEADLINE = 20.0
+
+    def __init__(self, account_service: Optional[Any] = None, imap_pool: IMAPPool = imap_pool) -> None:
         self._settings = get_settings()
         self._account_service = account_service
+        self._imap_pool = imap_pool
         self._templates: dict[str, EmailTemplate] = {}
+        self._store = MailStore()
+        self._attachments = AttachmentStore()
+        self._sync_locks: dict[str, asyncio.Lock] = {}  # account name -> lock
+        self._sync_task: Optional[asyncio.Task] = None  # sync_mail run started by a read
 
     async def _get_email_accounts(self) -> list:
         """Get all active email accounts."""
@@ -80,14 +123,16 @@ class EmailService:
 
     # ── IMAP Operations ──────────────────────────────────────────────
 
-    def _connect_imap(self, server: str, port: int, username: str, password: str, use_ssl: bool = True) -> imaplib.IMAP4_SSL:
-        """Create an IMAP connection."""
-        if use_ssl:
-            conn = imaplib.IMAP4_SSL(server, port)
-        else:
-            conn = imaplib.IMAP4(server, port)
-        conn.login(username, password)
-        return conn
+    def _imap_run(self, credentials: dict, work: Callable[[imaplib.IMAP4], Any]) -> Any:
+        """Run ``work`` on a pooled, logged-in connection for an IMAP account."""
+        return self._imap_pool.run(
+            credentials["server"],
+            credentials.get("port", 993),
+            credentials["username"],
+            credentials["password"],
+            work,
+            encryption="ssl" if credentials.get("use_ssl", True) else "none",
+        )
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def fetch_emails(
@@ -118,97 +163,35 @@ class EmailService:
             try:
                 credentials = self._account_service.decrypt_credentials(account)
                 
-                def _fetch():
-                    conn = self._connect_imap(
-                        credentials["server"],
-                        credentials.get("port", 993),
-                        credentials["username"],
-                        credentials["password"],
-                        credentials.get("use_ssl", True),
-                    )
-                    try:
-                        conn.select(f.folder)
-                        criteria = []
-                        if f.unread_only:
-                            criteria.append("UNSEEN")
-                        if f.since:
-                            criteria.append(f'SINCE {f.since.strftime("%d-%b-%Y")}')
-                        if f.before:
-                            criteria.append(f'BEFORE {f.before.strftime("%d-%b-%Y")}')
-                        if f.sender:
-                            criteria.append(f'FROM "{f.sender}"')
-                        if f.subject_contains:
-                            criteria.append(f'SUBJECT "{f.subject_contains}"')
-
-                        search_str = " ".join(criteria) if criteria else "ALL"
-                        _, msg_nums = conn.search(None, search_str)
-                        msg_ids = msg_nums[0].split()
-
-                        if f.limit:
-                            msg_ids = msg_ids[-f.limit:]
-
-                        messages = []
-                        for msg_id in reversed(msg_ids):
-                            _, data = conn.fetch(msg_id, "(RFC822 FLAGS)")
-                            if not data or not data[0]:
-                                continue
-                            raw = data[0][1]
-                            msg = email_lib.message_from_bytes(raw)
-
-                            subject = ""
-                            raw_subject = msg.get("Subject", "")
-                            if raw_subject:
-                                decoded = decode_header(raw_subject)
-                                subject = str(decoded[0][0], decoded[0][1] or "utf-8") if isinstance(decoded[0][0], bytes) else str(decoded[0][0])
-
-                            sender = msg.get("From", "")
-                            body_text = ""
-                            body_html = ""
-                            attachments = []
-
-                            if msg.is_multipart():
-                                for part in msg.walk():
-                                    ct = part.get_content_type()
-                                    cd = str(part.get("Content-Disposition", ""))
-                                    if ct == "text/plain" and "attachment" not in cd:
-                                        body_text = part.get_payload(decode=True).decode("utf-8", errors="replace")
-                                    elif ct == "text/html" and "attachment" not in cd:
-                                        body_html = part.get_payload(decode=True).decode("utf-8", errors="replace")
-                                    elif "attachment" in cd:
-                                        filename = part.get_filename() or "attachment"
-                                        attachments.append(EmailAttachment(
-                                            filename=filename,
-                                            content_type=ct,
-                                            size=len(part.get_payload(decode=True) or b""),
-                                        ))
-                            else:
-                                body_text = msg.get_payload(decode=True).decode("utf-8", errors="replace")
-
-                            flags = data[0][0].decode() if isinstance(data[0][0], bytes) else ""
-                            is_read = "\\Seen" in flags
-
-                            messages.append(EmailMessage(
-                                provider=EmailProvider.IMAP_SMTP,
-                                provider_id=msg_id.decode(),
-                                account_name=account.name,
-                                subject=subject,
-                                sender=sender,
-                                recipients=msg.get("To", "").split(","),
-                                cc=msg.get("Cc", "").split(",") if msg.get("Cc") else [],
-                                body_text=body_text,
-                                body_html=body_html,
-                                attachments=attachments,
-                                is_read=is_read,
-                                folder=f.folder,
-                                in_reply_to=msg.get("In-Reply-To", ""),
-                                references=msg.get("References", ""),
-                                date=email_lib.utils.parsedate_to_datetime(msg.get("Date", "")),
-                            ))
-                        return messages
-                    finally:
-                        conn.logout()
-
-                messages = await asyncio.to_thread(_fetch)
+                def _fetch(conn: imaplib.IMAP4) -> list[EmailMessage]:
+                    conn.select(f.folder)
+                    criteria = []
+                    if f.unread_only:
+                        criteria.append("UNSEEN")
+                    if f.since:
+                        criteria.append(f'SINCE {f.since.strftime("%d-%b-%Y")}')
+                    if f.before:
+                        criteria.append(f'BEFORE {f.before.strftime("%d-%b-%Y")}')
+                    if f.sender:
+                        criteria.append(f'FROM "{f.sender}"')
+                    if f.subject_contains:
+                        criteria.append(f'SUBJECT "{f.subject_contains}"')
+
+                    search_str = " ".join(criteria) if criteria else "ALL"
+                    _, uid_data = conn.uid("SEARCH", None, search_str)
+                    uids = uid_data[0].split() if uid_data and uid_data[0] else []
+
+                    if f.limit:
+                        uids = uids[-f.limit:]
+                    if not uids:
+                        return []
+
+                    # Headers, flags and structure for the whole batch in one round-trip
+                    _, data = conn.uid("FETCH", uid_set(uids), LIST_ITEMS)
+                    fetched = sorted(parse_listing(data), key=lambda m: int(m.uid), reverse=True)
+                    return [self._imap_message(m, account.name, f.folder) for m in fetched]
+
+                messages = await asyncio.to_thread(self._imap_run, credentials, _fetch)
                 all_messages.extend(messages)
                 
             except Exception as exc:
@@ -216,6 +199,133 @@ class EmailService:
 
         return all_messages
 
+    @staticmethod
+    def _imap_message(fetched: FetchedMessage, account_name: str, folder: str) -> EmailMessage:
+        """Build a header-only EmailMessage from a listing fetch; the body is loaded later."""
+        headers = fetched.headers
+        text = fetched.text_part()
+        message = EmailMessage(
+            provider=EmailProvider.IMAP_SMTP,
+            provider_id=fetched.uid,
+            account_name=account_name,
+            subject=decode_mime_header(headers.get("Subject", "")),
+            sender=decode_mime_header(headers.get("From", "")),
+            recipients=headers.get("To", "").split(","),
+            cc=headers.get("Cc", "").split(",") if headers.get("Cc") else [],
+            attachments=[
+                EmailAttachment(
+                    filename=part.filename or "attachment",
+                    content_type=part.content_type,
+                    size=part.decoded_size,
+                    section=part.section,
+                )
+                for part in fetched.attachments()
+            ],
+            is_read="\\Seen" in fetched.flags,
+            folder=folder,
+            in_reply_to=headers.get("In-Reply-To", ""),
+            references=headers.get("References", ""),
+            size=fetched.size,
+            body_loaded=text is None,
+            body_part=EmailBodyPart(
+                section=text.section,
+                content_type=text.content_type,
+                charset=text.params.get("charset", "utf-8"),
+                encoding=text.encoding,
+                size=text.size,
+            ) if text else None,
+        )
+        try:
+            message.date = email_lib.utils.parsedate_to_datetime(headers.get("Date", ""))
+        except (TypeError, ValueError):
+            pass
+        return message
+
+    async def load_bodies(
+        self,
+        messages: list[EmailMessage],
+        max_bytes: Optional[int] = None,
+    ) -> list[EmailMessage]:
+        """Fetch the text body of header-only IMAP messages, in place.
+
+        Only the text part is fetched (never attachments), one ``UID FETCH``
+        per account, folder and part number. ``max_bytes`` fetches just a
+        prefix of each body, enough for previews; such messages stay
+        ``body_loaded=False`` unless the whole body fit.
+        """
+        pending = [m for m in messages if not m.body_loaded and m.body_part and m.provider == EmailProvider.IMAP_SMTP]
+        if not pending or not self._account_service:
+            return messages
+
+        accounts = {
+            a.name: a for a in await self._get_email_accounts() if a.provider == ProviderType.IMAP.value
+        }
+        groups: dict[tuple[str, str], list[EmailMessage]] = {}
+        for message in pending:
+            groups.setdefault((message.account_name, message.folder), []).append(message)
+
+        for (account_name, folder), group in groups.items():
+            account = accounts.get(account_name)
+            if not account:
+                continue
+            try:
+                credentials = self._account_service.decrypt_credentials(account)
+
+                def _load(conn: imaplib.IMAP4) -> dict[tuple[str, str], bytes]:
+                    conn.select(folder)
+                    return self._imap_bodies(conn, group, max_bytes)
+
+                bodies = await asyncio.to_thread(self._imap_run, credentials, _load)
+            except Exception as exc:
+                logger.error("load_bodies_failed", account=account_name, error=str(exc))
+                continue
+            self._set_bodies(group, bodies, max_bytes)
+
+        # Previews aren't kept: a truncated body would hide the full one from search
+        loaded = [m for m in pending if m.body_loaded]
+        if loaded:
+            try:
+                await self._store.save_bodies(loaded)
+            except Exception as exc:
+                logger.warning("mail_store_write_failed", error=str(exc))
+        return messages
+
+    @staticmethod
+    def _imap_bodies(
+        conn: imaplib.IMAP4, messages: list[EmailMessage], max_bytes: Optional[int] = None,
+    ) -> dict[tuple[str, str], bytes]:
+        """Fetch the text parts of messages in the selected folder: (UID, section) -> encoded payload."""
+        partial = f"<0.{max_bytes}>" if max_bytes else ""
+        sections: dict[str, list[str]] = {}
+        for message in messages:
+            sections.setdefault(message.body_part.section, []).append(message.provider_id)
+        bodies: dict[tuple[str, str], bytes] = {}
+        for section, uids in sections.items():
+            _, data = conn.uid("FETCH", uid_set(uids), f"(UID BODY.PEEK[{section}]{partial})")
+            for values in parse_fetch(data):
+                payload = body_item(values)
+                if "UID" in values and payload is not None:
+                    bodies[(str(values["UID"]), section)] = payload
+        return bodies
+
+    @staticmethod
+    def _set_bodies(
+        messages: list[EmailMessage], bodies: dict[tuple[str, str], bytes], max_bytes: Optional[int] = None,
+    ) -> None:
+        """Decode fetched text parts into their messages."""
+        for message in messages:
+            part = message.body_part
+            payload = bodies.get((message.provider_id, part.section))
+            if payload is None:
+                continue
+            truncated = bool(max_bytes) and len(payload) >= max_bytes
+            text = decode_part(payload, part.encoding, part.charset, partial=truncated)
+            if part.content_type == "text/html":
+                message.body_html = text
+            else:
+                message.body_text = text
+            message.body_loaded = not truncated
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def send_email(
         self,
@@ -390,26 +500,15 @@ class EmailService:
             try:
                 credentials = self._account_service.decrypt_credentials(account)
                 
-                import httpx
-
-                # Get token
-                token_url = f"https://login.microsoftonline.com/{credentials['tenant_id']}/oauth2/v2.0/token"
                 async with httpx.AsyncClient() as client:
-                    token_resp = await client.post(token_url, data={
-                        "client_id": credentials["client_id"],
-                        "client_secret": credentials["client_secret"],
-                        "scope": "https://graph.microsoft.com/.default",
-                        "grant_type": "client_credentials",
-                    })
-                    token_resp.raise_for_status()
-                    token = token_resp.json()["access_token"]
+                    token = await self._msgraph_token(client, credentials)
 
                     # Fetch emails
-                    url = f"https://graph.microsoft.com/v1.0/me/mailFolders/{folder}/messages"
+                    url = f"{GRAPH_URL}/me/mailFolders/{folder}/messages"
                     params = {
                         "$top": limit,
                         "$orderby": "receivedDateTime desc",
-                        "$select": "id,subject,from,toRecipients,receivedDateTime,body,isRead,hasAttachments",
+                        "$select": GRAPH_SELECT,
                     }
                     if unread_only:
                         params["$filter"] = "isRead eq false"
@@ -419,28 +518,46 @@ class EmailService:
                     data = resp.json()
 
                     for msg in data.get("value", []):
-                        all_emails.append(EmailMessage(
-                            provider=EmailProvider.OFFICE365,
-                            provider_id=msg["id"],
-                            account_name=account.name,
-                            subject=msg.get("subject", ""),
-                            sender=msg.get("from", {}).get("emailAddress", {}).get("address", ""),
-                            recipients=[
-                                r.get("emailAddress", {}).get("address", "")
-                                for r in msg.get("toRecipients", [])
-                            ],
-                            body_text=msg.get("body", {}).get("content", "") if msg.get("body", {}).get("contentType") == "text" else "",
-                            body_html=msg.get("body", {}).get("content", "") if msg.get("body", {}).get("contentType") == "html" else "",
-                            is_read=msg.get("isRead", True),
-                            has_attachments=msg.get("hasAttachments", False),
-                            date=dt.datetime.fromisoformat(msg["receivedDateTime"].replace("Z", "+00:00")),
-                        ))
+                        all_emails.append(self._graph_message(msg, account.name))
 
             except Exception as e:
                 logger.error("msgraph_fetch_failed", account=account.name, error=str(e))
 
         return all_emails
 
+    @staticmethod
+    async def _msgraph_token(client: httpx.AsyncClient, credentials: dict) -> str:
+        """Client-credentials access token for a Graph account."""
+        token_url = f"https://login.microsoftonline.com/{credentials['tenant_id']}/oauth2/v2.0/token"
+        token_resp = await client.post(token_url, data={
+            "client_id": credentials["client_id"],
+            "client_secret": credentials["client_secret"],
+            "scope": "https://graph.microsoft.com/.default",
+            "grant_type": "client_credentials",
+        })
+        token_resp.raise_for_status()
+        return token_resp.json()["access_token"]
+
+    @staticmethod
+    def _graph_message(msg: dict, account_name: str) -> EmailMessage:
+        """Build an EmailMessage from one Graph ``message`` resource."""
+        return EmailMessage(
+            provider=EmailProvider.OFFICE365,
+            provider_id=msg["id"],
+            account_name=account_name,
+            subject=msg.get("subject", ""),
+            sender=msg.get("from", {}).get("emailAddress", {}).get("address", ""),
+            recipients=[
+                r.get("emailAddress", {}).get("address", "")
+                for r in msg.get("toRecipients", [])
+            ],
+            body_text=msg.get("body", {}).get("content", "") if msg.get("body", {}).get("contentType") == "text" else "",
+            body_html=msg.get("body", {}).get("content", "") if msg.get("body", {}).get("contentType") == "html" else "",
+            is_read=msg.get("isRead", True),
+            has_attachments=msg.get("hasAttachments", False),
+            date=dt.datetime.fromisoformat(msg["receivedDateTime"].replace("Z", "+00:00")),
+        )
+
     async def send_email_msgraph(
         self,
         message: EmailMessage,
@@ -544,81 +661,22 @@ class EmailService:
             try:
                 credentials = self._account_service.decrypt_credentials(account)
                 
-                from google.oauth2.credentials import Credentials
-                from googleapiclient.discovery import build
-
                 def _fetch():
-                    # Use token_file (has OAuth token), not credentials_file (has client secrets)
-                    token_path = credentials.get("token_file", credentials.get("credentials_file"))
-                    creds = Credentials.from_authorized_user_file(token_path)
-                    # Refresh if expired
-                    if creds and creds.expired and creds.refresh_token:
-                        from google.auth.transport.requests import Request
-                        creds.refresh(Request())
-                        from pathlib import Path
-                        Path(token_path).write_text(creds.to_json())
-                    service = build("gmail", "v1", credentials=creds, cache_discovery=False)
-
+                    service = self._gmail_service(credentials)
                     result = service.users().messages().list(
                         userId="me",
                         q=query,
                         maxResults=max_results,
                     ).execute()
 
-                    messages = result.get("messages", [])
                     emails = []
-
-                    for msg_meta in messages:
+                    for msg_meta in result.get("messages", []):
                         msg = service.users().messages().get(
                             userId="me",
                             id=msg_meta["id"],
                             format="full",
                         ).execute()
-
-                        headers = {h["name"]: h["value"] for h in msg["payload"]["headers"]}
-
-                        # Get body
-                        body_text = ""
-                        body_html = ""
-
-                        def get_body(parts):
-                            nonlocal body_text, body_html
-                            for part in parts:
-                                if part.get("mimeType") == "text/plain" and "data" in part.get("body", {}):
-                                    import base64
-                                    body_text = base64.urlsafe_b64decode(
-                                        part["body"]["data"]
-                                    ).decode("utf-8")
-                                elif part.get("mimeType") == "text/html" and "data" in part.get("body", {}):
-                                    import base64
-                                    body_html = base64.urlsafe_b64decode(
-                                        part["body"]["data"]
-                                    ).decode("utf-8")
-                                if "parts" in part:
-                                    get_body(part["parts"])
-
-                        if "parts" in msg["payload"]:
-                            get_body(msg["payload"]["parts"])
-                        elif "body" in msg["payload"] and "data" in msg["payload"]["body"]:
-                            import base64
-                            body_text = base64.urlsafe_b64decode(
-                                msg["payload"]["body"]["data"]
-                            ).decode("utf-8")
-
-                        emails.append(EmailMessage(
-                            provider=EmailProvider.GMAIL,
-                            provider_id=msg["id"],
-                            account_name=account.name,
-                            subject=headers.get("Subject", ""),
-                            sender=headers.get("From", ""),
-                            recipients=headers.get("To", "").split(","),
-                            body_text=body_text,
-                            body_html=body_html,
-                            is_read="UNREAD" not in msg.get("labelIds", []),
-                            has_attachments="has:attachment" in str(msg.get("payload", {})),
-                            date=dt.datetime.fromtimestamp(int(msg["internalDate"]) / 1000, dt.UTC),
-                        ))
-
+                        emails.append(self._gmail_message(msg, account.name))
                     return emails
 
                 emails = await asyncio.to_thread(_fetch)
@@ -629,6 +687,60 @@ class EmailService:
 
         return all_emails
 
+    @staticmethod
+    def _gmail_service(credentials: dict):
+        """Gmail API client for an account, refreshing its stored OAuth token if expired."""
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
+        # Use token_file (has OAuth token), not credentials_file (has client secrets)
+        token_path = credentials.get("token_file", credentials.get("credentials_file"))
+        creds = Credentials.from_authorized_user_file(token_path)
+        # Refresh if expired
+        if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+            Path(token_path).write_text(creds.to_json())
+        return build("gmail", "v1", credentials=creds, cache_discovery=False)
+
+    @staticmethod
+    def _gmail_message(msg: dict, account_name: str) -> EmailMessage:
+        """Build an EmailMessage from a Gmail message fetched with ``format="full"``."""
+        headers = {h["name"]: h["value"] for h in msg["payload"]["headers"]}
+
+        # Get body
+        body_text = ""
+        body_html = ""
+
+        def get_body(parts):
+            nonlocal body_text, body_html
+            for part in parts:
+                if part.get("mimeType") == "text/plain" and "data" in part.get("body", {}):
+                    body_text = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+                elif part.get("mimeType") == "text/html" and "data" in part.get("body", {}):
+                    body_html = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+                if "parts" in part:
+                    get_body(part["parts"])
+
+        if "parts" in msg["payload"]:
+            get_body(msg["payload"]["parts"])
+        elif "body" in msg["payload"] and "data" in msg["payload"]["body"]:
+            body_text = base64.urlsafe_b64decode(msg["payload"]["body"]["data"]).decode("utf-8")
+
+        return EmailMessage(
+            provider=EmailProvider.GMAIL,
+            provider_id=msg["id"],
+            account_name=account_name,
+            subject=headers.get("Subject", ""),
+            sender=headers.get("From", ""),
+            recipients=headers.get("To", "").split(","),
+            body_text=body_text,
+            body_html=body_html,
+            is_read="UNREAD" not in msg.get("labelIds", []),
+            has_attachments="has:attachment" in str(msg.get("payload", {})),
+            date=dt.datetime.fromtimestamp(int(msg["internalDate"]) / 1000, dt.UTC),
+        )
+
     # ── EWS (Exchange) Email ─────────────────────────────────────────
 
     async def ews_configured(self) -> bool:
@@ -682,32 +794,18 @@ class EmailService:
         unread_only: bool,
         limit: int,
     ) -> list[EmailMessage]:
-        """Synchronous EWS inbox fetch via SOAP + httpx-ntlm."""
-        import xml.etree.ElementTree as ET
+        """Synchronous EWS inbox fetch over the mailbox's shared ``EWSSession``.
 
-        try:
-            from httpx_ntlm import HttpNtlmAuth
-        except ImportError:
-            logger.error("httpx_ntlm_not_installed")
-            return []
-
-        from koda2.modules.account.validators import _normalize_ews_server, _discover_ews_servers
-
-        server = _normalize_ews_server(credentials["server"])
-        username = credentials["username"]
-        password = credentials["password"]
-        email_addr = credentials["email"]
-
-        # Build NTLM auth with domain prefix
-        user = username
-        if "\\" not in user and "@" not in user:
-            domain = email_addr.split("@")[-1].split(".")[0].upper() if "@" in email_addr else ""
-            if domain:
-                user = f"{domain}\\{username}"
+        FindItem is paged with ``IndexedPageItemView`` and each page is
+        parsed as it streams in, one message at a time.
+        """
+        from koda2.modules.account.ews import TYPES_NS, EWSSession
+        from koda2.modules.account.validators import _discover_ews_servers
 
-        auth = HttpNtlmAuth(user, password)
-        ews_url = f"https://{server}/EWS/Exchange.asmx"
-        headers = {"Content-Type": "text/xml; charset=utf-8"}
+        session = EWSSession.for_account(
+            credentials["server"], credentials["username"], credentials["password"], credentials["email"],
+            discover=_discover_ews_servers,
+        )
 
         # Build restriction for unread-only
         restriction_xml = ""
@@ -721,15 +819,8 @@ class EmailService:
         </t:IsEqualTo>
       </m:Restriction>"""
 
-        soap = f"""<?xml version="1.0" encoding="utf-8"?>
-<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"
-               xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
-  <soap:Header>
-    <t:RequestServerVersion Version="Exchange2016"/>
-  </soap:Header>
-  <soap:Body>
-    <m:FindItem Traversal="Shallow">
+        def _body(view: str) -> str:
+            return f"""<m:FindItem Traversal="Shallow">
       <m:ItemShape>
         <t:BaseShape>Default</t:BaseShape>
         <t:AdditionalProperties>
@@ -743,7 +834,7 @@ class EmailService:
           <t:FieldURI FieldURI="item:Body"/>
         </t:AdditionalProperties>
       </m:ItemShape>
-      <m:IndexedPageItemView MaxEntriesReturned="{limit}" Offset="0" BasePoint="Beginning"/>
+      {view}
       <m:SortOrder>
         <t:FieldOrder Order="Descending">
           <t:FieldURI FieldURI="item:DateTimeReceived"/>
@@ -753,119 +844,381 @@ class EmailService:
       <m:ParentFolderIds>
         <t:DistinguishedFolderId Id="inbox"/>
       </m:ParentFolderIds>
-    </m:FindItem>
-  </soap:Body>
-</soap:Envelope>"""
-
-        # Try configured server first, autodiscover if it fails
-        resp = None
-        for srv in [server] + _discover_ews_servers(server, email_addr):
-            url = f"https://{srv}/EWS/Exchange.asmx"
-            try:
-                with httpx.Client(verify=True, timeout=30) as client:
-                    resp = client.post(url, content=soap, headers=headers, auth=auth)
-                if resp.status_code == 200:
-                    ews_url = url
-                    break
-            except Exception:
-                continue
+    </m:FindItem>"""
 
-        if resp is None or resp.status_code != 200:
-            logger.error("ews_email_fetch_http_failed", server=server)
+        try:
+            emails = [
+                self._ews_message(msg, account_name)
+                for msg in session.find_items(_body, f"{{{TYPES_NS}}}Message", limit=limit)
+            ]
+        except (RuntimeError, httpx.HTTPError) as exc:
+            logger.error("ews_email_fetch_http_failed", server=session.server, error=str(exc))
             return []
 
-        # Parse response
-        ns = {
-            "t": "http://schemas.microsoft.com/exchange/services/2006/types",
-            "m": "http://schemas.microsoft.com/exchange/services/2006/messages",
-        }
-        root = ET.fromstring(resp.text)
-        messages = root.findall(".//t:Message", ns)
-
-        emails: list[EmailMessage] = []
-        for msg in messages:
-            def _text(tag: str) -> str:
-                el = msg.find(f"t:{tag}", ns)
-                return el.text if el is not None and el.text else ""
-
-            # Parse sender
-            sender_name = ""
-            sender_email = ""
-            from_name = msg.find(".//t:From/t:Mailbox/t:Name", ns)
-            from_email = msg.find(".//t:From/t:Mailbox/t:EmailAddress", ns)
-            if from_name is not None and from_name.text:
-                sender_name = from_name.text
-            if from_email is not None and from_email.text:
-                sender_email = from_email.text
-
-            # Parse recipients
-            recipients = []
-            for recip in msg.findall(".//t:ToRecipients/t:Mailbox", ns):
-                e = recip.find("t:EmailAddress", ns)
-                if e is not None and e.text:
-                    recipients.append(e.text)
-
-            # Parse CC
-            cc = []
-            for recip in msg.findall(".//t:CcRecipients/t:Mailbox", ns):
-                e = recip.find("t:EmailAddress", ns)
-                if e is not None and e.text:
-                    cc.append(e.text)
-
-            # Parse date
-            date_str = _text("DateTimeReceived")
-            try:
-                date = dt.datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                date = dt.datetime.now(dt.UTC)
-
-            # Parse read status
-            is_read = _text("IsRead").lower() == "true"
-
-            # Parse attachments flag
-            has_attachments = _text("HasAttachments").lower() == "true"
-
-            # Parse ItemId
-            item_id_el = msg.find("t:ItemId", ns)
-            item_id = item_id_el.get("Id", "") if item_id_el is not None else ""
-
-            # Parse body
-            body_text = ""
-            body_html = ""
-            body_el = msg.find("t:Body", ns)
-            if body_el is not None and body_el.text:
-                body_type = body_el.get("BodyType", "Text")
-                if body_type == "HTML":
-                    body_html = body_el.text
-                else:
-                    body_text = body_el.text
-
-            sender_display = f"{sender_name} <{sender_email}>" if sender_email else sender_name
-
-            attachments = []
-            if has_attachments:
-                attachments = [EmailAttachment(filename="(attachment)", content_type="application/octet-stream")]
-
-            emails.append(EmailMessage(
-                provider=EmailProvider.EWS,
-                provider_id=item_id,
-                account_name=account_name,
-                subject=_text("Subject"),
-                sender=sender_display,
-                sender_name=sender_name,
-                recipients=recipients,
-                cc=cc,
-                body_text=body_text,
-                body_html=body_html,
-                is_read=is_read,
-                attachments=attachments,
-                date=date,
-                folder="INBOX",
-            ))
-
         logger.info("ews_emails_fetched", account=account_name, count=len(emails))
         return emails
 
+    @staticmethod
+    def _ews_message(msg, account_name: str) -> EmailMessage:
+        """Build an EmailMessage from one EWS ``t:Message`` element."""
+        ns = {"t": "http://schemas.microsoft.com/exchange/services/2006/types"}
+
+        def _text(tag: str) -> str:
+            el = msg.find(f"t:{tag}", ns)
+            return el.text if el is not None and el.text else ""
+
+        # Parse sender
+        sender_name = ""
+        sender_email = ""
+        from_name = msg.find(".//t:From/t:Mailbox/t:Name", ns)
+        from_email = msg.find(".//t:From/t:Mailbox/t:EmailAddress", ns)
+        if from_name is not None and from_name.text:
+            sender_name = from_name.text
+        if from_email is not None and from_email.text:
+            sender_email = from_email.text
+
+        # Parse recipients
+        recipients = []
+        for recip in msg.findall(".//t:ToRecipients/t:Mailbox", ns):
+            e = recip.find("t:EmailAddress", ns)
+            if e is not None and e.text:
+                recipients.append(e.text)
+
+        # Parse CC
+        cc = []
+        for recip in msg.findall(".//t:CcRecipients/t:Mailbox", ns):
+            e = recip.find("t:EmailAddress", ns)
+            if e is not None and e.text:
+                cc.append(e.text)
+
+        # Parse date
+        date_str = _text("DateTimeReceived")
+        try:
+            date = dt.datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        except (ValueError, AttributeError):
+            date = dt.datetime.now(dt.UTC)
+
+        # Parse ItemId
+        item_id_el = msg.find("t:ItemId", ns)
+        item_id = item_id_el.get("Id", "") if item_id_el is not None else ""
+
+        # Parse body
+        body_text = ""
+        body_html = ""
+        body_el = msg.find("t:Body", ns)
+        if body_el is not None and body_el.text:
+            body_type = body_el.get("BodyType", "Text")
+            if body_type == "HTML":
+                body_html = body_el.text
+            else:
+                body_text = body_el.text
+
+        sender_display = f"{sender_name} <{sender_email}>" if sender_email else sender_name
+
+        attachments = []
+        if _text("HasAttachments").lower() == "true":
+            attachments = [EmailAttachment(filename="(attachment)", content_type="application/octet-stream")]
+
+        return EmailMessage(
+            provider=EmailProvider.EWS,
+            provider_id=item_id,
+            account_name=account_name,
+            subject=_text("Subject"),
+            sender=sender_display,
+            sender_name=sender_name,
+            recipients=recipients,
+            cc=cc,
+            body_text=body_text,
+            body_html=body_html,
+            is_read=_text("IsRead").lower() == "true",
+            attachments=attachments,
+            date=date,
+            folder="INBOX",
+        )
+
+    # ── Local Mail Store ─────────────────────────────────────────────
+
+    async def sync_mail(self, max_age: Optional[dt.timedelta] = None) -> dict[str, int]:
+        """Bring the local store up to date with every IMAP, Gmail and Graph inbox.
+
+        Only what changed since an account's stored sync state is fetched
+        (see ``store``); accounts are synced concurrently. Accounts synced
+        within ``max_age`` are skipped. Returns account name -> changes
+        applied, or -1 on failure.
+        """
+        if not self._account_service:
+            return {}
+        accounts = [a for a in await self._get_email_accounts() if a.provider in SYNCED_PROVIDERS]
+
+        async def _sync(account: Any) -> Optional[int]:
+            async with self._sync_locks.setdefault(account.name, asyncio.Lock()):
+                try:
+                    # Read under the lock: a sync that just finished moved the state on
+                    state = await self._store.get_state(account.name, SYNC_FOLDER)
+                    if max_age is not None and state is not None and self._fresh(state, max_age):
+                        return None
+                    return await self._sync_account(account, state)
+                except Exception as exc:
+                    logger.error("mail_sync_failed", account=account.name, error=str(exc))
+                    return -1
+
+        counts = await asyncio.gather(*(_sync(account) for account in accounts))
+        results = {account.name: count for account, count in zip(accounts, counts) if count is not None}
+        if results:
+            logger.info("mail_sync_complete", results=results)
+        return results
+
+    @staticmethod
+    def _fresh(state: EmailSyncState, max_age: dt.timedelta) -> bool:
+        return dt.datetime.utcnow() - state.synced_at <= max_age
+
+    async def _sync_account(self, account: Any, state: Optional[EmailSyncState]) -> int:
+        """Fetch one account's inbox changes and apply them to the store."""
+        credentials = self._account_service.decrypt_credentials(account)
+        if account.provider == ProviderType.IMAP.value:
+            known = await self._store.uids(account.name, SYNC_FOLDER)
+            delta = await asyncio.to_thread(
+                self._imap_run, credentials,
+                lambda conn: self._imap_delta(conn, account.name, SYNC_FOLDER, state, known),
+            )
+        elif account.provider == ProviderType.GOOGLE.value:
+            delta = await asyncio.to_thread(self._gmail_delta, credentials, account.name, state)
+        else:
+            delta = await self._graph_delta(credentials, account.name, state)
+        return await self._store.apply(account.name, SYNC_FOLDER, delta)
+
+    def _imap_list(self, conn: imaplib.IMAP4, uids: list[int], account_name: str, folder: str) -> list[EmailMessage]:
+        """Header-first listing of ``uids``, ``FETCH_BATCH`` at a time.
+
+        Text parts up to ``SYNC_BODY_MAX_BYTES`` come along (never
+        attachments), so the stored messages can be searched by body.
+        """
+        messages = []
+        for i in range(0, len(uids), self.FETCH_BATCH):
+            _, data = conn.uid("FETCH", uid_set(uids[i:i + self.FETCH_BATCH]), LIST_ITEMS)
+            batch = [self._imap_message(m, account_name, folder) for m in parse_listing(data)]
+            small = [m for m in batch if m.body_part and m.body_part.size <= self.SYNC_BODY_MAX_BYTES]
+            if small:
+                self._set_bodies(small, self._imap_bodies(conn, small))
+            messages.extend(batch)
+        return messages
+
+    def _imap_delta(
+        self,
+        conn: imaplib.IMAP4,
+        account_name: str,
+        folder: str,
+        state: Optional[EmailSyncState],
+        known: set[int],
+    ) -> MailDelta:
+        """What changed in an IMAP folder since ``state``.
+
+        - new messages: UIDs from the stored ``UIDNEXT`` on
+        - flag changes: with CONDSTORE, ``CHANGEDSINCE`` the stored
+          ``HIGHESTMODSEQ`` (nothing at all if it didn't move); without,
+          the flags of every stored message
+        - expunges: only looked for when ``EXISTS`` doesn't add up to the
+          stored count plus the new messages
+
+        A changed ``UIDVALIDITY`` (or no state) means a full sync of the
+        newest ``INITIAL_MESSAGES``.
+        """
+        typ, data = conn.select(folder, readonly=True)
+        if typ != "OK":
+            raise RuntimeError(f"Cannot select {folder}: {data}")
+        exists = int(data[0] or 0)
+
+        def _code(name: str) -> Optional[int]:
+            _, values = conn.response(name)
+            try:
+                return int(values[-1]) if values and values[-1] is not None else None
+            except ValueError:
+                return None
+
+        uidvalidity, uidnext, modseq = _code("UIDVALIDITY"), _code("UIDNEXT"), _code("HIGHESTMODSEQ")
+        new_state = {"uidvalidity": uidvalidity, "uidnext": uidnext, "highestmodseq": modseq, "message_count": exists}
+
+        def _search(criteria: str) -> list[int]:
+            _, found = conn.uid("SEARCH", None, criteria)
+            return sorted(int(uid) for uid in (found[0] or b"").split()) if found and found[0] else []
+
+        if state is None or state.uidvalidity != uidvalidity or state.uidnext is None:
+            uids = _search("ALL")[-self.INITIAL_MESSAGES:] if exists else []
+            return MailDelta(
+                messages=self._imap_list(conn, uids, account_name, folder), state=new_state, full=True,
+            )
+
+        delta = MailDelta(state=new_state)
+        new_uids: list[int] = []
+        if uidnext != state.uidnext:
+            # "n:*" also matches the highest UID when it is below n
+            new_uids = [uid for uid in _search(f"UID {state.uidnext}:*") if uid >= state.uidnext]
+            delta.messages = self._imap_list(conn, new_uids[-self.INITIAL_MESSAGES:], account_name, folder)
+
+        if known:
+            span = f"{min(known)}:{max(known)}"
+            changed = None
+            if modseq is not None and state.highestmodseq is not None:
+                if modseq != state.highestmodseq:
+                    _, changed = conn.uid("FETCH", span, "(UID FLAGS)", f"(CHANGEDSINCE {state.highestmodseq})")
+            else:
+                _, changed = conn.uid("FETCH", span, "(UID FLAGS)")
+            for values in parse_fetch(changed or []):
+                if "UID" in values and int(values["UID"]) in known:
+                    flags = values.get("FLAGS") or []
+                    delta.read_flags[str(values["UID"])] = "\\Seen" in flags
+
+            if exists != (state.message_count or 0) + len(new_uids):
+                remaining = set(_search(f"UID {span}"))
+                delta.deleted = [str(uid) for uid in sorted(known - remaining)]
+                for uid in delta.deleted:
+                    delta.read_flags.pop(uid, None)
+        return delta
+
+    def _gmail_delta(self, credentials: dict, account_name: str, state: Optional[EmailSyncState]) -> MailDelta:
+        """What changed in a Gmail inbox since the stored ``historyId``.
+
+        An expired ``historyId`` (404 from ``history.list``) or no state
+        means a full sync of the newest ``INITIAL_MESSAGES``.
+        """
+        users = self._gmail_service(credentials).users()
+        if state is not None and state.sync_token:
+            try:
+                return self._gmail_history(users, account_name, state.sync_token)
+            except Exception as exc:
+                if _http_status(exc) != 404:
+                    raise
+                logger.info("gmail_history_expired", account=account_name)
+
+        history_id = users.getProfile(userId="me").execute()["historyId"]
+        result = users.messages().list(
+            userId="me", labelIds=[SYNC_FOLDER], maxResults=self.INITIAL_MESSAGES,
+        ).execute()
+        messages = [
+            self._gmail_message(users.messages().get(userId="me", id=m["id"], format="full").execute(), account_name)
+            for m in result.get("messages", [])
+        ]
+        return MailDelta(messages=messages, state={"sync_token": str(history_id)}, full=True)
+
+    def _gmail_history(self, users: Any, account_name: str, start_history_id: str) -> MailDelta:
+        """Replay ``history.list`` from ``start_history_id`` onto the inbox."""
+        added: set[str] = set()
+        deleted: set[str] = set()
+        read_flags: dict[str, bool] = {}
+        history_id, page_token = start_history_id, None
+        while True:
+            response = users.history().list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"],
+                pageToken=page_token,
+            ).execute()
+            for record in response.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    if SYNC_FOLDER in item["message"].get("labelIds", []):
+                        added.add(item["message"]["id"])
+                        deleted.discard(item["message"]["id"])
+                for item in record.get("messagesDeleted", []):
+                    added.discard(item["message"]["id"])
+                    deleted.add(item["message"]["id"])
+                for item in record.get("labelsAdded", []):
+                    if SYNC_FOLDER in item["labelIds"]:
+                        added.add(item["message"]["id"])
+                        deleted.discard(item["message"]["id"])
+                    if "UNREAD" in item["labelIds"]:
+                        read_flags[item["message"]["id"]] = False
+                for item in record.get("labelsRemoved", []):
+                    if SYNC_FOLDER in item["labelIds"]:
+                        added.discard(item["message"]["id"])
+                        deleted.add(item["message"]["id"])
+                    if "UNREAD" in item["labelIds"]:
+                        read_flags[item["message"]["id"]] = True
+            history_id = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        messages = []
+        for message_id in sorted(added):
+            try:
+                msg = users.messages().get(userId="me", id=message_id, format="full").execute()
+            except Exception as exc:
+                if _http_status(exc) != 404:
+                    raise
+                deleted.add(message_id)  # gone again before we got to it
+                continue
+            messages.append(self._gmail_message(msg, account_name))
+        fetched = {m.provider_id for m in messages}
+        return MailDelta(
+            messages=messages,
+            read_flags={mid: read for mid, read in read_flags.items() if mid not in fetched and mid not in deleted},
+            deleted=sorted(deleted),
+            state={"sync_token": str(history_id)},
+        )
+
+    async def _graph_delta(self, credentials: dict, account_name: str, state: Optional[EmailSyncState]) -> MailDelta:
+        """What changed in a Graph inbox since the stored delta link.
+
+        An expired link (410) or no state means a full sync of the last
+        ``INITIAL_DAYS``.
+        """
+        since = (dt.datetime.now(dt.UTC) - dt.timedelta(days=self.INITIAL_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        initial = (
+            f"{GRAPH_URL}/me/mailFolders/inbox/messages/delta",
+            {"$select": GRAPH_SELECT, "$filter": f"receivedDateTime ge {since}"},
+        )
+        incremental = state is not None and bool(state.sync_token)
+        url, params = (state.sync_token, None) if incremental else initial
+        delta = MailDelta(full=not incremental)
+
+        async with httpx.AsyncClient(timeout=30) as client:
+            token = await self._msgraph_token(client, credentials)
+            headers = {"Authorization": f"Bearer {token}", "Prefer": f"odata.maxpagesize={self.FETCH_BATCH}"}
+            while url:
+                resp = await client.get(url, params=params, headers=headers)
+                if resp.status_code == 410 and not delta.full:
+                    logger.info("msgraph_delta_expired", account=account_name)
+                    (url, params), delta = initial, MailDelta(full=True)
+                    continue
+                resp.raise_for_status()
+                data = resp.json()
+                for msg in data.get("value", []):
+                    if "@removed" in msg:
+                        delta.deleted.append(msg["id"])
+                    elif "receivedDateTime" in msg:
+                        delta.messages.append(self._graph_message(msg, account_name))
+                    elif "isRead" in msg:
+                        delta.read_flags[msg["id"]] = msg["isRead"]
+                url, params = data.get("@odata.nextLink"), None
+                if "@odata.deltaLink" in data:
+                    delta.state = {"sync_token": data["@odata.deltaLink"]}
+        return delta
+
+    async def search_emails(
+        self,
+        query: str = "",
+        sender: Optional[str] = None,
+        since: Optional[dt.datetime] = None,
+        before: Optional[dt.datetime] = None,
+        folder: Optional[str] = None,
+        is_read: Optional[bool] = None,
+        has_attachments: Optional[bool] = None,
+        limit: int = 20,
+    ) -> list[MailSearchHit]:
+        """Search the IMAP, Gmail and Graph inboxes locally (see ``MailStore.search``).
+
+        Syncs first if the store is older than ``MAIL_SYNC_MAX_AGE``; EWS
+        mail isn't stored and so isn't searched.
+        """
+        await self.sync_mail(max_age=self.MAIL_SYNC_MAX_AGE)
+        synced = [a.name for a in await self._get_email_accounts() if a.provider in SYNCED_PROVIDERS]
+        if not synced:
+            return []
+        return await self._store.search(
+            query, sender=sender, since=since, before=before, folder=folder, is_read=is_read,
+            has_attachments=has_attachments, account_names=synced, limit=limit,
+        )
+
     # ── Unified Email Operations ─────────────────────────────────────
 
     async def fetch_all_emails(
@@ -873,34 +1226,87 @@ class EmailService:
         unread_only: bool = False,
         limit: int = 50,
     ) -> list[EmailMessage]:
-        """Fetch emails from all configured providers."""
-        all_emails = []
-
-        # IMAP accounts
-        emails = await self.fetch_emails(EmailFilter(unread_only=unread_only, limit=limit))
-        all_emails.extend(emails)
-
-        # MS Graph accounts
-        emails = await self.fetch_emails_msgraph(unread_only=unread_only, limit=limit)
-        all_emails.extend(emails)
-
-        # Gmail accounts
+        """Fetch emails from all configured providers.
+
+        IMAP, Gmail and Graph inboxes are read from the local store, after
+        syncing the ones older than ``MAIL_SYNC_MAX_AGE``; EWS is read live,
+        concurrently. Everything shares one ``FETCH_DEADLINE``: a sync still
+        running then carries on in the background and the store is read as
+        it is, and a provider that hasn't answered is left out. If the
+        store can't be used, every provider is read live.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.FETCH_DEADLINE
+        sync = self._start_sync(self.MAIL_SYNC_MAX_AGE)
+        ews = asyncio.ensure_future(self.fetch_emails_ews(unread_only=unread_only, limit=limit))
+        # wait() doesn't cancel: a sync that overruns the deadline keeps going
+        await asyncio.wait({sync}, timeout=max(0.0, deadline - loop.time()))
+        try:
+            if sync.done() and sync.exception() is not None:
+                raise sync.exception()
+            synced = [a.name for a in await self._get_email_accounts() if a.provider in SYNCED_PROVIDERS]
+            stored = await self._store.query(
+                unread_only=unread_only, limit=limit, account_names=synced,
+            ) if synced else []
+        except Exception as exc:
+            logger.warning("mail_store_read_failed", error=str(exc))
+            ews.cancel()
+            return await self._fetch_all_live(unread_only, limit)
+
+        if not sync.done():
+            logger.warning("mail_sync_over_deadline", deadline=self.FETCH_DEADLINE)
+        live = await self._gather_until({"ews": ews}, deadline)
+        return self._merge_newest_first([stored, *live.values()], limit)
+
+    async def _fetch_all_live(self, unread_only: bool, limit: int) -> list[EmailMessage]:
+        """Query every provider directly and concurrently, bypassing the store."""
+        deadline = asyncio.get_running_loop().time() + self.FETCH_DEADLINE
         gmail_query = "is:unread" if unread_only else ""
-        emails = await self.fetch_emails_gmail(query=gmail_query, max_results=limit)
-        all_emails.extend(emails)
-
-        # EWS (Exchange) accounts
-        emails = await self.fetch_emails_ews(unread_only=unread_only, limit=limit)
-        all_emails.extend(emails)
-
-        # Sort by date (newest first), handle mixed tz-aware/naive
-        def _sort_key(e):
-            d = e.date
-            if d and d.tzinfo is not None:
-                d = d.replace(tzinfo=None)
-            return d or dt.datetime.min
-        all_emails.sort(key=_sort_key, reverse=True)
-        return all_emails[:limit]
+        results = await self._gather_until({
+            "imap": self.fetch_emails(EmailFilter(unread_only=unread_only, limit=limit)),
+            "msgraph": self.fetch_emails_msgraph(unread_only=unread_only, limit=limit),
+            "gmail": self.fetch_emails_gmail(query=gmail_query, max_results=limit),
+            "ews": self.fetch_emails_ews(unread_only=unread_only, limit=limit),
+        }, deadline)
+        return self._merge_newest_first(list(results.values()), limit)
+
+    def _start_sync(self, max_age: Optional[dt.timedelta]) -> asyncio.Task:
+        """Start ``sync_mail``, or join the one already running."""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self.sync_mail(max_age=max_age))
+        return self._sync_task
+
+    async def _gather_until(self, calls: dict[str, Awaitable], deadline: float) -> dict[str, list[EmailMessage]]:
+        """Await provider reads concurrently until the loop time ``deadline``.
+
+        Returns the results of those that finished; the rest are cancelled
+        and, like failures, logged and left out.
+        """
+        tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+        _, pending = await asyncio.wait(
+            tasks.values(), timeout=max(0.0, deadline - asyncio.get_running_loop().time()),
+        )
+        results: dict[str, list[EmailMessage]] = {}
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                logger.warning("email_provider_timeout", provider=name, deadline=self.FETCH_DEADLINE)
+            elif task.exception() is not None:
+                logger.error("email_provider_failed", provider=name, error=str(task.exception()))
+            else:
+                results[name] = task.result()
+        return results
+
+    @staticmethod
+    def _merge_newest_first(sources: list[list[EmailMessage]], limit: int) -> list[EmailMessage]:
+        """Merge per-provider lists newest first, stopping at ``limit``.
+
+        Each list is put in order first (linear for the already ordered
+        runs providers return, one per account); a heap then merges them
+        lazily, so only ``limit`` messages are ever compared.
+        """
+        runs = [sorted(source, key=_date_key, reverse=True) for source in sources if source]
+        return list(itertools.islice(heapq.merge(*runs, key=_date_key, reverse=True), limit))
 
     # ── Attachment Operations ────────────────────────────────────────
 
@@ -912,7 +1318,13 @@ class EmailService:
         output_dir: str = "data/attachments",
     ) -> Optional[str]:
         """Download an email attachment to disk.
-        
+
+        Only the attachment's own MIME part is fetched, in ranges of
+        ``AttachmentStore.CHUNK`` bytes (``BODY.PEEK[<section>]<offset.length>``)
+        that are decoded straight to disk, so memory stays flat whatever
+        the file's size. Content is stored once per SHA-256; an attachment
+        downloaded before is served from the store without a fetch.
+
         Returns:
             Path to downloaded file, or None if failed.
         """
@@ -929,50 +1341,56 @@ class EmailService:
             return None
 
         try:
-            credentials = self._account_service.decrypt_credentials(account)
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            def _download():
-                conn = self._connect_imap(
-                    credentials["server"],
-                    credentials.get("port", 993),
-                    credentials["username"],
-                    credentials["password"],
-                    credentials.get("use_ssl", True),
-                )
-                try:
-                    conn.select("INBOX")
-                    _, data = conn.fetch(message_id, "(RFC822)")
-                    if not data or not data[0]:
-                        return None
+            # message_id is the UID that header listings report as provider_id
+            stored = await self._attachments.find(account.name, SYNC_FOLDER, message_id, attachment_filename)
+            if stored is None:
+                credentials = self._account_service.decrypt_credentials(account)
 
-                    raw = data[0][1]
-                    msg = email_lib.message_from_bytes(raw)
-
-                    for part in msg.walk():
-                        cd = str(part.get("Content-Disposition", ""))
-                        if "attachment" in cd:
-                            filename = part.get_filename()
-                            if filename == attachment_filename:
-                                file_path = output_path / filename
-                                payload = part.get_payload(decode=True)
-                                if payload:
-                                    file_path.write_bytes(payload)
-                                    return str(file_path)
-                    return None
-                finally:
-                    conn.logout()
+                def _download(conn: imaplib.IMAP4) -> Optional[tuple[BlobWriter, BodyPart]]:
+                    conn.select(SYNC_FOLDER)
+                    return self._imap_attachment(conn, message_id, attachment_filename)
 
-            result = await asyncio.to_thread(_download)
-            if result:
-                logger.info("attachment_downloaded", path=result, filename=attachment_filename)
-            return result
+                result = await asyncio.to_thread(self._imap_run, credentials, _download)
+                if result is None:
+                    return None
+                writer, part = result
+                stored = await self._attachments.add(
+                    writer, account.name, SYNC_FOLDER, message_id, attachment_filename,
+                    content_type=part.content_type, part=part.section,
+                )
+            path = str(await asyncio.to_thread(self._attachments.export, stored, output_dir, attachment_filename))
+            logger.info("attachment_downloaded", path=path, filename=attachment_filename, sha256=stored.sha256)
+            return path
 
         except Exception as exc:
             logger.error("download_attachment_failed", error=str(exc))
             return None
 
+    def _imap_attachment(
+        self, conn: imaplib.IMAP4, uid: str, filename: str,
+    ) -> Optional[tuple[BlobWriter, BodyPart]]:
+        """Stream a message's attachment (selected folder) into a blob writer, one range at a time."""
+        _, data = conn.uid("FETCH", uid, "(UID BODYSTRUCTURE)")
+        part = next((p for m in parse_listing(data) for p in m.parts if p.filename == filename), None)
+        if part is None:
+            return None
+        writer = self._attachments.writer()
+        try:
+            decoder = TransferDecoder(part.encoding)
+            chunk, offset = self._attachments.CHUNK, 0
+            while True:
+                _, data = conn.uid("FETCH", uid, f"(UID BODY.PEEK[{part.section}]<{offset}.{chunk}>)")
+                payload = next((body_item(v) for v in parse_fetch(data) if "UID" in v), None) or b""
+                writer.write(decoder.feed(payload))
+                offset += len(payload)
+                if len(payload) < chunk or (part.size and offset >= part.size):
+                    break
+            writer.write(decoder.flush())
+        except BaseException:
+            writer.discard()
+            raise
+        return writer, part
+
     async def download_attachment_msgraph(
         self,
         message_id: str,
@@ -981,7 +1399,11 @@ class EmailService:
         account_id: Optional[str] = None,
         output_dir: str = "data/attachments",
     ) -> Optional[str]:
-        """Download an attachment using Microsoft Graph API."""
+        """Download an attachment using Microsoft Graph API.
+
+        The raw content (``/$value``) is streamed to the attachment store
+        rather than decoded from a JSON ``contentBytes`` field in memory.
+        """
         if not self._account_service:
             return None
 
@@ -995,33 +1417,25 @@ class EmailService:
             return None
 
         try:
-            credentials = self._account_service.decrypt_credentials(account)
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            # Get token
-            token_url = f"https://login.microsoftonline.com/{credentials['tenant_id']}/oauth2/v2.0/token"
-            async with httpx.AsyncClient() as client:
-                token_resp = await client.post(token_url, data={
-                    "client_id": credentials["client_id"],
-                    "client_secret": credentials["client_secret"],
-                    "scope": "https://graph.microsoft.com/.default",
-                    "grant_type": "client_credentials",
-                })
-                token_resp.raise_for_status()
-                token = token_resp.json()["access_token"]
-
-                # Download attachment
-                url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}/attachments/{attachment_id}"
-                resp = await client.get(url, headers={"Authorization": f"Bearer {token}"})
-                resp.raise_for_status()
-                data = resp.json()
-
-                content = base64.b64decode(data.get("contentBytes", ""))
-                file_path = output_path / filename
-                file_path.write_bytes(content)
-                logger.info("msgraph_attachment_downloaded", path=str(file_path))
-                return str(file_path)
+            stored = await self._attachments.find(account.name, SYNC_FOLDER, message_id, filename)
+            if stored is None:
+                credentials = self._account_service.decrypt_credentials(account)
+                async with httpx.AsyncClient() as client:
+                    token = await self._msgraph_token(client, credentials)
+                    url = f"{GRAPH_URL}/me/messages/{message_id}/attachments/{attachment_id}/$value"
+                    with self._attachments.writer() as writer:
+                        async with client.stream("GET", url, headers={"Authorization": f"Bearer {token}"}) as resp:
+                            resp.raise_for_status()
+                            content_type = resp.headers.get("content-type", "application/octet-stream")
+                            async for chunk in resp.aiter_bytes(self._attachments.CHUNK):
+                                writer.write(chunk)
+                        stored = await self._attachments.add(
+                            writer, account.name, SYNC_FOLDER, message_id, filename,
+                            content_type=content_type.split(";")[0].strip(), part=attachment_id,
+                        )
+            path = str(await asyncio.to_thread(self._attachments.export, stored, output_dir, filename))
+            logger.info("msgraph_attachment_downloaded", path=path, sha256=stored.sha256)
+            return path
 
         except Exception as exc:
             logger.error("msgraph_download_attachment_failed", error=str(exc))
@@ -1035,7 +1449,12 @@ class EmailService:
         account_id: Optional[str] = None,
         output_dir: str = "data/attachments",
     ) -> Optional[str]:
-        """Download an attachment using Gmail API."""
+        """Download an attachment using Gmail API.
+
+        ``attachments.get`` only returns the whole attachment as one
+        base64 string, so this goes through memory once; the result is
+        still stored by content like the other providers.
+        """
         if not self._account_service:
             return None
 
@@ -1049,31 +1468,30 @@ class EmailService:
             return None
 
         try:
-            credentials = self._account_service.decrypt_credentials(account)
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            from google.oauth2.credentials import Credentials
-            from googleapiclient.discovery import build
-
-            def _download():
-                creds = Credentials.from_authorized_user_file(credentials["credentials_file"])
-                service = build("gmail", "v1", credentials=creds, cache_discovery=False)
-
-                attachment = service.users().messages().attachments().get(
-                    userId="me",
-                    messageId=message_id,
-                    id=attachment_id,
-                ).execute()
-
-                data = base64.urlsafe_b64decode(attachment["data"])
-                file_path = output_path / filename
-                file_path.write_bytes(data)
-                return str(file_path)
+            stored = await self._attachments.find(account.name, SYNC_FOLDER, message_id, filename)
+            if stored is None:
+                credentials = self._account_service.decrypt_credentials(account)
 
-            result = await asyncio.to_thread(_download)
-            logger.info("gmail_attachment_downloaded", path=result)
-            return result
+                def _download() -> BlobWriter:
+                    service = self._gmail_service(credentials)
+                    attachment = service.users().messages().attachments().get(
+                        userId="me",
+                        messageId=message_id,
+                        id=attachment_id,
+                    ).execute()
+                    data = base64.urlsafe_b64decode(attachment["data"])
+                    writer = self._attachments.writer()
+                    writer.write(data)
+                    return writer
+
+                writer = await asyncio.to_thread(_download)
+                stored = await self._attachments.add(
+                    writer, account.name, SYNC_FOLDER, message_id, filename,
+                    content_type=self._guess_mime_type(filename), part=attachment_id,
+                )
+            path = str(await asyncio.to_thread(self._attachments.export, stored, output_dir, filename))
+            logger.info("gmail_attachment_downloaded", path=path, sha256=stored.sha256)
+            return path
 
         except Exception as exc:
             logger.error("gmail_download_attachment_failed", error=str(exc))
@@ -1287,3 +1705,16 @@ class EmailService:
         except Exception as exc:
             logger.error("gmail_send_with_attachments_failed", error=str(exc))
             return False
+
+
+def _date_key(message: EmailMessage) -> dt.datetime:
+    # Sort by date, handle mixed tz-aware/naive
+    d = message.date
+    if d and d.tzinfo is not None:
+        d = d.replace(tzinfo=None)
+    return d or dt.datetime.min
+
+
+def _http_status(exc: Exception) -> Optional[int]:
+    """HTTP status of a googleapiclient ``HttpError`` (None for other errors)."""
+    return getattr(getattr(exc, "resp", None), "status", None)
@@ -0,0 +1,436 @@
+"""Local message store for synced mail.
+
+Inbox reads are served from here; ``EmailService.sync_mail`` keeps it
+current by applying only what changed on the server since the last sync:
+
+- IMAP: per-folder ``UIDVALIDITY``/``UIDNEXT`` pick out new messages,
+  CONDSTORE ``HIGHESTMODSEQ`` the ones whose flags changed, and the
+  ``EXISTS`` count whether anything was expunged
+- Gmail: ``history.list`` from the stored ``historyId``
+- Microsoft Graph: ``messages/delta`` from the stored delta link
+
+The provider's position is kept per account and folder in
+``EmailSyncState``; a ``MailDelta`` carries one sync's changes.
+
+``MailStore.search`` queries the SQLite FTS5 index ``email_fts`` over
+subject, sender, recipients and text body (migration 5 creates it, with
+triggers that keep it in step); other databases fall back to ``LIKE``.
+The index is keyed on ``search_rowid``, not the implicit rowid, which
+``VACUUM`` is free to renumber on a table with a string primary key.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Index, Integer, String, Text, case, column, delete, literal_column,
+    or_, select, table, text, update,
+)
+
+from koda2.database import Base, UTCDateTime, dialect_insert, get_session
+from koda2.logging_config import get_logger
+from koda2.modules.email.models import EmailAttachment, EmailBodyPart, EmailMessage, EmailProvider
+
+logger = get_logger(__name__)
+
+
+class StoredEmail(Base):
+    """One synced message (headers, flags and, once loaded, its text body)."""
+
+    __tablename__ = "email_messages"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    account_name = Column(String(255), nullable=False)
+    folder = Column(String(255), nullable=False, default="INBOX")
+    provider = Column(String(50), nullable=True)
+    provider_id = Column(String(512), nullable=False)
+    subject = Column(String(1024), nullable=False, default="")
+    sender = Column(String(512), nullable=False, default="")
+    sender_name = Column(String(255), nullable=False, default="")
+    recipients_json = Column(Text, nullable=False, default="[]")
+    cc_json = Column(Text, nullable=False, default="[]")
+    date = Column(UTCDateTime, nullable=False)
+    is_read = Column(Boolean, nullable=False, default=False)
+    attachments_json = Column(Text, nullable=False, default="[]")
+    size = Column(Integer, nullable=False, default=0)
+    body_text = Column(Text, nullable=False, default="")
+    body_html = Column(Text, nullable=False, default="")
+    body_loaded = Column(Boolean, nullable=False, default=True)
+    body_part_json = Column(Text, nullable=True)
+    in_reply_to = Column(String(1024), nullable=False, default="")
+    references = Column(Text, nullable=False, default="")
+    synced_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
+    search_rowid = Column(Integer, nullable=True)  # email_fts key, set by its insert trigger
+
+    __table_args__ = (
+        Index("ix_email_messages_key", "account_name", "folder", "provider_id", unique=True),
+        Index("ix_email_messages_search_rowid", "search_rowid", unique=True),
+        Index("ix_email_messages_date", "date"),
+        Index("ix_email_messages_account_date", "account_name", "folder", "date"),
+    )
+
+
+class EmailSyncState(Base):
+    """How far an account's folder has been synced.
+
+    IMAP folders track ``uidvalidity``/``uidnext``/``highestmodseq`` and
+    the server's message count; Gmail and Graph keep their change token
+    (``historyId`` or delta link) in ``sync_token``.
+    """
+
+    __tablename__ = "email_sync_state"
+
+    account_name = Column(String(255), primary_key=True)
+    folder = Column(String(255), primary_key=True)
+    uidvalidity = Column(BigInteger, nullable=True)
+    uidnext = Column(BigInteger, nullable=True)
+    highestmodseq = Column(BigInteger, nullable=True)
+    message_count = Column(Integer, nullable=True)
+    sync_token = Column(Text, nullable=True)
+    synced_at = Column(UTCDateTime, nullable=False, default=dt.datetime.utcnow)
+
+
+# Columns a sync rewrites; the body columns only when the incoming body is loaded
+CONTENT_FIELDS = (
+    "provider", "subject", "sender", "sender_name", "recipients_json", "cc_json", "date", "is_read",
+    "attachments_json", "size", "in_reply_to", "references", "synced_at",
+)
+BODY_FIELDS = ("body_text", "body_html", "body_part_json")
+STATE_FIELDS = ("uidvalidity", "uidnext", "highestmodseq", "message_count", "sync_token")
+
+# Values per ... IN (...) list in one statement
+_CHUNK = 500
+
+FTS_TABLE = "email_fts"
+# Fields a query matches, in the order snippets are taken from
+SEARCH_FIELDS = ("body_text", "subject", "sender_name", "sender", "recipients_json")
+HIGHLIGHT = ("[", "]")
+# Characters of context in a search snippet
+SNIPPET_CHARS = 160
+
+
+@dataclass
+class MailDelta:
+    """What changed in one account folder since its stored sync state.
+
+    ``full`` means the stored folder is out of date as a whole (new
+    ``UIDVALIDITY``, expired token, first sync): its rows are replaced by
+    ``messages``.
+    """
+
+    messages: list[EmailMessage] = field(default_factory=list)
+    read_flags: dict[str, bool] = field(default_factory=dict)  # provider_id -> is_read
+    deleted: list[str] = field(default_factory=list)
+    state: dict[str, Any] = field(default_factory=dict)  # STATE_FIELDS to store
+    full: bool = False
+
+    @property
+    def changes(self) -> int:
+        return len(self.messages) + len(self.read_flags) + len(self.deleted)
+
+
+@dataclass
+class MailSearchHit:
+    """A search result: the message and a highlighted excerpt of where it matched."""
+
+    message: EmailMessage
+    snippet: str
+
+
+def _query_terms(query: str) -> list[tuple[str, bool]]:
+    """Split a search query into ``(text, is_phrase)`` terms; ``"..."`` quotes a phrase."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|([^\s"]+)', query or ""):
+        value = phrase or word
+        if re.search(r"\w", value):
+            terms.append((value, bool(phrase)))
+    return terms
+
+
+def _match_expression(terms: list[tuple[str, bool]]) -> str:
+    """FTS5 MATCH string: every term required, single words matched as prefixes."""
+    return " ".join('"' + value.replace('"', '""') + '"' + ("" if phrase else "*") for value, phrase in terms)
+
+
+def _snippet(row: StoredEmail, terms: list[tuple[str, bool]], highlight: tuple[str, str]) -> str:
+    """Excerpt of the first field where a term occurs, with every term occurrence highlighted.
+
+    Built in Python for the returned rows only: FTS5's ``snippet()`` would
+    run for every match before the ``LIMIT``.
+    """
+    patterns = [re.escape(value).replace(r"\ ", r"\s+") + ("" if phrase else r"\w*") for value, phrase in terms]
+    pattern = re.compile(r"(?<!\w)(?:" + "|".join(patterns) + ")", re.IGNORECASE) if patterns else None
+    value = next(
+        (getattr(row, name) for name in SEARCH_FIELDS if pattern and pattern.search(getattr(row, name) or "")),
+        row.body_text or row.subject,
+    )
+    match = pattern.search(value) if pattern else None
+    start = max(0, match.start() - SNIPPET_CHARS // 3) if match else 0
+    end = min(len(value), start + SNIPPET_CHARS)
+    excerpt = " ".join(value[start:end].split())
+    if pattern:
+        excerpt = pattern.sub(lambda m: highlight[0] + m.group(0) + highlight[1], excerpt)
+    return ("…" if start else "") + excerpt + ("…" if end < len(value) else "")
+
+
+def _naive_utc(value: dt.datetime) -> dt.datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(dt.UTC).replace(tzinfo=None)
+
+
+class MailStore:
+    """Reads and writes the local message store."""
+
+    def __init__(self) -> None:
+        self._fts: Optional[bool] = None  # whether the FTS5 index exists, once checked
+
+    @staticmethod
+    def _to_db(message: EmailMessage) -> dict:
+        return {
+            "account_name": message.account_name,
+            "folder": message.folder,
+            "provider": message.provider.value if message.provider else None,
+            "provider_id": message.provider_id,
+            "subject": message.subject,
+            "sender": message.sender,
+            "sender_name": message.sender_name,
+            "recipients_json": json.dumps([r for r in message.recipients if r]),
+            "cc_json": json.dumps([c for c in message.cc if c]),
+            "date": _naive_utc(message.date),
+            "is_read": message.is_read,
+            "attachments_json": json.dumps([
+                {"filename": a.filename, "content_type": a.content_type, "size": a.size, "section": a.section}
+                for a in message.attachments
+            ]),
+            "size": message.size,
+            "body_text": message.body_text,
+            "body_html": message.body_html,
+            "body_loaded": message.body_loaded,
+            "body_part_json": message.body_part.model_dump_json() if message.body_part else None,
+            "in_reply_to": message.in_reply_to,
+            "references": message.references,
+            "synced_at": dt.datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _from_db(row: StoredEmail) -> EmailMessage:
+        return EmailMessage(
+            id=row.id,
+            provider=EmailProvider(row.provider) if row.provider else None,
+            provider_id=row.provider_id,
+            account_name=row.account_name,
+            subject=row.subject,
+            sender=row.sender,
+            sender_name=row.sender_name,
+            recipients=json.loads(row.recipients_json or "[]"),
+            cc=json.loads(row.cc_json or "[]"),
+            body_text=row.body_text or "",
+            body_html=row.body_html or "",
+            attachments=[EmailAttachment(**a) for a in json.loads(row.attachments_json or "[]")],
+            is_read=row.is_read,
+            folder=row.folder,
+            in_reply_to=row.in_reply_to or "",
+            references=row.references or "",
+            date=row.date.replace(tzinfo=dt.UTC),
+            size=row.size or 0,
+            body_loaded=row.body_loaded,
+            body_part=EmailBodyPart.model_validate_json(row.body_part_json) if row.body_part_json else None,
+        )
+
+    async def apply(self, account_name: str, folder: str, delta: MailDelta) -> int:
+        """Apply one sync's changes and record the new sync state, in one transaction.
+
+        Returns the number of messages written, re-flagged or deleted.
+        """
+        async with get_session() as session:
+            if delta.full:
+                await session.execute(delete(StoredEmail).where(
+                    StoredEmail.account_name == account_name, StoredEmail.folder == folder,
+                ))
+            ids = sorted(set(delta.deleted))
+            for i in range(0, len(ids), _CHUNK):
+                await session.execute(delete(StoredEmail).where(
+                    StoredEmail.account_name == account_name, StoredEmail.folder == folder,
+                    StoredEmail.provider_id.in_(ids[i:i + _CHUNK]),
+                ))
+
+            rows = []
+            for message in delta.messages:
+                message.account_name, message.folder = account_name, folder
+                rows.append({"id": message.id, **self._to_db(message)})
+            if rows:
+                stmt = dialect_insert(session.bind, StoredEmail)
+                loaded = stmt.excluded.body_loaded
+                set_ = {key: stmt.excluded[key] for key in CONTENT_FIELDS}
+                # A header-only update must not wipe a body loaded earlier
+                set_.update({key: case((loaded, stmt.excluded[key]), else_=StoredEmail.__table__.c[key])
+                             for key in BODY_FIELDS})
+                set_["body_loaded"] = case((loaded, True), else_=StoredEmail.body_loaded)
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=["account_name", "folder", "provider_id"], set_=set_,
+                ), rows)
+
+            for is_read in (True, False):
+                flagged = sorted(pid for pid, read in delta.read_flags.items() if read is is_read)
+                for i in range(0, len(flagged), _CHUNK):
+                    await session.execute(update(StoredEmail).where(
+                        StoredEmail.account_name == account_name, StoredEmail.folder == folder,
+                        StoredEmail.provider_id.in_(flagged[i:i + _CHUNK]),
+                    ).values(is_read=is_read))
+
+            state = dialect_insert(session.bind, EmailSyncState).values(
+                account_name=account_name, folder=folder, synced_at=dt.datetime.utcnow(),
+                **{key: delta.state.get(key) for key in STATE_FIELDS},
+            )
+            await session.execute(state.on_conflict_do_update(
+                index_elements=["account_name", "folder"],
+                set_={key: state.excluded[key] for key in (*STATE_FIELDS, "synced_at")},
+            ))
+
+        logger.info(
+            "mail_store_synced", account=account_name, folder=folder, full=delta.full,
+            written=len(rows), flagged=len(delta.read_flags), deleted=len(ids),
+        )
+        return delta.changes
+
+    async def save_bodies(self, messages: list[EmailMessage]) -> int:
+        """Store bodies loaded after the fact (``EmailService.load_bodies``)."""
+        saved = 0
+        async with get_session() as session:
+            for message in messages:
+                result = await session.execute(update(StoredEmail).where(
+                    StoredEmail.account_name == message.account_name,
+                    StoredEmail.folder == message.folder,
+                    StoredEmail.provider_id == message.provider_id,
+                ).values(body_text=message.body_text, body_html=message.body_html, body_loaded=message.body_loaded))
+                saved += result.rowcount or 0
+        return saved
+
+    async def query(
+        self,
+        unread_only: bool = False,
+        limit: int = 50,
+        account_names: Optional[list[str]] = None,
+        folder: str = "INBOX",
+    ) -> list[EmailMessage]:
+        """Stored messages, newest first."""
+        stmt = select(StoredEmail).where(StoredEmail.folder == folder)
+        if unread_only:
+            stmt = stmt.where(StoredEmail.is_read.is_(False))
+        if account_names is not None:
+            stmt = stmt.where(StoredEmail.account_name.in_(account_names))
+        stmt = stmt.order_by(StoredEmail.date.desc()).limit(limit)
+        async with get_session() as session:
+            rows = (await session.execute(stmt)).scalars().all()
+        return [self._from_db(row) for row in rows]
+
+    async def search(
+        self,
+        query: str = "",
+        sender: Optional[str] = None,
+        since: Optional[dt.datetime] = None,
+        before: Optional[dt.datetime] = None,
+        folder: Optional[str] = None,
+        is_read: Optional[bool] = None,
+        has_attachments: Optional[bool] = None,
+        account_names: Optional[list[str]] = None,
+        limit: int = 20,
+        highlight: tuple[str, str] = HIGHLIGHT,
+    ) -> list[MailSearchHit]:
+        """Search stored messages, best match first (newest first without a query).
+
+        Every word of ``query`` must match, as a prefix, somewhere in the
+        subject, sender, recipients or text body; ``"quoted words"`` match
+        as a phrase. The filters narrow by sender (substring of address or
+        name), date range, folder, read flag and attachments. Matches are
+        wrapped in ``highlight`` in the snippet.
+        """
+        terms = _query_terms(query)
+        filters = []
+        if sender:
+            filters.append(or_(
+                StoredEmail.sender.icontains(sender, autoescape=True),
+                StoredEmail.sender_name.icontains(sender, autoescape=True),
+            ))
+        if since:
+            filters.append(StoredEmail.date >= _naive_utc(since))
+        if before:
+            filters.append(StoredEmail.date < _naive_utc(before))
+        if folder:
+            filters.append(StoredEmail.folder == folder)
+        if is_read is not None:
+            filters.append(StoredEmail.is_read.is_(is_read))
+        if has_attachments is not None:
+            filters.append(StoredEmail.attachments_json != "[]" if has_attachments
+                           else StoredEmail.attachments_json == "[]")
+        if account_names is not None:
+            filters.append(StoredEmail.account_name.in_(account_names))
+
+        async with get_session() as session:
+            if terms and await self._has_fts(session):
+                # Rank to the limit on IDs alone, then load just those rows
+                fts = literal_column(FTS_TABLE)
+                ids = list((await session.execute(
+                    select(StoredEmail.id)
+                    .join(table(FTS_TABLE, column("rowid")),
+                          literal_column(f"{FTS_TABLE}.rowid") == StoredEmail.search_rowid)
+                    .where(fts.op("MATCH")(_match_expression(terms)), *filters)
+                    .order_by(literal_column(f"{FTS_TABLE}.rank"))
+                    .limit(limit)
+                )).scalars())
+                found = {row.id: row for row in (await session.execute(
+                    select(StoredEmail).where(StoredEmail.id.in_(ids))
+                )).scalars()} if ids else {}
+                rows = [found[id_] for id_ in ids if id_ in found]
+            else:
+                stmt = select(StoredEmail).where(*filters)
+                for term, _ in terms:
+                    stmt = stmt.where(or_(*(
+                        getattr(StoredEmail, name).icontains(term, autoescape=True) for name in SEARCH_FIELDS
+                    )))
+                rows = (await session.execute(stmt.order_by(StoredEmail.date.desc()).limit(limit))).scalars().all()
+        return [MailSearchHit(self._from_db(row), _snippet(row, terms, highlight)) for row in rows]
+
+    async def _has_fts(self, session) -> bool:
+        if self._fts is None:
+            self._fts = session.bind.dialect.name == "sqlite" and (await session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE},
+            )).first() is not None
+        return self._fts
+
+    async def uids(self, account_name: str, folder: str) -> set[int]:
+        """Provider IDs of an IMAP folder's stored messages, as UIDs."""
+        async with get_session() as session:
+            result = await session.execute(select(StoredEmail.provider_id).where(
+                StoredEmail.account_name == account_name, StoredEmail.folder == folder,
+            ))
+            return {int(pid) for pid in result.scalars() if pid.isdigit()}
+
+    async def get_states(self) -> dict[tuple[str, str], EmailSyncState]:
+        """Every recorded sync state, keyed by (account, folder)."""
+        async with get_session() as session:
+            rows = (await session.execute(select(EmailSyncState))).scalars().all()
+        return {(row.account_name, row.folder): row for row in rows}
+
+    async def get_state(self, account_name: str, folder: str = "INBOX") -> Optional[EmailSyncState]:
+        async with get_session() as session:
+            return await session.get(EmailSyncState, (account_name, folder))
+
+    async def clear(self, account_name: Optional[str] = None) -> None:
+        """Drop stored messages and sync state (all or for one account)."""
+        async with get_session() as session:
+            messages = delete(StoredEmail)
+            states = delete(EmailSyncState)
+            if account_name:
+                messages = messages.where(StoredEmail.account_name == account_name)
+                states = states.where(EmailSyncState.account_name == account_name)
+            await session.execute(messages)
+            await session.execute(states)
+        logger.info("mail_store_cleared", account=account_name or "all")
@@ -5,7 +5,7 @@ from __future__ import annotations
 import datetime as dt
 from decimal import Decimal
 from enum import StrEnum
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 from pydantic import BaseModel, Field
 
@@ -82,10 +82,18 @@ class Venue(BaseModel):
     notes: str = ""
     internal_location: bool = True  # Is this our own location?
     
-    def is_available(self, start: dt.datetime, end: dt.datetime) -> bool:
-        """Check if venue is available for given time slot."""
-        # This would check against actual calendar
-        return True  # Placeholder
+    def is_available(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        busy: Iterable[tuple[dt.datetime, dt.datetime]] = (),
+    ) -> bool:
+        """Check the time slot against the venue's busy periods.
+
+        ``busy`` comes from ``FacilityService``: room bookings plus the
+        free/busy index of the venue's ``availability_calendar``.
+        """
+        return not any(b_start < end and b_end > start for b_start, b_end in busy)
 
 
 class CateringItem(BaseModel):
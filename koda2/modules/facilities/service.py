@@ -4,21 +4,26 @@ from __future__ import annotations
 
 import datetime as dt
 from decimal import Decimal
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
+from koda2.config import ensure_local_tz
 from koda2.logging_config import get_logger
 from koda2.modules.facilities.models import (
     CateringItem, CateringOrder, CateringType, EquipmentType, 
     RoomBooking, Venue, VenueType
 )
 
+if TYPE_CHECKING:
+    from koda2.modules.calendar.freebusy import FreeBusyIndex
+
 logger = get_logger(__name__)
 
 
 class FacilityService:
     """Service for managing venues, catering, and meeting logistics."""
     
-    def __init__(self) -> None:
+    def __init__(self, freebusy: Optional[FreeBusyIndex] = None) -> None:
+        self._freebusy = freebusy
         self._venues: dict[str, Venue] = {}
         self._bookings: dict[str, RoomBooking] = {}
         self._catering_orders: dict[str, CateringOrder] = {}
@@ -107,7 +112,39 @@ class FacilityService:
             
         return sorted(venues, key=lambda v: v.max_capacity)
         
-    def find_suitable_venue(
+    async def venue_busy(
+        self,
+        venue: Venue,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> list[tuple[dt.datetime, dt.datetime]]:
+        """Busy periods of a venue overlapping ``start``–``end``.
+
+        Active bookings count including their setup and cleanup time. If
+        the venue has an ``availability_calendar`` (a calendar account
+        name), its events are taken from the calendar free/busy index.
+        """
+        start, end = ensure_local_tz(start), ensure_local_tz(end)
+        busy = []
+        for booking in self.get_bookings_for_venue(venue.id):
+            b_start = ensure_local_tz(booking.start_time) - dt.timedelta(minutes=booking.setup_time_minutes)
+            b_end = ensure_local_tz(booking.end_time) + dt.timedelta(minutes=booking.cleanup_time_minutes)
+            if b_start < end and b_end > start:
+                busy.append((b_start, b_end))
+        if self._freebusy and venue.availability_calendar:
+            try:
+                intervals = await self._freebusy.busy(start, end, [venue.availability_calendar])
+                busy.extend((i.start, i.end) for i in intervals)
+            except Exception as exc:
+                logger.warning("venue_freebusy_failed", venue=venue.name, error=str(exc))
+        return sorted(busy)
+
+    async def is_venue_available(self, venue: Venue, start: dt.datetime, end: dt.datetime) -> bool:
+        """Check a venue's bookings and calendar for the time slot."""
+        busy = await self.venue_busy(venue, start, end)
+        return venue.is_available(ensure_local_tz(start), ensure_local_tz(end), busy)
+
+    async def find_suitable_venue(
         self,
         num_people: int,
         requirements: list[EquipmentType],
@@ -120,7 +157,7 @@ class FacilityService:
             if venue.max_capacity >= num_people:
                 # Check equipment requirements
                 has_equipment = all(eq in venue.equipment for eq in requirements)
-                if has_equipment and venue.is_available(start_time, end_time):
+                if has_equipment and await self.is_venue_available(venue, start_time, end_time):
                     suitable.append(venue)
         return suitable
         
@@ -142,7 +179,7 @@ class FacilityService:
         if not venue:
             raise ValueError(f"Venue not found: {venue_id}")
             
-        if not venue.is_available(start_time, end_time):
+        if not await self.is_venue_available(venue, start_time, end_time):
             raise ValueError(f"Venue {venue.name} is not available at requested time")
             
         if expected_attendees > venue.max_capacity:
@@ -338,7 +375,7 @@ class FacilityService:
     ) -> dict[str, Any]:
         """Complete meeting setup with venue and catering."""
         # Find and book venue
-        venues = self.find_suitable_venue(num_attendees, venue_requirements, start_time, end_time)
+        venues = await self.find_suitable_venue(num_attendees, venue_requirements, start_time, end_time)
         
         if not venues:
             raise ValueError("No suitable venue found for the meeting")
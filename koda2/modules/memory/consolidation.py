@@ -0,0 +1,333 @@
+"""Scheduled memory consolidation: decay, de-duplication, archiving and compaction.
+
+``memory_entries`` and the vector index only ever grow during normal use.
+This job keeps both bounded:
+
+1. **Decay** — entries whose importance, decayed by age since the last
+   update, falls below a floor are soft-deleted and their vectors dropped.
+2. **Merge** — near-duplicate facts (same user and category, cosine distance
+   under a threshold) are clustered; the most important/newest entry is kept.
+3. **Archive** — conversation vectors older than N days are written to
+   gzipped JSONL cold storage and removed from the hot index. The raw turns
+   stay in the ``conversations`` table.
+4. **Compact** — the Chroma collection is rebuilt so deletions are
+   physically reclaimed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import gzip
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+
+from koda2.config import get_settings
+from koda2.database import get_session
+from koda2.logging_config import get_logger
+from koda2.modules.memory.models import Conversation, MemoryEntry, UserProfile
+from koda2.modules.memory.vector_store import index_size_bytes
+
+if TYPE_CHECKING:
+    from koda2.modules.memory.vector_store import VectorMemory
+
+logger = get_logger(__name__)
+
+# Categories that never decay away on their own
+PROTECTED_CATEGORIES = frozenset({"important"})
+
+# Rows handled per DB/vector round-trip
+BATCH_SIZE = 500
+
+
+@dataclass
+class ConsolidationReport:
+    """Outcome of a single consolidation run."""
+
+    started_at: str = field(default_factory=lambda: dt.datetime.now(dt.UTC).isoformat())
+    duration_seconds: float = 0.0
+    decayed: int = 0
+    merged: int = 0
+    archived_conversations: int = 0
+    archive_file: Optional[str] = None
+    compacted: bool = False
+    vectors_before: int = 0
+    vectors_after: int = 0
+    index_bytes_before: int = 0
+    index_bytes_after: int = 0
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable dict."""
+        return asdict(self)
+
+
+def _as_utc(value: Optional[dt.datetime]) -> Optional[dt.datetime]:
+    """SQLite hands back naive datetimes; treat them as UTC."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=dt.UTC)
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def load_archive_watermark(archive_dir: Path) -> Optional[dt.datetime]:
+    """The cutoff up to which conversation vectors were moved to the archive, if any.
+
+    Conversations created before it live only in the cold archive files;
+    anything rebuilding the vector collection must leave them out.
+    """
+    path = archive_dir / "state.json"
+    if not path.exists():
+        return None
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8")).get("conversations_archived_until")
+        return dt.datetime.fromisoformat(raw) if raw else None
+    except (ValueError, OSError):
+        return None
+
+
+class MemoryConsolidator:
+    """Runs the consolidation pipeline against a vector store."""
+
+    def __init__(
+        self,
+        vector: VectorMemory,
+        archive_dir: Optional[Path] = None,
+        half_life_days: Optional[float] = None,
+        decay_floor: Optional[float] = None,
+        duplicate_distance: Optional[float] = None,
+        archive_after_days: Optional[int] = None,
+    ) -> None:
+        settings = get_settings()
+        self.vector = vector
+        self.archive_dir = archive_dir or settings.data_dir / "memory_archive"
+        self.half_life_days = half_life_days or settings.memory_decay_half_life_days
+        self.decay_floor = decay_floor if decay_floor is not None else settings.memory_decay_floor
+        self.duplicate_distance = (
+            duplicate_distance if duplicate_distance is not None
+            else settings.memory_duplicate_distance
+        )
+        self.archive_after_days = archive_after_days or settings.memory_conversation_archive_days
+
+    async def run(self, compact: bool = True, force_compact: bool = False) -> ConsolidationReport:
+        """Execute all consolidation stages and return a report."""
+        started = time.monotonic()
+        now = dt.datetime.now(dt.UTC)
+        report = ConsolidationReport(started_at=now.isoformat())
+        report.vectors_before = await asyncio.to_thread(self.vector.count)
+        report.index_bytes_before = await asyncio.to_thread(index_size_bytes)
+
+        report.decayed = await self.decay(now)
+        report.merged = await self.merge_duplicates()
+        report.archived_conversations, report.archive_file = await self.archive_conversations(now)
+
+        removed = report.decayed + report.merged + report.archived_conversations
+        if compact and (removed or force_compact):
+            await asyncio.to_thread(self.vector.compact)
+            report.compacted = True
+
+        report.vectors_after = await asyncio.to_thread(self.vector.count)
+        report.index_bytes_after = await asyncio.to_thread(index_size_bytes)
+        report.duration_seconds = round(time.monotonic() - started, 3)
+        logger.info("memory_consolidated", **report.to_dict())
+        return report
+
+    # ── Decay ────────────────────────────────────────────────────────
+
+    def decayed_importance(self, importance: float, last_touched: dt.datetime, now: dt.datetime) -> float:
+        """Exponential decay of importance by days since the entry was last touched."""
+        age_days = max((now - last_touched).total_seconds(), 0.0) / 86400
+        return importance * 0.5 ** (age_days / self.half_life_days)
+
+    async def decay(self, now: dt.datetime) -> int:
+        """Soft-delete entries whose decayed importance dropped below the floor."""
+        async with get_session() as session:
+            result = await session.execute(
+                select(
+                    MemoryEntry.id, MemoryEntry.category, MemoryEntry.importance,
+                    MemoryEntry.created_at, MemoryEntry.updated_at,
+                ).where(MemoryEntry.active == True)  # noqa: E712
+            )
+            expired: list[str] = []
+            for row in result:
+                if row.category in PROTECTED_CATEGORIES:
+                    continue
+                touched = _as_utc(row.updated_at or row.created_at) or now
+                if self.decayed_importance(row.importance or 0.0, touched, now) < self.decay_floor:
+                    expired.append(row.id)
+
+            for batch in _chunks(expired):
+                await session.execute(
+                    update(MemoryEntry).where(MemoryEntry.id.in_(batch)).values(active=False)
+                )
+
+        for batch in _chunks(expired):
+            await asyncio.to_thread(self.vector.delete_many, batch)
+        if expired:
+            logger.info("memory_decayed", count=len(expired))
+        return len(expired)
+
+    # ── Near-duplicate merge ─────────────────────────────────────────
+
+    async def merge_duplicates(self) -> int:
+        """Cluster near-identical facts per (user, category) and keep one of each."""
+        async with get_session() as session:
+            result = await session.execute(
+                select(
+                    MemoryEntry.id, MemoryEntry.user_id, MemoryEntry.category,
+                    MemoryEntry.importance, MemoryEntry.created_at,
+                ).where(MemoryEntry.active == True)  # noqa: E712
+            )
+            groups: dict[tuple[str, str], list] = {}
+            for row in result:
+                groups.setdefault((row.user_id, row.category), []).append(row)
+
+        dropped: list[str] = []
+        boosts: dict[str, float] = {}
+        for rows in groups.values():
+            if len(rows) < 2:
+                continue
+            # Most important first, newest breaks ties — the keeper of each cluster
+            rows.sort(
+                key=lambda r: (r.importance or 0.0, _as_utc(r.created_at) or dt.datetime.min.replace(tzinfo=dt.UTC)),
+                reverse=True,
+            )
+            vectors = await asyncio.to_thread(
+                self.vector.get, [r.id for r in rows], True,
+            )
+            by_id = {v["id"]: v["embedding"] for v in vectors if v.get("embedding")}
+            rows = [r for r in rows if r.id in by_id]
+            if len(rows) < 2:
+                continue
+            for keeper, members in self._cluster(rows, by_id):
+                dropped.extend(m.id for m in members)
+                top = max((m.importance or 0.0) for m in members)
+                if top > (keeper.importance or 0.0):
+                    boosts[keeper.id] = top
+
+        if not dropped:
+            return 0
+        async with get_session() as session:
+            for batch in _chunks(dropped):
+                await session.execute(
+                    update(MemoryEntry).where(MemoryEntry.id.in_(batch)).values(active=False)
+                )
+            for entry_id, importance in boosts.items():
+                await session.execute(
+                    update(MemoryEntry).where(MemoryEntry.id == entry_id).values(importance=importance)
+                )
+        for batch in _chunks(dropped):
+            await asyncio.to_thread(self.vector.delete_many, batch)
+        logger.info("memory_duplicates_merged", count=len(dropped))
+        return len(dropped)
+
+    def _cluster(self, rows: list, embeddings: dict[str, list[float]]) -> list[tuple]:
+        """Greedy threshold clustering over cosine similarity.
+
+        ``rows`` must be sorted by keeper priority. Returns (keeper, members)
+        pairs where ``members`` excludes the keeper and is never empty.
+        """
+        matrix = np.asarray([embeddings[r.id] for r in rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        min_similarity = 1.0 - self.duplicate_distance
+
+        assigned = np.zeros(len(rows), dtype=bool)
+        clusters = []
+        for i in range(len(rows)):
+            if assigned[i]:
+                continue
+            assigned[i] = True
+            candidates = np.flatnonzero(~assigned)
+            if candidates.size == 0:
+                break
+            similarity = matrix[candidates] @ matrix[i]
+            hits = candidates[similarity >= min_similarity]
+            if hits.size:
+                assigned[hits] = True
+                clusters.append((rows[i], [rows[j] for j in hits]))
+        return clusters
+
+    # ── Conversation archive ─────────────────────────────────────────
+
+    def _state_path(self) -> Path:
+        return self.archive_dir / "state.json"
+
+    def _load_watermark(self) -> Optional[dt.datetime]:
+        return load_archive_watermark(self.archive_dir)
+
+    def _save_watermark(self, until: dt.datetime) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._state_path().write_text(
+            json.dumps({"conversations_archived_until": until.isoformat()}),
+            encoding="utf-8",
+        )
+
+    async def archive_conversations(self, now: dt.datetime) -> tuple[int, Optional[str]]:
+        """Move conversation vectors older than the cutoff into cold storage.
+
+        A watermark in ``state.json`` records how far previous runs got, so
+        each run only scans the newly-aged slice of the table.
+        """
+        cutoff = now - dt.timedelta(days=self.archive_after_days)
+        watermark = self._load_watermark()
+        if watermark is not None and watermark >= cutoff:
+            return 0, None
+
+        archive_path = self.archive_dir / f"conversations-{now:%Y%m%d%H%M%S}.jsonl.gz"
+        archived = 0
+        last_seen: Optional[tuple[dt.datetime, str]] = None
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        with gzip.open(archive_path, "wt", encoding="utf-8") as out:
+            while True:
+                async with get_session() as session:
+                    stmt = (
+                        select(Conversation.id, Conversation.created_at, UserProfile.user_id)
+                        .join(UserProfile, UserProfile.id == Conversation.profile_id)
+                        .where(Conversation.created_at < cutoff)
+                        .order_by(Conversation.created_at, Conversation.id)
+                        .limit(BATCH_SIZE)
+                    )
+                    if watermark is not None:
+                        stmt = stmt.where(Conversation.created_at >= watermark)
+                    if last_seen is not None:
+                        ts, last_id = last_seen
+                        stmt = stmt.where(
+                            (Conversation.created_at > ts)
+                            | ((Conversation.created_at == ts) & (Conversation.id > last_id))
+                        )
+                    rows = list(await session.execute(stmt))
+                if not rows:
+                    break
+                last_seen = (rows[-1].created_at, rows[-1].id)
+
+                created = {r.id: r.created_at for r in rows}
+                vectors = await asyncio.to_thread(self.vector.get, list(created), True)
+                for v in vectors:
+                    stamp = _as_utc(created.get(v["id"]))
+                    out.write(json.dumps({
+                        "id": v["id"],
+                        "content": v["content"],
+                        "metadata": v["metadata"],
+                        "created_at": stamp.isoformat() if stamp else None,
+                        "embedding": v["embedding"],
+                    }) + "\n")
+                await asyncio.to_thread(self.vector.delete_many, [v["id"] for v in vectors])
+                archived += len(vectors)
+
+        self._save_watermark(cutoff)
+        if not archived:
+            archive_path.unlink(missing_ok=True)
+            return 0, None
+        logger.info("conversation_vectors_archived", count=archived, file=str(archive_path))
+        return archived, str(archive_path)
@@ -5,11 +5,11 @@ from __future__ import annotations
 import datetime as dt
 from uuid import uuid4
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 from sqlalchemy.orm import relationship
 
-from koda2.database import Base
+from koda2.database import Base, UTCDateTime
 
 
 class UserProfile(Base):
@@ -27,8 +27,8 @@ class UserProfile(Base):
     preferences = Column(SQLiteJSON, default=dict)
     habits = Column(SQLiteJSON, default=dict)
     important_dates = Column(SQLiteJSON, default=dict)
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC))
-    updated_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC))
+    updated_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
 
     conversations = relationship("Conversation", back_populates="profile", cascade="all, delete-orphan")
     contacts = relationship("Contact", back_populates="profile", cascade="all, delete-orphan")
@@ -49,8 +49,8 @@ class Contact(Base):
     notes = Column(Text, default="")
     birthday = Column(String(16), default="")
     metadata_ = Column("metadata", SQLiteJSON, default=dict)
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC))
-    updated_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC))
+    updated_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
 
     profile = relationship("UserProfile", back_populates="contacts")
 
@@ -61,16 +61,20 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
-    profile_id = Column(String(36), ForeignKey("user_profiles.id"), nullable=False, index=True)
+    profile_id = Column(String(36), ForeignKey("user_profiles.id"), nullable=False)
     role = Column(String(32), nullable=False)
     content = Column(Text, nullable=False)
     channel = Column(String(64), default="api")
     tokens_used = Column(Integer, default=0)
     model = Column(String(128), default="")
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), index=True)
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), index=True)
 
     profile = relationship("UserProfile", back_populates="conversations")
 
+    __table_args__ = (
+        Index("ix_conversations_profile_created", profile_id, created_at.desc()),
+    )
+
 
 class MemoryEntry(Base):
     """Structured memory entries for searchable facts."""
@@ -78,11 +82,16 @@ class MemoryEntry(Base):
     __tablename__ = "memory_entries"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
-    user_id = Column(String(128), nullable=False, index=True)
+    user_id = Column(String(128), nullable=False)
     category = Column(String(64), nullable=False, index=True)
     content = Column(Text, nullable=False)
     importance = Column(Float, default=0.5)
     source = Column(String(128), default="")
     active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC))
-    updated_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC))
+    updated_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), onupdate=lambda: dt.datetime.now(dt.UTC))
+
+    __table_args__ = (
+        Index("ix_memory_entries_user_active_category_created", user_id, active, category, created_at),
+        Index("ix_memory_entries_active_updated", active, updated_at),
+    )
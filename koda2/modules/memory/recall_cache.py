@@ -0,0 +1,96 @@
+"""Short-lived per-user cache for semantic recall results.
+
+A single chat turn recalls near-identical queries several times (context
+building, auto-learn dedup, proactive prep suggestions). Each recall is a
+full embedding + HNSW search, so results are cached for a few seconds and
+dropped as soon as anything is written to the vector store for that user.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from koda2.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+RECALL_CACHE_TTL_SECONDS = 60.0
+RECALL_CACHE_MAX_ENTRIES = 128  # per user
+
+CacheKey = tuple[str, int, float]
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.casefold().split())
+
+
+class RecallCache:
+    """TTL + LRU cache of recall results, bucketed by user."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = RECALL_CACHE_TTL_SECONDS,
+        max_entries: int = RECALL_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._buckets: dict[Optional[str], OrderedDict[CacheKey, tuple[float, list[dict]]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, n: int, max_distance: float) -> CacheKey:
+        return (normalize_query(query), n, float(max_distance))
+
+    def get(self, user_id: Optional[str], key: CacheKey) -> Optional[list[dict]]:
+        """Return cached results or None on miss/expiry."""
+        bucket = self._buckets.get(user_id)
+        item = bucket.get(key) if bucket else None
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del bucket[key]
+            self.misses += 1
+            return None
+        bucket.move_to_end(key)
+        self.hits += 1
+        return list(item[1])
+
+    def put(self, user_id: Optional[str], key: CacheKey, results: list[dict]) -> None:
+        bucket = self._buckets.setdefault(user_id, OrderedDict())
+        bucket[key] = (time.monotonic() + self.ttl_seconds, list(results))
+        bucket.move_to_end(key)
+        while len(bucket) > self.max_entries:
+            bucket.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str]) -> None:
+        """Drop everything a write for ``user_id`` could have changed.
+
+        Unscoped (``user_id=None``) recalls search across every user, so
+        they are dropped on any write.
+        """
+        dropped = False
+        for key in (user_id, None):
+            if self._buckets.pop(key, None):
+                dropped = True
+        if dropped:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        if self._buckets:
+            self.invalidations += 1
+        self._buckets.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit-rate metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": sum(len(b) for b in self._buckets.values()),
+        }
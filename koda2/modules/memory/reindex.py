@@ -0,0 +1,326 @@
+"""Bulk rebuild of the ``executive_memory`` vector collection from SQL.
+
+Used after changing embedding models or Chroma versions. Rows from
+``memory_entries``, ``conversations`` and ``contacts`` are streamed in
+keyset-paginated batches, embedded in worker processes, written into a
+shadow collection and swapped in only once every source is complete.
+Conversations older than the consolidation archive watermark are left out:
+their vectors live in the cold archive, not the live collection.
+
+Progress is checkpointed after every batch, so an interrupted run resumes
+where it stopped instead of starting over. Run it with the server stopped:
+writes made during a rebuild land in the old collection and are lost on swap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from sqlalchemy import func, select
+
+from koda2.config import get_settings
+from koda2.database import get_session
+from koda2.logging_config import get_logger
+from koda2.modules.memory.consolidation import load_archive_watermark
+from koda2.modules.memory.models import Contact, Conversation, MemoryEntry, UserProfile
+from koda2.modules.memory.vector_store import VectorMemory, get_chroma_client
+
+logger = get_logger(__name__)
+
+Embedder = Callable[[list[str]], list[list[float]]]
+
+# Order matters only for progress output; each source has its own cursor
+SOURCES = ("memory_entries", "conversations", "contacts")
+
+DEFAULT_BATCH_SIZE = 256
+
+
+# ── Worker process side ──────────────────────────────────────────────
+
+_worker_embedder: Optional[Embedder] = None
+
+
+def _worker_init() -> None:
+    """Load the embedding model once per worker process."""
+    global _worker_embedder
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+    _worker_embedder = DefaultEmbeddingFunction()
+
+
+def _worker_embed(texts: list[str]) -> list[list[float]]:
+    assert _worker_embedder is not None, "worker not initialized"
+    return [[float(x) for x in vec] for vec in _worker_embedder(texts)]
+
+
+# ── Progress / checkpoint ────────────────────────────────────────────
+
+@dataclass
+class ReindexProgress:
+    """Running totals reported after each batch."""
+
+    source: str = ""
+    processed: int = 0
+    total: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ReindexCheckpoint:
+    """JSON file tracking the shadow collection and per-source cursors."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.shadow: str = ""
+        self.cursors: dict[str, str] = {}
+        self.done: list[str] = []
+        self.processed: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "ReindexCheckpoint":
+        cp = cls(path)
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            cp.shadow = data.get("shadow", "")
+            cp.cursors = data.get("cursors", {})
+            cp.done = data.get("done", [])
+            cp.processed = data.get("processed", 0)
+        return cp
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "shadow": self.shadow,
+            "cursors": self.cursors,
+            "done": self.done,
+            "processed": self.processed,
+        }), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+# ── Source queries ───────────────────────────────────────────────────
+
+def _page_stmt(source: str, after: Optional[str], limit: int, archived_until: Optional[dt.datetime] = None):
+    """Keyset-paginated query for one source, ordered by primary key.
+
+    ``archived_until`` leaves out conversations consolidation has archived.
+    """
+    if source == "memory_entries":
+        stmt = (
+            select(MemoryEntry.id, MemoryEntry.user_id, MemoryEntry.category,
+                   MemoryEntry.importance, MemoryEntry.content)
+            .where(MemoryEntry.active == True)  # noqa: E712
+        )
+        key = MemoryEntry.id
+    elif source == "conversations":
+        stmt = (
+            select(Conversation.id, UserProfile.user_id, Conversation.role,
+                   Conversation.channel, Conversation.content)
+            .join(UserProfile, UserProfile.id == Conversation.profile_id)
+        )
+        if archived_until is not None:
+            stmt = stmt.where(Conversation.created_at >= archived_until)
+        key = Conversation.id
+    elif source == "contacts":
+        stmt = (
+            select(Contact.id, UserProfile.user_id, Contact.name, Contact.email,
+                   Contact.company, Contact.notes)
+            .join(UserProfile, UserProfile.id == Contact.profile_id)
+        )
+        key = Contact.id
+    else:
+        raise ValueError(f"Unknown reindex source: {source}")
+    if after:
+        stmt = stmt.where(key > after)
+    return stmt.order_by(key).limit(limit)
+
+
+def _count_stmt(source: str, archived_until: Optional[dt.datetime] = None):
+    if source == "memory_entries":
+        return select(func.count()).select_from(MemoryEntry).where(MemoryEntry.active == True)  # noqa: E712
+    if source == "conversations":
+        stmt = select(func.count()).select_from(Conversation)
+        if archived_until is not None:
+            stmt = stmt.where(Conversation.created_at >= archived_until)
+        return stmt
+    return select(func.count()).select_from(Contact)
+
+
+def _to_documents(source: str, rows: list) -> tuple[list[str], list[str], list[dict]]:
+    """Map SQL rows to (ids, texts, metadatas) matching what MemoryService writes."""
+    ids, texts, metas = [], [], []
+    for r in rows:
+        if source == "memory_entries":
+            ids.append(r.id)
+            texts.append(r.content)
+            metas.append({"user_id": r.user_id, "category": r.category, "importance": r.importance})
+        elif source == "conversations":
+            ids.append(r.id)
+            texts.append(r.content)
+            metas.append({"user_id": r.user_id, "role": r.role, "channel": r.channel})
+        else:
+            ids.append(f"contact_{r.id}")
+            texts.append(f"{r.name} {r.email} {r.company} {r.notes}")
+            metas.append({"user_id": r.user_id, "type": "contact"})
+    return ids, texts, metas
+
+
+# ── Job ──────────────────────────────────────────────────────────────
+
+class MemoryReindexer:
+    """Rebuilds a vector collection from the relational tables."""
+
+    def __init__(
+        self,
+        collection_name: str = "executive_memory",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: Optional[int] = None,
+        embedder: Optional[Embedder] = None,
+        checkpoint_path: Optional[Path] = None,
+        on_progress: Optional[Callable[[ReindexProgress], None]] = None,
+        archive_dir: Optional[Path] = None,
+    ) -> None:
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.workers = max(1, (os.cpu_count() or 2) // 2) if workers is None else workers
+        self.embedder = embedder
+        self.checkpoint_path = checkpoint_path or get_settings().data_dir / "reindex_checkpoint.json"
+        self.on_progress = on_progress
+        self.archive_dir = archive_dir or get_settings().data_dir / "memory_archive"
+
+    async def count_rows(self) -> dict[str, int]:
+        """Return the number of rows each source will contribute."""
+        counts = {}
+        archived_until = load_archive_watermark(self.archive_dir)
+        async with get_session() as session:
+            for source in SOURCES:
+                counts[source] = (await session.execute(_count_stmt(source, archived_until))).scalar_one()
+        return counts
+
+    async def run(self, resume: bool = True) -> dict[str, Any]:
+        """Rebuild the collection and swap it in. Returns a summary."""
+        checkpoint = ReindexCheckpoint.load(self.checkpoint_path)
+        client = get_chroma_client()
+        if not resume or not checkpoint.shadow:
+            if checkpoint.shadow:
+                # A fresh start abandons the half-built shadow; don't leave it on disk
+                await asyncio.to_thread(self._drop_collection, client, checkpoint.shadow)
+            checkpoint.clear()
+            checkpoint = ReindexCheckpoint(self.checkpoint_path)
+            checkpoint.shadow = f"{self.collection_name}__reindex_{int(time.time())}"
+        checkpoint.save()
+
+        shadow = client.get_or_create_collection(
+            name=checkpoint.shadow, metadata={"hnsw:space": "cosine"},
+        )
+        counts = await self.count_rows()
+        progress = ReindexProgress(total=sum(counts.values()), processed=checkpoint.processed)
+        logger.info("memory_reindex_started", shadow=checkpoint.shadow, resumed=bool(checkpoint.processed),
+                    total=progress.total, workers=self.workers)
+
+        executor: Optional[Executor] = None
+        if self.workers > 0 and self.embedder is None:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_worker_init)
+        try:
+            for source in SOURCES:
+                if source in checkpoint.done:
+                    continue
+                progress.source = source
+                await self._reindex_source(source, shadow, checkpoint, progress, executor)
+                checkpoint.done.append(source)
+                checkpoint.save()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        await asyncio.to_thread(VectorMemory(self.collection_name).replace_with, checkpoint.shadow)
+        checkpoint.clear()
+        summary = {
+            "collection": self.collection_name,
+            "documents": progress.processed,
+            "sources": counts,
+            "seconds": round(progress.elapsed, 2),
+            "docs_per_second": round(progress.docs_per_second, 1),
+        }
+        logger.info("memory_reindex_complete", **summary)
+        return summary
+
+    async def _reindex_source(
+        self,
+        source: str,
+        shadow: Any,
+        checkpoint: ReindexCheckpoint,
+        progress: ReindexProgress,
+        executor: Optional[Executor],
+    ) -> None:
+        """Stream one table into the shadow collection.
+
+        Up to ``workers`` batches are embedding at any time while the next
+        page is being read, so the DB, the model and Chroma overlap.
+        """
+        loop = asyncio.get_running_loop()
+        archived_until = load_archive_watermark(self.archive_dir)
+        in_flight: list[tuple[asyncio.Future, list[str], list[str], list[dict], str]] = []
+        limit = max(1, self.workers) * 2
+        cursor = checkpoint.cursors.get(source)
+
+        async def _drain(keep: int) -> None:
+            while len(in_flight) > keep:
+                future, ids, texts, metas, last_id = in_flight.pop(0)
+                embeddings = await future
+                await asyncio.to_thread(
+                    shadow.upsert, ids=ids, documents=texts, metadatas=metas, embeddings=embeddings,
+                )
+                checkpoint.cursors[source] = last_id
+                checkpoint.processed += len(ids)
+                checkpoint.save()
+                progress.processed = checkpoint.processed
+                if self.on_progress:
+                    self.on_progress(progress)
+
+        while True:
+            async with get_session() as session:
+                rows = list(await session.execute(_page_stmt(source, cursor, self.batch_size, archived_until)))
+            if not rows:
+                break
+            cursor = rows[-1].id
+            ids, texts, metas = _to_documents(source, rows)
+            if executor is not None:
+                future = loop.run_in_executor(executor, _worker_embed, texts)
+            else:
+                future = asyncio.ensure_future(asyncio.to_thread(self._embed_inline, texts))
+            in_flight.append((future, ids, texts, metas, cursor))
+            await _drain(limit - 1)
+        await _drain(0)
+
+    @staticmethod
+    def _drop_collection(client: Any, name: str) -> None:
+        try:
+            client.delete_collection(name)
+        except Exception as exc:  # already gone
+            logger.debug("memory_reindex_shadow_missing", shadow=name, error=str(exc))
+
+    def _embed_inline(self, texts: list[str]) -> list[list[float]]:
+        if self.embedder is None:
+            _worker_init()
+            self.embedder = _worker_embedder
+        return self.embedder(texts)
@@ -3,16 +3,18 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from koda2.database import get_session
 from koda2.logging_config import get_logger
 from koda2.modules.memory.models import Contact, Conversation, MemoryEntry, UserProfile
+from koda2.modules.memory.recall_cache import RecallCache
 from koda2.modules.memory.vector_store import VectorMemory
+from koda2.pagination import cursor_datetime, decode_cursor, encode_cursor
 
 logger = get_logger(__name__)
 
@@ -22,6 +24,35 @@ class MemoryService:
 
     def __init__(self) -> None:
         self.vector = VectorMemory()
+        self.recall_cache = RecallCache()
+        # user_id → user_profiles.id; profiles are never re-keyed, only deleted
+        self._profile_ids: dict[str, str] = {}
+
+    async def _resolve_profile_id(
+        self, session: AsyncSession, user_id: str, create: bool = False,
+    ) -> tuple[Optional[str], bool]:
+        """Return (profile_id, created) for a user, hitting the DB only on a cache miss.
+
+        Newly created IDs are not cached here — callers do that once the
+        session has committed, so a rolled-back insert never leaves a
+        dangling ID behind.
+        """
+        profile_id = self._profile_ids.get(user_id)
+        if profile_id is not None:
+            return profile_id, False
+        result = await session.execute(
+            select(UserProfile.id).where(UserProfile.user_id == user_id)
+        )
+        profile_id = result.scalar_one_or_none()
+        if profile_id is not None:
+            self._profile_ids[user_id] = profile_id
+            return profile_id, False
+        if not create:
+            return None, False
+        profile = UserProfile(user_id=user_id)
+        session.add(profile)
+        await session.flush()
+        return profile.id, True
 
     # ── User Profile ─────────────────────────────────────────────────
 
@@ -37,7 +68,28 @@ class MemoryService:
                 session.add(profile)
                 await session.flush()
                 logger.info("profile_created", user_id=user_id)
-            return profile
+        self._profile_ids[user_id] = profile.id
+        return profile
+
+    async def delete_profile(self, user_id: str) -> bool:
+        """Delete a user profile with its conversations, contacts and vectors."""
+        async with get_session() as session:
+            result = await session.execute(
+                select(UserProfile).where(UserProfile.user_id == user_id)
+            )
+            profile = result.scalar_one_or_none()
+            if profile is None:
+                self._profile_ids.pop(user_id, None)
+                return False
+            await session.delete(profile)
+        self._profile_ids.pop(user_id, None)
+        try:
+            self.vector.delete_where({"user_id": user_id})
+        except Exception:
+            pass
+        self.recall_cache.invalidate(user_id)
+        logger.info("profile_deleted", user_id=user_id)
+        return True
 
     async def update_profile(self, user_id: str, updates: dict[str, Any]) -> UserProfile:
         """Update user profile fields."""
@@ -85,17 +137,9 @@ class MemoryService:
     ) -> Conversation:
         """Store a conversation turn."""
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            if profile is None:
-                profile = UserProfile(user_id=user_id)
-                session.add(profile)
-                await session.flush()
-
+            profile_id, created = await self._resolve_profile_id(session, user_id, create=True)
             convo = Conversation(
-                profile_id=profile.id,
+                profile_id=profile_id,
                 role=role,
                 content=content,
                 channel=channel,
@@ -110,7 +154,10 @@ class MemoryService:
                 text=content,
                 metadata={"user_id": user_id, "role": role, "channel": channel},
             )
-            return convo
+            self.recall_cache.invalidate(user_id)
+        if created:
+            self._profile_ids[user_id] = profile_id
+        return convo
 
     async def get_recent_conversations(
         self, user_id: str, limit: int = 20, max_age_hours: float = 0,
@@ -122,16 +169,10 @@ class MemoryService:
                            This prevents stale context from old sessions bleeding in.
         """
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            if profile is None:
-                return []
-
             stmt = (
                 select(Conversation)
-                .where(Conversation.profile_id == profile.id)
+                .join(UserProfile, UserProfile.id == Conversation.profile_id)
+                .where(UserProfile.user_id == user_id)
                 .order_by(Conversation.created_at.desc())
                 .limit(limit)
             )
@@ -174,6 +215,7 @@ class MemoryService:
                 text=content,
                 metadata={"user_id": user_id, "category": category, "importance": importance},
             )
+            self.recall_cache.invalidate(user_id)
             logger.debug("memory_stored", user_id=user_id, category=category)
             return entry
 
@@ -183,15 +225,24 @@ class MemoryService:
     ) -> list[dict]:
         """Recall relevant memories using semantic search.
 
+        Results are cached briefly per user (see ``RecallCache``) and the cache
+        is invalidated by any vector write for that user.
+
         Args:
             max_distance: If >0, discard results with cosine distance above this
                           threshold.  Lower distance = more relevant.  Good default
                           for cosine space: 0.35–0.45.
         """
+        key = self.recall_cache.make_key(query, n, max_distance)
+        cached = self.recall_cache.get(user_id, key)
+        if cached is not None:
+            return cached
+
         where = {"user_id": user_id} if user_id else None
         results = self.vector.search(query, n_results=n, where=where)
         if max_distance > 0:
             results = [r for r in results if r.get("distance", 1.0) <= max_distance]
+        self.recall_cache.put(user_id, key, results)
         return results
 
     async def list_memories(
@@ -199,18 +250,28 @@ class MemoryService:
         user_id: str,
         category: Optional[str] = None,
         limit: int = 50,
+        cursor: Optional[str] = None,
     ) -> list[MemoryEntry]:
-        """List all stored memory entries for a user, optionally filtered by category."""
+        """List all stored memory entries for a user, optionally filtered by category.
+
+        Newest first. Pass ``cursor`` (see ``memory_cursor``) to continue
+        after the last entry of a previous page.
+        """
         async with get_session() as session:
             stmt = (
                 select(MemoryEntry)
                 .where(MemoryEntry.user_id == user_id)
                 .where(MemoryEntry.active == True)  # noqa: E712
-                .order_by(MemoryEntry.created_at.desc())
+                .order_by(MemoryEntry.created_at.desc(), MemoryEntry.id.desc())
                 .limit(limit)
             )
             if category:
                 stmt = stmt.where(MemoryEntry.category == category)
+            if cursor:
+                created_at, entry_id = decode_cursor(cursor)
+                stmt = stmt.where(
+                    tuple_(MemoryEntry.created_at, MemoryEntry.id) < (cursor_datetime(created_at), entry_id)
+                )
             result = await session.execute(stmt)
             return list(result.scalars().all())
 
@@ -252,6 +313,7 @@ class MemoryService:
                     )
                 except Exception:
                     pass
+                self.recall_cache.invalidate(entry.user_id)
             logger.info("memory_updated", memory_id=memory_id)
             return entry
 
@@ -259,20 +321,59 @@ class MemoryService:
         self,
         category: str | None = None,
         limit: int = 100,
+        cursor: str | None = None,
     ) -> list[MemoryEntry]:
-        """List all active memory entries across all users (for dashboard)."""
+        """List all active memory entries across all users (for dashboard).
+
+        Most recently updated first; ``cursor`` comes from
+        ``memory_cursor(entry, "updated_at")``.
+        """
         async with get_session() as session:
             stmt = (
                 select(MemoryEntry)
                 .where(MemoryEntry.active == True)  # noqa: E712
-                .order_by(MemoryEntry.updated_at.desc())
+                .order_by(MemoryEntry.updated_at.desc(), MemoryEntry.id.desc())
                 .limit(limit)
             )
             if category:
                 stmt = stmt.where(MemoryEntry.category == category)
+            if cursor:
+                updated_at, entry_id = decode_cursor(cursor)
+                stmt = stmt.where(
+                    tuple_(MemoryEntry.updated_at, MemoryEntry.id) < (cursor_datetime(updated_at), entry_id)
+                )
             result = await session.execute(stmt)
             return list(result.scalars().all())
 
+    @staticmethod
+    def memory_cursor(entry: MemoryEntry, field: str = "created_at") -> tuple[Any, str]:
+        """Sort key of ``entry`` for ``list_memories`` (created_at) or ``list_all_memories`` (updated_at)."""
+        return getattr(entry, field), entry.id
+
+    async def iter_memories(
+        self,
+        user_id: Optional[str] = None,
+        category: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[MemoryEntry]:
+        """Yield every active memory (one user's, or everyone's) page by page.
+
+        Each page is its own short session, so exporting years of memories
+        never holds a transaction open or the whole table in memory.
+        """
+        field = "created_at" if user_id else "updated_at"
+        cursor: Optional[str] = None
+        while True:
+            if user_id:
+                page = await self.list_memories(user_id, category=category, limit=batch_size, cursor=cursor)
+            else:
+                page = await self.list_all_memories(category=category, limit=batch_size, cursor=cursor)
+            for entry in page:
+                yield entry
+            if len(page) < batch_size:
+                return
+            cursor = encode_cursor(*self.memory_cursor(page[-1], field))
+
     async def delete_memory(self, memory_id: str) -> bool:
         """Delete a memory entry by ID (soft-delete: sets active=False)."""
         async with get_session() as session:
@@ -289,6 +390,7 @@ class MemoryService:
                 self.vector.delete(memory_id)
             except Exception:
                 pass
+            self.recall_cache.invalidate(entry.user_id)
             logger.info("memory_deleted", memory_id=memory_id)
             return True
 
@@ -308,23 +410,31 @@ class MemoryService:
                 "total": len(entries),
                 "categories": categories,
                 "vector_count": self.vector.count(),
+                "recall_cache": self.recall_cache.stats(),
             }
 
+    async def consolidate(self, compact: bool = True, force_compact: bool = False) -> dict[str, Any]:
+        """Run decay, duplicate merging, conversation archiving and index compaction.
+
+        Returns the consolidation report, including index size before and after.
+        """
+        from koda2.modules.memory.consolidation import MemoryConsolidator
+
+        try:
+            report = await MemoryConsolidator(self.vector).run(
+                compact=compact, force_compact=force_compact,
+            )
+        finally:
+            self.recall_cache.clear()
+        return report.to_dict()
+
     # ── Contacts ─────────────────────────────────────────────────────
 
     async def add_contact(self, user_id: str, **kwargs: Any) -> Contact:
         """Add a contact to the user's profile."""
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            if profile is None:
-                profile = UserProfile(user_id=user_id)
-                session.add(profile)
-                await session.flush()
-
-            contact = Contact(profile_id=profile.id, **kwargs)
+            profile_id, created = await self._resolve_profile_id(session, user_id, create=True)
+            contact = Contact(profile_id=profile_id, **kwargs)
             session.add(contact)
             await session.flush()
 
@@ -333,21 +443,18 @@ class MemoryService:
                 text=f"{contact.name} {contact.email} {contact.company} {contact.notes}",
                 metadata={"user_id": user_id, "type": "contact"},
             )
-            return contact
+            self.recall_cache.invalidate(user_id)
+        if created:
+            self._profile_ids[user_id] = profile_id
+        return contact
 
     async def find_contact(self, user_id: str, name: str) -> Optional[Contact]:
         """Find a contact by name (exact or partial match)."""
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            if profile is None:
-                return None
-
             result = await session.execute(
                 select(Contact)
-                .where(Contact.profile_id == profile.id)
+                .join(UserProfile, UserProfile.id == Contact.profile_id)
+                .where(UserProfile.user_id == user_id)
                 .where(Contact.name.ilike(f"%{name}%"))
             )
             return result.scalars().first()
@@ -3,16 +3,20 @@
 from __future__ import annotations
 
 import threading
-from typing import Optional
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
 
 import chromadb
 from chromadb.config import Settings as ChromaSettings
+from chromadb.errors import NotFoundError
 
 from koda2.config import get_settings
 from koda2.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 _client: Optional[chromadb.ClientAPI] = None
 _chroma_lock = threading.Lock()
 
@@ -43,8 +47,23 @@ class VectorMemory:
     """Semantic memory backed by ChromaDB."""
 
     def __init__(self, collection_name: str = "executive_memory") -> None:
+        self.name = collection_name
         self.collection = get_collection(collection_name)
 
+    def _call(self, op: Callable[[chromadb.Collection], T]) -> T:
+        """Run ``op`` on the collection, looking it up again if it was swapped out.
+
+        A compaction or reindex (possibly from the CLI, in another process)
+        replaces the collection under the same name; a handle taken before
+        that points at the dropped one. Caller must hold ``_chroma_lock``.
+        """
+        try:
+            return op(self.collection)
+        except NotFoundError:
+            self.collection = get_chroma_client().get_collection(self.name)
+            logger.info("vector_collection_reloaded", collection=self.name)
+            return op(self.collection)
+
     def add(
         self,
         doc_id: str,
@@ -56,11 +75,11 @@ class VectorMemory:
         if not meta:
             meta = {"_source": "koda2"}
         with _chroma_lock:
-            self.collection.upsert(
+            self._call(lambda c: c.upsert(
                 ids=[doc_id],
                 documents=[text],
                 metadatas=[meta],
-            )
+            ))
         logger.debug("vector_upserted", doc_id=doc_id)
 
     def search(
@@ -75,7 +94,7 @@ class VectorMemory:
             kwargs["where"] = where
 
         with _chroma_lock:
-            results = self.collection.query(**kwargs)
+            results = self._call(lambda c: c.query(**kwargs))
         documents = results.get("documents", [[]])[0]
         metadatas = results.get("metadatas", [[]])[0]
         distances = results.get("distances", [[]])[0]
@@ -91,13 +110,155 @@ class VectorMemory:
             for i in range(len(documents))
         ]
 
+    def get(
+        self,
+        ids: list[str],
+        include_embeddings: bool = False,
+    ) -> list[dict]:
+        """Fetch stored documents by ID. Unknown IDs are silently skipped."""
+        if not ids:
+            return []
+        include = ["documents", "metadatas"]
+        if include_embeddings:
+            include.append("embeddings")
+        with _chroma_lock:
+            results = self._call(lambda c: c.get(ids=ids, include=include))
+        return _rows_from_get(results, include_embeddings)
+
     def delete(self, doc_id: str) -> None:
         """Remove a document from the vector store."""
         with _chroma_lock:
-            self.collection.delete(ids=[doc_id])
+            self._call(lambda c: c.delete(ids=[doc_id]))
         logger.debug("vector_deleted", doc_id=doc_id)
 
+    def delete_many(self, doc_ids: list[str]) -> None:
+        """Remove several documents in a single call."""
+        if not doc_ids:
+            return
+        with _chroma_lock:
+            self._call(lambda c: c.delete(ids=doc_ids))
+        logger.debug("vectors_deleted", count=len(doc_ids))
+
+    def delete_where(self, where: dict) -> None:
+        """Remove every document matching a metadata filter."""
+        with _chroma_lock:
+            self._call(lambda c: c.delete(where=where))
+        logger.debug("vectors_deleted_where", where=where)
+
     def count(self) -> int:
         """Return the total number of documents."""
         with _chroma_lock:
-            return self.collection.count()
+            return self._call(lambda c: c.count())
+
+    def compact(self, batch_size: int = 500) -> int:
+        """Rebuild the collection so deleted vectors are physically dropped.
+
+        HNSW only marks deletions, so the index keeps growing even when
+        documents are removed. This copies every live record into a fresh
+        collection and swaps it in place of the old one (see ``_swap_in``).
+        Writers are blocked for the duration. Returns the number of records
+        copied.
+        """
+        client = get_chroma_client()
+        name = self.name
+        shadow_name = f"{name}__compact"
+        copied = 0
+        with _chroma_lock:
+            try:
+                client.delete_collection(shadow_name)
+            except Exception:
+                pass
+            shadow = client.create_collection(
+                name=shadow_name,
+                metadata={"hnsw:space": "cosine"},
+            )
+            try:
+                while True:
+                    batch = self._call(lambda c: c.get(
+                        limit=batch_size,
+                        offset=copied,
+                        include=["documents", "metadatas", "embeddings"],
+                    ))
+                    rows = _rows_from_get(batch, include_embeddings=True)
+                    if not rows:
+                        break
+                    shadow.add(
+                        ids=[r["id"] for r in rows],
+                        documents=[r["content"] for r in rows],
+                        metadatas=[r["metadata"] or {"_source": "koda2"} for r in rows],
+                        embeddings=[r["embedding"] for r in rows],
+                    )
+                    copied += len(rows)
+            except Exception:
+                # Leave the live collection untouched if the copy fails
+                client.delete_collection(shadow_name)
+                raise
+            self.collection = _swap_in(client, name, shadow)
+        logger.info("vector_collection_compacted", collection=name, records=copied)
+        return copied
+
+    def replace_with(self, shadow_name: str) -> None:
+        """Swap a fully-built shadow collection in place of this one.
+
+        Done under the store lock (see ``_swap_in``), so no reader ever
+        sees a half-built index.
+        """
+        client = get_chroma_client()
+        with _chroma_lock:
+            shadow = client.get_collection(shadow_name)
+            self.collection = _swap_in(client, self.name, shadow)
+        logger.info("vector_collection_swapped", collection=self.name, shadow=shadow_name)
+
+
+def _swap_in(client: chromadb.ClientAPI, name: str, shadow: chromadb.Collection) -> chromadb.Collection:
+    """Rename ``shadow`` to ``name``, replacing the collection there.
+
+    The live collection is first renamed to a backup and only dropped once
+    the shadow holds the name; if the rename fails the backup is put back,
+    so ``name`` never goes missing. Caller must hold ``_chroma_lock``.
+    """
+    backup_name = f"{name}__previous"
+    try:
+        client.delete_collection(backup_name)  # left over from an interrupted swap
+    except NotFoundError:
+        pass
+    try:
+        live: Optional[chromadb.Collection] = client.get_collection(name)
+    except NotFoundError:
+        live = None  # first build — nothing to replace
+    if live is not None:
+        live.modify(name=backup_name)
+    try:
+        shadow.modify(name=name)
+    except Exception:
+        if live is not None:
+            live.modify(name=name)
+        raise
+    if live is not None:
+        client.delete_collection(backup_name)
+    return shadow
+
+
+def _rows_from_get(results: dict, include_embeddings: bool = False) -> list[dict]:
+    """Flatten a Chroma ``get`` result into one dict per record."""
+    ids = results.get("ids") or []
+    documents = results.get("documents") or [None] * len(ids)
+    metadatas = results.get("metadatas") or [None] * len(ids)
+    embeddings: Any = results.get("embeddings") if include_embeddings else None
+    if embeddings is None:
+        embeddings = [None] * len(ids)
+    rows = []
+    for i, doc_id in enumerate(ids):
+        row = {"id": doc_id, "content": documents[i], "metadata": metadatas[i]}
+        if include_embeddings:
+            row["embedding"] = [float(x) for x in embeddings[i]] if embeddings[i] is not None else None
+        rows.append(row)
+    return rows
+
+
+def index_size_bytes() -> int:
+    """Return the on-disk size of the Chroma persistence directory."""
+    root = Path(get_settings().chroma_persist_dir)
+    if not root.exists():
+        return 0
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
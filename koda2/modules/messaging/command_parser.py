@@ -256,15 +256,13 @@ class CommonCommands:
         from koda2.modules.memory.models import Conversation, UserProfile
 
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            if profile:
-                await session.execute(
-                    sa_delete(Conversation).where(Conversation.profile_id == profile.id)
+            await session.execute(
+                sa_delete(Conversation).where(
+                    Conversation.profile_id.in_(
+                        select(UserProfile.id).where(UserProfile.user_id == user_id)
+                    )
                 )
-                await session.flush()
+            )
 
         return "🔄 *Session reset*\n\nConversation history cleared. Starting fresh!"
 
@@ -293,21 +291,15 @@ class CommonCommands:
 
         # Delete old conversations, store summary as a memory
         from koda2.database import get_session
-        from sqlalchemy import select, delete as sa_delete
-        from koda2.modules.memory.models import Conversation, UserProfile
+        from sqlalchemy import delete as sa_delete
+        from koda2.modules.memory.models import Conversation
 
+        # IDs came from this user's own history, so no profile lookup is needed
+        old_ids = [c.id for c in old_messages]
         async with get_session() as session:
-            result = await session.execute(
-                select(UserProfile).where(UserProfile.user_id == user_id)
+            await session.execute(
+                sa_delete(Conversation).where(Conversation.id.in_(old_ids))
             )
-            profile = result.scalar_one_or_none()
-            if profile:
-                old_ids = [c.id for c in old_messages]
-                if old_ids:
-                    await session.execute(
-                        sa_delete(Conversation).where(Conversation.id.in_(old_ids))
-                    )
-                    await session.flush()
 
         # Store summary in memory for future recall
         await self._orch.memory.store_memory(
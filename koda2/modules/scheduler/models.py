@@ -5,9 +5,9 @@ from __future__ import annotations
 import datetime as dt
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, String, Text, Boolean, Integer
+from sqlalchemy import Column, String, Text, Boolean, Integer
 
-from koda2.database import Base
+from koda2.database import Base, UTCDateTime
 
 
 class ScheduledTaskRecord(Base):
@@ -27,8 +27,8 @@ class ScheduledTaskRecord(Base):
     action_payload = Column(Text, nullable=False)  # shell command or message text
     is_active = Column(Boolean, default=True, nullable=False)
     run_count = Column(Integer, default=0, nullable=False)
-    last_run = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False)
+    last_run = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False)
     created_by = Column(String(128), default="system", nullable=False)
 
     # For interval tasks
@@ -1,5 +1,5 @@
 """Task Queue System — Parallel task processing with real-time status updates."""
 
-from koda2.modules.task_queue.service import TaskQueueService, Task, TaskStatus
+from koda2.modules.task_queue.service import TaskQueueService, Task, TaskStatus, task_cursor
 
-__all__ = ["TaskQueueService", "Task", "TaskStatus"]
+__all__ = ["TaskQueueService", "Task", "TaskStatus", "task_cursor"]
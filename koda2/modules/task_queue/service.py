@@ -9,6 +9,7 @@ from enum import StrEnum
 from typing import Any, Callable, Coroutine, Optional
 
 from koda2.logging_config import get_logger
+from koda2.pagination import after_cursor
 
 logger = get_logger(__name__)
 
@@ -85,6 +86,11 @@ class Task:
         logger.debug("task_progress", task_id=self.id, progress=self.progress, message=message)
 
 
+def task_cursor(task: Task) -> tuple[str, str]:
+    """Keyset sort key for ``TaskQueueService.list_tasks``."""
+    return task.created_at.isoformat(), task.id
+
+
 class TaskQueueService:
     """Manages parallel task execution with real-time status tracking."""
     
@@ -188,14 +194,16 @@ class TaskQueueService:
         self,
         status: Optional[TaskStatus] = None,
         limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> list[Task]:
-        """List tasks, optionally filtered by status."""
-        tasks = list(self._tasks.values())
+        """List tasks newest first, optionally filtered by status.
+
+        ``cursor`` (from ``task_cursor``) continues after a previous page.
+        """
+        tasks = self._tasks.values()
         if status:
             tasks = [t for t in tasks if t.status == status]
-        # Sort by created_at desc
-        tasks.sort(key=lambda t: t.created_at, reverse=True)
-        return tasks[:limit]
+        return after_cursor(tasks, task_cursor, cursor)[:limit]
         
     async def get_active_tasks(self) -> list[Task]:
         """Get currently running or pending tasks."""
@@ -17,11 +17,13 @@ from koda2.config import get_settings
 from koda2.logging_config import get_logger
 from koda2.modules.account.service import AccountService
 from koda2.modules.calendar import CalendarEvent, CalendarService
+from koda2.modules.calendar.notifications import CalendarNotifier
 from koda2.modules.contacts import ContactSyncService
 from koda2.modules.document_analyzer import DocumentAnalyzerService
 from koda2.modules.documents import DocumentService
 from koda2.modules.email import EmailMessage, EmailService
 from koda2.modules.email.assistant_mail import AssistantMailService
+from koda2.modules.email.imap_pool import imap_pool
 from koda2.modules.images import ImageService
 from koda2.modules.llm import LLMRouter
 from koda2.modules.llm.models import ChatMessage, LLMRequest
@@ -90,6 +92,9 @@ CHARS_PER_TOKEN = 4
 # WhatsApp/Telegram message chunk limit
 MESSAGE_CHUNK_LIMIT = 4000
 
+# Body bytes fetched per email for inbox previews (full bodies load on demand)
+PREVIEW_BYTES = 2048
+
 # Inbound message debounce — batch rapid-fire messages (seconds)
 DEBOUNCE_SECONDS = 1.5
 
@@ -114,6 +119,9 @@ class Orchestrator:
         self.memory = MemoryService()
         self.account_service = AccountService()
         self.calendar = CalendarService(self.account_service)
+        self.calendar_notifications = CalendarNotifier(
+            self.calendar, webhook_url=self._settings.calendar_webhook_url,
+        )
         self.email = EmailService(self.account_service)
         self.assistant_mail = AssistantMailService(self.account_service)
         self.telegram = TelegramBot(self.account_service)
@@ -130,7 +138,7 @@ class Orchestrator:
         self.travel = TravelService()
         self.meetings = MeetingService(self.llm)
         self.expenses = ExpenseService(self.llm)
-        self.facilities = FacilityService()
+        self.facilities = FacilityService(freebusy=self.calendar.freebusy)
         
         # New services for complete coverage
         self.contacts = ContactSyncService(
@@ -741,9 +749,35 @@ class Orchestrator:
             end = ensure_local_tz(dt.datetime.fromisoformat(
                 params.get("end", (dt.datetime.now(dt.UTC) + dt.timedelta(days=1)).isoformat())
             ))
-            events = await self.calendar.list_events(start, end)
+            max_age = dt.timedelta(0) if params.get("live") else None
+            events = await self.calendar.list_events(start, end, max_age=max_age)
             return [{"title": e.title, "start": e.start.isoformat(), "end": e.end.isoformat()} for e in events]
 
+        elif action_name == "find_meeting_slots":
+            from koda2.config import ensure_local_tz
+            start = ensure_local_tz(dt.datetime.fromisoformat(params.get("start", dt.datetime.now(dt.UTC).isoformat())))
+            end = ensure_local_tz(dt.datetime.fromisoformat(
+                params.get("end", (start + dt.timedelta(days=7)).isoformat())
+            ))
+            search = await self.calendar.find_meeting_slots(
+                start, end,
+                duration_minutes=int(params.get("duration_minutes", 30)),
+                attendees=params.get("attendees") or [],
+                timezone=params.get("timezone") or None,
+                day_start=dt.time.fromisoformat(params.get("day_start") or "09:00"),
+                day_end=dt.time.fromisoformat(params.get("day_end") or "17:00"),
+                buffer_minutes=int(params.get("buffer_minutes", 15)),
+                max_results=int(params.get("max_results", 5)),
+            )
+            return {
+                "slots": [
+                    {"start": s.start.isoformat(), "end": s.end.isoformat(), "score": s.score}
+                    for s in search.slots
+                ],
+                "unresolved_attendees": search.unresolved_attendees,
+                "incomplete_accounts": search.incomplete_accounts,
+            }
+
         elif action_name == "schedule_meeting":
             from koda2.config import ensure_local_tz
             event = CalendarEvent(
@@ -829,23 +863,34 @@ class Orchestrator:
             return {"sent": success, "replied_to": original.subject}
 
         elif action_name == "search_email":
-            query = params.get("query", "")
-            limit = params.get("limit", 20)
-            # Use Gmail search if available, otherwise fetch all and filter
-            emails = await self.email.fetch_all_emails(unread_only=False, limit=limit)
-            if query:
-                q = query.lower()
-                emails = [e for e in emails if q in e.subject.lower() or q in e.sender.lower() or q in (e.body_text or "").lower()]
+            from koda2.config import ensure_local_tz
+
+            def _date(key: str) -> Optional[dt.datetime]:
+                value = params.get(key)
+                return ensure_local_tz(dt.datetime.fromisoformat(value)) if value else None
+
+            unread = params.get("unread")
+            hits = await self.email.search_emails(
+                query=params.get("query", ""),
+                sender=params.get("sender"),
+                since=_date("since"),
+                before=_date("before"),
+                folder=params.get("folder"),
+                is_read=None if unread is None else not unread,
+                has_attachments=params.get("has_attachments"),
+                limit=params.get("limit", 20),
+            )
             return [{
-                "id": e.id,
-                "provider_id": e.provider_id,
-                "account": e.account_name,
-                "subject": e.subject,
-                "sender": e.sender,
-                "date": e.date.isoformat(),
-                "is_read": e.is_read,
-                "body_preview": (e.body_text or "")[:300],
-            } for e in emails[:limit]]
+                "id": hit.message.id,
+                "provider_id": hit.message.provider_id,
+                "account": hit.message.account_name,
+                "subject": hit.message.subject,
+                "sender": hit.message.sender,
+                "date": hit.message.date.isoformat(),
+                "is_read": hit.message.is_read,
+                "has_attachments": hit.message.has_attachments,
+                "snippet": hit.snippet,
+            } for hit in hits]
 
         elif action_name == "get_email_detail":
             email_id = params.get("email_id", "")
@@ -853,6 +898,7 @@ class Orchestrator:
             email = next((e for e in all_emails if e.id == email_id or e.provider_id == email_id), None)
             if not email:
                 return {"error": f"Email not found: {email_id}"}
+            await self.email.load_bodies([email])
             return {
                 "id": email.id,
                 "provider_id": email.provider_id,
@@ -907,6 +953,7 @@ class Orchestrator:
                 unread_only=params.get("unread_only", True),
                 limit=params.get("limit", 10),
             )
+            await self.email.load_bodies(emails, max_bytes=PREVIEW_BYTES)
             return [{
                 "id": e.id,
                 "provider_id": e.provider_id,
@@ -1743,8 +1790,9 @@ class Orchestrator:
         # ── Email check — every 15 minutes ──
         async def _check_email():
             try:
-                from koda2.modules.email.models import EmailFilter
-                emails = await self.email.fetch_emails(EmailFilter(unread_only=True, limit=5))
+                # Pull only what changed into the local store, then read from it
+                await self.email.sync_mail()
+                emails = await self.email.fetch_all_emails(unread_only=True, limit=5)
                 if emails:
                     logger.info("scheduled_email_check", unread=len(emails))
             except Exception as exc:
@@ -1802,8 +1850,7 @@ class Orchestrator:
                 now = dt.datetime.now(dt.UTC)
                 end = now + dt.timedelta(days=1)
                 events = await self.calendar.list_events(now, end)
-                from koda2.modules.email.models import EmailFilter
-                emails = await self.email.fetch_emails(EmailFilter(unread_only=True, limit=20))
+                emails = await self.email.fetch_all_emails(unread_only=True, limit=20)
 
                 summary = f"🌅 *Goedemorgen — Koda2 Daily Summary*\n\n"
                 summary += f"📅 *Agenda vandaag:* {len(events)} events\n"
@@ -1853,6 +1900,25 @@ class Orchestrator:
                 run_immediately=True,
             )
 
+        # ── Memory consolidation — every night at 03:30 ──
+        async def _consolidate_memory():
+            try:
+                report = await self.memory.consolidate()
+                logger.info(
+                    "scheduled_memory_consolidation_done",
+                    vectors_before=report["vectors_before"],
+                    vectors_after=report["vectors_after"],
+                )
+            except Exception as exc:
+                logger.error("scheduled_memory_consolidation_failed", error=str(exc))
+
+        if not _already_exists("Memory Consolidation"):
+            self.scheduler.schedule_recurring(
+                name="Memory Consolidation",
+                func=_consolidate_memory,
+                cron_expression="30 3 * * *",
+            )
+
         logger.info("scheduled_tasks_registered", count=len(self.scheduler.list_tasks()))
 
     async def shutdown(self) -> None:
@@ -1887,6 +1953,24 @@ class Orchestrator:
         except Exception as exc:
             logger.error("scheduler_stop_failed", error=str(exc))
         
+        # Cancel calendar push subscriptions
+        try:
+            await self.calendar_notifications.stop()
+        except Exception as exc:
+            logger.error("calendar_notifications_stop_failed", error=str(exc))
+
+        # Close pooled calendar provider connections
+        try:
+            await self.calendar.close()
+        except Exception as exc:
+            logger.error("calendar_close_failed", error=str(exc))
+
+        # Log out pooled IMAP sessions
+        try:
+            await asyncio.to_thread(imap_pool.close_all)
+        except Exception as exc:
+            logger.error("imap_pool_close_failed", error=str(exc))
+        
         logger.info("orchestrator_shutdown_complete")
 
     async def handle_whatsapp_message(self, payload: dict[str, Any]) -> Optional[str]:
@@ -0,0 +1,83 @@
+"""Opaque keyset cursors for the list endpoints.
+
+A cursor encodes the sort key of the last item on a page (for example
+``(created_at, id)``); the next page is everything strictly after it in
+sort order. Unlike ``OFFSET`` this stays cheap however deep the page, and
+rows inserted meanwhile don't shift or duplicate results.
+"""
+
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import json
+from typing import Any, Callable, Iterable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string cannot be decoded."""
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort-key values (str, int, float, datetime) as an opaque cursor."""
+    plain = [v.isoformat() if isinstance(v, (dt.datetime, dt.date)) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, arity: int = 2) -> list[Any]:
+    """Decode a cursor into its ``arity`` sort-key values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(f"Malformed cursor: {cursor!r}") from exc
+    if not isinstance(values, list) or len(values) != arity:
+        raise InvalidCursor(f"Malformed cursor: {cursor!r}")
+    return values
+
+
+def cursor_datetime(value: Any) -> dt.datetime:
+    """Parse a datetime sort key from a decoded cursor."""
+    try:
+        return dt.datetime.fromisoformat(value)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor(f"Malformed cursor timestamp: {value!r}") from exc
+
+
+def trim_page(
+    items: Sequence[T],
+    limit: int,
+    key: Callable[[T], tuple],
+) -> tuple[list[T], Optional[str]]:
+    """Trim a ``limit + 1`` fetch to one page and build the next cursor.
+
+    Fetching one extra row tells us whether another page exists without a
+    separate COUNT query.
+    """
+    if len(items) <= limit:
+        return list(items), None
+    page = list(items[:limit])
+    return page, encode_cursor(*key(page[-1]))
+
+
+def after_cursor(
+    items: Iterable[T],
+    key: Callable[[T], tuple],
+    cursor: Optional[str],
+    descending: bool = True,
+) -> list[T]:
+    """Sort in-memory ``items`` by ``key`` and drop everything up to ``cursor``.
+
+    ``key`` must return JSON-friendly values (use ISO strings for times) so
+    they compare equal to what ``encode_cursor`` stored.
+    """
+    ordered = sorted(items, key=key, reverse=descending)
+    if not cursor:
+        return ordered
+    last = tuple(decode_cursor(cursor, arity=len(key(ordered[0])) if ordered else 2))
+    if descending:
+        return [i for i in ordered if key(i) < last]
+    return [i for i in ordered if key(i) > last]
@@ -1,15 +1,23 @@
-"""Comprehensive audit logging for all system actions."""
+"""Comprehensive audit logging for all system actions.
+
+Entries are buffered in memory by ``AuditWriter`` and inserted in batches
+from a background task, so ``log_action`` never waits on the database in
+the chat reply path. When the buffer is full, callers wait for the next
+flush (backpressure) instead of growing memory without bound.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
 from typing import Any, Optional
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, String, Text
+from sqlalchemy import Column, String, Text, insert
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 
-from koda2.database import Base, get_session
+from koda2.config import get_settings
+from koda2.database import Base, UTCDateTime, get_session
 from koda2.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -21,7 +29,7 @@ class AuditLog(Base):
     __tablename__ = "audit_logs"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
-    timestamp = Column(DateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False, index=True)
+    timestamp = Column(UTCDateTime, default=lambda: dt.datetime.now(dt.UTC), nullable=False, index=True)
     user_id = Column(String(128), nullable=False, index=True)
     action = Column(String(256), nullable=False, index=True)
     module = Column(String(128), nullable=False)
@@ -30,6 +38,139 @@ class AuditLog(Base):
     status = Column(String(32), default="success")
 
 
+class AuditWriter:
+    """Buffered, batched writer for ``audit_logs`` rows.
+
+    Rows are flushed every ``flush_interval_ms`` or as soon as
+    ``batch_size`` rows are waiting, whichever comes first. With
+    ``synchronous=True`` every row is inserted before ``write`` returns.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_buffer: Optional[int] = None,
+        synchronous: Optional[bool] = None,
+    ) -> None:
+        settings = get_settings()
+        self.flush_interval = (flush_interval_ms or settings.audit_flush_interval_ms) / 1000
+        self.batch_size = batch_size or settings.audit_batch_size
+        self.max_buffer = max_buffer or settings.audit_buffer_size
+        self.synchronous = settings.audit_synchronous if synchronous is None else synchronous
+        self._queue: Optional[asyncio.Queue[dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collecting: list[dict[str, Any]] = []  # taken off the queue for the next batch
+        self._inserting: list[dict[str, Any]] = []  # batch being inserted
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_running(self) -> asyncio.Queue[dict[str, Any]]:
+        """Start (or restart on a new event loop) the background flusher.
+
+        On a new loop, rows the old flusher was still collecting and rows
+        still queued move to the new queue. A batch whose insert the old
+        loop never finished may or may not have been committed; it is
+        logged and counted in ``failed``.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            carried, self._collecting = self._collecting, []
+            while self._queue is not None and not self._queue.empty():
+                carried.append(self._queue.get_nowait())
+            if self._inserting:
+                self.failed += len(self._inserting)
+                logger.error("audit_rows_lost", count=len(self._inserting), reason="event loop changed")
+                self._inserting = []
+            self._queue = asyncio.Queue(maxsize=max(self.max_buffer, len(carried)))
+            for row in carried:
+                self._queue.put_nowait(row)
+            if carried:
+                logger.info("audit_rows_carried_over", count=len(carried))
+            self._loop = loop
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="audit-writer")
+        return self._queue
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def write(self, row: dict[str, Any]) -> None:
+        """Queue a row; waits only when the buffer is full."""
+        if self.synchronous:
+            await self._insert([row])
+            return
+        await self._ensure_running().put(row)
+
+    async def _run(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            batch = [await queue.get()]
+            self._collecting = batch
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._collecting, self._inserting = [], batch
+            await self._insert(batch)
+            self._inserting = []
+            for _ in batch:
+                queue.task_done()
+
+    async def _insert(self, rows: list[dict[str, Any]]) -> None:
+        try:
+            async with get_session() as session:
+                await session.execute(insert(AuditLog), rows)
+            self.written += len(rows)
+            logger.debug("audit_batch_written", count=len(rows))
+        except Exception as exc:
+            self.failed += len(rows)
+            logger.error("audit_log_failed", count=len(rows), error=str(exc))
+
+    async def flush(self) -> None:
+        """Wait until every queued row has been written (or counted in ``failed``).
+
+        Rows queued on another event loop are moved to this one first.
+        """
+        if self._queue is None:
+            return
+        if self._loop is not asyncio.get_running_loop() or self._queue.qsize():
+            self._ensure_running()
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Flush outstanding rows and stop the background task."""
+        await self.flush()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        logger.info("audit_writer_closed", written=self.written, failed=self.failed)
+
+
+_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    """Return the singleton audit writer."""
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter()
+    return _writer
+
+
 async def log_action(
     user_id: str,
     action: str,
@@ -38,18 +179,15 @@ async def log_action(
     ip_address: Optional[str] = None,
     status: str = "success",
 ) -> None:
-    """Write an audit log entry to the database."""
-    entry = AuditLog(
-        user_id=user_id,
-        action=action,
-        module=module,
-        details=details,
-        ip_address=ip_address,
-        status=status,
-    )
-    try:
-        async with get_session() as session:
-            session.add(entry)
-        logger.debug("audit_logged", action=action, user_id=user_id, module=module)
-    except Exception as exc:
-        logger.error("audit_log_failed", action=action, error=str(exc))
+    """Queue an audit log entry for the database."""
+    await get_audit_writer().write({
+        "id": str(uuid4()),
+        "timestamp": dt.datetime.now(dt.UTC),
+        "user_id": user_id,
+        "action": action,
+        "module": module,
+        "details": details,
+        "ip_address": ip_address,
+        "status": status,
+    })
+    logger.debug("audit_logged", action=action, user_id=user_id, module=module)
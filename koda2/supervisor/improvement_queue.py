@@ -21,6 +21,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from koda2.logging_config import get_logger
+from koda2.pagination import decode_cursor
 
 logger = get_logger(__name__)
 
@@ -49,6 +50,11 @@ class QueueItemSource(StrEnum):
     SYSTEM = "system"
 
 
+def queue_item_cursor(item: dict[str, Any]) -> tuple[str, str]:
+    """Keyset sort key for ``ImprovementQueue.list_items``."""
+    return item.get("created_at") or "", item["id"]
+
+
 class ImprovementQueue:
     """Persistent queue with multiple concurrent workers.
 
@@ -134,11 +140,25 @@ class ImprovementQueue:
         self,
         status: Optional[str] = None,
         limit: int = 50,
+        cursor: Optional[str] = None,
     ) -> list[dict[str, Any]]:
-        """List queue items, optionally filtered by status."""
+        """List the newest queue items (oldest first), optionally filtered by status.
+
+        ``cursor`` pages backwards: only items queued before the one it
+        was made from (see ``queue_item_cursor``) are considered.
+        """
         items = self._items
         if status:
             items = [i for i in items if i.get("status") == status]
+        if cursor:
+            created_at, item_id = decode_cursor(cursor)
+            # Items are kept in append order; fall back to the timestamp if
+            # the cursor item has since been purged
+            index = next((n for n, i in enumerate(items) if i["id"] == item_id), None)
+            if index is not None:
+                items = items[:index]
+            else:
+                items = [i for i in items if (i.get("created_at") or "") < created_at]
         return items[-limit:]
 
     def get_item(self, item_id: str) -> Optional[dict[str, Any]]:
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Benchmark: CalendarCache.sync_events at N events per account.
+
+Compares the previous algorithm (delete the window, then SELECT + INSERT
+or UPDATE per event) with the current diffing bulk upsert, on a temporary
+on-disk SQLite database, for three sync cycles:
+
+    initial     empty cache
+    unchanged   same events again (the common 5-minute periodic sync)
+    2% changed  a few titles edited, a few events cancelled
+
+    python scripts/bench_calendar_cache.py --events 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+from koda2.database import Base, create_engine_for  # noqa: E402
+from koda2.modules.calendar.cache import CachedCalendarEvent, CalendarCache  # noqa: E402
+from koda2.modules.calendar.models import CalendarEvent, CalendarProvider  # noqa: E402
+
+WINDOW_START = dt.datetime(2026, 1, 1)
+WINDOW_END = dt.datetime(2026, 12, 31)
+
+
+def _events(n: int, edit_every: int = 0, drop_every: int = 0) -> list[CalendarEvent]:
+    out = []
+    for i in range(n):
+        if drop_every and i % drop_every == 0:
+            continue
+        start = WINDOW_START + dt.timedelta(hours=i)
+        title = f"Meeting {i}" + (" (moved)" if edit_every and i % edit_every == 1 else "")
+        out.append(CalendarEvent(
+            provider_id=f"evt-{i}", provider=CalendarProvider.GOOGLE, title=title,
+            start=start, end=start + dt.timedelta(minutes=30),
+        ))
+    return out
+
+
+async def _legacy_sync(session_factory, cache: CalendarCache, events, account: str) -> None:
+    """The pre-bulk implementation, kept here as the baseline."""
+    async with session_factory() as session:
+        await session.execute(delete(CachedCalendarEvent).where(
+            CachedCalendarEvent.account_name == account,
+            CachedCalendarEvent.start >= WINDOW_START,
+            CachedCalendarEvent.start <= WINDOW_END,
+        ))
+        for ev in events:
+            data = cache._to_db(ev, account)
+            existing = (await session.execute(select(CachedCalendarEvent).where(
+                CachedCalendarEvent.provider_id == data["provider_id"],
+                CachedCalendarEvent.account_name == data["account_name"],
+            ).limit(1))).scalar_one_or_none()
+            if existing:
+                for key, val in data.items():
+                    setattr(existing, key, val)
+            else:
+                session.add(CachedCalendarEvent(**data))
+        await session.commit()
+
+
+async def _run(n: int, legacy: bool) -> list[tuple[str, float, int]]:
+    rounds = [
+        ("initial", _events(n)),
+        ("unchanged", _events(n)),
+        ("2% changed", _events(n, edit_every=100, drop_every=100)),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine_for(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        statements = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _count(*_args, **_kwargs):
+            nonlocal statements
+            statements += 1
+
+        @asynccontextmanager
+        async def _session():
+            async with factory() as session:
+                yield session
+                await session.commit()
+
+        cache = CalendarCache()
+        with patch("koda2.modules.calendar.cache.get_session", side_effect=_session):
+            for label, events in rounds:
+                statements = 0
+                started = time.perf_counter()
+                if legacy:
+                    await _legacy_sync(factory, cache, events, "bench")
+                else:
+                    await cache.sync_events(events, "bench", WINDOW_START, WINDOW_END)
+                results.append((label, (time.perf_counter() - started) * 1000, statements))
+        await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="Events per account")
+    args = parser.parse_args()
+
+    legacy = asyncio.run(_run(args.events, legacy=True))
+    bulk = asyncio.run(_run(args.events, legacy=False))
+
+    print(f"{args.events} events per account\n")
+    print(f"{'':<12}{'per-event ms':>14}{'stmts':>8}{'bulk ms':>10}{'stmts':>8}{'speed-up':>10}")
+    for (label, old_ms, old_stmts), (_, new_ms, new_stmts) in zip(legacy, bulk):
+        print(f"{label:<12}{old_ms:>14.0f}{old_stmts:>8}{new_ms:>10.0f}{new_stmts:>8}{old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
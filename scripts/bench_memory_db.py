@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: DB time per chat message in MemoryService.
+
+Replays the memory calls ``Orchestrator.process_message`` makes for one
+turn (store user turn, load recent history, store assistant turn) against a
+temporary on-disk SQLite database, with the vector store stubbed out.
+
+Runs twice: once with the user_id → profile_id cache disabled (the old
+"look the profile up first" behaviour) and once with it enabled, and prints
+statements and milliseconds per message for both.
+
+    python scripts/bench_memory_db.py --messages 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from koda2.database import Base  # noqa: E402
+import koda2.modules.memory.models  # noqa: E402,F401 — registers the tables
+
+
+async def _run(messages: int, use_cache: bool) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        statements = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _count(*_args, **_kwargs):
+            nonlocal statements
+            statements += 1
+
+        @asynccontextmanager
+        async def _session():
+            async with factory() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+
+        with patch("koda2.modules.memory.service.VectorMemory", return_value=MagicMock()), \
+             patch("koda2.modules.memory.service.get_session", side_effect=_session):
+            from koda2.modules.memory.service import MemoryService
+
+            service = MemoryService()
+            await service.get_or_create_profile("bench_user")
+            statements = 0
+            started = time.perf_counter()
+            for i in range(messages):
+                if not use_cache:
+                    service._profile_ids.clear()
+                await service.add_conversation("bench_user", "user", f"message {i}")
+                await service.get_recent_conversations("bench_user", limit=20, max_age_hours=4)
+                if not use_cache:
+                    service._profile_ids.clear()
+                await service.add_conversation("bench_user", "assistant", f"reply {i}")
+            elapsed = time.perf_counter() - started
+
+        await engine.dispose()
+    return elapsed * 1000 / messages, statements / messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300, help="Chat turns to simulate")
+    args = parser.parse_args()
+
+    before_ms, before_stmts = asyncio.run(_run(args.messages, use_cache=False))
+    after_ms, after_stmts = asyncio.run(_run(args.messages, use_cache=True))
+
+    print(f"{'':<22}{'ms/message':>12}{'stmts/message':>16}")
+    print(f"{'profile lookup':<22}{before_ms:>12.2f}{before_stmts:>16.1f}")
+    print(f"{'profile-id cache':<22}{after_ms:>12.2f}{after_stmts:>16.1f}")
+    print(f"speed-up: {before_ms / after_ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
 os.environ.setdefault("CHROMA_PERSIST_DIR", "/tmp/koda2_test_chroma")
 os.environ.setdefault("KODA2_SECRET_KEY", "test-secret-key-do-not-use")
 os.environ.setdefault("KODA2_LOG_LEVEL", "WARNING")
+os.environ.setdefault("AUDIT_SYNCHRONOUS", "true")
 
 from koda2.config import Settings, get_settings
 from koda2.database import Base
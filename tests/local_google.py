@@ -0,0 +1,127 @@
+"""A local Google Calendar API stand-in for tests.
+
+Serves ``calendarList.list`` and ``events.list`` on 127.0.0.1 over plain
+HTTP, in the wire format ``googleapiclient`` speaks: JSON for single
+calls and ``multipart/mixed`` for batch calls to ``/batch/calendar/v3``.
+Lists are paged with ``pageToken``/``nextPageToken``. Every request (and
+every sub-request of a batch) is recorded, so tests can assert what went
+over the wire. Point ``GoogleCalendarProvider(api_endpoint=...)`` at
+``endpoint``.
+"""
+
+from __future__ import annotations
+
+import http.server
+import json
+import threading
+import uuid
+from email import message_from_bytes, policy
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format: str, *args) -> None:  # keep test output quiet
+        pass
+
+    def do_GET(self) -> None:
+        self.server.owner.requests.append(("GET", self.path))
+        status, body = self.server.owner.answer(self.path)
+        self._send(status, "application/json", json.dumps(body).encode())
+
+    def do_POST(self) -> None:
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.owner.requests.append(("POST", self.path))
+        if urlsplit(self.path).path != "/batch/calendar/v3":
+            self._send(404, "application/json", b'{"error": {"code": 404}}')
+            return
+        envelope = message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + data, policy=policy.HTTP,
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        out = []
+        sub_requests = []
+        for part in envelope.iter_parts():
+            request_line = part.get_payload(decode=True).split(b"\r\n", 1)[0].decode()
+            path = request_line.split(" ")[1]
+            sub_requests.append(path)
+            status, body = self.server.owner.answer(path)
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(body)}\r\n"
+            )
+        self.server.owner.batches.append(sub_requests)
+        out.append(f"--{boundary}--\r\n")
+        self._send(200, f"multipart/mixed; boundary={boundary}", "".join(out).encode())
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    owner: "LocalGoogleCalendar"
+
+
+class LocalGoogleCalendar:
+    """In-process Calendar API with in-memory calendars and events.
+
+    ``calendars`` is the calendar list (``{"id", "summary"}`` dicts) and
+    ``events`` maps calendar ID to its items; both are served
+    ``page_size`` items at a time. A calendar ID in ``failing`` answers
+    403.
+    """
+
+    def __init__(self, page_size: int = 2) -> None:
+        self.page_size = page_size
+        self.calendars: list[dict] = []
+        self.events: dict[str, list[dict]] = {}
+        self.failing: set[str] = set()
+        self.requests: list[tuple[str, str]] = []
+        self.batches: list[list[str]] = []  # sub-request paths of each batch call
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.owner = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/calendar/v3/"
+
+    def start(self) -> LocalGoogleCalendar:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, path: str) -> tuple[int, dict]:
+        """Status and JSON body for one API call."""
+        url = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.split("/")]
+        if url.path == "/calendar/v3/users/me/calendarList":
+            return 200, self._page(self.calendars, query)
+        if len(parts) == 6 and parts[:4] == ["", "calendar", "v3", "calendars"] and parts[5] == "events":
+            cal_id = parts[4]
+            if cal_id in self.failing:
+                return 403, {"error": {"code": 403, "message": "Forbidden"}}
+            page = self._page(self.events.get(cal_id, []), query)
+            if "nextPageToken" not in page:
+                page["nextSyncToken"] = f"sync-{cal_id}"
+            return 200, page
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    def _page(self, items: list[dict], query: dict[str, str]) -> dict:
+        start = int(query.get("pageToken", 0))
+        page: dict = {"items": items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            page["nextPageToken"] = str(start + self.page_size)
+        return page
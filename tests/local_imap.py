@@ -0,0 +1,322 @@
+"""A local IMAP4rev1 stand-in for tests.
+
+Serves in-memory mailboxes on 127.0.0.1 over plain TCP, speaking enough
+of the protocol for ``imaplib``: LOGIN, SELECT/EXAMINE, SEARCH, FETCH
+(RFC822, BODYSTRUCTURE, header fields and partial body sections), NOOP
+and LOGOUT (and their UID forms), plus CONDSTORE (``HIGHESTMODSEQ``,
+``CHANGEDSINCE``) unless ``condstore`` is switched off. Every command line is recorded, and
+logins, connections and bytes sent are counted, so tests can assert what
+went over the wire.
+"""
+
+from __future__ import annotations
+
+import re
+import socket
+import socketserver
+import threading
+from dataclasses import dataclass, field
+from email import message_from_bytes, policy
+from email.message import EmailMessage, Message
+
+
+@dataclass
+class StoredMessage:
+    uid: int
+    raw: bytes
+    flags: set[str] = field(default_factory=set)
+    modseq: int = 1
+
+
+def _tokens(args: str) -> list[str]:
+    """Split command arguments, honouring quoted strings and parentheses."""
+    return [t[1:-1] if t.startswith('"') else t for t in re.findall(r'"[^"]*"|\([^)]*\)|\S+', args)]
+
+
+def _sequence(spec: str, numbers: list[int]) -> list[int]:
+    """Resolve an IMAP sequence set (``1,3:5``, ``2:*``) against ``numbers``."""
+    if not numbers:
+        return []
+    top = max(numbers)
+    chosen: set[int] = set()
+    for part in spec.split(","):
+        low, _, high = part.partition(":")
+        low_n = top if low == "*" else int(low)
+        high_n = low_n if not high else top if high == "*" else int(high)
+        low_n, high_n = min(low_n, high_n), max(low_n, high_n)
+        chosen.update(n for n in numbers if low_n <= n <= high_n)
+    return sorted(chosen)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        self.owner = self.server.owner
+        self.folder: list[StoredMessage] | None = None
+        with self.owner._lock:
+            self.owner.connections += 1
+            self.owner._sockets.append(self.connection)
+
+    def send(self, data: bytes | str) -> None:
+        data = data.encode() if isinstance(data, str) else data
+        with self.owner._lock:
+            self.owner.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def handle(self) -> None:
+        self.send(f"* OK [CAPABILITY {self.owner.capabilities}] local stand-in ready\r\n")
+        while True:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            text = line.decode().rstrip("\r\n")
+            tag, _, rest = text.partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            with self.owner._lock:
+                self.owner.commands.append(rest if command != "LOGIN" else "LOGIN")
+            uid = command == "UID"
+            if uid:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+            if not self.dispatch(tag, command, args, uid):
+                return
+
+    def dispatch(self, tag: str, command: str, args: str, uid: bool) -> bool:
+        owner = self.owner
+        if command == "CAPABILITY":
+            self.send(f"* CAPABILITY {owner.capabilities}\r\n")
+        elif command == "ENABLE":
+            if owner.condstore and "CONDSTORE" in args.upper():
+                self.send("* ENABLED CONDSTORE\r\n")
+        elif command == "LOGIN":
+            user, password = _tokens(args)[:2]
+            if owner.users.get(user) != password:
+                self.send(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials\r\n")
+                return True
+            with owner._lock:
+                owner.logins += 1
+        elif command in ("SELECT", "EXAMINE"):
+            name = _tokens(args)[0]
+            if name not in owner.mailboxes:
+                self.send(f"{tag} NO Mailbox doesn't exist\r\n")
+                return True
+            self.folder = owner.mailboxes[name]
+            self.send(f"* {len(self.folder)} EXISTS\r\n* 0 RECENT\r\n")
+            self.send(f"* OK [UIDVALIDITY {owner.uidvalidity}] UIDs valid\r\n")
+            self.send(f"* OK [UIDNEXT {owner.next_uid}] Predicted next UID\r\n")
+            if owner.condstore:
+                self.send(f"* OK [HIGHESTMODSEQ {owner.modseq}] Highest\r\n")
+        elif command == "SEARCH":
+            folder = self.folder or []
+            uid_range = re.search(r"\bUID (\S+)", args, re.I)
+            allowed = set(_sequence(uid_range.group(1), [m.uid for m in folder])) if uid_range else None
+            found = [
+                (m.uid if uid else n) for n, m in enumerate(folder, 1)
+                if ("UNSEEN" not in args.upper() or "\\Seen" not in m.flags)
+                and (allowed is None or m.uid in allowed)
+            ]
+            self.send(f"* SEARCH {' '.join(map(str, found))}\r\n".replace(" \r\n", "\r\n"))
+        elif command == "FETCH":
+            spec, _, items = args.partition(" ")
+            self.fetch(spec, items.upper(), uid)
+        elif command == "NOOP":
+            pass
+        elif command == "LOGOUT":
+            self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+            return False
+        else:
+            self.send(f"{tag} BAD Unknown command\r\n")
+            return True
+        self.send(f"{tag} OK {command} completed\r\n")
+        return True
+
+    def fetch(self, spec: str, items: str, uid: bool) -> None:
+        folder = self.folder or []
+        numbers = [m.uid for m in folder] if uid else list(range(1, len(folder) + 1))
+        changed_since = re.search(r"\(CHANGEDSINCE (\d+)\)", items)
+        for key in _sequence(spec, numbers):
+            seq = next(n for n, m in enumerate(folder, 1) if m.uid == key) if uid else key
+            message = folder[seq - 1]
+            if changed_since and message.modseq <= int(changed_since.group(1)):
+                continue
+            parsed = message_from_bytes(message.raw)
+            parts: list[bytes] = [f"UID {message.uid}".encode()] if uid or "UID" in items else []
+            if "FLAGS" in items:
+                parts.append(f"FLAGS ({' '.join(sorted(message.flags))})".encode())
+            if changed_since or "MODSEQ" in items:
+                parts.append(f"MODSEQ ({message.modseq})".encode())
+            if "RFC822.SIZE" in items:
+                parts.append(f"RFC822.SIZE {len(message.raw)}".encode())
+            if "BODYSTRUCTURE" in items:
+                parts.append(b"BODYSTRUCTURE " + _bodystructure(parsed).encode())
+            fields = re.search(r"BODY(?:\.PEEK)?\[HEADER\.FIELDS \(([^)]*)\)\]", items)
+            section = re.search(r"BODY(?:\.PEEK)?\[([\d.]*)\](?:<(\d+)\.(\d+)>)?", items)
+            if fields:
+                names = fields.group(1).split()
+                wanted = [(k, v) for k, v in parsed.items() if k.upper() in names]
+                literal = "".join(f"{k}: {v}\r\n" for k, v in wanted).encode() + b"\r\n"
+                parts.append(f"BODY[HEADER.FIELDS ({fields.group(1)})] {{{len(literal)}}}\r\n".encode() + literal)
+            elif section:
+                literal = _section(message.raw, parsed, section.group(1))
+                origin = ""
+                if section.group(2) is not None:
+                    start = int(section.group(2))
+                    literal = literal[start:start + int(section.group(3))]
+                    origin = f"<{start}>"
+                parts.append(f"BODY[{section.group(1)}]{origin} {{{len(literal)}}}\r\n".encode() + literal)
+                if ".PEEK" not in items:
+                    message.flags.add("\\Seen")
+            elif "RFC822.HEADER" in items:
+                literal = message.raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                parts.append(f"RFC822.HEADER {{{len(literal)}}}\r\n".encode() + literal)
+            elif "RFC822" in items.replace("RFC822.SIZE", ""):
+                parts.append(f"RFC822 {{{len(message.raw)}}}\r\n".encode() + message.raw)
+                message.flags.add("\\Seen")
+            self.send(f"* {seq} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+
+
+def _section(raw: bytes, message: Message, section: str) -> bytes:
+    """The encoded body of a part (``""`` is the whole message)."""
+    if not section:
+        return raw
+    part = message
+    for index in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+    payload = part.get_payload()
+    return payload.encode() if isinstance(payload, str) else b""
+
+
+def _quote(value: str | None) -> str:
+    return "NIL" if value is None else '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _bodystructure(part: Message) -> str:
+    """Render a parsed message as an IMAP BODYSTRUCTURE (with extension data)."""
+    if part.is_multipart():
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+    params = part.get_params()[1:] if part.get_params() else []
+    param_list = "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in params) + ")" if params else "NIL"
+    payload = part.get_payload()
+    body = payload.encode() if isinstance(payload, str) else b""
+    encoding = (part.get("Content-Transfer-Encoding") or "7bit").upper()
+    fields = (f"{_quote(part.get_content_maintype().upper())} {_quote(part.get_content_subtype().upper())} "
+              f"{param_list} NIL NIL {_quote(encoding)} {len(body)}")
+    if part.get_content_maintype() == "text":
+        fields += f" {len(body.splitlines())}"
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        disposition_list = f"({_quote(disposition.upper())} " + (
+            f'("FILENAME" {_quote(filename)}))' if filename else "NIL)")
+    else:
+        disposition_list = "NIL"
+    return f"({fields} NIL {disposition_list} NIL NIL)"
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    owner: "LocalIMAPServer"
+
+
+class LocalIMAPServer:
+    """In-process IMAP server with in-memory mailboxes."""
+
+    def __init__(self, username: str = "user", password: str = "secret") -> None:
+        self.username = username
+        self.password = password
+        self.users = {username: password}  # add more to serve several accounts
+        self.uidvalidity = 1
+        self.next_uid = 1
+        self.modseq = 1
+        self.condstore = True
+        self.mailboxes: dict[str, list[StoredMessage]] = {"INBOX": []}
+        self.commands: list[str] = []
+        self.connections = 0
+        self.logins = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._sockets: list[socket.socket] = []
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.owner = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def capabilities(self) -> str:
+        return "IMAP4rev1 ENABLE CONDSTORE" if self.condstore else "IMAP4rev1"
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> LocalIMAPServer:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self) -> None:
+        """Cut every open connection, as a server restart or NAT timeout would."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def add_message(
+        self,
+        subject: str,
+        sender: str = "anna@example.com",
+        body: str = "Hello",
+        folder: str = "INBOX",
+        flags: tuple[str, ...] = (),
+        date: str = "Mon, 02 Mar 2026 09:00:00 +0000",
+        html: str | None = None,
+        attachments: tuple[tuple[str, bytes], ...] = (),
+    ) -> int:
+        """Append a message (text, optional HTML alternative and attachments); returns its UID."""
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"], message["Date"] = sender, "me@example.com", subject, date
+        message["Message-ID"] = f"<{self.next_uid}@example.com>"
+        message.set_content(body)
+        if html is not None:
+            message.add_alternative(html, subtype="html")
+        for filename, data in attachments:
+            message.add_attachment(data, maintype="application", subtype="octet-stream", filename=filename)
+        raw = message.as_bytes(policy=policy.SMTP)
+        with self._lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.modseq += 1
+            self.mailboxes.setdefault(folder, []).append(StoredMessage(uid, raw, set(flags), self.modseq))
+        return uid
+
+    def set_flags(self, uid: int, *flags: str, folder: str = "INBOX") -> None:
+        """Replace a message's flags, as another client would (bumps its MODSEQ)."""
+        with self._lock:
+            message = next(m for m in self.mailboxes[folder] if m.uid == uid)
+            self.modseq += 1
+            message.flags, message.modseq = set(flags), self.modseq
+
+    def expunge(self, uid: int, folder: str = "INBOX") -> None:
+        """Remove a message, as another client's delete and EXPUNGE would."""
+        with self._lock:
+            self.mailboxes[folder][:] = [m for m in self.mailboxes[folder] if m.uid != uid]
+
+    def count(self, command: str) -> int:
+        """How many times a command (e.g. ``"SELECT"``, ``"UID FETCH"``) was issued."""
+        with self._lock:
+            return sum(1 for c in self.commands if c.upper().startswith(command.upper()))
@@ -28,6 +28,7 @@ def mock_orchestrator():
     # Mock calendar
     orch.calendar.active_providers = AsyncMock(return_value=[])
     orch.calendar.list_events = AsyncMock(return_value=[])
+    orch.calendar.list_events_with_status = AsyncMock(return_value=([], {}))
     orch.calendar.list_all_calendars = AsyncMock(return_value={})
     orch.calendar.schedule_with_prep = AsyncMock(return_value=(
         MagicMock(id="ev1", title="Test", provider_id="p1"),
@@ -128,6 +129,19 @@ class TestCalendarEndpoints:
         response = client.get("/api/calendar/events?days=7")
         assert response.status_code == 200
         assert isinstance(response.json(), list)
+        assert "X-Calendar-Incomplete" not in response.headers
+
+    def test_list_events_reports_incomplete_accounts(self, client, mock_orchestrator) -> None:
+        """Accounts that timed out are named in X-Calendar-Incomplete."""
+        from koda2.modules.calendar.models import AccountFetchStatus
+
+        mock_orchestrator.calendar.list_events_with_status = AsyncMock(return_value=([], {
+            "Work": AccountFetchStatus(account="Work", status="cached"),
+            "Exchange NL": AccountFetchStatus(account="Exchange NL", status="timeout"),
+        }))
+        response = client.get("/api/calendar/events?days=7")
+        assert response.status_code == 200
+        assert response.headers["X-Calendar-Incomplete"] == "Exchange%20NL"
 
     def test_list_calendars(self, client) -> None:
         """GET /calendar/calendars returns calendar list."""
@@ -156,6 +170,22 @@ class TestEmailEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
+    def test_search_email(self, client, mock_orchestrator) -> None:
+        """GET /email/search returns hits with snippets; unread maps to the read flag."""
+        from koda2.modules.email.models import EmailMessage
+        from koda2.modules.email.store import MailSearchHit
+
+        hit = MailSearchHit(EmailMessage(subject="Offerte", account_name="Work"), "de [offerte] voor")
+        mock_orchestrator.email.search_emails = AsyncMock(return_value=[hit])
+
+        response = client.get("/api/email/search?q=offerte&unread=true&since=2026-01-01T00:00:00")
+
+        assert response.status_code == 200
+        assert response.json()[0]["snippet"] == "de [offerte] voor"
+        kwargs = mock_orchestrator.email.search_emails.call_args.kwargs
+        assert kwargs["query"] == "offerte" and kwargs["is_read"] is False
+        assert kwargs["since"].year == 2026
+
     def test_send_email(self, client) -> None:
         """POST /email/send sends an email."""
         response = client.post("/api/email/send", json={
@@ -219,6 +249,67 @@ class TestMemoryEndpoints:
         assert isinstance(response.json(), list)
 
 
+class TestPaginatedEndpoints:
+    """Tests for cursor pagination and NDJSON export."""
+
+    @staticmethod
+    def _entries(n: int) -> list:
+        from types import SimpleNamespace
+        import datetime as dt
+
+        base = dt.datetime(2026, 1, 1)
+        return [
+            SimpleNamespace(
+                id=f"m{i}", user_id="u1", category="fact", content=f"fact {i}", importance=0.5,
+                source="", created_at=base - dt.timedelta(minutes=i), updated_at=base - dt.timedelta(minutes=i),
+            )
+            for i in range(n)
+        ]
+
+    def test_memory_list_sets_next_cursor(self, client, mock_orchestrator) -> None:
+        """A full page returns limit items and an X-Next-Cursor header."""
+        from koda2.modules.memory.service import MemoryService
+
+        mock_orchestrator.memory.list_memories = AsyncMock(return_value=self._entries(3))
+        mock_orchestrator.memory.memory_cursor = MemoryService.memory_cursor
+        response = client.get("/api/memory/list?user_id=u1&limit=2")
+        assert response.status_code == 200
+        assert [m["id"] for m in response.json()] == ["m0", "m1"]
+        assert response.headers["X-Next-Cursor"]
+        assert mock_orchestrator.memory.list_memories.call_args.kwargs["limit"] == 3
+
+    def test_memory_list_last_page_has_no_cursor(self, client, mock_orchestrator) -> None:
+        """A short page omits the cursor header."""
+        mock_orchestrator.memory.list_memories = AsyncMock(return_value=self._entries(1))
+        response = client.get("/api/memory/list?user_id=u1&limit=2")
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_invalid_cursor_is_bad_request(self, client, mock_orchestrator) -> None:
+        """A malformed cursor is a 400, not a 500."""
+        from koda2.pagination import InvalidCursor
+
+        mock_orchestrator.memory.list_all_memories = AsyncMock(side_effect=InvalidCursor("bad"))
+        response = client.get("/api/memory/all?cursor=bad")
+        assert response.status_code == 400
+
+    def test_memory_export_streams_ndjson(self, client, mock_orchestrator) -> None:
+        """GET /memory/export returns one JSON object per line."""
+        import json
+
+        entries = self._entries(3)
+
+        async def _iter(**_kwargs):
+            for e in entries:
+                yield e
+
+        mock_orchestrator.memory.iter_memories = _iter
+        response = client.get("/api/memory/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == ["m0", "m1", "m2"]
+
+
 class TestSchedulerEndpoints:
     """Tests for scheduler endpoints."""
 
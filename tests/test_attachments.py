@@ -0,0 +1,233 @@
+"""Tests for streamed, content-addressed attachment downloads."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import math
+import os
+from contextlib import asynccontextmanager
+from email import message_from_bytes
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.account.models import ProviderType
+from koda2.modules.email.attachments import AttachmentStore, MessageAttachment, TransferDecoder
+from koda2.modules.email.imap_pool import IMAPPool
+from tests.local_imap import LocalIMAPServer
+
+PAYLOAD = os.urandom(700_000)
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+async def attachment_db():
+    """In-memory DB patched into the attachment store."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    with patch("koda2.modules.email.attachments.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def server():
+    server = LocalIMAPServer().start()
+    yield server
+    server.stop()
+
+
+def make_service(provider: ProviderType, credentials: dict, blobs, pool: IMAPPool | None = None):
+    account = MagicMock()
+    account.name, account.provider = "Work", provider.value
+    account_service = MagicMock()
+    account_service.get_accounts = AsyncMock(return_value=[account])
+    account_service.decrypt_credentials.return_value = credentials
+    with patch("koda2.modules.email.service.get_settings") as mock:
+        mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="none.json")
+        from koda2.modules.email.service import EmailService
+        service = EmailService(account_service, imap_pool=pool or IMAPPool())
+    service._attachments = AttachmentStore(blobs)
+    service._attachments.CHUNK = CHUNK
+    return service
+
+
+@pytest.fixture
+def service(server, tmp_path):
+    pool = IMAPPool()
+    credentials = {"server": "127.0.0.1", "port": server.port, "username": "user", "password": "secret", "use_ssl": False}
+    yield make_service(ProviderType.IMAP, credentials, tmp_path / "blobs", pool)
+    pool.close_all()
+
+
+class TestTransferDecoder:
+    """Chunked decoding gives the same bytes however the input is cut."""
+
+    @pytest.mark.parametrize("cut", [1, 3, 77, 1000, 4096])
+    def test_base64(self, cut) -> None:
+        data = os.urandom(5000)
+        encoded = base64.encodebytes(data)
+        decoder = TransferDecoder("base64")
+        out = b"".join(decoder.feed(encoded[i:i + cut]) for i in range(0, len(encoded), cut)) + decoder.flush()
+        assert out == data
+
+    @pytest.mark.parametrize("cut", [1, 2, 50, 333])
+    def test_quoted_printable(self, cut) -> None:
+        data = ("Grüße, " * 300 + "\n" + "é" * 200).encode()
+        encoded = binascii.b2a_qp(data)
+        decoder = TransferDecoder("quoted-printable")
+        out = b"".join(decoder.feed(encoded[i:i + cut]) for i in range(0, len(encoded), cut)) + decoder.flush()
+        assert out == data
+
+
+class TestIMAPDownload:
+    """Downloading attachments from a local IMAP server."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_only_the_part_in_ranges(self, server, service, attachment_db, tmp_path) -> None:
+        uid = server.add_message("Report", body="See attached", attachments=(("report.bin", PAYLOAD),))
+
+        path = await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "out"))
+
+        assert path == str(tmp_path / "out" / "report.bin")
+        with open(path, "rb") as f:
+            assert f.read() == PAYLOAD
+        fetches = [c.split(" ", 3)[3] for c in server.commands if c.startswith("UID FETCH")]
+        assert fetches[0] == "(UID BODYSTRUCTURE)"
+        ranges = fetches[1:]
+        assert all(f.startswith("(UID BODY.PEEK[2]<") for f in ranges)
+        encoded = message_from_bytes(server.mailboxes["INBOX"][0].raw).get_payload()[1].get_payload()
+        assert len(ranges) == math.ceil(len(encoded) / CHUNK) > 10
+        assert not any("RFC822" in c for c in server.commands)
+        assert all("\\Seen" not in m.flags for m in server.mailboxes["INBOX"])
+
+    @pytest.mark.asyncio
+    async def test_same_content_is_stored_once(self, server, service, attachment_db, tmp_path) -> None:
+        first = server.add_message("Offerte", attachments=(("offerte.pdf", PAYLOAD),))
+        second = server.add_message("Fwd: Offerte", attachments=(("copy.pdf", PAYLOAD),))
+
+        a = await service.download_attachment(str(first), "offerte.pdf", output_dir=str(tmp_path / "out"))
+        b = await service.download_attachment(str(second), "copy.pdf", output_dir=str(tmp_path / "out"))
+
+        sha = hashlib.sha256(PAYLOAD).hexdigest()
+        blobs = [p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]
+        assert [p.name for p in blobs] == [sha]
+        assert not os.path.samefile(a, b) and not os.path.samefile(a, blobs[0])
+        with open(b, "rb") as f:
+            assert f.read() == PAYLOAD
+        async with attachment_db() as session:
+            links = (await session.execute(select(func.count()).select_from(MessageAttachment))).scalar()
+        assert links == 2
+
+    @pytest.mark.asyncio
+    async def test_repeat_download_served_from_store(self, server, service, attachment_db, tmp_path) -> None:
+        uid = server.add_message("Report", attachments=(("report.bin", PAYLOAD),))
+        await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "out"))
+        fetches = server.count("UID FETCH")
+
+        path = await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "other"))
+
+        assert server.count("UID FETCH") == fetches
+        with open(path, "rb") as f:
+            assert f.read() == PAYLOAD
+
+    @pytest.mark.asyncio
+    async def test_download_is_a_private_copy(self, server, service, attachment_db, tmp_path) -> None:
+        """Editing a download leaves the blob alone; a different file of the same name isn't overwritten."""
+        uid = server.add_message("Report", attachments=(("report.bin", PAYLOAD),))
+        out = tmp_path / "out"
+        out.mkdir()
+        (out / "report.bin").write_bytes(b"the user's own file")
+
+        path = await service.download_attachment(str(uid), "report.bin", output_dir=str(out))
+
+        assert path == str(out / "report (1).bin")
+        assert (out / "report.bin").read_bytes() == b"the user's own file"
+        with open(path, "r+b") as f:  # writable, and not the blob
+            f.write(b"edited")
+        again = await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "other"))
+        with open(again, "rb") as f:
+            assert f.read() == PAYLOAD
+        # Asking again for the same folder reuses an identical copy instead of piling up numbered ones
+        assert await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "other")) == again
+
+    @pytest.mark.asyncio
+    async def test_corrupt_blob_fetched_again(self, server, service, attachment_db, tmp_path) -> None:
+        uid = server.add_message("Report", attachments=(("report.bin", PAYLOAD),))
+        await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "out"))
+        (blob,) = [p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]
+        blob.chmod(0o644)
+        blob.write_bytes(b"x" * len(PAYLOAD))
+
+        assert await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "a")) is None
+        path = await service.download_attachment(str(uid), "report.bin", output_dir=str(tmp_path / "b"))
+        with open(path, "rb") as f:
+            assert f.read() == PAYLOAD
+
+    @pytest.mark.asyncio
+    async def test_unknown_filename(self, server, service, attachment_db, tmp_path) -> None:
+        uid = server.add_message("Report", attachments=(("report.bin", PAYLOAD),))
+        assert await service.download_attachment(str(uid), "other.bin", output_dir=str(tmp_path)) is None
+        assert not (tmp_path / "blobs").exists()
+
+
+class TestGraphDownload:
+    """Microsoft Graph attachments are streamed from ``$value``."""
+
+    @pytest.mark.asyncio
+    async def test_streams_value(self, attachment_db, tmp_path) -> None:
+        requests = []
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            if "oauth2" in request.url.path:
+                return httpx.Response(200, json={"access_token": "token"})
+            return httpx.Response(200, content=PAYLOAD, headers={"content-type": "application/pdf"})
+
+        transport = httpx.MockTransport(_handler)
+        real_client = httpx.AsyncClient
+        credentials = {"tenant_id": "t", "client_id": "c", "client_secret": "s"}
+        service = make_service(ProviderType.MSGRAPH, credentials, tmp_path / "blobs")
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+            path = await service.download_attachment_msgraph("m1", "a1", "offerte.pdf", output_dir=str(tmp_path))
+            again = await service.download_attachment_msgraph("m1", "a1", "offerte.pdf", output_dir=str(tmp_path))
+
+        assert path == again == str(tmp_path / "offerte.pdf")
+        with open(path, "rb") as f:
+            assert f.read() == PAYLOAD
+        assert [p for p in requests if "attachments" in p] == ["/v1.0/me/messages/m1/attachments/a1/$value"]
+        stored = await service._attachments.find("Work", "INBOX", "m1", "offerte.pdf")
+        assert stored.content_type == "application/pdf" and stored.size == len(PAYLOAD)
+
+
+class TestAnalysisCache:
+    @pytest.mark.asyncio
+    async def test_analysis_kept_per_blob(self, attachment_db, tmp_path) -> None:
+        store = AttachmentStore(tmp_path)
+        writer = store.writer()
+        writer.write(b"hello")
+        stored = await store.add(writer, "Work", "INBOX", "1", "hello.txt", "text/plain")
+        assert await store.get_analysis(stored.sha256) is None
+
+        await store.save_analysis(stored.sha256, {"summary": "A greeting"})
+
+        assert await store.get_analysis(stored.sha256) == {"summary": "A greeting"}
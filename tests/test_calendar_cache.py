@@ -0,0 +1,190 @@
+"""Tests for the local calendar event cache."""
+
+from __future__ import annotations
+
+import datetime as dt
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.calendar.cache import CachedCalendarEvent, CalendarCache
+from koda2.modules.calendar.models import CalendarEvent, CalendarProvider
+
+WINDOW_START = dt.datetime(2026, 3, 1)
+WINDOW_END = dt.datetime(2026, 3, 31)
+
+
+def make_event(n: int, title: str = "") -> CalendarEvent:
+    start = WINDOW_START + dt.timedelta(days=1, hours=n)
+    return CalendarEvent(
+        provider_id=f"evt-{n}", provider=CalendarProvider.GOOGLE, title=title or f"Meeting {n}",
+        start=start, end=start + dt.timedelta(minutes=30),
+    )
+
+
+@pytest.fixture
+async def cache_db():
+    """In-memory DB patched into the cache; yields (factory, write statement log)."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    writes: list[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _log(_conn, _cursor, statement, _params, _context, _many):
+        if "cached_calendar_events" in statement and not statement.lstrip().startswith("SELECT"):
+            writes.append(statement.split()[0])
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    with patch("koda2.modules.calendar.cache.get_session", side_effect=mock_get_session):
+        yield factory, writes
+    await engine.dispose()
+
+
+class TestCalendarCacheSync:
+    """Tests for the diffing bulk upsert in sync_events."""
+
+    @pytest.mark.asyncio
+    async def test_initial_sync_is_one_bulk_insert(self, cache_db) -> None:
+        """A fresh window is written with a single INSERT statement."""
+        _, writes = cache_db
+        cache = CalendarCache()
+        count = await cache.sync_events([make_event(i) for i in range(50)], "work", WINDOW_START, WINDOW_END)
+        assert count == 50
+        assert writes == ["INSERT"]
+        assert len(await cache.get_events(WINDOW_START, WINDOW_END, account_name="work")) == 50
+
+    @pytest.mark.asyncio
+    async def test_unchanged_resync_writes_nothing(self, cache_db) -> None:
+        """Re-syncing identical events touches no rows but records the sync."""
+        _, writes = cache_db
+        cache = CalendarCache()
+        events = [make_event(i) for i in range(10)]
+        await cache.sync_events(events, "work", WINDOW_START, WINDOW_END)
+        first_sync = await cache.get_last_sync("work")
+        writes.clear()
+
+        await cache.sync_events(events, "work", WINDOW_START, WINDOW_END)
+        assert writes == []
+        assert await cache.get_last_sync("work") >= first_sync
+
+    @pytest.mark.asyncio
+    async def test_changed_event_updated_in_place(self, cache_db) -> None:
+        """A changed event keeps its row and gets the new values."""
+        factory, _ = cache_db
+        cache = CalendarCache()
+        await cache.sync_events([make_event(1), make_event(2)], "work", WINDOW_START, WINDOW_END)
+        async with factory() as session:
+            row_id = (await session.execute(
+                select(CachedCalendarEvent.id).where(CachedCalendarEvent.provider_id == "evt-1")
+            )).scalar_one()
+
+        await cache.sync_events([make_event(1, "Renamed"), make_event(2)], "work", WINDOW_START, WINDOW_END)
+        async with factory() as session:
+            row = (await session.execute(
+                select(CachedCalendarEvent).where(CachedCalendarEvent.provider_id == "evt-1")
+            )).scalar_one()
+        assert row.id == row_id
+        assert row.title == "Renamed"
+
+    @pytest.mark.asyncio
+    async def test_vanished_events_deleted_within_window_only(self, cache_db) -> None:
+        """Events missing from the batch are removed; other accounts and windows are kept."""
+        cache = CalendarCache()
+        later = make_event(99)
+        later.start = WINDOW_END + dt.timedelta(days=5)
+        later.end = later.start + dt.timedelta(hours=1)
+        await cache.sync_events([make_event(1), make_event(2), later], "work",
+                                WINDOW_START, WINDOW_END + dt.timedelta(days=10))
+        await cache.sync_events([make_event(3)], "home", WINDOW_START, WINDOW_END)
+
+        await cache.sync_events([make_event(2)], "work", WINDOW_START, WINDOW_END)
+
+        far = WINDOW_END + dt.timedelta(days=10)
+        work = {e.provider_id for e in await cache.get_events(WINDOW_START, far, account_name="work")}
+        assert work == {"evt-2", "evt-99"}
+        assert len(await cache.get_events(WINDOW_START, far, account_name="home")) == 1
+
+    @pytest.mark.asyncio
+    async def test_clear_forgets_sync_state(self, cache_db) -> None:
+        """clear() removes rows and the last-sync marker."""
+        cache = CalendarCache()
+        await cache.sync_events([make_event(1)], "work", WINDOW_START, WINDOW_END)
+        await cache.clear("work")
+        assert await cache.get_last_sync("work") is None
+
+
+class TestCalendarCacheApplyChanges:
+    """Tests for applying incremental change sets."""
+
+    @pytest.mark.asyncio
+    async def test_full_sync_stores_token(self, cache_db) -> None:
+        """sync_events records the provider token with the window."""
+        cache = CalendarCache()
+        await cache.sync_events([make_event(1)], "work", WINDOW_START, WINDOW_END, sync_token="t1")
+        state = await cache.get_sync_state("work")
+        assert state.sync_token == "t1"
+
+    @pytest.mark.asyncio
+    async def test_changes_upsert_and_delete(self, cache_db) -> None:
+        """Changed events are written, deleted IDs removed, others untouched."""
+        _, writes = cache_db
+        cache = CalendarCache()
+        await cache.sync_events([make_event(i) for i in range(5)], "work", WINDOW_START, WINDOW_END, sync_token="t1")
+        writes.clear()
+
+        applied = await cache.apply_changes(
+            [make_event(1, "Moved"), make_event(2), make_event(7)], ["evt-3"], "work", sync_token="t2",
+        )
+
+        assert applied == 3  # evt-1 updated, evt-7 added, evt-3 deleted; evt-2 unchanged
+        assert writes == ["DELETE", "INSERT"]
+        events = {e.provider_id: e.title for e in await cache.get_events(WINDOW_START, WINDOW_END, "work")}
+        assert events == {"evt-0": "Meeting 0", "evt-1": "Moved", "evt-2": "Meeting 2",
+                          "evt-4": "Meeting 4", "evt-7": "Meeting 7"}
+        assert (await cache.get_sync_state("work")).sync_token == "t2"
+
+    @pytest.mark.asyncio
+    async def test_event_moved_out_of_window_removed(self, cache_db) -> None:
+        """An update that moves an event outside the window deletes its row."""
+        cache = CalendarCache()
+        await cache.sync_events([make_event(1)], "work", WINDOW_START, WINDOW_END, sync_token="t1")
+        moved = make_event(1)
+        moved.start = WINDOW_END + dt.timedelta(days=30)
+        moved.end = moved.start + dt.timedelta(hours=1)
+
+        await cache.apply_changes([moved], [], "work", sync_token="t2")
+        assert await cache.get_events(WINDOW_START, WINDOW_END + dt.timedelta(days=60), "work") == []
+
+    @pytest.mark.asyncio
+    async def test_requires_prior_full_sync(self, cache_db) -> None:
+        """Without a recorded window there is nothing to apply changes to."""
+        with pytest.raises(ValueError):
+            await CalendarCache().apply_changes([make_event(1)], [], "work", sync_token="t1")
+
+    @pytest.mark.asyncio
+    async def test_local_write_keeps_sync_state(self, cache_db) -> None:
+        """A write made by the app itself leaves the token and sync time for the next real sync."""
+        cache = CalendarCache()
+        await cache.sync_events([make_event(1)], "work", WINDOW_START, WINDOW_END, sync_token="t1")
+        before = await cache.get_sync_state("work")
+
+        await cache.apply_changes([make_event(2)], ["evt-1"], "work", local_write=True)
+
+        state = await cache.get_sync_state("work")
+        assert (state.sync_token, state.synced_at) == ("t1", before.synced_at)
+        assert [e.provider_id for e in await cache.get_events(WINDOW_START, WINDOW_END, "work")] == ["evt-2"]
@@ -0,0 +1,315 @@
+"""Tests for the free/busy interval index and its users."""
+
+from __future__ import annotations
+
+import datetime as dt
+import math
+import random
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.calendar.cache import CalendarCache
+from koda2.modules.calendar.freebusy import BusyInterval, FreeBusyIndex, IntervalTree
+from koda2.modules.calendar.models import CalendarEvent
+from koda2.modules.calendar.providers import BaseCalendarProvider
+from koda2.modules.calendar.service import CalendarService
+from koda2.modules.facilities.models import Venue, VenueType
+from koda2.modules.facilities.service import FacilityService
+
+UTC = dt.UTC
+WINDOW_START = dt.datetime(2026, 3, 1, tzinfo=UTC)
+WINDOW_END = dt.datetime(2026, 3, 31, tzinfo=UTC)
+
+
+def at(day: int, hour: float) -> dt.datetime:
+    return dt.datetime(2026, 3, day, tzinfo=UTC) + dt.timedelta(hours=hour)
+
+
+def make_event(pid: str, start: dt.datetime, end: dt.datetime, **kwargs) -> CalendarEvent:
+    return CalendarEvent(provider_id=pid, title=pid, start=start, end=end, **kwargs)
+
+
+@pytest.fixture
+async def cache_db():
+    """Back the calendar cache with a fresh in-memory DB."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    with patch("koda2.modules.calendar.cache.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+async def index(cache_db):
+    """Index over an account synced with three events on March 2nd."""
+    cache = CalendarCache()
+    await cache.sync_events([
+        make_event("a", at(2, 9), at(2, 10)),
+        make_event("b", at(2, 9.5), at(2, 11)),
+        make_event("c", at(2, 14), at(2, 15)),
+    ], "Work", WINDOW_START, WINDOW_END)
+    return FreeBusyIndex(cache)
+
+
+class TestIntervalTree:
+    """Tests for the interval tree's updates and overlap query."""
+
+    def test_matches_brute_force(self) -> None:
+        """Overlap results equal a linear scan, ordered by start."""
+        rng = random.Random(7)
+        base = dt.datetime(2026, 3, 1, tzinfo=UTC)
+        intervals = []
+        for n in range(300):
+            start = base + dt.timedelta(minutes=rng.randrange(0, 10_000))
+            end = start + dt.timedelta(minutes=rng.randrange(1, 600))
+            intervals.append(BusyInterval(start, end, "acc", make_event(str(n), start, end)))
+        tree = IntervalTree(intervals)
+
+        for _ in range(200):
+            qs = base + dt.timedelta(minutes=rng.randrange(0, 10_000))
+            qe = qs + dt.timedelta(minutes=rng.randrange(1, 300))
+            expected = sorted((i for i in intervals if i.start < qe and i.end > qs), key=lambda i: (i.start, i.end))
+            assert tree.overlapping(qs, qe) == expected
+
+    def test_updates_match_brute_force(self) -> None:
+        """Interleaved adds and removes keep queries exact and the tree shallow."""
+        rng = random.Random(11)
+        base = dt.datetime(2026, 3, 1, tzinfo=UTC)
+        tree, live = IntervalTree(), {}
+        for n in range(3000):
+            if live and rng.random() < 0.3:
+                tree.remove(live.pop(rng.choice(sorted(live))))
+            else:
+                start = base + dt.timedelta(minutes=rng.randrange(0, 50_000))
+                end = start + dt.timedelta(minutes=rng.randrange(1, 600))
+                live[n] = BusyInterval(start, end, "acc", make_event(str(n), start, end))
+                tree.add(live[n])
+
+            if n % 100 == 0:
+                qs = base + dt.timedelta(minutes=rng.randrange(0, 50_000))
+                qe = qs + dt.timedelta(minutes=rng.randrange(1, 300))
+                expected = sorted((i for i in live.values() if i.start < qe and i.end > qs),
+                                  key=lambda i: (i.start, i.end, i.event.provider_id))
+                assert tree.overlapping(qs, qe) == expected
+
+        def height(node) -> int:
+            return 0 if node is None else 1 + max(height(node.left), height(node.right))
+
+        assert len(tree) == len(live)
+        assert height(tree._root) <= 4 * math.log2(len(live))
+
+    def test_touching_intervals_do_not_overlap(self) -> None:
+        """Intervals are half-open: back-to-back meetings don't collide."""
+        tree = IntervalTree([BusyInterval(at(2, 9), at(2, 10), "acc", make_event("a", at(2, 9), at(2, 10)))])
+        assert tree.overlapping(at(2, 10), at(2, 11)) == []
+        assert tree.overlapping(at(2, 8), at(2, 9)) == []
+        assert len(tree.overlapping(at(2, 9.5), at(2, 9.75))) == 1
+        assert IntervalTree([]).overlapping(at(2, 0), at(3, 0)) == []
+        assert len(tree.overlapping(at(2, 10), at(2, 11), closed=True)) == 1
+
+
+class TestFreeBusyIndex:
+    """Tests for free/busy queries loaded from and kept in step with the cache."""
+
+    @pytest.mark.asyncio
+    async def test_busy_and_is_free(self, index) -> None:
+        """Overlap queries return the events behind each busy period."""
+        busy = await index.busy(at(2, 9.75), at(2, 14.5), ["Work"])
+        assert [i.event.provider_id for i in busy] == ["a", "b", "c"]
+        assert await index.is_free(at(2, 11), at(2, 14), ["Work"]) is True
+        assert await index.is_free(at(2, 10.5), at(2, 12), ["Work"]) is False
+
+    @pytest.mark.asyncio
+    async def test_free_slots_merge_overlapping_busy(self, index) -> None:
+        """Gaps are computed over merged busy periods."""
+        slots = await index.free_slots(at(2, 8), at(2, 16), ["Work"])
+        assert slots == [(at(2, 8), at(2, 9)), (at(2, 11), at(2, 14)), (at(2, 15), at(2, 16))]
+        slots = await index.free_slots(at(2, 8), at(2, 16), ["Work"], min_duration=dt.timedelta(hours=2))
+        assert slots == [(at(2, 11), at(2, 14))]
+
+    @pytest.mark.asyncio
+    async def test_next_free_slot(self, index) -> None:
+        """The first gap long enough is returned, trimmed to the duration."""
+        slot = await index.next_free_slot(at(2, 9), dt.timedelta(hours=2), ["Work"])
+        assert slot == (at(2, 11), at(2, 13))
+        assert await index.next_free_slot(at(2, 9), dt.timedelta(hours=4), ["Work"], until=at(2, 15)) is None
+
+    @pytest.mark.asyncio
+    async def test_last_before(self, index) -> None:
+        """The interval ending last before a time is found, ignoring ones still running."""
+        prev = await index.last_before(at(2, 14.5), at(2, 8), ["Work"])
+        assert prev.event.provider_id == "b"
+        assert await index.last_before(at(2, 9), at(2, 5), ["Work"]) is None
+
+    @pytest.mark.asyncio
+    async def test_covers(self, index) -> None:
+        """Only ranges inside every account's synced window are covered."""
+        assert await index.covers(at(2, 0), at(3, 0), ["Work"]) is True
+        assert await index.covers(at(2, 0), WINDOW_END + dt.timedelta(days=1), ["Work"]) is False
+        assert await index.covers(at(2, 0), at(3, 0), ["Work", "Never synced"]) is False
+
+    @pytest.mark.asyncio
+    async def test_apply_changes_updates_loaded_account(self, index) -> None:
+        """Incremental changes move, add and remove intervals without a reload."""
+        await index.busy(at(2, 0), at(3, 0), ["Work"])
+        index._cache.get_events = AsyncMock(side_effect=AssertionError("reloaded"))
+
+        index.apply_changes("Work", [
+            make_event("c", at(2, 16), at(2, 17)),
+            make_event("d", at(2, 12), at(2, 13)),
+            make_event("e", at(2, 12), at(2, 13), status="cancelled"),
+        ], deleted_ids=["a"])
+
+        busy = await index.busy(at(2, 0), at(3, 0), ["Work"])
+        assert [i.event.provider_id for i in busy] == ["b", "d", "c"]
+
+    @pytest.mark.asyncio
+    async def test_deleting_series_drops_its_occurrences(self, index) -> None:
+        await index.busy(at(2, 0), at(3, 0), ["Work"])
+        index.apply_changes("Work", [
+            make_event(f"s{day}", at(day, 7), at(day, 8), series_id="series-1") for day in (2, 3, 4)
+        ], deleted_ids=[])
+        assert len(await index.busy(at(2, 0), at(5, 0), ["Work"])) == 6
+
+        index.apply_changes("Work", [], deleted_ids=["series-1"])
+
+        assert [i.event.provider_id for i in await index.busy(at(2, 0), at(5, 0), ["Work"])] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_replace_mirrors_full_sync(self, index) -> None:
+        """A full range write replaces everything in the range and moves the window."""
+        await index.busy(at(2, 0), at(3, 0), ["Work"])
+        window = (at(2, 0), at(20, 0))
+        index.replace("Work", [make_event("x", at(2, 12), at(2, 13))], *window, synced=True)
+
+        assert [i.event.provider_id for i in await index.busy(at(1, 0), at(5, 0), ["Work"])] == ["x"]
+        assert await index.covers(at(2, 0), at(20, 0), ["Work"]) is True
+        assert await index.covers(at(2, 0), at(21, 0), ["Work"]) is False
+
+    @pytest.mark.asyncio
+    async def test_unloaded_account_reads_cache(self, index) -> None:
+        """Writes for an account not yet loaded are picked up from the cache."""
+        index.replace("Work", [], at(2, 0), at(3, 0))
+        assert len(await index.busy(at(2, 0), at(3, 0), ["Work"])) == 3
+
+
+class TestCalendarServiceFreeBusy:
+    """Tests for CalendarService keeping the index current and reading from it."""
+
+    @pytest.fixture
+    def service(self, cache_db):
+        account = MagicMock()
+        account.id, account.name = "acc-1", "Work"
+        account_service = MagicMock()
+        account_service.get_accounts = AsyncMock(return_value=[account])
+        provider = MagicMock()
+        provider.list_events = AsyncMock(return_value=[])
+
+        async def _list_changes(start, end, sync_token=None):
+            return await BaseCalendarProvider.list_changes(provider, start, end, sync_token)
+
+        provider.list_changes = AsyncMock(side_effect=_list_changes)
+        service = CalendarService(account_service)
+        service._providers["acc-1"] = provider
+        return service, provider
+
+    @pytest.mark.asyncio
+    async def test_prep_time_served_from_index(self, service) -> None:
+        """A synced window answers prep time without a provider call."""
+        service, provider = service
+        now = dt.datetime.now(UTC).replace(microsecond=0)
+        meeting = make_event("m", now + dt.timedelta(days=1, hours=2), now + dt.timedelta(days=1, hours=3))
+        provider.list_events = AsyncMock(return_value=[
+            make_event("prior", now + dt.timedelta(days=1), now + dt.timedelta(days=1, hours=1), location="HQ"),
+        ])
+        await service.sync_all()
+        provider.list_events.reset_mock()
+
+        result = await service.calculate_prep_time(meeting, 15)
+        assert result.event_before.provider_id == "prior"
+        assert result.available_minutes == 60
+        provider.list_events.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_sync_updates_index(self, service) -> None:
+        """A later sync replaces the index contents without a cache reload."""
+        service, provider = service
+        start = dt.datetime.now(UTC).replace(microsecond=0) + dt.timedelta(days=1)
+        provider.list_events = AsyncMock(return_value=[make_event("a", start, start + dt.timedelta(hours=1))])
+        await service.sync_all()
+        assert await service.freebusy.is_free(start, start + dt.timedelta(hours=1), ["Work"]) is False
+
+        provider.list_events = AsyncMock(return_value=[])
+        await service.sync_all()
+        assert await service.freebusy.is_free(start, start + dt.timedelta(hours=1), ["Work"]) is True
+
+    @pytest.mark.asyncio
+    async def test_created_event_turns_slot_busy(self, service) -> None:
+        """An event booked through the service is busy in the index before any sync."""
+        service, provider = service
+        day = (dt.datetime.now(UTC) + dt.timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+        while day.weekday() >= 5:
+            day += dt.timedelta(days=1)
+        await service.sync_all()
+        slot_start, slot_end = day.replace(hour=10), day.replace(hour=11)
+        assert await service.freebusy.is_free(slot_start, slot_end, ["Work"]) is True
+
+        provider.create_event = AsyncMock(side_effect=lambda e: e.model_copy(update={"provider_id": "booked"}))
+        await service.create_event(make_event("", slot_start, slot_end), "acc-1")
+
+        assert await service.freebusy.is_free(slot_start, slot_end, ["Work"]) is False
+        search = await service.find_meeting_slots(slot_start, slot_end, 30, timezone="UTC", buffer_minutes=0)
+        assert search.slots == []
+
+        provider.delete_event = AsyncMock(return_value=True)
+        await service.delete_event("booked", "acc-1")
+        assert await service.freebusy.is_free(slot_start, slot_end, ["Work"]) is True
+        provider.list_events.assert_called_once()
+
+
+class TestFacilityAvailability:
+    """Tests for venue availability from bookings and the free/busy index."""
+
+    @staticmethod
+    def _venue(**kwargs) -> Venue:
+        return Venue(name="Room", venue_type=VenueType.MEETING_ROOM, address="HQ",
+                     max_capacity=10, seating_capacity=8, hourly_rate=Decimal("0"), **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_booking_blocks_overlapping_slot(self) -> None:
+        """A booking, with its setup and cleanup time, makes the room unavailable."""
+        facilities = FacilityService()
+        venue = self._venue()
+        facilities.add_venue(venue)
+        await facilities.book_room(venue.id, "Board", "Ann", "ann@example.com", at(2, 9), at(2, 10), 4)
+
+        assert await facilities.is_venue_available(venue, at(2, 10), at(2, 11)) is False
+        assert await facilities.is_venue_available(venue, at(2, 10.5), at(2, 11)) is True
+        with pytest.raises(ValueError, match="not available"):
+            await facilities.book_room(venue.id, "Clash", "Bob", "bob@example.com", at(2, 9.5), at(2, 10), 4)
+
+    @pytest.mark.asyncio
+    async def test_calendar_blocks_slot(self, index) -> None:
+        """Events in the venue's availability calendar make it unavailable."""
+        facilities = FacilityService(freebusy=index)
+        venue = self._venue(availability_calendar="Work")
+        facilities.add_venue(venue)
+
+        assert await facilities.is_venue_available(venue, at(2, 9), at(2, 10)) is False
+        assert await facilities.is_venue_available(venue, at(2, 11), at(2, 12)) is True
+        found = await facilities.find_suitable_venue(5, [], at(2, 9), at(2, 10))
+        assert venue not in found
@@ -0,0 +1,288 @@
+"""Tests for push-based calendar change notifications."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from koda2.api.routes import set_orchestrator
+from koda2.modules.calendar.models import CalendarProvider, CalendarSubscription
+from koda2.modules.calendar.notifications import CalendarNotifier
+from koda2.modules.calendar.providers import BaseCalendarProvider, SubscriptionExpired
+
+BASE_URL = "https://koda.example.com"
+NOW = dt.datetime(2026, 3, 2, 12, 0, tzinfo=dt.UTC)
+
+
+class LocalPushProvider(BaseCalendarProvider):
+    """Local notification stand-in: a provider that records subscriptions.
+
+    Webhook kinds remember the callback URL and secret so a test can
+    deliver notifications the way Graph or Google would; the stream kind
+    hands out changes queued with ``push``.
+    """
+
+    def __init__(self, provider: CalendarProvider, push_kind: str, renewable: bool = True) -> None:
+        self.provider = provider
+        self.push_kind = push_kind
+        self.renewable = renewable
+        self.subscribed: list[CalendarSubscription] = []
+        self.unsubscribed: list[str] = []
+        self.callback_urls: list[str] = []
+        self.changes: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, callback_url: str, client_state: str) -> list[CalendarSubscription]:
+        self.callback_urls.append(callback_url)
+        subscription = CalendarSubscription(
+            subscription_id=f"{self.provider}-{len(self.subscribed) + 1}", kind=self.push_kind,
+            client_state=client_state, resource_id="res",
+            expires_at=None if self.push_kind == "stream" else NOW + dt.timedelta(days=3),
+        )
+        self.subscribed.append(subscription)
+        return [subscription]
+
+    async def renew(self, subscription: CalendarSubscription) -> CalendarSubscription | None:
+        if not self.renewable:
+            return None
+        return subscription.model_copy(update={"expires_at": NOW + dt.timedelta(days=3)})
+
+    async def unsubscribe(self, subscription: CalendarSubscription) -> None:
+        self.unsubscribed.append(subscription.subscription_id)
+
+    async def wait_for_changes(self, subscription: CalendarSubscription, timeout_minutes: int) -> bool:
+        change = await self.changes.get()
+        if isinstance(change, Exception):
+            raise change
+        return change
+
+    def push(self, change: bool | Exception = True) -> None:
+        self.changes.put_nowait(change)
+
+    def graph_notification(self, client_state: str | None = None) -> dict:
+        subscription = self.subscribed[-1]
+        return {"value": [{
+            "subscriptionId": subscription.subscription_id,
+            "clientState": subscription.client_state if client_state is None else client_state,
+            "changeType": "updated", "resource": "me/events/AAMk",
+        }]}
+
+    async def list_events(self, start, end, calendar_name=None):
+        return []
+
+    async def create_event(self, event):
+        return event
+
+    async def update_event(self, event):
+        return event
+
+    async def delete_event(self, event_id):
+        return True
+
+    async def list_calendars(self):
+        return []
+
+
+async def settle() -> None:
+    """Let debounced syncs and stream loops run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def push_setup():
+    """Notifier over three accounts: Graph (Work), Google (Home) and Exchange (Office)."""
+    providers = {
+        "acc-work": LocalPushProvider(CalendarProvider.MSGRAPH, "webhook"),
+        "acc-home": LocalPushProvider(CalendarProvider.GOOGLE, "webhook", renewable=False),
+        "acc-office": LocalPushProvider(CalendarProvider.EWS, "stream"),
+    }
+    accounts = []
+    for account_id, name in (("acc-work", "Work"), ("acc-home", "Home"), ("acc-office", "Office")):
+        account = MagicMock()
+        account.id, account.name = account_id, name
+        accounts.append(account)
+
+    calendar = MagicMock()
+    calendar.push_accounts = set()
+    calendar.get_accounts = AsyncMock(return_value=accounts)
+    calendar._get_provider = AsyncMock(side_effect=lambda account_id: (account_id, providers[account_id]))
+    calendar.sync_account = AsyncMock(return_value=1)
+
+    notifier = CalendarNotifier(calendar, webhook_url=BASE_URL + "/")
+    notifier.DEBOUNCE_SECONDS = 0
+    return notifier, calendar, providers
+
+
+@pytest.fixture
+async def started(push_setup):
+    """Started notifier, with the catch-up syncs after subscribing already done."""
+    notifier, calendar, providers = push_setup
+    await notifier.start()
+    await settle()
+    calendar.sync_account.reset_mock()
+    yield notifier, calendar, providers
+    await notifier.stop()
+
+
+class TestCalendarNotifier:
+    """Tests for subscribing, notification handling and renewal."""
+
+    @pytest.mark.asyncio
+    async def test_start_subscribes_and_catches_up(self, push_setup) -> None:
+        """Every push-capable account is subscribed and synced once."""
+        notifier, calendar, providers = push_setup
+        await notifier.start()
+        await settle()
+
+        assert calendar.push_accounts == {"Work", "Home", "Office"}
+        assert providers["acc-work"].callback_urls == [BASE_URL + "/api/calendar/notifications/graph"]
+        assert providers["acc-home"].callback_urls == [BASE_URL + "/api/calendar/notifications/google"]
+        assert sorted(c.args[0] for c in calendar.sync_account.call_args_list) == ["Home", "Office", "Work"]
+        await notifier.stop()
+
+    @pytest.mark.asyncio
+    async def test_webhooks_need_public_url(self, push_setup) -> None:
+        """Without a webhook URL only the stream account is pushed."""
+        _, calendar, _ = push_setup
+        notifier = CalendarNotifier(calendar)
+        await notifier.start()
+        assert calendar.push_accounts == {"Office"}
+        await notifier.stop()
+
+    @pytest.mark.asyncio
+    async def test_graph_notification_syncs_only_that_account(self, started) -> None:
+        """A change on one account syncs that account, once per burst."""
+        notifier, calendar, providers = started
+        for _ in range(5):
+            assert notifier.handle_graph(providers["acc-work"].graph_notification()) == 1
+        await settle()
+        calendar.sync_account.assert_awaited_once_with("Work")
+
+    @pytest.mark.asyncio
+    async def test_wrong_client_state_rejected(self, started) -> None:
+        """Notifications that don't carry the subscription's secret are ignored."""
+        notifier, calendar, providers = started
+        assert notifier.handle_graph(providers["acc-work"].graph_notification(client_state="forged")) == 0
+        assert notifier.handle_google("unknown", "x", "exists") is False
+        await settle()
+        calendar.sync_account.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_google_handshake_ignored(self, started) -> None:
+        """The ``sync`` message of a new channel isn't a change; ``exists`` is."""
+        notifier, calendar, providers = started
+        channel = providers["acc-home"].subscribed[-1]
+        assert notifier.handle_google(channel.subscription_id, channel.client_state, "sync") is True
+        await settle()
+        calendar.sync_account.assert_not_called()
+        notifier.handle_google(channel.subscription_id, channel.client_state, "exists")
+        await settle()
+        calendar.sync_account.assert_awaited_once_with("Home")
+
+    @pytest.mark.asyncio
+    async def test_stream_change_and_resubscribe(self, started) -> None:
+        """A streamed change syncs the account; an expired stream is recreated."""
+        _, calendar, providers = started
+        office = providers["acc-office"]
+        office.push(True)
+        await settle()
+        calendar.sync_account.assert_awaited_once_with("Office")
+
+        office.push(SubscriptionExpired("gone"))
+        await settle()
+        assert len(office.subscribed) == 2 and office.unsubscribed == ["ews-1"]
+        assert "Office" in calendar.push_accounts
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_falls_back_to_polling(self, started) -> None:
+        """While the stream is down the account is no longer treated as pushed."""
+        notifier, calendar, providers = started
+        notifier.STREAM_RETRY_SECONDS = 3600
+        providers["acc-office"].push(RuntimeError("connection reset"))
+        await settle()
+        assert "Office" not in calendar.push_accounts
+
+    @pytest.mark.asyncio
+    async def test_stream_without_change_stream_backs_off(self, push_setup) -> None:
+        """The default wait_for_changes expires every subscription; one retry, then polling."""
+        notifier, calendar, providers = push_setup
+        office = providers["acc-office"]
+        office.wait_for_changes = partial(BaseCalendarProvider.wait_for_changes, office)
+        notifier.STREAM_RETRY_SECONDS = 3600
+        await notifier.start()
+        await settle()
+        assert len(office.subscribed) == 2
+        assert "Office" not in calendar.push_accounts
+        await notifier.stop()
+
+    @pytest.mark.asyncio
+    async def test_renew_expiring(self, started) -> None:
+        """Renewable subscriptions are extended; others are replaced and the old one cancelled."""
+        notifier, _, providers = started
+        renewed = await notifier.renew_expiring(now=NOW + dt.timedelta(days=3))
+        assert renewed == 2  # EWS streams have no expiry
+        assert len(providers["acc-work"].subscribed) == 1
+        assert len(providers["acc-home"].subscribed) == 2
+        assert providers["acc-home"].unsubscribed == ["google-1"]
+        assert {s.subscription_id for s in notifier.subscriptions} == {"msgraph-1", "google-2", "ews-1"}
+
+    @pytest.mark.asyncio
+    async def test_stop_unsubscribes(self, push_setup) -> None:
+        """Stopping cancels every subscription and clears the push accounts."""
+        notifier, calendar, providers = push_setup
+        await notifier.start()
+        await notifier.stop()
+        assert providers["acc-work"].unsubscribed == ["msgraph-1"]
+        assert calendar.push_accounts == set()
+
+
+class TestNotificationRoutes:
+    """Tests for the webhook routes Graph and Google deliver to."""
+
+    @pytest.fixture
+    async def client(self, started):
+        notifier, calendar, providers = started
+        orch = MagicMock()
+        orch.calendar_notifications = notifier
+        set_orchestrator(orch)
+        from koda2.main import app
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL) as client:
+            yield client, calendar, providers
+
+    @pytest.mark.asyncio
+    async def test_graph_validation_echoed(self, client) -> None:
+        """Subscription validation returns the token as plain text."""
+        client, _, _ = client
+        resp = await client.post("/api/calendar/notifications/graph", params={"validationToken": "abc 123"})
+        assert resp.status_code == 200
+        assert resp.text == "abc 123"
+        assert resp.headers["content-type"].startswith("text/plain")
+
+    @pytest.mark.asyncio
+    async def test_graph_notification_delivered(self, client) -> None:
+        """A notification POSTed by Graph syncs the subscribed account."""
+        client, calendar, providers = client
+        resp = await client.post("/api/calendar/notifications/graph",
+                                 json=providers["acc-work"].graph_notification())
+        assert resp.status_code == 202
+        await settle()
+        calendar.sync_account.assert_awaited_once_with("Work")
+
+    @pytest.mark.asyncio
+    async def test_google_notification_delivered(self, client) -> None:
+        """Google's headers identify the channel and carry its token."""
+        client, calendar, providers = client
+        channel = providers["acc-home"].subscribed[-1]
+        resp = await client.post("/api/calendar/notifications/google", headers={
+            "X-Goog-Channel-ID": channel.subscription_id,
+            "X-Goog-Channel-Token": channel.client_state,
+            "X-Goog-Resource-State": "exists",
+        })
+        assert resp.status_code == 200
+        await settle()
+        calendar.sync_account.assert_awaited_once_with("Home")
@@ -0,0 +1,639 @@
+"""Tests for the calendar providers against in-process API stand-ins."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from koda2.modules.calendar.providers import (
+    CalDAVCalendarProvider,
+    EWSCalendarProvider,
+    GoogleCalendarProvider,
+    MSGraphCalendarProvider,
+    SubscriptionExpired,
+    SyncTokenExpired,
+)
+
+START = dt.datetime(2026, 3, 1, tzinfo=dt.UTC)
+END = dt.datetime(2026, 4, 1, tzinfo=dt.UTC)
+
+
+def google_item(event_id: str, title: str = "Meeting", status: str = "confirmed") -> dict:
+    return {
+        "id": event_id, "status": status, "summary": title,
+        "start": {"dateTime": "2026-03-02T09:00:00+00:00"},
+        "end": {"dateTime": "2026-03-02T10:00:00+00:00"},
+    }
+
+
+class GoogleGone(Exception):
+    """Stand-in for googleapiclient's HttpError with a 410 response."""
+
+    resp = MagicMock(status=410)
+
+
+class FakeGoogleService:
+    """In-process stand-in for the Calendar API client.
+
+    Serves ``calendarList().list()`` and batched ``events().list()`` pages
+    from canned responses keyed by ``(calendarId, pageToken)``, and records
+    what was asked for.
+    """
+
+    def __init__(self, calendars: list[dict], pages: dict) -> None:
+        self.calendars = calendars
+        self.pages = pages
+        self.calendar_list_calls: list[dict] = []
+        self.batches: list[list[dict]] = []
+
+    def calendarList(self):
+        resource = MagicMock()
+
+        def _list(**kwargs):
+            self.calendar_list_calls.append(kwargs)
+            return MagicMock(execute=MagicMock(return_value={"items": self.calendars}))
+
+        resource.list.side_effect = _list
+        resource.get.side_effect = AssertionError("summaries come from calendarList().list()")
+        return resource
+
+    def events(self):
+        resource = MagicMock()
+        resource.list.side_effect = lambda **kwargs: kwargs  # the "request" is its arguments
+        return resource
+
+    def new_batch_http_request(self, callback):
+        service = self
+        requests: list[tuple[str, dict]] = []
+
+        class _Batch:
+            def add(self, request, request_id):
+                requests.append((request_id, request))
+
+            def execute(self):
+                service.batches.append([kwargs for _, kwargs in requests])
+                for request_id, kwargs in requests:
+                    page = service.pages[(kwargs["calendarId"], kwargs.get("pageToken"))]
+                    if isinstance(page, Exception):
+                        callback(request_id, None, page)
+                    else:
+                        callback(request_id, page, None)
+
+        return _Batch()
+
+
+@pytest.fixture
+def google():
+    """Google provider backed by a FakeGoogleService with one calendar."""
+    provider = GoogleCalendarProvider(credentials_file="creds.json", token_file="token.json")
+    service = FakeGoogleService([{"id": "cal1", "summary": "Work"}], {})
+    provider._get_service = MagicMock(return_value=service)
+    return provider, service
+
+
+class TestGoogleListEvents:
+    """Google reads: one calendar listing, batched pages, partial responses."""
+
+    @pytest.mark.asyncio
+    async def test_follows_pagination_in_batched_rounds(self, google) -> None:
+        """Every page of every calendar is fetched, one batch call per round."""
+        provider, service = google
+        service.calendars = [{"id": "cal1", "summary": "Work"}, {"id": "cal2", "summary": "Family"}]
+        service.pages = {
+            ("cal1", None): {"items": [google_item("a1")], "nextPageToken": "p2"},
+            ("cal1", "p2"): {"items": [google_item("a2")]},
+            ("cal2", None): {"items": [google_item("b1")]},
+        }
+
+        events = await provider.list_events(START, END)
+
+        assert sorted((e.provider_id, e.calendar_name) for e in events) == [
+            ("a1", "Work"), ("a2", "Work"), ("b1", "Family"),
+        ]
+        assert [len(batch) for batch in service.batches] == [2, 1]
+        first = service.batches[0][0]
+        assert first["fields"] == GoogleCalendarProvider.EVENT_FIELDS
+        assert first["maxResults"] == GoogleCalendarProvider.PAGE_SIZE
+        assert service.calendar_list_calls[0]["fields"] == GoogleCalendarProvider.CALENDAR_LIST_FIELDS
+
+    @pytest.mark.asyncio
+    async def test_calendar_list_reused(self, google) -> None:
+        """calendarList() is fetched once within CALENDAR_LIST_TTL."""
+        provider, service = google
+        service.pages = {("cal1", None): {"items": []}}
+        await provider.list_events(START, END)
+        await provider.list_events(START, END)
+        assert await provider.list_calendars() == ["cal1"]
+        assert len(service.calendar_list_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_calendar_does_not_hide_others(self, google) -> None:
+        """An error on one calendar leaves the other calendars' events."""
+        provider, service = google
+        service.calendars = [{"id": "cal1", "summary": "Work"}, {"id": "cal2", "summary": "Shared"}]
+        service.pages = {("cal1", None): {"items": [google_item("a1")]}, ("cal2", None): RuntimeError("403")}
+        events = await provider.list_events(START, END)
+        assert [e.provider_id for e in events] == ["a1"]
+
+
+class TestGoogleListChanges:
+    """Google syncToken handling."""
+
+    @pytest.mark.asyncio
+    async def test_full_sync_pages_and_returns_token(self, google) -> None:
+        """Initial sync walks every page and keeps the final nextSyncToken."""
+        provider, service = google
+        service.pages = {
+            ("cal1", None): {"items": [google_item("e1")], "nextPageToken": "p2"},
+            ("cal1", "p2"): {"items": [google_item("e2")], "nextSyncToken": "s1"},
+        }
+
+        changes = await provider.list_changes(START, END)
+
+        assert changes.full
+        assert [e.provider_id for e in changes.events] == ["e1", "e2"]
+        assert json.loads(changes.sync_token) == {"cal1": "s1"}
+        first_call = service.batches[0][0]
+        assert "timeMin" in first_call and "syncToken" not in first_call
+
+    @pytest.mark.asyncio
+    async def test_incremental_sync_reports_cancellations(self, google) -> None:
+        """With a token, cancelled items become deletions."""
+        provider, service = google
+        service.pages = {("cal1", None): {
+            "items": [google_item("e1", "Renamed"), google_item("e2", status="cancelled")],
+            "nextSyncToken": "s2",
+        }}
+
+        changes = await provider.list_changes(START, END, sync_token=json.dumps({"cal1": "s1"}))
+
+        assert not changes.full
+        assert [e.title for e in changes.events] == ["Renamed"]
+        assert changes.deleted_ids == ["e2"]
+        call = service.batches[0][0]
+        assert call["syncToken"] == "s1" and "timeMin" not in call
+
+    @pytest.mark.asyncio
+    async def test_gone_raises_sync_token_expired(self, google) -> None:
+        """HTTP 410 from Google means the token must be dropped."""
+        provider, service = google
+        service.pages = {("cal1", None): GoogleGone()}
+        with pytest.raises(SyncTokenExpired):
+            await provider.list_changes(START, END, sync_token=json.dumps({"cal1": "s1"}))
+
+    @pytest.mark.asyncio
+    async def test_new_calendar_invalidates_token(self, google) -> None:
+        """A calendar without a token can't be synced incrementally."""
+        provider, _ = google
+        with pytest.raises(SyncTokenExpired):
+            await provider.list_changes(START, END, sync_token=json.dumps({"other": "s1"}))
+
+
+@pytest.fixture
+def google_http(tmp_path):
+    """Google provider talking HTTP to a LocalGoogleCalendar through ``api_endpoint``."""
+    pytest.importorskip("googleapiclient")
+    from tests.local_google import LocalGoogleCalendar
+
+    server = LocalGoogleCalendar(page_size=2).start()
+    token = tmp_path / "token.json"
+    token.write_text(json.dumps({
+        "token": "t", "refresh_token": "r", "client_id": "c", "client_secret": "s", "expiry": "2099-01-01T00:00:00Z",
+    }))
+    provider = GoogleCalendarProvider(
+        credentials_file=str(tmp_path / "creds.json"), token_file=str(token), api_endpoint=server.endpoint,
+    )
+    yield provider, server
+    server.stop()
+
+
+class TestGoogleWireFormat:
+    """The real client against a local Calendar API: batch bodies, paging, endpoint override."""
+
+    @pytest.mark.asyncio
+    async def test_list_events_batches_pages_locally(self, google_http) -> None:
+        provider, server = google_http
+        server.calendars = [{"id": "cal1", "summary": "Work"}, {"id": "cal2", "summary": "Family"},
+                            {"id": "cal3@group.calendar.google.com", "summary": "Shared"}]
+        server.events = {
+            "cal1": [google_item(f"a{n}") for n in range(5)],
+            "cal2": [google_item("b0")],
+            "cal3@group.calendar.google.com": [google_item("c0"), google_item("c1")],
+        }
+
+        events = await provider.list_events(START, END)
+
+        assert sorted((e.provider_id, e.calendar_name) for e in events) == sorted(
+            [(f"a{n}", "Work") for n in range(5)] + [("b0", "Family"), ("c0", "Shared"), ("c1", "Shared")]
+        )
+        # calendarList paged over two GETs, then one batch per round: cal1 needs three pages
+        assert [method for method, _ in server.requests] == ["GET", "GET", "POST", "POST", "POST"]
+        assert all(path == "/batch/calendar/v3" for method, path in server.requests if method == "POST")
+        assert [len(batch) for batch in server.batches] == [3, 1, 1]
+        first = server.batches[0][0]
+        assert "fields=" in first and f"maxResults={GoogleCalendarProvider.PAGE_SIZE}" in first
+        assert "pageToken=2" in server.batches[1][0] and "pageToken=4" in server.batches[2][0]
+
+    @pytest.mark.asyncio
+    async def test_list_changes_keeps_sync_tokens(self, google_http) -> None:
+        provider, server = google_http
+        server.calendars = [{"id": "cal1", "summary": "Work"}]
+        server.events = {"cal1": [google_item("e1"), google_item("e2"), google_item("e3")]}
+
+        changes = await provider.list_changes(START, END)
+
+        assert [e.provider_id for e in changes.events] == ["e1", "e2", "e3"]
+        assert json.loads(changes.sync_token) == {"cal1": "sync-cal1"}
+
+    @pytest.mark.asyncio
+    async def test_failing_calendar_logged(self, google_http) -> None:
+        provider, server = google_http
+        server.calendars = [{"id": "cal1", "summary": "Work"}, {"id": "cal2", "summary": "Shared"}]
+        server.events = {"cal1": [google_item("a1")]}
+        server.failing = {"cal2"}
+
+        with patch("koda2.modules.calendar.providers.logger") as log:
+            events = await provider.list_events(START, END)
+
+        assert [e.provider_id for e in events] == ["a1"]
+        log.warning.assert_called_once()
+        assert log.warning.call_args.args == ("google_calendar_fetch_failed",)
+        assert log.warning.call_args.kwargs["calendar"] == "cal2"
+        assert "403" in log.warning.call_args.kwargs["error"]
+
+
+@pytest.fixture
+async def graph():
+    """Graph provider factory whose HTTP goes to an in-process handler.
+
+    ``routes`` maps a URL path to a JSON body (or a callable returning an
+    ``httpx.Response``); every request is appended to ``seen``.
+    """
+    routes: dict = {}
+    seen: list[httpx.Request] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if request.url.host == "login.microsoftonline.com":
+            return httpx.Response(200, json={"access_token": f"tok{len(seen)}", "expires_in": 3599})
+        route = routes[request.url.path]
+        return route(request) if callable(route) else httpx.Response(200, json=route)
+
+    transport = httpx.MockTransport(_handler)
+    real_client = httpx.AsyncClient
+    providers: list[MSGraphCalendarProvider] = []
+
+    def _make(tenant_id: str = "tenant") -> MSGraphCalendarProvider:
+        provider = MSGraphCalendarProvider(client_id="id", client_secret="secret", tenant_id=tenant_id)
+        providers.append(provider)
+        return provider
+
+    with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+        yield _make, routes, seen
+    for provider in providers:
+        await provider.close()
+    MSGraphCalendarProvider._tokens.clear()
+
+
+def graph_event(event_id: str) -> dict:
+    return {"id": event_id, "subject": event_id,
+            "start": {"dateTime": "2026-03-02T09:00:00.0000000", "timeZone": "UTC"},
+            "end": {"dateTime": "2026-03-02T10:00:00.0000000", "timeZone": "UTC"}}
+
+
+class TestGraphClient:
+    """Token cache, pooled client and paging for Microsoft Graph."""
+
+    @pytest.mark.asyncio
+    async def test_token_cached_one_request_per_call(self, graph) -> None:
+        """After the first call, each call is a single Graph request."""
+        make, routes, seen = graph
+        routes["/v1.0/me/calendarview"] = {"value": [graph_event("e1")]}
+        provider = make()
+
+        await provider.list_events(START, END)
+        await provider.list_events(START, END)
+
+        hosts = [r.url.host for r in seen]
+        assert hosts == ["login.microsoftonline.com", "graph.microsoft.com", "graph.microsoft.com"]
+
+    @pytest.mark.asyncio
+    async def test_token_refreshed_before_expiry(self, graph) -> None:
+        """A token inside the refresh margin is replaced before use."""
+        make, routes, seen = graph
+        routes["/v1.0/me/calendars"] = {"value": [{"name": "Calendar"}]}
+        provider = make()
+        MSGraphCalendarProvider._tokens[("tenant", "id")] = ("old", 0.0)
+
+        assert await provider.list_calendars() == ["Calendar"]
+        assert seen[0].url.host == "login.microsoftonline.com"
+        assert seen[1].headers["Authorization"] != "Bearer old"
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_refreshes_token_once(self, graph) -> None:
+        """A 401 (revoked token) triggers one refresh and a retry."""
+        make, routes, seen = graph
+        responses = iter([httpx.Response(401), httpx.Response(204)])
+        routes["/v1.0/me/events/e1"] = lambda request: next(responses)
+        provider = make()
+        MSGraphCalendarProvider._tokens[("tenant", "id")] = ("revoked", float("inf"))
+
+        assert await provider.delete_event("e1")
+        auth = [r.headers.get("Authorization") for r in seen if r.url.host == "graph.microsoft.com"]
+        assert auth[0] == "Bearer revoked" and auth[1] != "Bearer revoked"
+
+    @pytest.mark.asyncio
+    async def test_list_events_pages_with_projection(self, graph) -> None:
+        """All pages are followed; requests carry $select and a page-size preference."""
+        make, routes, seen = graph
+        routes["/v1.0/me/calendarview"] = {
+            "value": [graph_event("e1")], "@odata.nextLink": "https://graph.microsoft.com/v1.0/page2",
+        }
+        routes["/v1.0/page2"] = {"value": [graph_event("e2")]}
+
+        events = await make().list_events(START, END)
+
+        assert [e.provider_id for e in events] == ["e1", "e2"]
+        first = next(r for r in seen if r.url.path == "/v1.0/me/calendarview")
+        assert first.url.params["$select"] == MSGraphCalendarProvider.EVENT_SELECT
+        assert first.url.params["startDateTime"] == "2026-03-01T00:00:00Z"
+        assert f"odata.maxpagesize={MSGraphCalendarProvider.PAGE_SIZE}" in first.headers["Prefer"]
+
+    @pytest.mark.asyncio
+    async def test_client_shared_per_tenant(self, graph) -> None:
+        """Providers for the same tenant share one pooled client."""
+        make, _, _ = graph
+        assert make("a")._client() is make("a")._client()
+        assert make("a")._client() is not make("b")._client()
+
+
+class TestGraphListChanges:
+    """Microsoft Graph calendarView/delta handling."""
+
+    @pytest.mark.asyncio
+    async def test_follows_next_link_and_returns_delta_link(self, graph) -> None:
+        """Pages are followed; @removed entries become deletions."""
+        make, routes, _ = graph
+        routes["/v1.0/me/calendarView/delta"] = {
+            "value": [graph_event("e1")],
+            "@odata.nextLink": "https://graph.microsoft.com/v1.0/page2",
+        }
+        routes["/v1.0/page2"] = {
+            "value": [{"id": "e2", "@removed": {"reason": "deleted"}}],
+            "@odata.deltaLink": "https://graph.microsoft.com/v1.0/delta?token=d1",
+        }
+
+        changes = await make().list_changes(START, END)
+
+        assert changes.full
+        assert [e.provider_id for e in changes.events] == ["e1"]
+        assert changes.events[0].start == dt.datetime(2026, 3, 2, 9, 0, tzinfo=dt.UTC)
+        assert changes.deleted_ids == ["e2"]
+        assert changes.sync_token == "https://graph.microsoft.com/v1.0/delta?token=d1"
+
+    @pytest.mark.asyncio
+    async def test_gone_raises_sync_token_expired(self, graph) -> None:
+        """An expired delta link (410) requires a full resync."""
+        make, routes, _ = graph
+        routes["/v1.0/delta"] = lambda request: httpx.Response(410, json={})
+        with pytest.raises(SyncTokenExpired):
+            await make().list_changes(START, END, sync_token="https://graph.microsoft.com/v1.0/delta?token=old")
+
+
+def ews_sync_response(body: str, state: str = "S2", last: bool = True, code: str = "NoError") -> str:
+    response_class = "Success" if code == "NoError" else "Error"
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <m:SyncFolderItemsResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+                               xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+      <m:ResponseMessages>
+        <m:SyncFolderItemsResponseMessage ResponseClass="{response_class}">
+          <m:ResponseCode>{code}</m:ResponseCode>
+          <m:SyncState>{state}</m:SyncState>
+          <m:IncludesLastItemInRange>{str(last).lower()}</m:IncludesLastItemInRange>
+          <m:Changes>{body}</m:Changes>
+        </m:SyncFolderItemsResponseMessage>
+      </m:ResponseMessages>
+    </m:SyncFolderItemsResponse>
+  </s:Body>
+</s:Envelope>"""
+
+
+def ews_item(item_id: str, item_type: str = "Single") -> str:
+    return f"""<t:Update><t:CalendarItem>
+      <t:ItemId Id="{item_id}"/>
+      <t:Subject>Review</t:Subject>
+      <t:Start>2026-03-02T09:00:00Z</t:Start>
+      <t:End>2026-03-02T10:00:00Z</t:End>
+      <t:CalendarItemType>{item_type}</t:CalendarItemType>
+    </t:CalendarItem></t:Update>"""
+
+
+class TestEWSListChanges:
+    """EWS SyncFolderItems handling."""
+
+    @pytest.fixture
+    def ews(self):
+        return EWSCalendarProvider(server="mail.example.com", username="u", password="p", email="u@example.com")
+
+    @pytest.mark.asyncio
+    async def test_single_item_changes_applied_incrementally(self, ews) -> None:
+        """Updates and deletes of single appointments are returned as a delta."""
+        ews._soap_request = MagicMock(side_effect=[
+            ews_sync_response(ews_item("i1"), state="S2", last=False),
+            ews_sync_response('<t:Delete><t:ItemId Id="i2"/></t:Delete>', state="S3"),
+        ])
+
+        changes = await ews.list_changes(START, END, sync_token="S1")
+
+        assert not changes.full
+        assert [e.provider_id for e in changes.events] == ["i1"]
+        assert changes.deleted_ids == ["i2"]
+        assert changes.sync_token == "S3"
+        assert "<m:SyncState>S2</m:SyncState>" in ews._soap_request.call_args_list[1].args[0]
+
+    @pytest.mark.asyncio
+    async def test_recurring_change_refetches_window(self, ews) -> None:
+        """A changed series can't be expanded from its master, so the window is refetched."""
+        ews._soap_request = MagicMock(return_value=ews_sync_response(ews_item("m1", "RecurringMaster")))
+        with patch.object(EWSCalendarProvider, "list_events", AsyncMock(return_value=[])) as list_events:
+            changes = await ews.list_changes(START, END, sync_token="S1")
+        assert changes.full
+        list_events.assert_awaited_once()
+        assert changes.sync_token == "S2"
+
+    @pytest.mark.asyncio
+    async def test_invalid_state_raises_sync_token_expired(self, ews) -> None:
+        """ErrorInvalidSyncStateData maps to SyncTokenExpired."""
+        ews._soap_request = MagicMock(return_value=ews_sync_response("", code="ErrorInvalidSyncStateData"))
+        with pytest.raises(SyncTokenExpired):
+            await ews.list_changes(START, END, sync_token="bad")
+
+
+def utc(day: int, hour: int, minute: int = 0) -> dt.datetime:
+    return dt.datetime(2026, 3, day, hour, minute, tzinfo=dt.UTC)
+
+
+class TestFreeBusyLookups:
+    """Attendee free/busy per provider, keyed by lowercased email."""
+
+    @pytest.mark.asyncio
+    async def test_graph_get_schedule(self, graph) -> None:
+        """Blocking schedule items become busy periods; errored schedules are left out."""
+        make, routes, seen = graph
+        routes["/v1.0/me/calendar/getSchedule"] = {"value": [
+            {"scheduleId": "Anna@example.com", "scheduleItems": [
+                {"status": "busy", "start": {"dateTime": "2026-03-02T09:00:00.0000000", "timeZone": "UTC"},
+                 "end": {"dateTime": "2026-03-02T10:00:00.0000000", "timeZone": "UTC"}},
+                {"status": "free", "start": {"dateTime": "2026-03-02T11:00:00.0000000", "timeZone": "UTC"},
+                 "end": {"dateTime": "2026-03-02T12:00:00.0000000", "timeZone": "UTC"}},
+            ]},
+            {"scheduleId": "ghost@example.com", "error": {"message": "not found"}},
+        ]}
+
+        result = await make().get_free_busy(["Anna@example.com", "ghost@example.com"], START, END)
+
+        assert result == {"anna@example.com": [(utc(2, 9), utc(2, 10))]}
+        body = json.loads(seen[-1].content)
+        assert body["schedules"] == ["Anna@example.com", "ghost@example.com"]
+        assert body["startTime"] == {"dateTime": "2026-03-01T00:00:00", "timeZone": "UTC"}
+
+    @pytest.mark.asyncio
+    async def test_google_freebusy_query(self, google) -> None:
+        """freebusy().query busy blocks are returned; calendars with errors are not."""
+        provider, service = google
+        query = MagicMock(return_value=MagicMock(execute=MagicMock(return_value={"calendars": {
+            "piet@example.com": {"busy": [{"start": "2026-03-02T13:00:00Z", "end": "2026-03-02T14:00:00Z"}]},
+            "private@example.com": {"errors": [{"reason": "notFound"}], "busy": []},
+        }})))
+        service.freebusy = MagicMock(return_value=MagicMock(query=query))
+
+        result = await provider.get_free_busy(["piet@example.com", "private@example.com"], START, END)
+
+        assert result == {"piet@example.com": [(utc(2, 13), utc(2, 14))]}
+        assert query.call_args.kwargs["body"]["items"] == [{"id": "piet@example.com"}, {"id": "private@example.com"}]
+
+    @pytest.mark.asyncio
+    async def test_ews_get_user_availability(self) -> None:
+        """Busy and tentative blocks count; free ones and failed mailboxes don't."""
+        ews = EWSCalendarProvider(server="mail.example.com", username="u", password="p", email="u@example.com")
+        ews._soap_request = MagicMock(return_value="""<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <GetUserAvailabilityResponse xmlns="http://schemas.microsoft.com/exchange/services/2006/messages">
+      <FreeBusyResponseArray>
+        <FreeBusyResponse>
+          <ResponseMessage ResponseClass="Success"><ResponseCode>NoError</ResponseCode></ResponseMessage>
+          <FreeBusyView>
+            <CalendarEventArray xmlns="http://schemas.microsoft.com/exchange/services/2006/types">
+              <CalendarEvent><StartTime>2026-03-02T09:00:00</StartTime><EndTime>2026-03-02T10:00:00</EndTime><BusyType>Busy</BusyType></CalendarEvent>
+              <CalendarEvent><StartTime>2026-03-02T11:00:00</StartTime><EndTime>2026-03-02T11:30:00</EndTime><BusyType>Tentative</BusyType></CalendarEvent>
+              <CalendarEvent><StartTime>2026-03-02T12:00:00</StartTime><EndTime>2026-03-02T13:00:00</EndTime><BusyType>Free</BusyType></CalendarEvent>
+            </CalendarEventArray>
+          </FreeBusyView>
+        </FreeBusyResponse>
+        <FreeBusyResponse>
+          <ResponseMessage ResponseClass="Error"><ResponseCode>ErrorMailRecipientNotFound</ResponseCode></ResponseMessage>
+        </FreeBusyResponse>
+      </FreeBusyResponseArray>
+    </GetUserAvailabilityResponse>
+  </s:Body>
+</s:Envelope>""")
+
+        result = await ews.get_free_busy(["anna@example.com", "nobody@example.com"], START, END)
+
+        assert result == {"anna@example.com": [(utc(2, 9), utc(2, 10)), (utc(2, 11), utc(2, 11, 30))]}
+        request = ews._soap_request.call_args.args[0]
+        assert "<t:Address>anna@example.com</t:Address>" in request
+        assert "<t:StartTime>2026-03-01T00:00:00</t:StartTime>" in request
+
+    def test_caldav_schedule_response(self) -> None:
+        """VFREEBUSY periods (end or duration form, folded lines) per recipient."""
+        xml_text = """<?xml version="1.0" encoding="utf-8"?>
+<C:schedule-response xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <C:response>
+    <C:recipient><D:href>mailto:Anna@example.com</D:href></C:recipient>
+    <C:request-status>2.0;Success</C:request-status>
+    <C:calendar-data>BEGIN:VCALENDAR
+BEGIN:VFREEBUSY
+FREEBUSY;FBTYPE=BUSY:20260302T090000Z/20260302T100000Z,20260302T
+ 140000Z/PT1H30M
+FREEBUSY;FBTYPE=FREE:20260302T120000Z/20260302T130000Z
+END:VFREEBUSY
+END:VCALENDAR</C:calendar-data>
+  </C:response>
+  <C:response>
+    <C:recipient><D:href>mailto:ghost@example.com</D:href></C:recipient>
+    <C:request-status>3.7;Invalid calendar user</C:request-status>
+  </C:response>
+</C:schedule-response>"""
+
+        result = CalDAVCalendarProvider._parse_schedule_response(xml_text)
+
+        assert result == {"anna@example.com": [(utc(2, 9), utc(2, 10)), (utc(2, 14), utc(2, 15, 30))]}
+
+
+def ews_stream(message: str) -> str:
+    return f"""<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>
+<m:GetStreamingEventsResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+    xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"><m:ResponseMessages>
+{message}
+</m:ResponseMessages></m:GetStreamingEventsResponse></s:Body></s:Envelope>"""
+
+
+class TestPushSubscriptions:
+    """Change-notification subscriptions per provider."""
+
+    @pytest.mark.asyncio
+    async def test_graph_subscribe_renew_unsubscribe(self, graph) -> None:
+        """Subscriptions carry the secret and expiry; a vanished one can't be renewed."""
+        make, routes, seen = graph
+        routes["/v1.0/subscriptions"] = {"id": "sub1", "expirationDateTime": "2026-03-04T10:00:00Z"}
+        routes["/v1.0/subscriptions/sub1"] = lambda request: (
+            httpx.Response(200, json={"expirationDateTime": "2026-03-06T10:00:00Z"})
+            if request.method == "PATCH" else httpx.Response(404)
+        )
+        provider = make()
+
+        subscription, = await provider.subscribe("https://koda.example.com/hook", "s3cret")
+        body = json.loads(seen[-1].content)
+        assert body["notificationUrl"] == "https://koda.example.com/hook"
+        assert body["clientState"] == "s3cret" and body["resource"] == "me/events"
+        assert subscription.subscription_id == "sub1"
+        assert subscription.expires_at == dt.datetime(2026, 3, 4, 10, tzinfo=dt.UTC)
+
+        renewed = await provider.renew(subscription)
+        assert renewed.expires_at == dt.datetime(2026, 3, 6, 10, tzinfo=dt.UTC)
+        await provider.unsubscribe(subscription)
+        assert seen[-1].method == "DELETE"
+
+        routes["/v1.0/subscriptions/sub1"] = lambda request: httpx.Response(404)
+        assert await provider.renew(subscription) is None
+
+    def test_ews_stream_status(self) -> None:
+        """Notifications, keep-alives, closes and expired subscriptions are told apart."""
+        change = ews_stream("""<m:GetStreamingEventsResponseMessage ResponseClass="Success">
+  <m:ResponseCode>NoError</m:ResponseCode><m:Notifications><m:Notification>
+  <t:SubscriptionId>s1</t:SubscriptionId><t:ModifiedEvent><t:ItemId Id="AAMk"/></t:ModifiedEvent>
+  </m:Notification></m:Notifications><m:ConnectionStatus>OK</m:ConnectionStatus>
+</m:GetStreamingEventsResponseMessage>""")
+        keepalive = ews_stream("""<m:GetStreamingEventsResponseMessage ResponseClass="Success">
+  <m:ResponseCode>NoError</m:ResponseCode><m:ConnectionStatus>OK</m:ConnectionStatus>
+</m:GetStreamingEventsResponseMessage>""")
+        closed = keepalive.replace(">OK<", ">Closed<")
+        gone = ews_stream("""<m:GetStreamingEventsResponseMessage ResponseClass="Error">
+  <m:ResponseCode>ErrorSubscriptionNotFound</m:ResponseCode>
+</m:GetStreamingEventsResponseMessage>""")
+
+        assert EWSCalendarProvider._stream_status(change) is True
+        assert EWSCalendarProvider._stream_status(keepalive) is None
+        assert EWSCalendarProvider._stream_status(closed) is False
+        with pytest.raises(SubscriptionExpired):
+            EWSCalendarProvider._stream_status(gone)
+        with pytest.raises(RuntimeError):
+            EWSCalendarProvider._stream_status(gone.replace("ErrorSubscriptionNotFound", "ErrorServerBusy"))
@@ -0,0 +1,195 @@
+"""Tests for recurring series: rule expansion and series storage in the cache."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.calendar.cache import CachedCalendarEvent, CalendarCache
+from koda2.modules.calendar.models import CalendarEvent
+from koda2.modules.calendar.providers import GoogleCalendarProvider
+from koda2.modules.calendar.recurrence import (
+    expand_series,
+    instance_id,
+    occurrence_starts,
+    series_end,
+    series_recurrence,
+)
+
+AMS = ZoneInfo("Europe/Amsterdam")
+WINDOW_START = dt.datetime(2026, 3, 1, tzinfo=dt.UTC)
+WINDOW_END = dt.datetime(2026, 4, 30, tzinfo=dt.UTC)
+
+
+def ams(month: int, day: int, hour: int = 9) -> dt.datetime:
+    return dt.datetime(2026, month, day, hour, tzinfo=AMS)
+
+
+def standup(*lines: str, pid: str = "standup") -> CalendarEvent:
+    """Weekly Monday 09:00 Amsterdam series, starting March 2nd."""
+    rules = list(lines) or ["RRULE:FREQ=WEEKLY;BYDAY=MO"]
+    return CalendarEvent(
+        provider_id=pid, title="Standup", start=ams(3, 2), end=ams(3, 2) + dt.timedelta(minutes=15),
+        recurrence=series_recurrence(rules, ams(3, 2), tz_name="Europe/Amsterdam"),
+    )
+
+
+@pytest.fixture
+async def cache_db():
+    """Back the calendar cache with a fresh in-memory DB."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    with patch("koda2.modules.calendar.cache.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+class TestExpansion:
+    """Tests for parsing and expanding rule blocks."""
+
+    def test_wall_clock_kept_across_dst(self) -> None:
+        """A 09:00 Amsterdam meeting stays at 09:00 after the clocks change."""
+        occurrences = expand_series(standup(), ams(3, 20), ams(4, 10))
+        assert [o.start.astimezone(AMS) for o in occurrences] == [ams(3, 23), ams(3, 30), ams(4, 6)]
+        assert occurrences[1].start.astimezone(dt.UTC).hour == 7
+        assert all(o.end - o.start == dt.timedelta(minutes=15) for o in occurrences)
+
+    def test_occurrence_identity(self) -> None:
+        """Occurrences carry Google-style instance IDs and point back at the series."""
+        first = expand_series(standup(), ams(3, 1), ams(3, 3))[0]
+        assert first.provider_id == "standup_20260302T080000Z"
+        assert first.series_id == "standup" and first.recurrence is None
+        assert first.original_start == ams(3, 2)
+        assert instance_id("holiday", dt.datetime(2026, 3, 2), all_day=True) == "holiday_20260302"
+
+    def test_exdate_and_bounded_series(self) -> None:
+        """EXDATEs are skipped; COUNT and date-only UNTIL bound the series."""
+        event = standup("RRULE:FREQ=WEEKLY;BYDAY=MO;COUNT=4", "EXDATE;TZID=Europe/Amsterdam:20260309T090000")
+        assert [o.start.astimezone(AMS) for o in expand_series(event, ams(3, 1), ams(5, 1))] == [
+            ams(3, 2), ams(3, 16), ams(3, 23),
+        ]
+        assert series_end(event.recurrence) == ams(3, 23)
+        assert series_end(standup("RRULE:FREQ=WEEKLY;UNTIL=20260316").recurrence) == ams(3, 16)
+        assert series_end(standup().recurrence) is None
+
+    def test_expansion_is_memoized(self) -> None:
+        """The same window is expanded once."""
+        text = standup().recurrence
+        occurrence_starts.cache_clear()
+        for _ in range(3):
+            expand_series(standup(), ams(3, 1), ams(4, 1))
+        assert occurrence_starts.cache_info().hits == 2
+        assert len(occurrence_starts(text, ams(3, 1), ams(4, 1))) == 5
+
+
+class TestSeriesCache:
+    """Tests for storing masters and overrides in CalendarCache."""
+
+    @pytest.mark.asyncio
+    async def test_series_stored_once_and_expanded(self, cache_db) -> None:
+        """One row per series; reads return every occurrence with overrides applied."""
+        moved = CalendarEvent(
+            provider_id="standup_20260309T080000Z", title="Standup (moved)", start=ams(3, 10), end=ams(3, 10),
+            series_id="standup", original_start=ams(3, 9),
+        )
+        cancelled = CalendarEvent(
+            provider_id="standup_20260316T080000Z", title="", start=ams(3, 16), end=ams(3, 16),
+            status="cancelled", series_id="standup", original_start=ams(3, 16),
+        )
+        cache = CalendarCache()
+        await cache.sync_events([standup(), moved, cancelled], "Work", WINDOW_START, WINDOW_END)
+
+        events = await cache.get_events(ams(3, 1), ams(3, 24))
+        assert [(e.title, e.start.astimezone(AMS)) for e in events] == [
+            ("Standup", ams(3, 2)), ("Standup (moved)", ams(3, 10)), ("Standup", ams(3, 23)),
+        ]
+        async with cache_db() as session:
+            rows = (await session.execute(select(func.count()).select_from(CachedCalendarEvent))).scalar_one()
+        assert rows == 3
+
+    @pytest.mark.asyncio
+    async def test_series_started_before_window_is_read(self, cache_db) -> None:
+        """A master whose first occurrence predates the range still expands into it."""
+        cache = CalendarCache()
+        await cache.sync_events([standup()], "Work", WINDOW_START, WINDOW_END)
+        events = await cache.get_events(ams(4, 20, 0), ams(4, 21, 0))
+        assert [e.provider_id for e in events] == ["standup_20260420T070000Z"]
+
+    @pytest.mark.asyncio
+    async def test_adhoc_write_keeps_series(self, cache_db) -> None:
+        """Expanded live reads don't remove the master; their rows win over the expansion."""
+        cache = CalendarCache()
+        await cache.sync_events([standup()], "Work", WINDOW_START, WINDOW_END)
+        live = CalendarEvent(provider_id="standup_20260302T080000Z", title="Standup (live)",
+                             start=ams(3, 2), end=ams(3, 2) + dt.timedelta(minutes=15))
+        await cache.sync_events([live], "Work", ams(3, 2, 0), ams(3, 3, 0), mark_synced=False)
+
+        events = await cache.get_events(ams(3, 1), ams(3, 10))
+        assert [e.title for e in events] == ["Standup (live)", "Standup"]
+
+    @pytest.mark.asyncio
+    async def test_deleting_master_removes_overrides(self, cache_db) -> None:
+        """A deleted series takes its exceptions with it."""
+        moved = CalendarEvent(provider_id="standup_20260309T080000Z", title="Moved", start=ams(3, 10),
+                              end=ams(3, 10), series_id="standup", original_start=ams(3, 9))
+        cache = CalendarCache()
+        await cache.sync_events([standup(), moved], "Work", WINDOW_START, WINDOW_END)
+        await cache.apply_changes([], ["standup"], "Work", sync_token="t2")
+        assert await cache.get_events(ams(3, 1), ams(4, 1)) == []
+
+
+class TestGoogleSeries:
+    """Tests for Google returning series unexpanded to the sync."""
+
+    @pytest.mark.asyncio
+    async def test_list_changes_returns_masters_and_exceptions(self) -> None:
+        """Masters carry their rules, exceptions their series; cancelled exceptions stay as overrides."""
+        provider = GoogleCalendarProvider(credentials_file="creds.json", token_file="token.json")
+        calls: list[dict] = []
+        items = [
+            {"id": "s1", "summary": "Standup", "status": "confirmed",
+             "start": {"dateTime": "2026-03-02T09:00:00+01:00", "timeZone": "Europe/Amsterdam"},
+             "end": {"dateTime": "2026-03-02T09:15:00+01:00", "timeZone": "Europe/Amsterdam"},
+             "recurrence": ["RRULE:FREQ=WEEKLY;BYDAY=MO"]},
+            {"id": "s1_20260309T080000Z", "status": "cancelled", "recurringEventId": "s1",
+             "originalStartTime": {"dateTime": "2026-03-09T09:00:00+01:00", "timeZone": "Europe/Amsterdam"}},
+            {"id": "gone", "status": "cancelled"},
+        ]
+
+        service = MagicMock()
+        service.calendarList.return_value.list.return_value.execute.return_value = {"items": [{"id": "cal1"}]}
+        service.events.return_value.list.side_effect = lambda **kwargs: calls.append(kwargs) or kwargs
+
+        def _batch(callback):
+            batch = MagicMock()
+            batch.execute.side_effect = lambda: callback("0", {"items": items, "nextSyncToken": "s2"}, None)
+            return batch
+
+        service.new_batch_http_request.side_effect = _batch
+        provider._get_service = MagicMock(return_value=service)
+
+        changes = await provider.list_changes(WINDOW_START, WINDOW_END, sync_token=json.dumps({"cal1": "s1"}))
+
+        assert calls[0]["singleEvents"] is False
+        master, override = changes.events
+        assert master.recurrence.startswith("DTSTART;TZID=Europe/Amsterdam:20260302T090000")
+        assert override.status == "cancelled" and override.series_id == "s1"
+        assert override.original_start == ams(3, 9)
+        assert changes.deleted_ids == ["gone"]
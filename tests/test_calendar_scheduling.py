@@ -0,0 +1,119 @@
+"""Tests for the meeting-slot engine and CalendarService.find_meeting_slots."""
+
+from __future__ import annotations
+
+import datetime as dt
+from unittest.mock import AsyncMock, MagicMock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from koda2.modules.calendar.models import CalendarEvent
+from koda2.modules.calendar.scheduling import (
+    find_meeting_slots,
+    free_gaps,
+    merge_intervals,
+    working_windows,
+)
+from koda2.modules.calendar.service import CalendarService
+
+AMS = ZoneInfo("Europe/Amsterdam")
+
+
+def ams(day: int, hour: int, minute: int = 0) -> dt.datetime:
+    """A wall-clock time in Amsterdam, March 2026 (the 2nd is a Monday)."""
+    return dt.datetime(2026, 3, day, hour, minute, tzinfo=AMS)
+
+
+class TestSlotEngine:
+    """Tests for the pure interval computations."""
+
+    def test_merge_intervals(self) -> None:
+        """Overlapping and touching intervals collapse; order doesn't matter."""
+        merged = merge_intervals([(ams(2, 11), ams(2, 12)), (ams(2, 9), ams(2, 10)), (ams(2, 10), ams(2, 10, 30)),
+                                  (ams(2, 11, 30), ams(2, 11, 45))])
+        assert merged == [(ams(2, 9), ams(2, 10, 30)), (ams(2, 11), ams(2, 12))]
+
+    def test_working_windows_skip_weekend_and_clip(self) -> None:
+        """Only workdays count, clipped to the searched range."""
+        windows = working_windows(ams(6, 12), ams(9, 11), AMS)
+        assert windows == [(ams(6, 12), ams(6, 17)), (ams(9, 9), ams(9, 11))]
+
+    def test_working_windows_in_other_time_zone(self) -> None:
+        """Working hours are wall-clock time in the requested zone."""
+        ny = ZoneInfo("America/New_York")
+        windows = working_windows(ams(2, 0), ams(3, 0), ny)
+        assert windows[0][0] == dt.datetime(2026, 3, 2, 9, 0, tzinfo=ny)
+
+    def test_free_gaps(self) -> None:
+        """Blocked time is cut out of every window, including blocks spanning two windows."""
+        windows = [(ams(2, 9), ams(2, 17)), (ams(3, 9), ams(3, 17))]
+        blocked = [(ams(2, 8), ams(2, 10)), (ams(2, 12), ams(2, 13)), (ams(2, 16), ams(3, 10))]
+        assert free_gaps(windows, blocked) == [
+            (ams(2, 10), ams(2, 12)), (ams(2, 13), ams(2, 16)), (ams(3, 10), ams(3, 17)),
+        ]
+
+    def test_slots_respect_busy_buffer_and_hours(self) -> None:
+        """Slots avoid busy time plus buffer and stay inside working hours."""
+        busy = [(ams(2, 9), ams(2, 11)), (ams(2, 12), ams(2, 16, 30))]
+        slots = find_meeting_slots(busy, ams(2, 0), ams(3, 0), dt.timedelta(minutes=45), AMS,
+                                   buffer=dt.timedelta(minutes=15))
+        assert slots == []
+        slots = find_meeting_slots(busy, ams(2, 0), ams(3, 0), dt.timedelta(minutes=30), AMS,
+                                   buffer=dt.timedelta(minutes=15))
+        assert [(s.start, s.end) for s in slots] == [(ams(2, 11, 15), ams(2, 11, 45))]
+
+    def test_ranking_prefers_early_and_gap_edges(self) -> None:
+        """Earlier slots rank first; returned slots don't overlap each other."""
+        slots = find_meeting_slots([(ams(2, 10), ams(2, 16))], ams(2, 0), ams(4, 0), dt.timedelta(hours=1), AMS,
+                                   max_results=3)
+        assert [s.start for s in slots] == [ams(2, 9), ams(2, 16), ams(3, 9)]
+        assert slots[0].score > slots[1].score > slots[2].score
+        assert all(a.end <= b.start for a, b in zip(slots, slots[1:]))
+
+    def test_slots_align_to_step(self) -> None:
+        """A gap starting off-grid yields a slot on the next step."""
+        slots = find_meeting_slots([(ams(2, 9), ams(2, 9, 7))], ams(2, 0), ams(2, 12), dt.timedelta(minutes=30), AMS,
+                                   max_results=1)
+        assert slots[0].start == ams(2, 9, 15)
+
+
+class TestFindMeetingSlots:
+    """Tests for CalendarService.find_meeting_slots."""
+
+    @pytest.fixture
+    def service(self):
+        account = MagicMock()
+        account.id, account.name = "acc-1", "Work"
+        account_service = MagicMock()
+        account_service.get_accounts = AsyncMock(return_value=[account])
+        provider = MagicMock()
+        provider.list_events = AsyncMock(return_value=[
+            CalendarEvent(provider_id="own", title="Standup", start=ams(2, 9), end=ams(2, 10)),
+        ])
+        provider.get_free_busy = AsyncMock(return_value={"anna@example.com": [(ams(2, 10), ams(2, 12))]})
+        service = CalendarService(account_service)
+        service._providers["acc-1"] = provider
+        return service, provider
+
+    @pytest.mark.asyncio
+    async def test_merges_own_and_attendee_busy(self, service) -> None:
+        """Own events and attendee free/busy are combined; unknown attendees are reported."""
+        service, provider = service
+        result = await service.find_meeting_slots(
+            ams(2, 0), ams(3, 0), 60, attendees=["Anna@example.com", "piet@example.com"],
+            timezone="Europe/Amsterdam", buffer_minutes=0, max_results=1,
+        )
+
+        assert [(s.start, s.end) for s in result.slots] == [(ams(2, 12), ams(2, 13))]
+        assert result.unresolved_attendees == ["piet@example.com"]
+        assert provider.get_free_busy.call_args.args[0] == ["anna@example.com", "piet@example.com"]
+
+    @pytest.mark.asyncio
+    async def test_failed_account_reported(self, service) -> None:
+        """An account whose events can't be read is listed as incomplete."""
+        service, provider = service
+        provider.list_events = AsyncMock(side_effect=RuntimeError("down"))
+        result = await service.find_meeting_slots(ams(2, 0), ams(3, 0), 30, timezone="Europe/Amsterdam")
+        assert result.incomplete_accounts == ["Work"]
+        assert result.slots[0].start == ams(2, 9)
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from koda2.modules.calendar.models import Attendee, CalendarEvent, CalendarProvider
+from koda2.database import Base
+from koda2.modules.calendar.models import Attendee, CalendarChanges, CalendarEvent, CalendarProvider
+from koda2.modules.calendar.providers import BaseCalendarProvider, SyncTokenExpired
 from koda2.modules.calendar.service import CalendarService
 
 
@@ -23,6 +29,12 @@ def mock_provider():
     provider.update_event = AsyncMock()
     provider.delete_event = AsyncMock(return_value=True)
     provider.list_calendars = AsyncMock(return_value=["primary", "work"])
+
+    async def _list_changes(start, end, sync_token=None):
+        # A provider without change tracking: always the full window
+        return await BaseCalendarProvider.list_changes(provider, start, end, sync_token)
+
+    provider.list_changes = AsyncMock(side_effect=_list_changes)
     return provider
 
 
@@ -220,3 +232,289 @@ class TestCalendarService:
         mock_provider.update_event = AsyncMock(return_value=event)
         result = await calendar_service.update_event(event, ACCOUNT_ID)
         assert result.title == "Updated"
+
+
+@pytest.fixture
+async def cache_db():
+    """Back the calendar cache with a fresh in-memory DB."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    with patch("koda2.modules.calendar.cache.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+class TestCalendarServiceClose:
+    """Tests for releasing provider connections."""
+
+    @pytest.mark.asyncio
+    async def test_close_closes_every_provider(self, calendar_service, mock_provider) -> None:
+        """close() awaits each provider's close, tolerating failures."""
+        failing = MagicMock(close=AsyncMock(side_effect=RuntimeError("boom")))
+        calendar_service._providers["other"] = failing
+        mock_provider.close = AsyncMock()
+
+        await calendar_service.close()
+
+        mock_provider.close.assert_awaited_once()
+        failing.close.assert_awaited_once()
+
+
+class TestCalendarServiceCacheFirst:
+    """Tests for cache-first list_events with stale-while-revalidate."""
+
+    @pytest.fixture
+    async def synced(self, cache_db, calendar_service, mock_provider):
+        """Service whose cache holds one event tomorrow, freshly synced."""
+        start = dt.datetime.now(dt.UTC).replace(microsecond=0) + dt.timedelta(days=1)
+        mock_provider.list_events = AsyncMock(return_value=[
+            CalendarEvent(provider_id="e1", title="Cached", start=start, end=start + dt.timedelta(hours=1)),
+        ])
+        await calendar_service.sync_all()
+        mock_provider.list_events.reset_mock()
+        return calendar_service, start
+
+    async def _age_sync_state(self, cache_db, minutes: int) -> None:
+        from koda2.modules.calendar.cache import CalendarSyncState
+
+        async with cache_db() as session:
+            await session.execute(update(CalendarSyncState).values(
+                synced_at=dt.datetime.now(dt.UTC).replace(tzinfo=None) - dt.timedelta(minutes=minutes),
+            ))
+            await session.commit()
+
+    @pytest.mark.asyncio
+    async def test_fresh_window_served_from_cache(self, synced, mock_provider) -> None:
+        """A covered, fresh range never calls the provider."""
+        service, start = synced
+        events = await service.list_events(start - dt.timedelta(hours=1), start + dt.timedelta(hours=2))
+        assert [e.title for e in events] == ["Cached"]
+        assert events[0].start == start
+        mock_provider.list_events.assert_not_called()
+        stats = await service.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["hit_rate"] == 1.0
+        assert "Test Calendar" in stats["accounts"]
+
+    @pytest.mark.asyncio
+    async def test_stale_window_served_and_revalidated(self, synced, cache_db, mock_provider) -> None:
+        """Stale cache is returned immediately and re-synced in the background."""
+        service, start = synced
+        await self._age_sync_state(cache_db, minutes=60)
+        events = await service.list_events(start, start + dt.timedelta(hours=1))
+        assert [e.title for e in events] == ["Cached"]
+        await asyncio.gather(*service._revalidating.values())
+        mock_provider.list_events.assert_called_once()
+        assert (await service.cache_stats())["stale_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_push_account_never_stale(self, synced, cache_db, mock_provider) -> None:
+        """An account kept current by push notifications is served from cache whatever its age."""
+        service, start = synced
+        await self._age_sync_state(cache_db, minutes=60)
+        service.push_accounts.add("Test Calendar")
+        await service.list_events(start, start + dt.timedelta(hours=1), allow_stale=False)
+        mock_provider.list_events.assert_not_called()
+        assert service._revalidating == {}
+
+    @pytest.mark.asyncio
+    async def test_stale_window_live_when_stale_disallowed(self, synced, cache_db, mock_provider) -> None:
+        """allow_stale=False fetches live instead of serving old data."""
+        service, start = synced
+        await self._age_sync_state(cache_db, minutes=60)
+        await service.list_events(start, start + dt.timedelta(hours=1), allow_stale=False)
+        mock_provider.list_events.assert_called_once()
+        assert service._revalidating == {}
+
+    @pytest.mark.asyncio
+    async def test_uncovered_range_goes_live(self, synced, mock_provider) -> None:
+        """Ranges outside the synced window are fetched from the provider."""
+        service, start = synced
+        far = start + dt.timedelta(days=90)
+        await service.list_events(far, far + dt.timedelta(days=1))
+        mock_provider.list_events.assert_called_once()
+        assert (await service.cache_stats())["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_own_writes_visible_in_cache(self, synced, mock_provider) -> None:
+        """Events created, moved or deleted through the service show up in cached reads at once."""
+        service, start = synced
+        later = start + dt.timedelta(hours=3)
+        mock_provider.create_event = AsyncMock(side_effect=lambda e: e.model_copy(update={"provider_id": "e2"}))
+        mock_provider.update_event = AsyncMock(side_effect=lambda e: e)
+
+        created = await service.create_event(CalendarEvent(title="New", start=later, end=later + dt.timedelta(hours=1)))
+        window = (start - dt.timedelta(hours=1), start + dt.timedelta(hours=6))
+        assert [e.title for e in await service.list_events(*window)] == ["Cached", "New"]
+
+        moved = created.model_copy(update={"title": "Moved", "start": start + dt.timedelta(hours=4),
+                                           "end": start + dt.timedelta(hours=5)})
+        await service.update_event(moved, ACCOUNT_ID)
+        await service.delete_event("e1", ACCOUNT_ID)
+
+        events = await service.list_events(*window)
+        assert [(e.title, e.start) for e in events] == [("Moved", start + dt.timedelta(hours=4))]
+        mock_provider.list_events.assert_not_called()
+        assert (await service.cache_stats())["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_zero_max_age_forces_live(self, synced, mock_provider) -> None:
+        """max_age=0 bypasses the cache entirely."""
+        service, start = synced
+        await service.list_events(start, start + dt.timedelta(hours=1), max_age=dt.timedelta(0))
+        mock_provider.list_events.assert_called_once()
+        assert (await service.cache_stats())["bypassed"] == 1
+
+
+class TestCalendarServiceIncrementalSync:
+    """Tests for token-based incremental sync in sync_all."""
+
+    @staticmethod
+    def _event(pid: str, title: str, days: int = 1) -> CalendarEvent:
+        start = dt.datetime.now(dt.UTC).replace(microsecond=0) + dt.timedelta(days=days)
+        return CalendarEvent(provider_id=pid, title=title, start=start, end=start + dt.timedelta(hours=1))
+
+    @pytest.mark.asyncio
+    async def test_second_sync_uses_token(self, cache_db, calendar_service, mock_provider) -> None:
+        """The stored token is passed back and only the delta is applied."""
+        mock_provider.list_changes = AsyncMock(side_effect=[
+            CalendarChanges(events=[self._event("a", "A"), self._event("b", "B")], sync_token="t1", full=True),
+            CalendarChanges(events=[self._event("a", "A2")], deleted_ids=["b"], sync_token="t2"),
+        ])
+
+        assert await calendar_service.sync_all() == {"Test Calendar": 2}
+        assert mock_provider.list_changes.call_args_list[0].kwargs == {}
+        assert await calendar_service.sync_all() == {"Test Calendar": 2}
+        assert mock_provider.list_changes.call_args_list[1].kwargs == {"sync_token": "t1"}
+
+        start, end = calendar_service._sync_window()
+        events = await calendar_service._cache.get_events(start, end, account_name="Test Calendar")
+        assert [e.title for e in events] == ["A2"]
+        assert (await calendar_service._cache.get_sync_state("Test Calendar")).sync_token == "t2"
+
+    @pytest.mark.asyncio
+    async def test_expired_token_falls_back_to_full_sync(self, cache_db, calendar_service, mock_provider) -> None:
+        """SyncTokenExpired triggers a full window fetch that replaces the cache."""
+        mock_provider.list_changes = AsyncMock(side_effect=[
+            CalendarChanges(events=[self._event("a", "A")], sync_token="t1", full=True),
+            SyncTokenExpired("gone"),
+            CalendarChanges(events=[self._event("c", "C")], sync_token="t9", full=True),
+        ])
+
+        await calendar_service.sync_all()
+        assert await calendar_service.sync_all() == {"Test Calendar": 1}
+
+        assert mock_provider.list_changes.call_args_list[2].kwargs == {}
+        start, end = calendar_service._sync_window()
+        events = await calendar_service._cache.get_events(start, end, account_name="Test Calendar")
+        assert [e.provider_id for e in events] == ["c"]
+        assert (await calendar_service._cache.get_sync_state("Test Calendar")).sync_token == "t9"
+
+    @pytest.mark.asyncio
+    async def test_outgrown_window_forces_full_sync(self, cache_db, calendar_service, mock_provider) -> None:
+        """Once the sliding window passes the token's window, the token is not used."""
+        mock_provider.list_changes = AsyncMock(return_value=CalendarChanges(sync_token="t1", full=True))
+        await calendar_service.sync_all()
+
+        calendar_service.SYNC_WINDOW_DAYS = CalendarService.SYNC_WINDOW_DAYS + CalendarService.SYNC_TOKEN_SLACK_DAYS + 1
+        await calendar_service.sync_all()
+        assert mock_provider.list_changes.call_args_list[1].kwargs == {}
+
+    @pytest.mark.asyncio
+    async def test_sync_account_and_exclude(self, cache_db, calendar_service, mock_provider) -> None:
+        """One account can be synced by name; sync_all can skip accounts."""
+        assert await calendar_service.sync_account("Test Calendar") == 0
+        assert await calendar_service.sync_account("Unknown") == -1
+        assert await calendar_service.sync_all(exclude={"Test Calendar"}) == {}
+        assert mock_provider.list_changes.call_count == 1
+
+
+class TestCalendarServiceFanOut:
+    """Tests for concurrent multi-account calls with per-account deadlines."""
+
+    @staticmethod
+    def _service(delays: dict[str, float]) -> tuple[CalendarService, dict]:
+        """Service with one account per entry; each provider answers after its delay."""
+        accounts, providers = [], {}
+        running = {"now": 0, "max": 0}
+        for i, (name, delay) in enumerate(delays.items()):
+            account = MagicMock()
+            account.id, account.name = f"acc-{i}", name
+
+            async def _list_events(start, end, calendar_name=None, _name=name, _delay=delay):
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+                try:
+                    await asyncio.sleep(_delay)
+                finally:
+                    running["now"] -= 1
+                return [CalendarEvent(provider_id=f"{_name}-1", title=_name, start=start, end=end)]
+
+            async def _list_calendars(_name=name, _delay=delay):
+                await asyncio.sleep(_delay)
+                return [_name]
+
+            provider = MagicMock()
+            provider.list_events = AsyncMock(side_effect=_list_events)
+            provider.list_calendars = AsyncMock(side_effect=_list_calendars)
+            accounts.append(account)
+            providers[account.id] = provider
+
+        account_service = MagicMock()
+        account_service.get_accounts = AsyncMock(return_value=accounts)
+        service = CalendarService(account_service)
+        service._providers.update(providers)
+        return service, running
+
+    @pytest.mark.asyncio
+    async def test_slow_account_times_out_with_partial_results(self, cache_db) -> None:
+        """Healthy accounts are returned; the slow one is reported, not waited for."""
+        service, _ = self._service({"Google": 0.01, "Exchange": 5.0})
+        service.ACCOUNT_TIMEOUT = 0.2
+        now = dt.datetime.now(dt.UTC)
+
+        started = asyncio.get_running_loop().time()
+        events, statuses = await service.list_events_with_status(now, now + dt.timedelta(hours=1),
+                                                                 max_age=dt.timedelta(0))
+        assert asyncio.get_running_loop().time() - started < 1.0
+
+        assert [e.title for e in events] == ["Google"]
+        assert statuses["Google"].status == "ok"
+        assert statuses["Exchange"].status == "timeout"
+        assert (await service.cache_stats())["account_status"]["Exchange"]["status"] == "timeout"
+
+    @pytest.mark.asyncio
+    async def test_parallelism_is_bounded(self) -> None:
+        """Accounts run concurrently, at most FANOUT_CONCURRENCY at a time."""
+        service, running = self._service({f"acc{i}": 0.05 for i in range(6)})
+        service.FANOUT_CONCURRENCY = 3
+        now = dt.datetime.now(dt.UTC)
+
+        events = await service.list_events(now, now + dt.timedelta(hours=1), max_age=dt.timedelta(0))
+        assert len(events) == 6
+        assert running["max"] == 3
+
+    @pytest.mark.asyncio
+    async def test_list_all_calendars_survives_slow_account(self) -> None:
+        """A timed-out account lists no calendars; the others still do."""
+        service, _ = self._service({"Google": 0.01, "Exchange": 5.0})
+        service.ACCOUNT_TIMEOUT = 0.2
+        assert await service.list_all_calendars() == {"Google": ["Google"], "Exchange": []}
+
+    @pytest.mark.asyncio
+    async def test_sync_all_reports_failed_account(self, cache_db) -> None:
+        """A failing account is -1 in sync_all; the rest are synced."""
+        service, _ = self._service({"Google": 0.01, "Exchange": 0.01})
+        service._providers["acc-1"].list_changes = AsyncMock(side_effect=RuntimeError("HTTP 503"))
+        service._providers["acc-0"].list_changes = AsyncMock(return_value=CalendarChanges(full=True))
+
+        assert await service.sync_all() == {"Google": 0, "Exchange": -1}
@@ -2,11 +2,25 @@
 
 from __future__ import annotations
 
+import datetime as dt
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from koda2.database import Base, get_engine, get_session, get_session_factory, init_db, close_db
+from sqlalchemy import text
+
+from koda2.database import (
+    Base,
+    UTCDateTime,
+    close_db,
+    create_engine_for,
+    database_backend,
+    get_engine,
+    get_session,
+    get_session_factory,
+    init_db,
+    normalize_database_url,
+)
 
 
 class TestDatabase:
@@ -85,3 +99,57 @@ class TestDatabase:
         assert "pk" in Base.metadata.naming_convention
         assert "fk" in Base.metadata.naming_convention
         assert "uq" in Base.metadata.naming_convention
+
+
+class TestEngineProfiles:
+    """Tests for per-backend engine tuning."""
+
+    @pytest.mark.asyncio
+    async def test_sqlite_file_gets_tuned_pragmas(self, tmp_path) -> None:
+        """File SQLite connections run in WAL with a busy timeout."""
+        engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path}/t.db")
+        try:
+            async with engine.connect() as conn:
+                assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+                assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+                assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+            assert engine.pool.size() == 5
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_untuned_sqlite_keeps_defaults(self, tmp_path) -> None:
+        """tuned=False leaves SQLite's rollback journal in place."""
+        engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path}/t.db", tuned=False)
+        try:
+            async with engine.connect() as conn:
+                assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "delete"
+        finally:
+            await engine.dispose()
+
+    def test_postgres_urls_use_asyncpg(self) -> None:
+        """Plain PostgreSQL URLs are mapped onto the asyncpg driver."""
+        assert normalize_database_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert normalize_database_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert normalize_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+        assert database_backend("postgres://u:p@h/db") == "postgresql"
+
+    def test_postgres_datetimes_are_plain_timestamps(self) -> None:
+        """DateTime columns are plain TIMESTAMP on PostgreSQL, holding naive UTC."""
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateTable
+
+        import koda2.security.audit  # noqa: F401
+
+        ddl = str(CreateTable(Base.metadata.tables["audit_logs"]).compile(dialect=postgresql.dialect()))
+        assert "TIMESTAMP WITHOUT TIME ZONE" in ddl
+
+    def test_utc_datetime_normalizes_aware_values(self) -> None:
+        """Aware values are stored as the same instant in naive UTC; naive ones are taken as UTC."""
+        from zoneinfo import ZoneInfo
+
+        amsterdam = dt.datetime(2026, 3, 2, 10, 30, tzinfo=ZoneInfo("Europe/Amsterdam"))
+        bind = UTCDateTime().process_bind_param
+        assert bind(amsterdam, None) == dt.datetime(2026, 3, 2, 9, 30)
+        assert bind(dt.datetime(2026, 3, 2, 9, 30), None) == dt.datetime(2026, 3, 2, 9, 30)
+        assert bind(None, None) is None
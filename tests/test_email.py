@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+import datetime as dt
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
 
+from koda2.modules.account.models import ProviderType
+
 from koda2.modules.email.models import (
     EmailAttachment,
     EmailFilter,
@@ -140,3 +147,83 @@ class TestEmailService:
 
             with pytest.raises(ValueError, match="Template not found"):
                 service.render_template("nonexistent", {})
+
+
+def _mail(subject: str, minute: int, tz: bool = True) -> EmailMessage:
+    return EmailMessage(subject=subject, date=dt.datetime(2026, 3, 2, 9, minute, tzinfo=dt.UTC if tz else None))
+
+
+def _delayed(result: list[EmailMessage], seconds: float):
+    async def _fetch(*args, **kwargs) -> list[EmailMessage]:
+        await asyncio.sleep(seconds)
+        return result
+    return _fetch
+
+
+class TestFetchAllEmails:
+    """Concurrent provider reads under a shared deadline, merged newest first."""
+
+    @pytest.fixture
+    def service(self):
+        with patch("koda2.modules.email.service.get_settings") as mock:
+            mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="nonexistent.json")
+            from koda2.modules.email.service import EmailService
+            service = EmailService(MagicMock(get_accounts=AsyncMock(return_value=[])))
+        service.FETCH_DEADLINE = 0.5
+        return service
+
+    @pytest.mark.asyncio
+    async def test_live_providers_read_concurrently(self, service) -> None:
+        """Without the store every provider is read at once, merged newest first."""
+        failing = AsyncMock(side_effect=RuntimeError("no database"))
+        service._store = MagicMock(get_state=failing, query=failing)
+        service._account_service.get_accounts = AsyncMock(return_value=[MagicMock(provider=ProviderType.IMAP.value)])
+        service.fetch_emails = _delayed([_mail("imap 2", 2), _mail("imap 9", 9)], 0.2)
+        service.fetch_emails_msgraph = _delayed([_mail("graph 5", 5)], 0.2)
+        service.fetch_emails_gmail = _delayed([_mail("gmail 7", 7), _mail("gmail 1", 1)], 0.2)
+        service.fetch_emails_ews = _delayed([_mail("ews 8", 8, tz=False)], 0.2)
+
+        started = time.monotonic()
+        emails = await service.fetch_all_emails(limit=4)
+
+        assert time.monotonic() - started < 0.4
+        assert [e.subject for e in emails] == ["imap 9", "ews 8", "gmail 7", "graph 5"]
+
+    @pytest.mark.asyncio
+    async def test_slow_provider_left_out_at_deadline(self, service) -> None:
+        service.fetch_emails = _delayed([_mail("imap", 1)], 0)
+        service.fetch_emails_msgraph = _delayed([], 0)
+        service.fetch_emails_gmail = AsyncMock(side_effect=RuntimeError("token revoked"))
+        service.fetch_emails_ews = _delayed([_mail("ews", 2)], 5)
+
+        started = time.monotonic()
+        emails = await service._fetch_all_live(unread_only=False, limit=50)
+
+        assert time.monotonic() - started < 1
+        assert [e.subject for e in emails] == ["imap"]
+
+    @pytest.mark.asyncio
+    async def test_slow_sync_serves_store_and_keeps_syncing(self, service) -> None:
+        """A sync overrunning the deadline isn't cancelled; the store is read as it is."""
+        account = MagicMock()
+        account.name, account.provider = "Work", ProviderType.IMAP.value
+        service._account_service.get_accounts = AsyncMock(return_value=[account])
+        service._store = MagicMock(query=AsyncMock(return_value=[_mail("stored", 3)]))
+        service.sync_mail = _delayed({"Work": 1}, 5)
+        service.fetch_emails_ews = _delayed([_mail("ews", 4)], 0.1)
+
+        emails = await service.fetch_all_emails()
+
+        assert [e.subject for e in emails] == ["ews", "stored"]
+        assert not service._sync_task.done()
+        assert service._start_sync(None) is service._sync_task  # joined, not restarted
+        service._sync_task.cancel()
+
+    def test_merge_stops_at_limit(self) -> None:
+        from koda2.modules.email.service import EmailService
+
+        # Two accounts of one provider: two ordered runs back to back
+        imap = [_mail("a 9", 9), _mail("a 4", 4), _mail("b 8", 8), _mail("b 1", 1)]
+        ews = [_mail("c 6", 6, tz=False), _mail("c 5", 5, tz=False)]
+        merged = EmailService._merge_newest_first([imap, [], ews], limit=4)
+        assert [e.subject for e in merged] == ["a 9", "b 8", "c 6", "c 5"]
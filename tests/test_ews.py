@@ -0,0 +1,204 @@
+"""Tests for the shared EWS session: keep-alive, autodiscover cache, paging and streamed parsing."""
+
+from __future__ import annotations
+
+import datetime as dt
+import re
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from koda2.modules.account.ews import HEADERS, AutodiscoverCache, EWSSession, TYPES_NS
+from koda2.modules.calendar.providers import EWSCalendarProvider
+
+START = dt.datetime(2026, 3, 1, tzinfo=dt.UTC)
+END = dt.datetime(2026, 4, 1, tzinfo=dt.UTC)
+
+
+def find_response(items: list[str], offset: int, last: bool, code: str = "NoError") -> str:
+    klass = "Error" if code != "NoError" else "Success"
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>
+<m:FindItemResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+    xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"><m:ResponseMessages>
+<m:FindItemResponseMessage ResponseClass="{klass}"><m:ResponseCode>{code}</m:ResponseCode>
+<m:RootFolder IndexedPagingOffset="{offset}" TotalItemsInView="5" IncludesLastItemInRange="{str(last).lower()}">
+<t:Items>{"".join(items)}</t:Items></m:RootFolder>
+</m:FindItemResponseMessage></m:ResponseMessages></m:FindItemResponse></s:Body></s:Envelope>"""
+
+
+def message(n: int) -> str:
+    return f"""<t:Message><t:ItemId Id="msg{n}"/><t:Subject>Mail {n}</t:Subject>
+<t:DateTimeReceived>2026-03-0{n}T09:00:00Z</t:DateTimeReceived><t:IsRead>false</t:IsRead>
+<t:From><t:Mailbox><t:Name>Anna</t:Name><t:EmailAddress>anna@example.com</t:EmailAddress></t:Mailbox></t:From>
+<t:HasAttachments>false</t:HasAttachments></t:Message>"""
+
+
+def calendar_item(item_id: str, start: str) -> str:
+    return f"""<t:CalendarItem><t:ItemId Id="{item_id}"/><t:Subject>{item_id}</t:Subject>
+<t:Start>{start}</t:Start><t:End>2026-03-20T18:00:00Z</t:End></t:CalendarItem>"""
+
+
+def chunked(text: str, size: int = 64):
+    """Response body delivered in small pieces, as a slow server would."""
+    data = text.encode()
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.fixture
+def ews(tmp_path):
+    """Session factory whose HTTP goes to ``handler``; the autodiscover cache lives in tmp_path.
+
+    ``hosts`` lists the hosts that answer; requests are recorded in ``seen``.
+    """
+    seen: list[httpx.Request] = []
+    state: dict = {"hosts": {"mail.example.com"}, "handler": None}
+
+    def _transport(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if request.url.host not in state["hosts"]:
+            raise httpx.ConnectError("unreachable", request=request)
+        if b"ResolveNames" in request.content:
+            return httpx.Response(200, text="<ok/>")
+        return state["handler"](request)
+
+    def _make(**kwargs) -> EWSSession:
+        session = EWSSession.for_account(
+            kwargs.get("server", "mail.example.com"), "u", kwargs.get("password", "p"), "u@example.com",
+            discover=kwargs.get("discover", lambda server, email: [server, "exchange.example.com"]),
+        )
+        session._client = httpx.Client(transport=httpx.MockTransport(_transport), headers=HEADERS)
+        return session
+
+    with patch.object(EWSSession, "autodiscover_cache", AutodiscoverCache(tmp_path / "ews_autodiscover.json")):
+        yield _make, state, seen
+    EWSSession.close_all()
+
+
+def offset_of(request: httpx.Request) -> int:
+    return int(re.search(rb'Offset="(\d+)"', request.content).group(1))
+
+
+class TestEWSSession:
+    """Shared session behaviour."""
+
+    def test_shared_per_mailbox(self, ews) -> None:
+        """One session per mailbox; a changed password gets a fresh one."""
+        make, _, _ = ews
+        session = make()
+        assert EWSSession.for_account("https://mail.example.com/EWS/Exchange.asmx", "u", "p", "U@example.com") is session
+        assert make(password="new") is not session
+
+    def test_find_items_pages_and_streams(self, ews) -> None:
+        """FindItem is paged with IndexedPageItemView until the last item, parsed from chunks."""
+        make, state, seen = ews
+        pages = {0: ([message(1), message(2)], 2, False), 2: ([message(3)], 3, True)}
+        state["handler"] = lambda request: httpx.Response(
+            200, content=chunked(find_response(*pages[offset_of(request)])),
+        )
+        session = make()
+        session.PAGE_SIZE = 2
+
+        ids = [item.find(f"{{{TYPES_NS}}}ItemId").get("Id")
+               for item in session.find_items(lambda view: f"<m:FindItem>{view}</m:FindItem>", f"{{{TYPES_NS}}}Message")]
+
+        assert ids == ["msg1", "msg2", "msg3"]
+        finds = [r for r in seen if b"FindItem" in r.content]
+        assert [offset_of(r) for r in finds] == [0, 2]
+        assert b'MaxEntriesReturned="2"' in finds[0].content
+
+    def test_find_items_stops_at_limit(self, ews) -> None:
+        """A limit caps the page size and the number of pages."""
+        make, state, seen = ews
+        state["handler"] = lambda request: httpx.Response(200, text=find_response([message(1)], 1, False))
+        session = make()
+        items = list(session.find_items(lambda view: view, f"{{{TYPES_NS}}}Message", limit=1))
+        assert len(items) == 1
+        assert len([r for r in seen if b"IndexedPageItemView" in r.content]) == 1
+
+    def test_error_response_raises(self, ews) -> None:
+        """An error ResponseMessage surfaces as RuntimeError."""
+        make, state, _ = ews
+        state["handler"] = lambda request: httpx.Response(
+            200, text=find_response([], 0, True, code="ErrorAccessDenied"),
+        )
+        with pytest.raises(RuntimeError, match="ErrorAccessDenied"):
+            list(make().iter_items("<m:FindItem/>", f"{{{TYPES_NS}}}Message"))
+
+    def test_autodiscover_cached_on_disk(self, ews) -> None:
+        """The discovered host is remembered, so the next session neither probes nor discovers."""
+        make, state, seen = ews
+        state["hosts"] = {"exchange.example.com"}
+        state["handler"] = lambda request: httpx.Response(200, text="<done/>")
+
+        session = make()
+        session.request("<m:GetFolder/>")
+        assert session.server == "exchange.example.com"
+        assert EWSSession.autodiscover_cache.get("u@example.com", "mail.example.com") == "exchange.example.com"
+
+        EWSSession.close_all()
+        seen.clear()
+        discover = MagicMock()
+        session = make(discover=discover)
+        session.request("<m:GetFolder/>")
+        discover.assert_not_called()
+        assert [r.url.host for r in seen] == ["exchange.example.com"]
+
+    def test_unreachable_cached_host_rediscovered(self, ews) -> None:
+        """A cached host that stopped answering is forgotten and the mailbox rediscovered."""
+        make, state, _ = ews
+        EWSSession.autodiscover_cache.put("u@example.com", "mail.example.com", "old.example.com")
+        state["handler"] = lambda request: httpx.Response(200, text="<done/>")
+
+        session = make()
+        assert session.request("<m:GetFolder/>") == "<done/>"
+        assert session.server == "mail.example.com"
+        assert EWSSession.autodiscover_cache.get("u@example.com", "mail.example.com") == "mail.example.com"
+
+
+class TestEWSConsumers:
+    """Calendar and inbox reads over the session."""
+
+    @pytest.mark.asyncio
+    async def test_calendar_view_continues_from_last_start(self, ews) -> None:
+        """A truncated CalendarView is continued from its last item, without duplicates."""
+        make, state, seen = ews
+        pages = {
+            "2026-03-01T00:00:00Z": find_response(
+                [calendar_item("a", "2026-03-02T09:00:00Z"), calendar_item("b", "2026-03-10T09:00:00Z")], 0, False),
+            "2026-03-10T09:00:00Z": find_response(
+                [calendar_item("b", "2026-03-10T09:00:00Z"), calendar_item("c", "2026-03-20T09:00:00Z")], 0, True),
+        }
+        state["handler"] = lambda request: httpx.Response(
+            200, content=chunked(pages[re.search(rb'StartDate="([^"]+)"', request.content).group(1).decode()]),
+        )
+        provider = EWSCalendarProvider(server="mail.example.com", username="u", password="p", email="u@example.com")
+        provider._session = make()
+
+        events = await provider.list_events(START, END)
+
+        assert [e.provider_id for e in events] == ["a", "b", "c"]
+        assert events[0].start == dt.datetime(2026, 3, 2, 9, tzinfo=dt.UTC)
+
+    def test_inbox_fetch_builds_messages(self, ews) -> None:
+        """The inbox is paged up to the limit and each message parsed as it arrives."""
+        make, state, seen = ews
+        pages = {0: ([message(1), message(2)], 2, False), 2: ([message(3)], 3, True)}
+        state["handler"] = lambda request: httpx.Response(
+            200, content=chunked(find_response(*pages[offset_of(request)])),
+        )
+        session = make()
+        session.PAGE_SIZE = 2
+
+        with patch("koda2.modules.email.service.get_settings") as mock:
+            mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="none.json")
+            from koda2.modules.email.service import EmailService
+            service = EmailService()
+        credentials = {"server": "mail.example.com", "username": "u", "password": "p", "email": "u@example.com"}
+
+        emails = service._fetch_ews_inbox(credentials, "Work", unread_only=True, limit=3)
+
+        assert [e.provider_id for e in emails] == ["msg1", "msg2", "msg3"]
+        assert emails[0].sender == "Anna <anna@example.com>" and emails[0].account_name == "Work"
+        assert b"message:IsRead" in seen[-1].content
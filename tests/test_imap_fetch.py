@@ -0,0 +1,162 @@
+"""Tests for header-first IMAP listing and lazy body loading."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from koda2.modules.account.models import ProviderType
+from koda2.modules.email.imap_fetch import decode_part, parse_bodystructure, parse_listing, uid_set
+from koda2.modules.email.imap_pool import IMAPPool
+from koda2.modules.email.models import EmailFilter
+from tests.local_imap import LocalIMAPServer
+
+ATTACHMENT = bytes(range(256)) * 800  # ~200 KB
+
+
+@pytest.fixture
+def server():
+    server = LocalIMAPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def service(server):
+    pool = IMAPPool()
+    account = MagicMock()
+    account.name, account.provider = "Work", ProviderType.IMAP.value
+    account_service = MagicMock()
+    account_service.get_accounts = AsyncMock(return_value=[account])
+    account_service.decrypt_credentials.return_value = {
+        "server": "127.0.0.1", "port": server.port, "username": "user", "password": "secret", "use_ssl": False,
+    }
+    with patch("koda2.modules.email.service.get_settings") as mock:
+        mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="none.json")
+        from koda2.modules.email.service import EmailService
+        service = EmailService(account_service, imap_pool=pool)
+    yield service
+    pool.close_all()
+
+
+class TestParsing:
+    """Parsing what imaplib returns."""
+
+    def test_uid_set(self) -> None:
+        assert uid_set([b"7", b"1", b"2", b"3", b"9", b"10"]) == "1:3,7,9:10"
+        assert uid_set(["4"]) == "4"
+
+    def test_bodystructure_sections(self) -> None:
+        """Parts are numbered as IMAP sections; dispositions and filenames come through."""
+        data = [
+            b'1 (UID 12 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 120 4 NIL NIL NIL NIL)'
+            b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 300 8 NIL NIL NIL NIL) "ALTERNATIVE")'
+            b'("APPLICATION" "PDF" ("NAME" "=?utf-8?q?offerte_=C3=A9.pdf?=") NIL NIL "BASE64" 4000 NIL '
+            b'("ATTACHMENT" ("FILENAME" "=?utf-8?q?offerte_=C3=A9.pdf?=")) NIL NIL) "MIXED"))',
+        ]
+        (message,) = parse_listing(data)
+        parts = message.parts
+        assert [p.section for p in parts] == ["1.1", "1.2", "2"]
+        assert message.text_part().section == "1.1"
+        assert message.text_part().params["charset"] == "utf-8"
+        (attachment,) = message.attachments()
+        assert attachment.filename == "offerte é.pdf" and attachment.decoded_size == 2923
+
+    def test_single_part_is_section_one(self) -> None:
+        parts = parse_bodystructure(["TEXT", "HTML", None, None, None, "7BIT", "42", "2"])
+        assert parts[0].section == "1" and parts[0].content_type == "text/html"
+
+    def test_listing_with_header_literal(self) -> None:
+        """A header literal and the items after it belong to the same message."""
+        data = [
+            (b'3 (UID 7 FLAGS (\\Seen) RFC822.SIZE 900 BODY[HEADER.FIELDS (SUBJECT FROM)] {46}',
+             b"Subject: Offerte\r\nFrom: Bob <bob@example.com>\r\n\r\n"),
+            b' BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1 NIL NIL NIL NIL))',
+        ]
+        (message,) = parse_listing(data)
+        assert message.uid == "7" and message.flags == ["\\Seen"] and message.size == 900
+        assert message.headers["Subject"] == "Offerte"
+        assert message.text_part().section == "1"
+
+    def test_decode_partial_base64(self) -> None:
+        """A prefix cut mid-quantum still decodes."""
+        assert decode_part(b"SGVsbG8gd29y", "base64", partial=True) == "Hello wor"
+        assert decode_part(b"SGVsbG8gd29yb", "base64", partial=True) == "Hello wor"
+        assert decode_part(b"Gr=C3=BC=C3=9Fe", "quoted-printable") == "Grüße"
+
+
+class TestHeaderFirstListing:
+    """Listing the inbox over a local IMAP server."""
+
+    @pytest.mark.asyncio
+    async def test_listing_is_one_small_fetch(self, server, service) -> None:
+        """50 messages with large attachments: one UID FETCH, kilobytes on the wire."""
+        for n in range(50):
+            server.add_message(f"Report {n}", body=f"Body {n}", attachments=((f"report{n}.bin", ATTACHMENT),))
+        mailbox_bytes = sum(len(m.raw) for m in server.mailboxes["INBOX"])
+
+        emails = await service.fetch_emails(EmailFilter(limit=50))
+
+        assert len(emails) == 50 and emails[0].subject == "Report 49"
+        assert server.count("UID FETCH") == 1
+        assert server.bytes_sent < 50_000 < mailbox_bytes
+        first = emails[0]
+        assert first.body_text == "" and not first.body_loaded
+        assert first.attachments[0].filename == "report49.bin"
+        assert first.attachments[0].section == "2"
+        assert abs(first.attachments[0].size - len(ATTACHMENT)) < len(ATTACHMENT) // 50
+        assert first.size > len(ATTACHMENT)
+        assert all("\\Seen" not in m.flags for m in server.mailboxes["INBOX"])
+
+    @pytest.mark.asyncio
+    async def test_limit_takes_newest(self, server, service) -> None:
+        for n in range(5):
+            server.add_message(f"Mail {n}")
+        emails = await service.fetch_emails(EmailFilter(limit=2))
+        assert [e.subject for e in emails] == ["Mail 4", "Mail 3"]
+        assert [e.provider_id for e in emails] == ["5", "4"]
+        assert [c.split(" ")[2] for c in server.commands if c.startswith("UID FETCH")] == ["4:5"]
+
+    @pytest.mark.asyncio
+    async def test_load_bodies_fetches_text_part_only(self, server, service) -> None:
+        """Opening messages fetches just their text parts, never the attachments."""
+        server.add_message("With file", body="Zie bijlage. Grüße", html="<p>Zie bijlage</p>",
+                           attachments=(("big.bin", ATTACHMENT),))
+        server.add_message("Html only", body="ignored")
+        server.mailboxes["INBOX"][-1].raw = server.mailboxes["INBOX"][-1].raw.replace(b"text/plain", b"text/html")
+        emails = await service.fetch_emails()
+        sent_before = server.bytes_sent
+
+        await service.load_bodies(emails)
+
+        by_subject = {e.subject: e for e in emails}
+        assert by_subject["With file"].body_text.strip() == "Zie bijlage. Grüße"
+        assert by_subject["Html only"].body_html.strip() == "ignored"
+        assert all(e.body_loaded for e in emails)
+        assert server.bytes_sent - sent_before < 2_000
+        body_fetches = [c.split(" ", 3)[3] for c in server.commands if "BODY.PEEK[1" in c]
+        assert sorted(body_fetches) == ["(UID BODY.PEEK[1.1])", "(UID BODY.PEEK[1])"]
+
+    @pytest.mark.asyncio
+    async def test_preview_prefix(self, server, service) -> None:
+        """``max_bytes`` fetches a prefix; the message stays marked as not fully loaded."""
+        server.add_message("Long", body="x" * 5000)
+        emails = await service.fetch_emails()
+
+        await service.load_bodies(emails, max_bytes=100)
+
+        preview = emails[0].body_text
+        assert set(preview) == {"x"} and 90 < len(preview) <= 100  # quoted-printable soft breaks
+        assert not emails[0].body_loaded
+        await service.load_bodies(emails)
+        assert emails[0].body_text.strip() == "x" * 5000 and emails[0].body_loaded
+
+    @pytest.mark.asyncio
+    async def test_loaded_messages_skipped(self, server, service) -> None:
+        server.add_message("Short")
+        emails = await service.fetch_emails()
+        await service.load_bodies(emails)
+        fetches = server.count("UID FETCH")
+        await service.load_bodies(emails)
+        assert server.count("UID FETCH") == fetches
@@ -0,0 +1,169 @@
+"""Tests for pooled IMAP sessions, against a local IMAP server."""
+
+from __future__ import annotations
+
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from koda2.modules.account.models import ProviderType
+from koda2.modules.email.imap_pool import IMAPPool
+from tests.local_imap import LocalIMAPServer
+
+
+@pytest.fixture
+def server():
+    server = LocalIMAPServer().start()
+    server.add_message("Quarterly numbers")
+    server.add_message("Lunch?", flags=("\\Seen",))
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def pool():
+    pool = IMAPPool()
+    pool.TIMEOUT = 5
+    yield pool
+    pool.close_all()
+
+
+def select_inbox(conn) -> int:
+    return int(conn.select("INBOX")[1][0])
+
+
+def run(pool: IMAPPool, server: LocalIMAPServer, username: str = "user", password: str = "secret"):
+    return pool.run("127.0.0.1", server.port, username, password, select_inbox, encryption="none")
+
+
+def email_service(server: LocalIMAPServer, pool: IMAPPool):
+    account = MagicMock()
+    account.name, account.provider = "Work", ProviderType.IMAP.value
+    account_service = MagicMock()
+    account_service.get_accounts = AsyncMock(return_value=[account])
+    account_service.decrypt_credentials.return_value = {
+        "server": "127.0.0.1", "port": server.port, "username": "user", "password": "secret", "use_ssl": False,
+    }
+    with patch("koda2.modules.email.service.get_settings") as mock:
+        mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="none.json")
+        from koda2.modules.email.service import EmailService
+        return EmailService(account_service, imap_pool=pool)
+
+
+class TestIMAPPool:
+    """Session reuse, reconnects and limits."""
+
+    def test_reuses_logged_in_session(self, server, pool) -> None:
+        """Repeated work runs over one connection and one LOGIN."""
+        assert [run(pool, server) for _ in range(3)] == [2, 2, 2]
+        assert server.connections == 1 and server.logins == 1
+        assert pool.stats() == {"127.0.0.1": 1}
+
+    def test_reconnects_after_drop(self, server, pool) -> None:
+        """A connection the server cut is replaced and the work retried."""
+        run(pool, server)
+        server.drop_connections()
+        assert run(pool, server) == 2
+        assert server.logins == 2
+        assert pool.stats() == {"127.0.0.1": 1}
+
+    def test_idle_session_checked_with_noop(self, server, pool) -> None:
+        """A session idle past NOOP_AFTER is probed before reuse."""
+        run(pool, server)
+        assert server.count("NOOP") == 0
+        pool.NOOP_AFTER = 0
+        run(pool, server)
+        assert server.count("NOOP") == 1 and server.logins == 1
+
+    def test_password_change_logs_in_again(self, server, pool) -> None:
+        """Sessions from the old password are closed, not reused."""
+        run(pool, server)
+        server.users["user"] = "rotated"
+        assert run(pool, server, password="rotated") == 2
+        assert server.logins == 2 and server.count("LOGOUT") == 1
+
+    def test_failed_work_keeps_session(self, server, pool) -> None:
+        """An ordinary error in the caller's work leaves the session pooled."""
+        def _boom(conn):
+            conn.noop()
+            raise ValueError("parse error")
+
+        with pytest.raises(ValueError):
+            pool.run("127.0.0.1", server.port, "user", "secret", _boom, encryption="none")
+        run(pool, server)
+        assert server.logins == 1
+
+    def test_keepalive(self, server, pool) -> None:
+        """Idle sessions are NOOPed; those idle past MAX_IDLE are logged out."""
+        run(pool, server)
+        assert pool.keepalive() == 1
+        assert server.count("NOOP") == 1
+        pool.MAX_IDLE = 0
+        assert pool.keepalive() == 0
+        assert server.count("LOGOUT") == 1 and pool.stats() == {}
+
+    def test_bounded_per_server(self, server, pool) -> None:
+        """A busy server makes callers wait, then time out."""
+        pool.MAX_PER_SERVER = 1
+        pool.CHECKOUT_TIMEOUT = 0.2
+        with pool.connection("127.0.0.1", server.port, "user", "secret", "none"):
+            with pytest.raises(TimeoutError):
+                run(pool, server)
+        assert server.connections == 1
+
+    def test_waiter_gets_released_session(self, server, pool) -> None:
+        """A caller waiting for a slot takes over the session when it's returned."""
+        pool.MAX_PER_SERVER = 1
+        results: list[int] = []
+        with pool.connection("127.0.0.1", server.port, "user", "secret", "none"):
+            waiter = threading.Thread(target=lambda: results.append(run(pool, server)))
+            waiter.start()
+            waiter.join(0.1)
+        waiter.join(5)
+        assert results == [2] and server.logins == 1
+
+    def test_other_account_evicts_idle_session(self, server, pool) -> None:
+        """At the limit, an idle session of another account on the server makes room."""
+        server.users["assistant"] = "pw"
+        pool.MAX_PER_SERVER = 1
+        run(pool, server)
+        assert run(pool, server, username="assistant", password="pw") == 2
+        assert server.logins == 2 and server.count("LOGOUT") == 1
+        assert pool.stats() == {"127.0.0.1": 1}
+
+    def test_close_all_logs_out(self, server, pool) -> None:
+        run(pool, server)
+        pool.close_all()
+        assert server.count("LOGOUT") == 1 and pool.stats() == {}
+
+
+class TestPooledServices:
+    """The inbox services read over the shared pool."""
+
+    @pytest.mark.asyncio
+    async def test_email_service_reuses_session(self, server, pool) -> None:
+        """Checking the inbox twice logs in once."""
+        service = email_service(server, pool)
+        first = await service.fetch_emails()
+        second = await service.fetch_emails()
+        assert [m.subject for m in first] == ["Lunch?", "Quarterly numbers"]
+        assert len(second) == 2
+        assert server.logins == 1 and server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_assistant_mail_shares_session(self, server, pool) -> None:
+        """The assistant's inbox reuses a session EmailService opened for the same login."""
+        from koda2.modules.email.assistant_mail import AssistantEmailConfig, AssistantMailService
+
+        await email_service(server, pool).fetch_emails()
+        assistant = AssistantMailService(imap_pool=pool)
+        assistant.get_config = AsyncMock(return_value=AssistantEmailConfig(
+            imap_server="127.0.0.1", imap_port=server.port, imap_username="user",
+            imap_password="secret", imap_encryption="none", email_address="user@example.com",
+        ))
+
+        messages = await assistant.fetch_emails()
+
+        assert [m.subject for m in messages] == ["Lunch?", "Quarterly numbers"]
+        assert server.logins == 1
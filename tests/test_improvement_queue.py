@@ -63,6 +63,18 @@ class TestImprovementQueue:
         assert len(items) == 1
         assert items[0]["request"] == "Item 1"
 
+    def test_list_items_cursor_pages_backwards(self, tmp_path: Path) -> None:
+        from koda2.pagination import encode_cursor
+        from koda2.supervisor.improvement_queue import queue_item_cursor
+
+        queue = self._make_queue(tmp_path)
+        for i in range(5):
+            queue.add(f"Item {i}")
+        newest = queue.list_items(limit=2)
+        assert [i["request"] for i in newest] == ["Item 3", "Item 4"]
+        older = queue.list_items(limit=2, cursor=encode_cursor(*queue_item_cursor(newest[0])))
+        assert [i["request"] for i in older] == ["Item 1", "Item 2"]
+
     def test_get_item(self, tmp_path: Path) -> None:
         queue = self._make_queue(tmp_path)
         item = queue.add("Find me")
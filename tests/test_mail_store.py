@@ -0,0 +1,480 @@
+"""Tests for the local mail store and incremental mail sync."""
+
+from __future__ import annotations
+
+import datetime as dt
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.account.models import ProviderType
+from koda2.modules.email.imap_pool import IMAPPool
+from koda2.modules.email.models import EmailMessage, EmailProvider
+from koda2.modules.email.store import MailDelta, MailStore
+from tests.local_imap import LocalIMAPServer
+
+
+@pytest.fixture
+async def store_db():
+    """In-memory DB patched into the mail store."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    with patch("koda2.modules.email.store.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+def make_service(accounts: list, credentials: dict, pool: IMAPPool | None = None):
+    account_service = MagicMock()
+    account_service.get_accounts = AsyncMock(return_value=accounts)
+    account_service.decrypt_credentials.return_value = credentials
+    with patch("koda2.modules.email.service.get_settings") as mock:
+        mock.return_value = MagicMock(imap_server="", smtp_server="", google_credentials_file="none.json")
+        from koda2.modules.email.service import EmailService
+        return EmailService(account_service, imap_pool=pool or IMAPPool())
+
+
+def account(name: str, provider: ProviderType):
+    acc = MagicMock()
+    acc.name, acc.provider = name, provider.value
+    return acc
+
+
+@pytest.fixture
+def server():
+    server = LocalIMAPServer().start()
+    server.add_message("Quarterly numbers")
+    server.add_message("Lunch?", flags=("\\Seen",))
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def imap(server, store_db):
+    pool = IMAPPool()
+    service = make_service([account("Work", ProviderType.IMAP)], {
+        "server": "127.0.0.1", "port": server.port, "username": "user", "password": "secret", "use_ssl": False,
+    }, pool)
+    yield service
+    pool.close_all()
+
+
+def listed_uids(server: LocalIMAPServer) -> list[str]:
+    """UID sets of the header listings sent so far."""
+    return [c.split(" ")[2] for c in server.commands if c.startswith("UID FETCH") and "BODYSTRUCTURE" in c]
+
+
+class TestMailStore:
+    """Applying deltas to the store."""
+
+    @pytest.mark.asyncio
+    async def test_header_update_keeps_loaded_body(self, store_db) -> None:
+        store = MailStore()
+        date = dt.datetime(2026, 3, 2, 9, tzinfo=dt.UTC)
+        full = EmailMessage(provider=EmailProvider.IMAP_SMTP, provider_id="1", subject="Hi", body_text="Body", date=date)
+        await store.apply("Work", "INBOX", MailDelta(messages=[full], full=True))
+        (stored,) = await store.query()
+
+        header_only = EmailMessage(provider=EmailProvider.IMAP_SMTP, provider_id="1", subject="Hi (edited)",
+                                   body_loaded=False, date=date)
+        await store.apply("Work", "INBOX", MailDelta(messages=[header_only]))
+
+        (again,) = await store.query()
+        assert again.id == stored.id and again.subject == "Hi (edited)"
+        assert again.body_text == "Body" and again.body_loaded
+        assert again.date == date
+
+    @pytest.mark.asyncio
+    async def test_full_delta_replaces_folder(self, store_db) -> None:
+        store = MailStore()
+        old = [EmailMessage(provider_id=str(n), subject=f"Old {n}") for n in range(3)]
+        await store.apply("Work", "INBOX", MailDelta(messages=old, full=True))
+        await store.apply("Home", "INBOX", MailDelta(messages=[EmailMessage(provider_id="1")], full=True))
+        await store.apply("Work", "INBOX", MailDelta(messages=[EmailMessage(provider_id="9")], full=True))
+        assert await store.uids("Work", "INBOX") == {9}
+        assert await store.uids("Home", "INBOX") == {1}
+
+
+@pytest.fixture
+async def search_db(store_db):
+    """store_db with the FTS5 index from migration 5."""
+    from koda2.migrations.versions import add_email_search_index
+
+    engine = store_db.kw["bind"]
+    async with engine.begin() as conn:
+        await conn.run_sync(add_email_search_index)
+    yield store_db
+
+
+def stored(provider_id: str, subject: str, body: str = "", **fields) -> EmailMessage:
+    fields.setdefault("date", dt.datetime(2026, 3, 2, 9, tzinfo=dt.UTC))
+    return EmailMessage(provider=EmailProvider.IMAP_SMTP, provider_id=provider_id, subject=subject,
+                        body_text=body, **fields)
+
+
+class TestMailSearch:
+    """Full-text search over the store."""
+
+    @pytest.fixture
+    async def store(self, search_db):
+        store = MailStore()
+        await store.apply("Work", "INBOX", MailDelta(messages=[
+            stored("1", "Offerte kantoorpand", "Hierbij de offerte voor de verbouwing.", sender="jansen@bouw.nl",
+                   attachments=[{"filename": "offerte.pdf"}]),
+            stored("2", "Lunch vrijdag", "Zullen we vrijdag lunchen? Offertes bespreken we later.",
+                   sender="anna@example.com", is_read=True, date=dt.datetime(2026, 3, 5, tzinfo=dt.UTC)),
+            stored("3", "Factuur maart", "De factuur voor maart staat klaar.", sender="boekhouding@bouw.nl"),
+        ], full=True))
+        return store
+
+    @pytest.mark.asyncio
+    async def test_ranked_prefix_match_with_snippet(self, store) -> None:
+        """Subject matches rank first; words match as prefixes; the snippet highlights them."""
+        hits = await store.search("offerte")
+        assert [h.message.provider_id for h in hits] == ["1", "2"]
+        assert "[offerte]" in hits[0].snippet.lower()
+        assert "[Offertes]" in hits[1].snippet
+
+    @pytest.mark.asyncio
+    async def test_all_words_and_phrases(self, store) -> None:
+        assert [h.message.provider_id for h in await store.search("offerte verbouwing")] == ["1"]
+        assert await store.search('"verbouwing offerte"') == []
+        assert [h.message.provider_id for h in await store.search('"de factuur"')] == ["3"]
+
+    @pytest.mark.asyncio
+    async def test_filters(self, store) -> None:
+        async def ids(query: str = "", **filters) -> list[str]:
+            return sorted(h.message.provider_id for h in await store.search(query, **filters))
+
+        assert await ids(sender="bouw.nl") == ["1", "3"]
+        assert await ids("offerte", has_attachments=False) == ["2"]
+        assert await ids(is_read=True) == ["2"]
+        assert await ids(since=dt.datetime(2026, 3, 3, tzinfo=dt.UTC)) == ["2"]
+        assert await ids(before=dt.datetime(2026, 3, 3, tzinfo=dt.UTC), folder="INBOX") == ["1", "3"]
+        assert await ids("offerte", folder="Archive") == []
+
+    @pytest.mark.asyncio
+    async def test_index_follows_changes(self, store) -> None:
+        """Updated bodies are reindexed and deleted messages drop out; flag changes don't matter."""
+        updated = stored("3", "Factuur maart", "Creditnota in plaats van de factuur.")
+        await store.apply("Work", "INBOX", MailDelta(messages=[updated], read_flags={"1": True}, deleted=["2"]))
+
+        assert [h.message.provider_id for h in await store.search("creditnota")] == ["3"]
+        assert [h.message.provider_id for h in await store.search("offerte")] == ["1"]
+
+    @pytest.mark.asyncio
+    async def test_survives_renumbered_rowids(self, store, search_db) -> None:
+        """VACUUM may renumber the implicit rowid; results still point at the right messages."""
+        async with search_db.begin() as session:
+            await session.execute(text("UPDATE email_messages SET rowid = 1000 - rowid"))
+        await store.apply("Work", "INBOX", MailDelta(messages=[stored("4", "Offerte schilderwerk")]))
+
+        assert sorted(h.message.provider_id for h in await store.search("offerte")) == ["1", "2", "4"]
+        assert [h.message.subject for h in await store.search("factuur")] == ["Factuur maart"]
+
+    @pytest.mark.asyncio
+    async def test_without_index_falls_back_to_like(self, store_db) -> None:
+        store = MailStore()
+        await store.apply("Work", "INBOX", MailDelta(messages=[stored("1", "Offerte", "de offerte voor")], full=True))
+        (hit,) = await store.search("offerte")
+        assert hit.snippet == "de [offerte] voor"
+
+    @pytest.mark.asyncio
+    async def test_search_covers_synced_imap_bodies(self, server, imap, search_db) -> None:
+        """Syncing fetches small text parts, so bodies are searchable without opening them."""
+        server.add_message("Notulen", body="Besproken: de nieuwe huurovereenkomst.")
+        (hit,) = await imap.search_emails("huurovereenkomst")
+        assert hit.message.subject == "Notulen" and hit.message.body_loaded
+
+
+class TestIMAPSync:
+    """Incremental sync of an IMAP inbox over a local server."""
+
+    @pytest.mark.asyncio
+    async def test_reads_come_from_store(self, server, imap) -> None:
+        """The first read syncs; reads within MAIL_SYNC_MAX_AGE don't touch the server."""
+        first = await imap.fetch_all_emails()
+        assert [e.subject for e in first] == ["Lunch?", "Quarterly numbers"]
+        commands = len(server.commands)
+
+        unread = await imap.fetch_all_emails(unread_only=True)
+
+        assert [e.subject for e in unread] == ["Quarterly numbers"]
+        assert unread[0].id == first[1].id
+        assert len(server.commands) == commands
+
+    @pytest.mark.asyncio
+    async def test_only_new_messages_listed(self, server, imap) -> None:
+        await imap.sync_mail()
+        server.add_message("Invoice")
+
+        assert await imap.sync_mail() == {"Work": 1}
+
+        assert listed_uids(server) == ["1:2", "3"]
+        assert "UID SEARCH UID 3:*" in server.commands
+        subjects = [e.subject for e in await imap.fetch_all_emails()]
+        assert subjects == ["Invoice", "Lunch?", "Quarterly numbers"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_folder_costs_one_examine(self, server, imap) -> None:
+        await imap.sync_mail()
+        commands = len(server.commands)
+        assert await imap.sync_mail() == {"Work": 0}
+        assert [c.split(" ")[0] for c in server.commands[commands:]] == ["EXAMINE"]
+
+    @pytest.mark.asyncio
+    async def test_flag_changes_since_modseq(self, server, imap) -> None:
+        """Only messages whose MODSEQ moved are fetched, flags only."""
+        await imap.sync_mail()
+        server.set_flags(1, "\\Seen")
+        server.set_flags(2)
+
+        await imap.sync_mail()
+
+        assert any("(CHANGEDSINCE 3)" in c for c in server.commands)
+        assert listed_uids(server) == ["1:2"]
+        emails = {e.subject: e for e in await imap.fetch_all_emails()}
+        assert emails["Quarterly numbers"].is_read and not emails["Lunch?"].is_read
+
+    @pytest.mark.asyncio
+    async def test_flags_without_condstore(self, server, imap) -> None:
+        server.condstore = False
+        await imap.sync_mail()
+        server.set_flags(1, "\\Seen")
+        await imap.sync_mail()
+        assert not any("CHANGEDSINCE" in c for c in server.commands)
+        assert all(e.is_read for e in await imap.fetch_all_emails())
+
+    @pytest.mark.asyncio
+    async def test_expunged_message_removed(self, server, imap) -> None:
+        await imap.sync_mail()
+        server.expunge(1)
+        await imap.sync_mail()
+        assert [e.subject for e in await imap.fetch_all_emails()] == ["Lunch?"]
+
+    @pytest.mark.asyncio
+    async def test_new_uidvalidity_resyncs(self, server, imap) -> None:
+        await imap.sync_mail()
+        server.uidvalidity = 2
+        server.expunge(2)
+        await imap.sync_mail()
+        assert listed_uids(server) == ["1:2", "1"]
+        assert [e.subject for e in await imap.fetch_all_emails()] == ["Quarterly numbers"]
+
+    @pytest.mark.asyncio
+    async def test_loaded_bodies_are_stored(self, server, imap) -> None:
+        emails = await imap.fetch_all_emails()
+        await imap.load_bodies(emails)
+        fetches = server.count("UID FETCH")
+
+        again = await imap.fetch_all_emails()
+        await imap.load_bodies(again)
+
+        assert again[0].body_text.strip() == "Hello" and again[0].body_loaded
+        assert server.count("UID FETCH") == fetches
+
+    @pytest.mark.asyncio
+    async def test_store_failure_falls_back_to_live(self, server, imap) -> None:
+        imap._store.query = AsyncMock(side_effect=RuntimeError("database is locked"))
+        emails = await imap.fetch_all_emails()
+        assert [e.subject for e in emails] == ["Lunch?", "Quarterly numbers"]
+        assert server.count("SELECT") == 1
+
+
+class HttpError(Exception):
+    """Stands in for googleapiclient's HttpError (status on ``resp``)."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+class _Request:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self._result
+
+
+class FakeGmail:
+    """Just enough of the Gmail API client for syncing."""
+
+    def __init__(self) -> None:
+        self.messages_by_id: dict[str, dict] = {}
+        self.history_id = 100
+        self.records: list[dict] = []
+        self.expired = False
+        self.calls: list[str] = []
+
+    def add(self, message_id: str, subject: str, labels: tuple[str, ...] = ("INBOX", "UNREAD")) -> dict:
+        msg = {
+            "id": message_id, "labelIds": list(labels), "internalDate": "1772442000000",
+            "payload": {"headers": [{"name": "Subject", "value": subject}, {"name": "From", "value": "a@example.com"}],
+                        "body": {"data": "SGk="}},
+        }
+        self.messages_by_id[message_id] = msg
+        return msg
+
+    def users(self):
+        return self
+
+    def getProfile(self, userId):
+        self.calls.append("getProfile")
+        return _Request({"historyId": str(self.history_id)})
+
+    def messages(self):
+        gmail = self
+
+        class _Messages:
+            def list(self, userId, labelIds, maxResults):
+                gmail.calls.append("messages.list")
+                return _Request({"messages": [{"id": i} for i in gmail.messages_by_id]})
+
+            def get(self, userId, id, format):
+                gmail.calls.append(f"messages.get {id}")
+                return _Request(gmail.messages_by_id[id])
+
+        return _Messages()
+
+    def history(self):
+        gmail = self
+
+        class _History:
+            def list(self, userId, startHistoryId, historyTypes, pageToken=None):
+                gmail.calls.append(f"history.list {startHistoryId}")
+                if gmail.expired:
+                    return _Request(HttpError(404))
+                return _Request({"history": gmail.records, "historyId": str(gmail.history_id)})
+
+        return _History()
+
+
+class TestGmailSync:
+    """``history.list`` deltas."""
+
+    @pytest.fixture
+    def gmail(self, store_db):
+        fake = FakeGmail()
+        fake.add("m1", "Offerte")
+        fake.add("m2", "Agenda", labels=("INBOX",))
+        service = make_service([account("Gmail", ProviderType.GOOGLE)], {"token_file": "token.json"})
+        with patch.object(type(service), "_gmail_service", staticmethod(lambda credentials: fake)):
+            yield service, fake
+
+    @pytest.mark.asyncio
+    async def test_history_replay(self, gmail) -> None:
+        service, fake = gmail
+        await service.sync_mail()
+        assert fake.calls[:2] == ["getProfile", "messages.list"]
+
+        fake.add("m3", "Nieuw")
+        fake.history_id = 120
+        fake.records = [
+            {"messagesAdded": [{"message": {"id": "m3", "labelIds": ["INBOX", "UNREAD"]}}]},
+            {"labelsRemoved": [{"message": {"id": "m1"}, "labelIds": ["UNREAD"]}]},
+            {"labelsRemoved": [{"message": {"id": "m2"}, "labelIds": ["INBOX"]}]},
+        ]
+        fake.calls.clear()
+
+        assert await service.sync_mail() == {"Gmail": 3}
+
+        assert fake.calls == ["history.list 100", "messages.get m3"]
+        emails = {e.provider_id: e for e in await service._store.query()}
+        assert set(emails) == {"m1", "m3"} and emails["m1"].is_read and not emails["m3"].is_read
+        assert (await service._store.get_state("Gmail")).sync_token == "120"
+
+    @pytest.mark.asyncio
+    async def test_expired_history_resyncs(self, gmail) -> None:
+        service, fake = gmail
+        await service.sync_mail()
+        fake.expired = True
+        fake.calls.clear()
+        await service.sync_mail()
+        assert fake.calls[:3] == ["history.list 100", "getProfile", "messages.list"]
+        assert {e.provider_id for e in await service._store.query()} == {"m1", "m2"}
+
+
+def graph_message(message_id: str, is_read: bool = False) -> dict:
+    return {"id": message_id, "subject": message_id, "isRead": is_read,
+            "from": {"emailAddress": {"address": "bob@example.com"}},
+            "receivedDateTime": "2026-03-02T09:00:00Z", "body": {"contentType": "text", "content": "Hoi"}}
+
+
+class TestGraphSync:
+    """``messages/delta`` deltas."""
+
+    @pytest.fixture
+    def graph(self, store_db):
+        pages: dict[str, object] = {}
+        seen: list[httpx.Request] = []
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            if request.url.host == "login.microsoftonline.com":
+                return httpx.Response(200, json={"access_token": "tok"})
+            page = pages[request.url.params.get("$deltatoken", "initial")]
+            return page if isinstance(page, httpx.Response) else httpx.Response(200, json=page)
+
+        transport = httpx.MockTransport(_handler)
+        real_client = httpx.AsyncClient
+        service = make_service([account("Office", ProviderType.MSGRAPH)], {
+            "tenant_id": "t", "client_id": "c", "client_secret": "s",
+        })
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+            yield service, pages, seen
+
+    @staticmethod
+    def link(token: str) -> str:
+        return f"https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta?$deltatoken={token}"
+
+    @pytest.mark.asyncio
+    async def test_delta_pages_and_link(self, graph) -> None:
+        service, pages, seen = graph
+        pages["initial"] = {"value": [graph_message("a")], "@odata.nextLink": self.link("p2")}
+        pages["p2"] = {"value": [graph_message("b")], "@odata.deltaLink": self.link("d1")}
+        await service.sync_mail()
+        assert "receivedDateTime ge" in seen[1].url.params["$filter"]
+        assert seen[1].headers["Prefer"] == "odata.maxpagesize=100"
+
+        pages["d1"] = {"value": [graph_message("a", is_read=True), {"id": "b", "@removed": {"reason": "deleted"}}],
+                       "@odata.deltaLink": self.link("d2")}
+        assert await service.sync_mail() == {"Office": 2}
+
+        (email,) = await service._store.query()
+        assert email.provider_id == "a" and email.is_read
+        assert (await service._store.get_state("Office")).sync_token == self.link("d2")
+
+    @pytest.mark.asyncio
+    async def test_expired_link_restarts(self, graph) -> None:
+        service, pages, _ = graph
+        pages["initial"] = {"value": [graph_message("a")], "@odata.deltaLink": self.link("d1")}
+        await service.sync_mail()
+        pages["d1"] = httpx.Response(410, json={"error": {"code": "SyncStateNotFound"}})
+        pages["initial"] = {"value": [graph_message("c")], "@odata.deltaLink": self.link("d3")}
+
+        await service.sync_mail()
+
+        assert [e.provider_id for e in await service._store.query()] == ["c"]
+        assert (await service._store.get_state("Office")).sync_token == self.link("d3")
@@ -0,0 +1,278 @@
+"""Tests for memory consolidation (decay, merge, archive, compaction)."""
+
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.memory.consolidation import MemoryConsolidator
+from koda2.modules.memory.models import Conversation, MemoryEntry, UserProfile
+
+
+class FakeVectorStore:
+    """In-memory stand-in for VectorMemory with explicit embeddings."""
+
+    def __init__(self) -> None:
+        self.docs: dict[str, dict] = {}
+        self.compactions = 0
+
+    def put(self, doc_id: str, text: str, embedding: list[float], metadata: dict | None = None) -> None:
+        self.docs[doc_id] = {"content": text, "embedding": embedding, "metadata": metadata or {}}
+
+    def get(self, ids: list[str], include_embeddings: bool = False) -> list[dict]:
+        rows = []
+        for doc_id in ids:
+            if doc_id in self.docs:
+                d = self.docs[doc_id]
+                row = {"id": doc_id, "content": d["content"], "metadata": d["metadata"]}
+                if include_embeddings:
+                    row["embedding"] = d["embedding"]
+                rows.append(row)
+        return rows
+
+    def delete_many(self, ids: list[str]) -> None:
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+    def count(self) -> int:
+        return len(self.docs)
+
+    def compact(self) -> int:
+        self.compactions += 1
+        return len(self.docs)
+
+
+@pytest.fixture
+async def session_factory():
+    """In-memory database with all tables created."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    with patch("koda2.modules.memory.consolidation.get_session", side_effect=mock_get_session), \
+         patch("koda2.modules.memory.consolidation.index_size_bytes", return_value=0):
+        yield factory
+
+    await engine.dispose()
+
+
+@pytest.fixture
+def vector() -> FakeVectorStore:
+    return FakeVectorStore()
+
+
+@pytest.fixture
+def consolidator(vector, tmp_path) -> MemoryConsolidator:
+    return MemoryConsolidator(
+        vector,
+        archive_dir=tmp_path / "archive",
+        half_life_days=30,
+        decay_floor=0.1,
+        duplicate_distance=0.05,
+        archive_after_days=30,
+    )
+
+
+async def _add_entry(factory, vector, entry_id, content, embedding, *, user="u1",
+                     category="fact", importance=0.5, age_days=0.0) -> None:
+    stamp = dt.datetime.now(dt.UTC) - dt.timedelta(days=age_days)
+    async with factory() as session:
+        session.add(MemoryEntry(
+            id=entry_id, user_id=user, category=category, content=content,
+            importance=importance, created_at=stamp, updated_at=stamp,
+        ))
+        await session.commit()
+    vector.put(entry_id, content, embedding, {"user_id": user})
+
+
+async def _active_ids(factory) -> set[str]:
+    async with factory() as session:
+        result = await session.execute(
+            select(MemoryEntry.id).where(MemoryEntry.active == True)  # noqa: E712
+        )
+        return set(result.scalars().all())
+
+
+class TestDecay:
+    """Importance/recency decay."""
+
+    @pytest.mark.asyncio
+    async def test_old_low_importance_entries_expire(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "fresh", "fresh", [1, 0], age_days=1)
+        await _add_entry(session_factory, vector, "stale", "stale", [0, 1], age_days=120)
+        removed = await consolidator.decay(dt.datetime.now(dt.UTC))
+        assert removed == 1
+        assert await _active_ids(session_factory) == {"fresh"}
+        assert "stale" not in vector.docs
+
+    @pytest.mark.asyncio
+    async def test_protected_category_never_decays(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "vip", "birthday", [1, 0],
+                         category="important", age_days=3650)
+        assert await consolidator.decay(dt.datetime.now(dt.UTC)) == 0
+        assert await _active_ids(session_factory) == {"vip"}
+
+    def test_decayed_importance_halves_per_half_life(self, consolidator) -> None:
+        now = dt.datetime.now(dt.UTC)
+        value = consolidator.decayed_importance(0.8, now - dt.timedelta(days=30), now)
+        assert value == pytest.approx(0.4)
+
+
+class TestMergeDuplicates:
+    """Near-duplicate clustering."""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_collapse_to_most_important(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "a", "Likes coffee", [1.0, 0.0], importance=0.4)
+        await _add_entry(session_factory, vector, "b", "Likes coffee a lot", [0.999, 0.01], importance=0.9)
+        await _add_entry(session_factory, vector, "c", "Lives in Utrecht", [0.0, 1.0], importance=0.5)
+        merged = await consolidator.merge_duplicates()
+        assert merged == 1
+        assert await _active_ids(session_factory) == {"b", "c"}
+        assert set(vector.docs) == {"b", "c"}
+
+    @pytest.mark.asyncio
+    async def test_keeper_inherits_highest_importance(self, session_factory, vector, consolidator) -> None:
+        old = dt.timedelta(days=2)
+        await _add_entry(session_factory, vector, "new", "x", [1.0, 0.0], importance=0.5)
+        await _add_entry(session_factory, vector, "old", "x", [1.0, 0.0], importance=0.5, age_days=old.days)
+        await consolidator.merge_duplicates()
+        async with session_factory() as session:
+            kept = (await session.execute(
+                select(MemoryEntry).where(MemoryEntry.active == True)  # noqa: E712
+            )).scalars().all()
+        assert [e.id for e in kept] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_other_users_and_categories_are_not_merged(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "a", "same", [1.0, 0.0], user="u1")
+        await _add_entry(session_factory, vector, "b", "same", [1.0, 0.0], user="u2")
+        await _add_entry(session_factory, vector, "c", "same", [1.0, 0.0], user="u1", category="habit")
+        assert await consolidator.merge_duplicates() == 0
+
+
+class TestArchive:
+    """Cold storage for old conversation vectors."""
+
+    @pytest.mark.asyncio
+    async def test_old_conversation_vectors_are_archived(self, session_factory, vector, consolidator) -> None:
+        now = dt.datetime.now(dt.UTC)
+        async with session_factory() as session:
+            profile = UserProfile(user_id="u1")
+            session.add(profile)
+            await session.flush()
+            session.add(Conversation(id="old", profile_id=profile.id, role="user",
+                                     content="old turn", created_at=now - dt.timedelta(days=60)))
+            session.add(Conversation(id="new", profile_id=profile.id, role="user",
+                                     content="new turn", created_at=now))
+            await session.commit()
+        vector.put("old", "old turn", [1.0, 0.0], {"user_id": "u1"})
+        vector.put("new", "new turn", [0.0, 1.0], {"user_id": "u1"})
+
+        count, path = await consolidator.archive_conversations(now)
+        assert count == 1
+        assert set(vector.docs) == {"new"}
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            records = [json.loads(line) for line in fh]
+        assert records[0]["id"] == "old"
+        assert records[0]["embedding"] == [1.0, 0.0]
+
+        # Watermark prevents rescanning the same slice
+        assert await consolidator.archive_conversations(now) == (0, None)
+
+
+class TestRun:
+    """End-to-end consolidation report."""
+
+    @pytest.mark.asyncio
+    async def test_report_and_compaction(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "stale", "stale", [0, 1], age_days=400)
+        await _add_entry(session_factory, vector, "keep", "keep", [1, 0])
+        report = await consolidator.run()
+        assert report.decayed == 1
+        assert report.vectors_before == 2
+        assert report.vectors_after == 1
+        assert report.compacted is True
+        assert vector.compactions == 1
+
+    @pytest.mark.asyncio
+    async def test_no_compaction_when_nothing_removed(self, session_factory, vector, consolidator) -> None:
+        await _add_entry(session_factory, vector, "keep", "keep", [1, 0])
+        report = await consolidator.run()
+        assert report.compacted is False
+        assert vector.compactions == 0
+
+
+class TestCompactOnChroma:
+    """VectorMemory.compact and the collection swap against a real (in-memory) Chroma client."""
+
+    @pytest.fixture
+    def chroma(self):
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        import koda2.modules.memory.vector_store as vs
+
+        client = chromadb.EphemeralClient(settings=ChromaSettings(allow_reset=True, anonymized_telemetry=False))
+        client.reset()
+        vs._client = client
+        yield client
+        vs._client = None
+        client.reset()
+
+    @staticmethod
+    def _fill(memory, count: int) -> None:
+        memory.collection.upsert(
+            ids=[f"d{i}" for i in range(count)],
+            embeddings=[[float(i), 1.0, 0.0] for i in range(count)],
+            documents=[f"doc {i}" for i in range(count)],
+            metadatas=[{"n": i} for i in range(count)],
+        )
+
+    def test_compact_keeps_records_and_refreshes_other_handles(self, chroma) -> None:
+        from koda2.modules.memory.vector_store import VectorMemory
+
+        memory = VectorMemory("executive_memory")
+        other = VectorMemory("executive_memory")  # e.g. the running MemoryService
+        self._fill(memory, 10)
+        memory.delete_many(["d0", "d1", "d2"])
+
+        assert memory.compact(batch_size=4) == 7
+
+        assert [c.name for c in chroma.list_collections()] == ["executive_memory"]
+        assert memory.count() == 7
+        assert other.count() == 7
+        assert other.get(["d5"])[0]["content"] == "doc 5"
+
+    def test_failed_swap_keeps_live_collection(self, chroma) -> None:
+        from koda2.modules.memory.vector_store import VectorMemory, _swap_in
+
+        memory = VectorMemory("executive_memory")
+        self._fill(memory, 3)
+        shadow = MagicMock()
+        shadow.modify.side_effect = RuntimeError("rename failed")
+
+        with pytest.raises(RuntimeError):
+            _swap_in(chroma, "executive_memory", shadow)
+
+        assert [c.name for c in chroma.list_collections()] == ["executive_memory"]
+        assert memory.count() == 3
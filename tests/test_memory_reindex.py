@@ -0,0 +1,176 @@
+"""Tests for the bulk memory re-index tool."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from koda2.database import Base
+from koda2.modules.memory.models import Contact, Conversation, MemoryEntry, UserProfile
+from koda2.modules.memory.reindex import MemoryReindexer, ReindexCheckpoint
+
+
+def fake_embedder(texts: list[str]) -> list[list[float]]:
+    """Deterministic 3-d embedding that needs no model download."""
+    return [[float(len(t)), float(sum(map(ord, t)) % 97), 1.0] for t in texts]
+
+
+@pytest.fixture
+def chroma(tmp_path):
+    """Point the Chroma singleton at a temp directory."""
+    import koda2.modules.memory.vector_store as vs
+
+    with patch("koda2.modules.memory.vector_store.get_settings") as mock:
+        mock.return_value = MagicMock(chroma_persist_dir=str(tmp_path / "chroma"))
+        vs._client = None
+        yield vs.get_chroma_client()
+        vs._client = None
+
+
+@pytest.fixture
+async def populated_db():
+    """In-memory DB with a profile, memories, conversations and a contact."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as session:
+        profile = UserProfile(user_id="u1")
+        session.add(profile)
+        await session.flush()
+        for i in range(7):
+            session.add(MemoryEntry(user_id="u1", category="fact", content=f"fact {i}"))
+        session.add(MemoryEntry(user_id="u1", category="fact", content="gone", active=False))
+        for i in range(5):
+            session.add(Conversation(profile_id=profile.id, role="user", content=f"turn {i}"))
+        session.add(Contact(profile_id=profile.id, name="Anna", email="anna@example.com"))
+        await session.commit()
+
+    @asynccontextmanager
+    async def mock_get_session():
+        async with factory() as session:
+            yield session
+
+    with patch("koda2.modules.memory.reindex.get_session", side_effect=mock_get_session):
+        yield factory
+    await engine.dispose()
+
+
+class TestMemoryReindexer:
+    """Shadow build, swap and resume behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_collection_from_all_sources(self, chroma, populated_db, tmp_path) -> None:
+        chroma.get_or_create_collection("executive_memory").upsert(
+            ids=["stale"], embeddings=[[0.0, 0.0, 1.0]], documents=["stale"],
+        )
+        progress = []
+        reindexer = MemoryReindexer(
+            batch_size=3, workers=0, embedder=fake_embedder,
+            checkpoint_path=tmp_path / "cp.json", on_progress=lambda p: progress.append(p.processed),
+        )
+        summary = await reindexer.run()
+
+        assert summary["documents"] == 13
+        assert summary["sources"] == {"memory_entries": 7, "conversations": 5, "contacts": 1}
+        live = chroma.get_collection("executive_memory")
+        assert live.count() == 13
+        assert live.get(ids=["stale"])["ids"] == []
+        assert [c.name for c in chroma.list_collections()] == ["executive_memory"]
+        assert progress[-1] == 13
+        assert not (tmp_path / "cp.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_contact_documents_match_service_format(self, chroma, populated_db, tmp_path) -> None:
+        reindexer = MemoryReindexer(workers=0, embedder=fake_embedder, checkpoint_path=tmp_path / "cp.json")
+        await reindexer.run()
+        live = chroma.get_collection("executive_memory")
+        rows = live.get(where={"type": "contact"})
+        assert rows["ids"][0].startswith("contact_")
+        assert rows["metadatas"][0]["user_id"] == "u1"
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_interruption(self, chroma, populated_db, tmp_path) -> None:
+        calls = {"n": 0}
+
+        def flaky(texts: list[str]) -> list[list[float]]:
+            calls["n"] += 1
+            if calls["n"] == 3:
+                raise RuntimeError("interrupted")
+            return fake_embedder(texts)
+
+        checkpoint = tmp_path / "cp.json"
+        first = MemoryReindexer(batch_size=3, workers=0, embedder=flaky, checkpoint_path=checkpoint)
+        with pytest.raises(RuntimeError):
+            await first.run()
+
+        saved = ReindexCheckpoint.load(checkpoint)
+        assert saved.shadow
+        assert saved.processed == 6
+        assert "memory_entries" in saved.cursors
+
+        embedded: list[str] = []
+
+        def recording(texts: list[str]) -> list[list[float]]:
+            embedded.extend(texts)
+            return fake_embedder(texts)
+
+        second = MemoryReindexer(batch_size=3, workers=0, embedder=recording, checkpoint_path=checkpoint)
+        summary = await second.run()
+        assert summary["documents"] == 13
+        assert len(embedded) == 7
+        assert chroma.get_collection("executive_memory").count() == 13
+
+    @pytest.mark.asyncio
+    async def test_skips_archived_conversations(self, chroma, populated_db, tmp_path) -> None:
+        """Conversations consolidation moved to the archive are not re-embedded."""
+        now = dt.datetime.now(dt.UTC).replace(tzinfo=None)
+        async with populated_db() as session:
+            profile_id = (await session.execute(select(UserProfile.id))).scalar_one()
+            for i in range(4):
+                session.add(Conversation(profile_id=profile_id, role="user", content=f"old {i}",
+                                         created_at=now - dt.timedelta(days=200)))
+            await session.commit()
+        archive = tmp_path / "archive"
+        archive.mkdir()
+        (archive / "state.json").write_text(json.dumps({
+            "conversations_archived_until": (now - dt.timedelta(days=90)).replace(tzinfo=dt.UTC).isoformat(),
+        }))
+
+        reindexer = MemoryReindexer(workers=0, embedder=fake_embedder, checkpoint_path=tmp_path / "cp.json",
+                                    archive_dir=archive)
+        summary = await reindexer.run()
+
+        assert summary["sources"]["conversations"] == 5
+        documents = chroma.get_collection("executive_memory").get()["documents"]
+        assert not any(d.startswith("old ") for d in documents)
+
+    @pytest.mark.asyncio
+    async def test_fresh_run_drops_abandoned_shadow(self, chroma, populated_db, tmp_path) -> None:
+        """--fresh deletes the checkpoint's half-built shadow collection instead of leaking it."""
+        calls = {"n": 0}
+
+        def flaky(texts: list[str]) -> list[list[float]]:
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("interrupted")
+            return fake_embedder(texts)
+
+        checkpoint = tmp_path / "cp.json"
+        failing = MemoryReindexer(batch_size=3, workers=0, embedder=flaky, checkpoint_path=checkpoint)
+        with pytest.raises(RuntimeError):
+            await failing.run()
+        abandoned = ReindexCheckpoint.load(checkpoint).shadow
+        assert abandoned in [c.name for c in chroma.list_collections()]
+
+        reindexer = MemoryReindexer(workers=0, embedder=fake_embedder, checkpoint_path=checkpoint)
+        await reindexer.run(resume=False)
+
+        assert [c.name for c in chroma.list_collections()] == ["executive_memory"]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import datetime as dt
 from contextlib import asynccontextmanager
 from unittest.mock import MagicMock, patch
 
@@ -232,6 +233,87 @@ class TestMemoryServiceMemoryEntries:
         assert await memory_service.delete_memory("ghost-id") is False
 
 
+class TestMemoryServiceProfileCache:
+    """Tests for the user_id → profile_id cache."""
+
+    @pytest.mark.asyncio
+    async def test_profile_id_cached_after_first_write(self, memory_service) -> None:
+        """Only the first write for a user resolves the profile from the DB."""
+        await memory_service.add_conversation("u1", "user", "one")
+        profile = await memory_service.get_or_create_profile("u1")
+        assert memory_service._profile_ids == {"u1": profile.id}
+        convo = await memory_service.add_conversation("u1", "user", "two")
+        assert convo.profile_id == profile.id
+
+    @pytest.mark.asyncio
+    async def test_delete_profile_evicts_cache(self, memory_service, mock_vector) -> None:
+        """Deleting a profile drops its cached ID and its history."""
+        await memory_service.add_conversation("u1", "user", "hello")
+        assert await memory_service.delete_profile("u1") is True
+        assert "u1" not in memory_service._profile_ids
+        mock_vector.delete_where.assert_called_once_with({"user_id": "u1"})
+        assert await memory_service.get_recent_conversations("u1") == []
+
+        # A new conversation recreates the profile rather than reusing the stale ID
+        convo = await memory_service.add_conversation("u1", "user", "again")
+        profile = await memory_service.get_or_create_profile("u1")
+        assert convo.profile_id == profile.id
+
+    @pytest.mark.asyncio
+    async def test_delete_profile_not_found(self, memory_service) -> None:
+        assert await memory_service.delete_profile("ghost") is False
+
+
+class TestMemoryServiceRecallCache:
+    """Tests for the per-user recall cache."""
+
+    def test_repeated_recall_hits_cache(self, memory_service, mock_vector) -> None:
+        """Near-identical queries within the TTL only search once."""
+        mock_vector.search.return_value = [
+            {"id": "m1", "content": "x", "metadata": {}, "distance": 0.1}
+        ]
+        first = memory_service.recall("Project  Alpha", user_id="u1", n=5, max_distance=0.45)
+        second = memory_service.recall("project alpha", user_id="u1", n=5, max_distance=0.45)
+        assert first == second
+        mock_vector.search.assert_called_once()
+        stats = memory_service.recall_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_different_parameters_miss(self, memory_service, mock_vector) -> None:
+        """n and max_distance are part of the cache key."""
+        memory_service.recall("alpha", user_id="u1", n=5)
+        memory_service.recall("alpha", user_id="u1", n=1)
+        memory_service.recall("alpha", user_id="u1", n=1, max_distance=0.15)
+        assert mock_vector.search.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_only_that_user(self, memory_service, mock_vector) -> None:
+        """A vector write for one user drops that user's cached recalls."""
+        memory_service.recall("alpha", user_id="u1")
+        memory_service.recall("alpha", user_id="u2")
+        await memory_service.store_memory("u1", "fact", "New fact")
+        memory_service.recall("alpha", user_id="u1")
+        memory_service.recall("alpha", user_id="u2")
+        assert mock_vector.search.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_conversation_write_invalidates(self, memory_service, mock_vector) -> None:
+        """Adding a conversation turn invalidates the user's cache."""
+        memory_service.recall("alpha", user_id="u1")
+        await memory_service.add_conversation("u1", "user", "hello")
+        memory_service.recall("alpha", user_id="u1")
+        assert mock_vector.search.call_count == 2
+
+    def test_expired_entries_miss(self, memory_service, mock_vector) -> None:
+        """Entries older than the TTL are not served."""
+        memory_service.recall_cache.ttl_seconds = 0
+        memory_service.recall("alpha", user_id="u1")
+        memory_service.recall("alpha", user_id="u1")
+        assert mock_vector.search.call_count == 2
+
+
 class TestMemoryServiceContacts:
     """Tests for contact management."""
 
@@ -246,8 +328,76 @@ class TestMemoryServiceContacts:
         assert contact.name == "John Doe"
         mock_vector.add.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_find_contact_by_partial_name(self, memory_service, mock_vector) -> None:
+        """find_contact matches on a name fragment scoped to the user."""
+        await memory_service.add_contact("u1", name="Anna de Vries")
+        await memory_service.add_contact("u2", name="Anna Jansen")
+        contact = await memory_service.find_contact("u1", "anna")
+        assert contact.name == "Anna de Vries"
+
     @pytest.mark.asyncio
     async def test_find_contact_not_found(self, memory_service) -> None:
         """Finding a contact for unknown user returns None."""
         contact = await memory_service.find_contact("unknown", "Nobody")
         assert contact is None
+
+
+class TestMemoryServicePagination:
+    """Tests for keyset-paginated memory listings."""
+
+    async def _seed(self, memory_service, n: int) -> None:
+        base = dt.datetime(2026, 1, 1, 12, 0)
+        for i in range(n):
+            await memory_service.store_memory("u1", "fact", f"fact {i}")
+        # Give two entries the same timestamp so the id tiebreak is exercised
+        from koda2.modules.memory import service as service_module
+
+        async with service_module.get_session() as session:
+            rows = (await session.execute(select(MemoryEntry).order_by(MemoryEntry.content))).scalars().all()
+            for i, row in enumerate(rows):
+                row.created_at = base + dt.timedelta(minutes=min(i, n - 2))
+                row.updated_at = row.created_at
+
+    @pytest.mark.asyncio
+    async def test_list_memories_pages_without_gaps(self, memory_service) -> None:
+        """Following cursors visits every entry exactly once, newest first."""
+        from koda2.pagination import encode_cursor
+
+        await self._seed(memory_service, 7)
+        seen, cursor = [], None
+        while True:
+            page = await memory_service.list_memories("u1", limit=3, cursor=cursor)
+            seen.extend(page)
+            if len(page) < 3:
+                break
+            cursor = encode_cursor(*memory_service.memory_cursor(page[-1]))
+        assert len({e.id for e in seen}) == 7
+        assert [e.created_at for e in seen] == sorted((e.created_at for e in seen), reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_list_all_memories_cursor(self, memory_service) -> None:
+        """list_all_memories continues after the updated_at cursor."""
+        from koda2.pagination import encode_cursor
+
+        await self._seed(memory_service, 4)
+        first = await memory_service.list_all_memories(limit=2)
+        cursor = encode_cursor(*memory_service.memory_cursor(first[-1], "updated_at"))
+        second = await memory_service.list_all_memories(limit=2, cursor=cursor)
+        assert len(second) == 2
+        assert not {e.id for e in first} & {e.id for e in second}
+
+    @pytest.mark.asyncio
+    async def test_iter_memories_yields_everything(self, memory_service) -> None:
+        """iter_memories walks all pages."""
+        await self._seed(memory_service, 5)
+        entries = [e async for e in memory_service.iter_memories(user_id="u1", batch_size=2)]
+        assert len({e.id for e in entries}) == 5
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_raises(self, memory_service) -> None:
+        """A garbage cursor raises InvalidCursor."""
+        from koda2.pagination import InvalidCursor
+
+        with pytest.raises(InvalidCursor):
+            await memory_service.list_memories("u1", cursor="not-a-cursor")
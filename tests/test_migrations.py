@@ -0,0 +1,203 @@
+"""Tests for schema migrations and hot-path query plans."""
+
+from __future__ import annotations
+
+import datetime as dt
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import koda2.modules.calendar.cache  # noqa: F401
+import koda2.modules.email.store  # noqa: F401
+import koda2.security.audit  # noqa: F401
+from koda2.database import Base
+from koda2.migrations import MIGRATIONS, migration, run_migrations
+from koda2.modules.calendar.models import CalendarEvent, CalendarProvider
+from koda2.modules.memory.models import Conversation  # noqa: F401
+
+
+@pytest.fixture
+async def engine():
+    """In-memory SQLite engine with every table created."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def _index_names(engine, table: str) -> set[str]:
+    async with engine.connect() as conn:
+        indexes = await conn.run_sync(lambda c: inspect(c).get_indexes(table))
+    return {ix["name"] for ix in indexes}
+
+
+class TestMigrationRunner:
+    """Applying and recording migrations."""
+
+    @pytest.mark.asyncio
+    async def test_applies_each_version_once(self, engine) -> None:
+        """Pending migrations run in order and are not re-applied."""
+        applied = await run_migrations(engine)
+        assert applied == [m.version for m in MIGRATIONS]
+        assert applied == sorted(applied)
+        assert await run_migrations(engine) == []
+
+    @pytest.mark.asyncio
+    async def test_upgrades_legacy_schema(self, engine) -> None:
+        """A database from before the composites gains them and loses the old indexes."""
+        async with engine.begin() as conn:
+            for name in ("ix_conversations_profile_created", "ix_memory_entries_user_active_category_created",
+                         "ix_memory_entries_active_updated", "ix_cached_events_account_start"):
+                await conn.execute(text(f"DROP INDEX {name}"))
+            await conn.execute(text("CREATE INDEX ix_conversations_profile_id ON conversations (profile_id)"))
+            await conn.execute(text("CREATE INDEX ix_memory_entries_user_id ON memory_entries (user_id)"))
+
+        await run_migrations(engine)
+
+        conversations = await _index_names(engine, "conversations")
+        assert "ix_conversations_profile_created" in conversations
+        assert "ix_conversations_profile_id" not in conversations
+        memories = await _index_names(engine, "memory_entries")
+        assert "ix_memory_entries_user_active_category_created" in memories
+        assert "ix_memory_entries_user_id" not in memories
+        assert "ix_cached_events_account_start" in await _index_names(engine, "cached_calendar_events")
+
+    @pytest.mark.asyncio
+    async def test_adds_calendar_sync_token_column(self, engine) -> None:
+        """calendar_sync_state from before sync tokens gains the column."""
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE calendar_sync_state"))
+            await conn.execute(text(
+                "CREATE TABLE calendar_sync_state (account_name VARCHAR(255) PRIMARY KEY, "
+                "window_start DATETIME NOT NULL, window_end DATETIME NOT NULL, synced_at DATETIME NOT NULL)"
+            ))
+
+        await run_migrations(engine)
+
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda c: inspect(c).get_columns("calendar_sync_state"))
+        assert "sync_token" in {c["name"] for c in columns}
+
+    @pytest.mark.asyncio
+    async def test_email_search_index_on_own_key(self, engine) -> None:
+        """Migration 5 keys email_fts on search_rowid, numbering stored mail and new rows alike."""
+        async def insert(conn, n: int, subject: str) -> None:
+            await conn.execute(text(
+                "INSERT INTO email_messages (id, account_name, folder, provider_id, subject, sender, sender_name, "
+                "recipients_json, cc_json, date, is_read, attachments_json, size, body_text, body_html, "
+                'body_loaded, in_reply_to, "references", synced_at) VALUES '
+                "(:id, 'Work', 'INBOX', :pid, :subject, '', '', '[]', '[]', :now, 0, '[]', 0, '', '', 1, '', '', :now)"
+            ), {"id": f"m{n}", "pid": str(n), "subject": subject, "now": dt.datetime(2026, 3, 2)})
+
+        # A mail store synced before search existed
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ix_email_messages_search_rowid"))
+            await conn.execute(text("ALTER TABLE email_messages DROP COLUMN search_rowid"))
+            await insert(conn, 1, "Offerte kantoor")
+            await insert(conn, 2, "Factuur maart")
+
+        await run_migrations(engine)
+
+        async with engine.begin() as conn:
+            await insert(conn, 3, "Offerte schilder")
+            ddl = (await conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'email_fts'"))).scalar()
+            keys = (await conn.execute(text("SELECT search_rowid FROM email_messages ORDER BY id"))).scalars().all()
+            found = (await conn.execute(text(
+                "SELECT m.id FROM email_fts JOIN email_messages m ON email_fts.rowid = m.search_rowid "
+                "WHERE email_fts MATCH 'offerte' ORDER BY m.id"
+            ))).scalars().all()
+        assert "content_rowid='search_rowid'" in ddl
+        assert keys == [1, 2, 3]
+        assert found == ["m1", "m3"]
+
+    def test_series_columns_render_for_postgresql(self) -> None:
+        """Migration 4's column types come from the dialect, so PostgreSQL gets TIMESTAMP like the models."""
+        from sqlalchemy.dialects import postgresql
+
+        from koda2.migrations import versions
+
+        conn = MagicMock()
+        conn.dialect = postgresql.dialect()
+        with patch.object(versions, "has_table", return_value=True), \
+                patch.object(versions, "has_column", return_value=False):
+            versions.add_calendar_series_columns(conn)
+
+        statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+        alters = [s for s in statements if s.startswith("ALTER TABLE")]
+        assert "ALTER TABLE cached_calendar_events ADD COLUMN recurrence_end TIMESTAMP WITHOUT TIME ZONE" in alters
+        assert "ALTER TABLE cached_calendar_events ADD COLUMN series_id VARCHAR(512)" in alters
+        assert len(alters) == 4 and not any("DATETIME" in s for s in alters)
+
+    def test_duplicate_version_rejected(self) -> None:
+        """Registering an existing version number is an error."""
+        from koda2.migrations import versions  # noqa: F401
+
+        with pytest.raises(ValueError):
+            migration(1, "duplicate")(lambda conn: None)
+
+
+class TestHotQueryPlans:
+    """EXPLAIN QUERY PLAN on the statements the services actually issue."""
+
+    @pytest.fixture
+    async def captured(self, engine):
+        """Run the hot-path service calls and collect (sql, params) pairs."""
+        await run_migrations(engine)
+        factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        statements: list[tuple[str, tuple]] = []
+
+        @asynccontextmanager
+        async def mock_get_session():
+            async with factory() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+
+        with patch("koda2.modules.memory.service.VectorMemory", return_value=MagicMock()), \
+             patch("koda2.modules.memory.service.get_session", side_effect=mock_get_session), \
+             patch("koda2.modules.calendar.cache.get_session", side_effect=mock_get_session):
+            from koda2.modules.calendar.cache import CalendarCache
+            from koda2.modules.memory.service import MemoryService
+
+            service = MemoryService()
+            cache = CalendarCache()
+            now = dt.datetime(2026, 3, 2, 9, 0)
+            await service.add_conversation("u1", "user", "hello")
+            await service.store_memory("u1", "fact", "likes tea")
+            await cache.sync_events(
+                [CalendarEvent(provider_id="e1", provider=CalendarProvider.GOOGLE, title="Standup",
+                               start=now, end=now + dt.timedelta(minutes=15))],
+                "work", now, now + dt.timedelta(days=7),
+            )
+
+            def _capture(_conn, _cursor, statement, parameters, _context, _many):
+                if statement.lstrip().upper().startswith(("SELECT", "DELETE")):
+                    statements.append((statement, tuple(parameters)))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", _capture)
+            await service.get_recent_conversations("u1", limit=20, max_age_hours=4)
+            await service.list_memories("u1")
+            await service.list_memories("u1", category="fact")
+            await service.list_all_memories()
+            await cache.get_events(now, now + dt.timedelta(days=1), account_name="work")
+            await cache.sync_events([], "work", now, now + dt.timedelta(days=7))
+            event.remove(engine.sync_engine, "before_cursor_execute", _capture)
+        return statements
+
+    @pytest.mark.asyncio
+    async def test_no_full_table_scans(self, engine, captured) -> None:
+        """Every hot query is served by an index."""
+        assert len(captured) >= 6
+        async with engine.connect() as conn:
+            for sql, params in captured:
+                plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)).all()
+                details = [row[-1] for row in plan]
+                scans = [d for d in details if d.startswith("SCAN ") and " USING " not in d]
+                assert not scans, f"full table scan {scans} for:\n{sql}"
@@ -325,6 +325,32 @@ class TestExecuteAction:
         )
         assert isinstance(result, list)
 
+    @pytest.mark.asyncio
+    async def test_find_meeting_slots(self, orchestrator) -> None:
+        """find_meeting_slots passes the search to the calendar service in one call."""
+        import datetime as dt
+
+        from koda2.modules.calendar.models import MeetingSlot, MeetingSlotSearch
+
+        start = dt.datetime(2026, 2, 16, 11, 0, tzinfo=dt.UTC)
+        orchestrator.calendar.find_meeting_slots = AsyncMock(return_value=MeetingSlotSearch(
+            slots=[MeetingSlot(start=start, end=start + dt.timedelta(minutes=45), score=0.9)],
+            unresolved_attendees=["piet@example.com"],
+        ))
+        result = await orchestrator._execute_action(
+            "user1",
+            {"action": "find_meeting_slots", "params": {
+                "start": "2026-02-16T00:00:00", "end": "2026-02-20T23:59:59", "duration_minutes": 45,
+                "attendees": ["anna@example.com", "piet@example.com"], "day_start": "08:30",
+            }},
+            {},
+        )
+        kwargs = orchestrator.calendar.find_meeting_slots.call_args.kwargs
+        assert kwargs["duration_minutes"] == 45
+        assert kwargs["day_start"] == dt.time(8, 30)
+        assert result["slots"][0]["start"] == start.isoformat()
+        assert result["unresolved_attendees"] == ["piet@example.com"]
+
     @pytest.mark.asyncio
     async def test_find_contact(self, orchestrator) -> None:
         """find_contact queries macOS contacts."""
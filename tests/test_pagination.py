@@ -0,0 +1,61 @@
+"""Tests for keyset cursor helpers and in-memory task pagination."""
+
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+from koda2.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor, trim_page
+
+
+class TestCursors:
+    """Tests for cursor encoding."""
+
+    def test_round_trip(self) -> None:
+        """Datetimes are stored as ISO strings alongside other values."""
+        when = dt.datetime(2026, 3, 1, 9, 30)
+        assert decode_cursor(encode_cursor(when, "abc")) == [when.isoformat(), "abc"]
+
+    @pytest.mark.parametrize("bad", ["", "not-a-cursor", encode_cursor("only-one")])
+    def test_rejects_malformed(self, bad: str) -> None:
+        """Garbage and wrong-arity cursors raise InvalidCursor."""
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad)
+
+    def test_trim_page(self) -> None:
+        """An over-fetch yields a cursor from the last kept item."""
+        page, cursor = trim_page([3, 2, 1], 2, lambda n: (n, str(n)))
+        assert page == [3, 2]
+        assert decode_cursor(cursor) == [2, "2"]
+        assert trim_page([1], 2, lambda n: (n, str(n))) == ([1], None)
+
+    def test_after_cursor(self) -> None:
+        """after_cursor sorts and skips everything up to the cursor."""
+        items = [("b", "2"), ("a", "1"), ("c", "3")]
+        assert after_cursor(items, lambda i: i, None) == [("c", "3"), ("b", "2"), ("a", "1")]
+        assert after_cursor(items, lambda i: i, encode_cursor("b", "2")) == [("a", "1")]
+
+
+class TestTaskQueuePagination:
+    """Tests for TaskQueueService.list_tasks paging."""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_tasks(self) -> None:
+        """Following cursors returns every task once, newest first."""
+        from koda2.modules.task_queue import TaskQueueService, task_cursor
+
+        async def noop() -> None:
+            return None
+
+        service = TaskQueueService()
+        submitted = [await service.submit(f"t{i}", noop) for i in range(5)]
+        seen, cursor = [], None
+        while True:
+            page = await service.list_tasks(limit=2, cursor=cursor)
+            seen.extend(page)
+            if len(page) < 2:
+                break
+            cursor = encode_cursor(*task_cursor(page[-1]))
+        assert sorted(t.id for t in seen) == sorted(t.id for t in submitted)
+        assert len(seen) == 5
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import os
+from contextlib import asynccontextmanager
 from unittest.mock import patch, MagicMock
 
 import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from koda2.database import Base
+from koda2.security.audit import AuditLog, AuditWriter
 from koda2.security.encryption import encrypt, decrypt, _get_cipher
 from koda2.security.rbac import Permission, Role, ROLE_PERMISSIONS, UserIdentity
 
@@ -105,3 +111,136 @@ class TestRBAC:
         """require_permission does not raise for valid perms."""
         user = UserIdentity(user_id="admin1", role=Role.ADMIN)
         user.require_permission(Permission.SYSTEM_ACCESS)
+
+
+class TestAuditWriter:
+    """Tests for the buffered audit log writer."""
+
+    @pytest.fixture
+    async def audit_db(self):
+        """In-memory DB; yields a counter of insert transactions."""
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        stats = {"transactions": 0, "factory": factory}
+
+        @asynccontextmanager
+        async def mock_get_session():
+            stats["transactions"] += 1
+            async with factory() as session:
+                yield session
+                await session.commit()
+
+        with patch("koda2.security.audit.get_session", side_effect=mock_get_session):
+            yield stats
+        await engine.dispose()
+
+    @staticmethod
+    async def _row_count(stats) -> int:
+        async with stats["factory"]() as session:
+            return (await session.execute(select(func.count()).select_from(AuditLog))).scalar_one()
+
+    @staticmethod
+    def _row(i: int) -> dict:
+        return {"id": f"row-{i}", "user_id": "u1", "action": "test", "module": "tests", "status": "success"}
+
+    @pytest.mark.asyncio
+    async def test_rows_are_batched(self, audit_db) -> None:
+        """Rows queued together are inserted in a few transactions, not one each."""
+        writer = AuditWriter(flush_interval_ms=50, batch_size=4, max_buffer=100, synchronous=False)
+        for i in range(10):
+            await writer.write(self._row(i))
+        assert audit_db["transactions"] == 0  # nothing hit the DB in the caller's path
+        await writer.close()
+        assert await self._row_count(audit_db) == 10
+        assert audit_db["transactions"] == 3
+
+    @pytest.mark.asyncio
+    async def test_interval_flush(self, audit_db) -> None:
+        """A partial batch is written once the flush interval elapses."""
+        writer = AuditWriter(flush_interval_ms=20, batch_size=100, max_buffer=100, synchronous=False)
+        await writer.write(self._row(1))
+        await asyncio.sleep(0.1)
+        assert await self._row_count(audit_db) == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_buffer_full(self, audit_db) -> None:
+        """Writers wait for the flusher instead of growing the buffer."""
+        writer = AuditWriter(flush_interval_ms=10, batch_size=1, max_buffer=2, synchronous=False)
+        for i in range(6):
+            await writer.write(self._row(i))
+            assert writer.pending <= 2
+        await writer.close()
+        assert await self._row_count(audit_db) == 6
+
+    @staticmethod
+    def _recording_writer(**kwargs) -> tuple[AuditWriter, list[str]]:
+        """Writer whose inserts only record row IDs, so it can outlive an event loop."""
+        writer = AuditWriter(max_buffer=100, synchronous=False, **kwargs)
+        inserted: list[str] = []
+
+        async def record(rows: list[dict]) -> None:
+            inserted.extend(row["id"] for row in rows)
+            writer.written += len(rows)
+
+        writer._insert = record
+        return writer, inserted
+
+    def test_queued_rows_move_to_a_new_event_loop(self) -> None:
+        """Rows left behind by a loop that ended are written by a flush on the next one."""
+        writer, inserted = self._recording_writer(flush_interval_ms=60_000, batch_size=100)
+
+        async def queue_rows() -> None:
+            for i in range(3):
+                await writer.write(self._row(i))
+
+        asyncio.run(queue_rows())  # the flusher was still waiting to fill its batch
+        assert inserted == []
+        writer.flush_interval = 0.01
+        asyncio.run(writer.flush())
+        assert inserted == ["row-0", "row-1", "row-2"]
+        assert writer.written == 3 and writer.failed == 0
+
+    def test_insert_lost_with_its_event_loop_is_counted(self) -> None:
+        """A batch whose insert never finished counts as failed, not written."""
+        writer, inserted = self._recording_writer(flush_interval_ms=10, batch_size=2)
+        record = writer._insert
+
+        async def hang(rows: list[dict]) -> None:
+            await asyncio.Event().wait()
+
+        async def start_insert() -> None:
+            for i in range(2):
+                await writer.write(self._row(i))
+            for _ in range(3):
+                await asyncio.sleep(0)  # the flusher is now inside the insert
+
+        writer._insert = hang
+        asyncio.run(start_insert())
+        writer._insert = record
+
+        async def write_and_flush() -> None:
+            await writer.write(self._row(2))
+            await writer.flush()
+
+        asyncio.run(write_and_flush())
+        assert inserted == ["row-2"]
+        assert writer.written == 1 and writer.failed == 2
+
+    @pytest.mark.asyncio
+    async def test_synchronous_mode_writes_inline(self, audit_db) -> None:
+        """Synchronous mode inserts before write() returns."""
+        writer = AuditWriter(synchronous=True)
+        await writer.write(self._row(1))
+        assert await self._row_count(audit_db) == 1
+
+    @pytest.mark.asyncio
+    async def test_log_action_uses_writer(self, audit_db) -> None:
+        """log_action goes through the module writer."""
+        from koda2.security import audit
+
+        with patch.object(audit, "_writer", AuditWriter(synchronous=True)):
+            await audit.log_action("u1", "message_received", "orchestrator", {"length": 3})
+        assert await self._row_count(audit_db) == 1